@@ -228,9 +228,21 @@ def create_app(config_name=None):
     from app.utils.ping_monitor import ping_monitor
     ping_monitor.init_app(app)
 
+    # Initialize trading calendar (shared by all background services)
+    from app.utils.trading_calendar import trading_calendar
+    trading_calendar.init_app(app)
+
+    # OHLC candle cache (leg history shared by charts and Supertrend exits)
+    from app.utils.candle_cache import candle_cache
+    candle_cache.init_app(app)
+
+    # Funds cache (shared, short-lived funds responses for margin sizing)
+    from app.utils.funds_cache import funds_cache
+    funds_cache.init_app(app)
+
     # Initialize option chain background service
     from app.utils.background_service import option_chain_service
-    option_chain_service.start_service()
+    option_chain_service.start_service(app)
 
     # Initialize order status poller (Phase 2)
     from app.utils.order_status_poller import order_status_poller
@@ -238,6 +250,10 @@ def create_app(config_name=None):
     order_status_poller.start()
     app.logger.debug('Order status poller started', extra={'event': 'poller_init'})
 
+    # Order update channel: push-based order events (the poller is the reconciliation sweep)
+    from app.utils.order_update_channel import order_update_channel
+    order_update_channel.init_app(app)
+
     # Recover any pending orders from database (handles app restarts)
     with app.app_context():
         recovered = order_status_poller.recover_pending_orders()
@@ -246,7 +262,7 @@ def create_app(config_name=None):
 
     # Initialize Supertrend exit monitoring service
     from app.utils.supertrend_exit_service import supertrend_exit_service
-    supertrend_exit_service.start_service()
+    supertrend_exit_service.start_service(app)  # Reuses this app for every monitoring cycle
     app.logger.debug('Supertrend exit monitoring service started', extra={'event': 'supertrend_exit_init'})
 
     # Load existing primary and backup accounts within app context
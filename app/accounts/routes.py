@@ -8,6 +8,7 @@ from app import db
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
 from app.utils.rate_limiter import api_rate_limit, heavy_rate_limit
 from app.utils.background_service import option_chain_service
+from app.utils.risk_manager import risk_manager
 import json
 
 def log_activity(action, details=None, account_id=None):
@@ -107,6 +108,7 @@ def add():
             
             db.session.add(account)
             db.session.commit()
+            risk_manager.invalidate_price_accounts()
             
             log_activity('account_added', {
                 'account_name': account.account_name,
@@ -185,6 +187,7 @@ def edit(account_id):
             account.updated_at = datetime.utcnow()
             
             db.session.commit()
+            risk_manager.invalidate_price_accounts()
             
             log_activity('account_updated', {
                 'account_name': account.account_name
@@ -262,6 +265,7 @@ def delete(account_id):
         db.session.commit()
 
         # If deleted account was primary, reassign primary to another active account
+        new_primary = None
         if was_primary:
             remaining_accounts = TradingAccount.query.filter_by(
                 user_id=current_user.id,
@@ -276,9 +280,12 @@ def delete(account_id):
                 # Notify background service about new primary account
                 option_chain_service.on_primary_account_connected(new_primary)
                 current_app.logger.debug(f'Reassigned primary account to: {new_primary.account_name}')
-                flash(f'Account "{account_name}" deleted. Primary reassigned to "{new_primary.account_name}".', 'success')
-            else:
-                flash(f'Account "{account_name}" deleted successfully!', 'success')
+
+        # Reload price feed accounts only once the new primary is committed
+        risk_manager.invalidate_price_accounts()
+
+        if new_primary:
+            flash(f'Account "{account_name}" deleted. Primary reassigned to "{new_primary.account_name}".', 'success')
         else:
             flash(f'Account "{account_name}" deleted successfully!', 'success')
 
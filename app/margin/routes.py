@@ -7,6 +7,7 @@ from app.models import (
     TradingAccount, Strategy, StrategyLeg
 )
 from app.utils.margin_calculator import MarginCalculator
+from app.utils.margin_reference import margin_reference_cache
 from app.utils.rate_limiter import api_rate_limit, heavy_rate_limit
 from datetime import datetime
 import logging
@@ -162,6 +163,7 @@ def requirements():
                 margin_req.futures_non_expiry = float(data.get('futures_non_expiry', 215000))
 
             db.session.commit()
+            margin_reference_cache.invalidate(current_user.id)
 
             return jsonify({
                 'status': 'success',
@@ -252,6 +254,7 @@ def qualities():
                 quality.margin_source = quality_data.get('margin_source', 'available')
 
             db.session.commit()
+            margin_reference_cache.invalidate(current_user.id)
 
             return jsonify({
                 'status': 'success',
@@ -659,6 +662,7 @@ def update_trade_quality(quality_grade):
 
         quality.updated_at = datetime.utcnow()
         db.session.commit()
+        margin_reference_cache.invalidate(current_user.id)
 
         logger.debug(f"Updated trade quality {quality_grade} for user {current_user.id}")
 
@@ -703,6 +707,7 @@ def delete_trade_quality(quality_grade):
 
         db.session.delete(quality)
         db.session.commit()
+        margin_reference_cache.invalidate(current_user.id)
 
         logger.debug(f"Deleted trade quality {quality_grade} for user {current_user.id}")
 
@@ -776,6 +781,7 @@ def update_option_buying_premium():
             sensex_req.sensex_option_buying_premium = float(sensex_option_buying_premium)
 
         db.session.commit()
+        margin_reference_cache.invalidate(current_user.id)
 
         logger.debug(f"Updated option buying premium for user {current_user.id}: NIFTY/BN={option_buying_premium}, SENSEX={sensex_option_buying_premium}")
 
@@ -312,6 +312,7 @@ class Strategy(db.Model):
     supertrend_exit_triggered = db.Column(db.Boolean, default=False)  # Track if exit was already executed
     supertrend_exit_reason = db.Column(db.String(200))  # Stores the exit reason (e.g., "Breakout at Close: 150.25, ST: 145.50")
     supertrend_exit_triggered_at = db.Column(db.DateTime)  # When the exit was triggered
+    supertrend_state = db.Column(db.Text)  # Serialized streaming Supertrend state (survives restarts)
 
     # Order settings
     product_order_type = db.Column(db.String(10), default='NRML')  # 'NRML' or 'MIS'
@@ -914,6 +915,30 @@ class RiskEvent(db.Model):
     def __repr__(self):
         return f'<RiskEvent {self.event_type} - Strategy {self.strategy_id} at {self.triggered_at}>'
 
+class OHLCCandle(db.Model):
+    """
+    Local OHLC candle store, shared by every strategy and user (see app/utils/candle_cache.py)
+    """
+    __tablename__ = 'ohlc_candles'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(100), nullable=False)
+    exchange = db.Column(db.String(20), nullable=False)
+    interval = db.Column(db.String(10), nullable=False)
+    timestamp = db.Column(db.BigInteger, nullable=False)  # Bar open time, epoch seconds (UTC)
+    open = db.Column(db.Float)
+    high = db.Column(db.Float)
+    low = db.Column(db.Float)
+    close = db.Column(db.Float)
+    volume = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'exchange', 'interval', 'timestamp', name='_candle_key_uc'),
+    )
+
+    def __repr__(self):
+        return f'<OHLCCandle {self.exchange}:{self.symbol} {self.interval} @ {self.timestamp}>'
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
\ No newline at end of file
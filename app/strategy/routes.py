@@ -5,6 +5,7 @@ from app.strategy import strategy_bp
 from app.models import Strategy, StrategyLeg, StrategyExecution, TradingAccount, TradeQuality
 from app.utils.rate_limiter import api_rate_limit, heavy_rate_limit
 from app.utils.strategy_executor import StrategyExecutor
+from app.utils.risk_manager import risk_manager
 from datetime import datetime, timedelta
 import json
 import logging
@@ -405,13 +406,10 @@ def execute_strategy(strategy_id):
         # TSL State: RESET -> WAITING -> ACTIVE -> TRIGGERED -> EXIT
         if strategy.trailing_sl and strategy.trailing_sl > 0:
             logger.debug(f"[TSL STATE] Strategy {strategy.id} ({strategy.name}): RESET - Clearing TSL for new entry")
-            strategy.trailing_sl_active = False
-            strategy.trailing_sl_peak_pnl = 0.0
-            strategy.trailing_sl_initial_stop = None
-            strategy.trailing_sl_trigger_pnl = None
-            strategy.trailing_sl_triggered_at = None
-            strategy.trailing_sl_exit_reason = None
-            db.session.commit()
+            # Replaces the previous trade's in-memory ratchet; the write-behind flush
+            # writes the cleared columns after any older flush still in flight
+            risk_manager.reset_trailing_sl(strategy.id)
+            risk_manager.persist_trailing_sl_states()
             logger.debug(f"[TSL STATE] Strategy {strategy.id} ({strategy.name}): State = WAITING (monitoring for P&L > 0)")
 
         # Execute strategy
@@ -645,6 +643,7 @@ def modify_leg_orders(strategy_id, leg_id):
     """Modify the price of all open orders for a specific leg"""
     try:
         from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+        from app.utils.order_status_poller import order_status_poller
 
         data = request.get_json()
         new_price = data.get('price')
@@ -731,6 +730,8 @@ def modify_leg_orders(strategy_id, leg_id):
                     # This will be updated to actual filled price by the order status poller when order fills
                     execution.entry_price = new_price
                     modified_count += 1
+                    # New limit price - poll this order fast again
+                    order_status_poller.expedite_order(execution.id)
                     logger.debug(f"Modified order {execution.order_id} for leg {leg_id} to price {new_price}")
                 else:
                     failed_count += 1
@@ -1484,127 +1485,105 @@ def strategy_positions(strategy_id):
         open_positions_count = len(open_positions)
 
         if open_positions_count > 0:
-            # If TSL was already triggered for this trade, don't re-calculate
-            if strategy.trailing_sl_triggered_at:
+            # TSL ACTIVE FROM ENTRY - Calculate initial stop based on NET PREMIUM
+            # For combined strategies (straddles, spreads), we need to account for direction:
+            #   - BUY leg: Premium paid (debit) = positive contribution to net premium
+            #   - SELL leg: Premium received (credit) = negative contribution to net premium
+            # Net Premium > 0 means net debit (paid money)
+            # Net Premium < 0 means net credit (received money)
+
+            # Get open executions from database for accurate action info
+            open_executions = StrategyExecution.query.filter_by(
+                strategy_id=strategy_id,
+                status='entered'
+            ).join(StrategyLeg).all()
+
+            net_premium = 0
+            buy_premium = 0
+            sell_premium = 0
+
+            for exec in open_executions:
+                if exec.entry_price and exec.quantity:
+                    premium = float(exec.entry_price) * abs(int(exec.quantity))
+                    # Check leg action to determine direction
+                    if exec.leg and exec.leg.action and exec.leg.action.upper() == 'BUY':
+                        net_premium += premium  # Debit (cost)
+                        buy_premium += premium
+                    else:  # SELL
+                        net_premium -= premium  # Credit (received)
+                        sell_premium += premium
+
+            # For TSL calculation, use absolute value of net premium
+            # This represents the actual capital at risk
+            entry_value = abs(net_premium)
+
+            # Detect strategy type for logging
+            is_combined = buy_premium > 0 and sell_premium > 0
+            is_net_credit = net_premium < 0
+            strategy_type = "Combined" if is_combined else "Single Leg"
+            premium_type = "Net Credit" if is_net_credit else "Net Debit"
+
+            logger.debug(f"[TSL] Strategy {strategy.name}: {strategy_type} ({premium_type})")
+            logger.debug(f"[TSL]   BUY premiums: {buy_premium:.2f}, SELL premiums: {sell_premium:.2f}")
+            logger.debug(f"[TSL]   Net Premium: {net_premium:.2f}, Entry Value (abs): {entry_value:.2f}")
+
+            trailing_value = strategy.trailing_sl
+            trailing_type = strategy.trailing_sl_type or 'percentage'
+
+            # Calculate initial stop (max loss from entry)
+            # For 20% TSL: initial_stop = -20% of entry value (net premium)
+            if trailing_type == 'percentage':
+                initial_stop_pnl = -entry_value * (trailing_value / 100)
+            elif trailing_type == 'points':
+                initial_stop_pnl = -trailing_value
+            else:  # 'amount'
+                initial_stop_pnl = -trailing_value
+
+            # The ratchet lives in RiskManager's in-memory TSL state (persisted by its
+            # write-behind flush), so this route never writes the Strategy TSL columns
+            tsl = risk_manager.observe_trailing_sl(strategy, total_pnl, initial_stop_pnl)
+
+            if tsl['triggered_at']:
+                # TSL was already triggered for this trade, don't re-calculate
                 logger.debug(f"[TSL] Strategy {strategy.name}: TSL already triggered, returning triggered state")
                 tsl_status['active'] = False
                 tsl_status['triggered'] = True
-                tsl_status['peak_pnl'] = strategy.trailing_sl_peak_pnl or 0.0
-                tsl_status['trigger_pnl'] = strategy.trailing_sl_trigger_pnl
-                tsl_status['initial_stop'] = strategy.trailing_sl_initial_stop
-                tsl_status['current_stop'] = strategy.trailing_sl_trigger_pnl
-                tsl_status['exit_reason'] = strategy.trailing_sl_exit_reason
+                tsl_status['peak_pnl'] = tsl['peak_pnl']
+                tsl_status['trigger_pnl'] = tsl['stop']
+                tsl_status['initial_stop'] = tsl['initial_stop']
+                tsl_status['current_stop'] = tsl['stop']
+                tsl_status['exit_reason'] = tsl['exit_reason']
             else:
-                # TSL ACTIVE FROM ENTRY - Calculate initial stop based on NET PREMIUM
-                # For combined strategies (straddles, spreads), we need to account for direction:
-                #   - BUY leg: Premium paid (debit) = positive contribution to net premium
-                #   - SELL leg: Premium received (credit) = negative contribution to net premium
-                # Net Premium > 0 means net debit (paid money)
-                # Net Premium < 0 means net credit (received money)
-
-                # Get open executions from database for accurate action info
-                open_executions = StrategyExecution.query.filter_by(
-                    strategy_id=strategy_id,
-                    status='entered'
-                ).join(StrategyLeg).all()
-
-                net_premium = 0
-                buy_premium = 0
-                sell_premium = 0
-
-                for exec in open_executions:
-                    if exec.entry_price and exec.quantity:
-                        premium = float(exec.entry_price) * abs(int(exec.quantity))
-                        # Check leg action to determine direction
-                        if exec.leg and exec.leg.action and exec.leg.action.upper() == 'BUY':
-                            net_premium += premium  # Debit (cost)
-                            buy_premium += premium
-                        else:  # SELL
-                            net_premium -= premium  # Credit (received)
-                            sell_premium += premium
-
-                # For TSL calculation, use absolute value of net premium
-                # This represents the actual capital at risk
-                entry_value = abs(net_premium)
-
-                # Detect strategy type for logging
-                is_combined = buy_premium > 0 and sell_premium > 0
-                is_net_credit = net_premium < 0
-                strategy_type = "Combined" if is_combined else "Single Leg"
-                premium_type = "Net Credit" if is_net_credit else "Net Debit"
-
-                logger.debug(f"[TSL] Strategy {strategy.name}: {strategy_type} ({premium_type})")
-                logger.debug(f"[TSL]   BUY premiums: {buy_premium:.2f}, SELL premiums: {sell_premium:.2f}")
-                logger.debug(f"[TSL]   Net Premium: {net_premium:.2f}, Entry Value (abs): {entry_value:.2f}")
-
-                trailing_value = strategy.trailing_sl
-                trailing_type = strategy.trailing_sl_type or 'percentage'
-
-                # Calculate initial stop (max loss from entry)
-                # For 20% TSL: initial_stop = -20% of entry value (net premium)
-                if trailing_type == 'percentage':
-                    initial_stop_pnl = -entry_value * (trailing_value / 100)
-                elif trailing_type == 'points':
-                    initial_stop_pnl = -trailing_value
-                else:  # 'amount'
-                    initial_stop_pnl = -trailing_value
-
-                # Set initial stop if not already set
-                if strategy.trailing_sl_initial_stop is None:
-                    strategy.trailing_sl_initial_stop = initial_stop_pnl
-                    logger.debug(f"[TSL STATE] Strategy {strategy.name}: Initial stop set at {initial_stop_pnl:.2f} (Net Premium: {net_premium:.2f}, Entry Value: {entry_value:.2f})")
-
                 # TSL is ALWAYS active from entry (no waiting state)
+                # Stop = Initial Stop + Peak P&L, ratcheted up only
+                current_stop = tsl['stop']
                 tsl_status['active'] = True
-                strategy.trailing_sl_active = True
-
-                # Track peak P&L (highest P&L achieved)
-                current_peak = strategy.trailing_sl_peak_pnl or 0.0
-                if total_pnl > current_peak:
-                    strategy.trailing_sl_peak_pnl = total_pnl
-                    current_peak = total_pnl
-                    logger.debug(f"[TSL] Strategy {strategy.name}: New peak P&L = {current_peak:.2f}")
-
-                tsl_status['peak_pnl'] = current_peak
-
-                # Calculate trailing stop based on peak P&L
-                # Logic: Current Stop = Initial Stop + Peak P&L
-                # The stop trails UP from initial stop level by the amount of peak profit
-                # Example: Initial=-860, Peak=100 -> Stop = -860 + 100 = -760
-                current_stop = strategy.trailing_sl_initial_stop + current_peak
-                logger.debug(f"[TSL] Strategy {strategy.name}: Initial={strategy.trailing_sl_initial_stop:.2f} + Peak={current_peak:.2f} = Stop={current_stop:.2f}")
-
-                # Ratchet: current stop can only increase from previous value
-                previous_stop = strategy.trailing_sl_trigger_pnl or strategy.trailing_sl_initial_stop
-                if current_stop > previous_stop:
-                    logger.debug(f"[TSL] Strategy {strategy.name}: Stop ratcheted UP from {previous_stop:.2f} to {current_stop:.2f}")
-
-                current_stop = max(current_stop, previous_stop)
-
-                strategy.trailing_sl_trigger_pnl = current_stop
+                tsl_status['peak_pnl'] = tsl['peak_pnl']
                 tsl_status['trigger_pnl'] = current_stop
-                tsl_status['initial_stop'] = strategy.trailing_sl_initial_stop
+                tsl_status['initial_stop'] = tsl['initial_stop']
                 tsl_status['current_stop'] = current_stop
+                logger.debug(f"[TSL] Strategy {strategy.name}: Initial={tsl['initial_stop']:.2f} + Peak={tsl['peak_pnl']:.2f} -> Stop={current_stop:.2f}")
 
                 # Exit when P&L drops to or below current stop
                 if total_pnl <= current_stop:
                     tsl_status['should_exit'] = True
-                    logger.warning(f"[TSL STATE] Strategy {strategy.name}: ACTIVE -> TRIGGERED | P&L {total_pnl:.2f} <= Stop {current_stop:.2f} (Peak: {current_peak:.2f}, Initial: {strategy.trailing_sl_initial_stop:.2f})")
+                    logger.warning(f"[TSL STATE] Strategy {strategy.name}: P&L {total_pnl:.2f} <= Stop {current_stop:.2f} (Peak: {tsl['peak_pnl']:.2f}, Initial: {tsl['initial_stop']:.2f})")
         else:
-            # No open positions, reset TSL tracking completely
+            # No open positions, reset TSL tracking (triggered_at kept for history)
             tsl_status['no_positions'] = True
-            strategy.trailing_sl_active = False
-            strategy.trailing_sl_peak_pnl = 0.0
-            strategy.trailing_sl_initial_stop = None
-            strategy.trailing_sl_trigger_pnl = None
+            risk_manager.observe_trailing_sl(strategy, total_pnl, None)
 
-    # Save unrealized P&L and TSL state to database with error handling for database locks
+    # Save unrealized P&L to database with error handling for database locks
     try:
         db.session.commit()
     except Exception as e:
         logger.debug(f"DB commit error in positions (will continue): {e}")
         db.session.rollback()
 
+    # Without the risk loop running nothing else flushes the TSL state
+    if tsl_status['enabled'] and not risk_manager.is_running:
+        risk_manager.persist_trailing_sl_states()
+
     return jsonify({
         'status': 'success',
         'data': data,
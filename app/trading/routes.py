@@ -8,6 +8,7 @@ from app.utils.option_chain import OptionChainManager
 from app.utils.websocket_manager import ProfessionalWebSocketManager
 from app.utils.background_service import option_chain_service
 from app.utils.session_manager import session_manager
+from app.utils.trading_calendar import trading_calendar
 from datetime import datetime
 from app.utils.time_utils import format_timestamp_to_ist
 import json
@@ -790,6 +791,7 @@ def add_holiday():
             
             db.session.add(holiday)
             db.session.commit()
+            trading_calendar.invalidate()
             flash(f'Holiday "{holiday_name}" added successfully!', 'success')
             
     except Exception as e:
@@ -816,6 +818,7 @@ def delete_holiday(holiday_id):
         
         db.session.delete(holiday)
         db.session.commit()
+        trading_calendar.invalidate()
         
         flash(f'Holiday "{holiday_name}" deleted successfully!', 'success')
         
@@ -875,6 +878,7 @@ def update_session(session_id):
             session.end_time = datetime.strptime(data['end_time'], '%H:%M').time()
         
         db.session.commit()
+        trading_calendar.invalidate()
         
         # Restart background service to apply changes
         option_chain_service.schedule_market_hours()
@@ -941,6 +945,7 @@ def update_sessions():
                 db.session.add(new_session)
         
         db.session.commit()
+        trading_calendar.invalidate()
         
         # Restart background service to apply changes
         option_chain_service.schedule_market_hours()
@@ -968,6 +973,7 @@ def toggle_template(template_id):
         template = TradingHoursTemplate.query.get_or_404(template_id)
         template.is_active = not template.is_active
         db.session.commit()
+        trading_calendar.invalidate()
         
         return jsonify({'status': 'success', 'is_active': template.is_active})
         
@@ -1021,6 +1027,7 @@ def add_special_session():
             
             db.session.add(session)
             db.session.commit()
+            trading_calendar.invalidate()
             flash(f'Special session "{session_name}" added successfully!', 'success')
             
     except Exception as e:
@@ -1048,6 +1055,7 @@ def delete_special_session(session_id):
         
         db.session.delete(session)
         db.session.commit()
+        trading_calendar.invalidate()
         
         flash(f'Special session "{session_name}" deleted successfully!', 'success')
         
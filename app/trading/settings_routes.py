@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask_login import login_required, current_user
 from app import db
 from app.models import TradingSettings
+from app.utils.margin_reference import margin_reference_cache
 from app.utils.rate_limiter import auth_rate_limit
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/trading/settings')
@@ -104,6 +105,7 @@ def update():
         setting.max_lots_per_order = max_lots
 
         db.session.commit()
+        margin_reference_cache.invalidate(current_user.id)
 
         return jsonify({
             'success': True,
@@ -164,6 +166,7 @@ def reset():
         
         # Create defaults
         TradingSettings.get_or_create_defaults(current_user.id)
+        margin_reference_cache.invalidate(current_user.id)
         
         flash('Settings reset to defaults successfully', 'success')
         return jsonify({'success': True, 'message': 'Settings reset to defaults'})
@@ -2,19 +2,89 @@
 TradingView Routes
 Spread monitoring with Supertrend indicator
 """
-from flask import render_template, request, jsonify
+from flask import render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.tradingview import tradingview_bp
 from app.models import Strategy, StrategyLeg, StrategyExecution
 from app.utils.rate_limiter import api_rate_limit
-from app.utils.supertrend import calculate_supertrend
+from app.utils.supertrend import calculate_supertrend, calculate_supertrend_grid
+from app.utils.candle_cache import candle_cache
+from app.utils.spread_builder import build_spread
+from app.utils.downsample import lttb_indices, span_extremes
 import logging
+import math
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# IST offset: UTC+5:30 = 5*3600 + 30*60 = 19800 seconds (chart times are shifted for display)
+IST_OFFSET = 19800
+
+CHART_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'supertrend', 'direction')
+
+# Bounds for the max_points downsampling parameter
+MIN_CHART_POINTS = 50
+MAX_CHART_POINTS = 10000
+
+
+def _chart_columns(spread_data, trend, direction, start=0, since=None, max_points=None):
+    """
+    Chart series column-wise straight from the NumPy arrays.
+
+    Bars before `start` (Supertrend warm-up) are dropped, and with `since` only
+    bars at or after that chart time are kept (the client's last bar may have
+    been forming when it was sent). With `max_points` the series is LTTB
+    downsampled on close; bars on both sides of every Supertrend flip are kept
+    and each kept candle's high/low cover the bars it stands for.
+    """
+    index = pd.DatetimeIndex(spread_data.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    times = index.as_unit('s').asi8 + IST_OFFSET
+
+    keep = np.arange(len(times)) >= start
+    if since is not None:
+        keep &= times >= since
+
+    times = times[keep]
+    open_ = spread_data['open'].to_numpy(dtype=np.float64)[keep]
+    high = spread_data['high'].to_numpy(dtype=np.float64)[keep]
+    low = spread_data['low'].to_numpy(dtype=np.float64)[keep]
+    close = spread_data['close'].to_numpy(dtype=np.float64)[keep]
+    trend = np.asarray(trend, dtype=np.float64)[keep]
+    direction = np.nan_to_num(np.asarray(direction, dtype=np.float64)[keep], nan=0.0).astype(np.int64)
+
+    if max_points and len(times) > max_points:
+        # A flip is a direction change between two bars that both have a value
+        flips = np.zeros(len(times), dtype=bool)
+        changed = (direction[1:] != direction[:-1]) & (direction[1:] != 0) & (direction[:-1] != 0)
+        flips[1:] |= changed
+        flips[:-1] |= changed
+
+        selected = lttb_indices(times, close, max_points, keep=flips)
+        high, low = span_extremes(high, low, selected)
+        times, open_, close = times[selected], open_[selected], close[selected]
+        trend, direction = trend[selected], direction[selected]
+
+    return {
+        'time': times.tolist(),
+        'open': open_.tolist(),
+        'high': high.tolist(),
+        'low': low.tolist(),
+        'close': close.tolist(),
+        'supertrend': np.where(np.isnan(trend), None, trend).tolist(),
+        'direction': direction.tolist()
+    }
+
+
+def _chart_payload(columns, layout):
+    """'columns' layout as is, 'rows' layout as one object per bar"""
+    if layout == 'columns':
+        return columns
+    return [dict(zip(CHART_COLUMNS, values)) for values in zip(*(columns[name] for name in CHART_COLUMNS))]
+
 
 @tradingview_bp.route('/')
 @login_required
@@ -90,6 +160,9 @@ def get_chart_data(strategy_id):
         - days: Number of days to load (1-5, default: 3)
         - period: Supertrend ATR period (default: from strategy settings or 10)
         - multiplier: Supertrend multiplier (default: from strategy settings or 3)
+        - format: 'rows' (one object per bar, default) or 'columns' (one array per field)
+        - since: Only return bars whose chart time is at or after this value (for refreshes)
+        - max_points: Downsample to about this many bars (LTTB, Supertrend flips always kept)
     """
     try:
         strategy = Strategy.query.filter_by(
@@ -102,6 +175,11 @@ def get_chart_data(strategy_id):
         days = int(request.args.get('days', 3))
         period = int(request.args.get('period', strategy.supertrend_period or 10))
         multiplier = float(request.args.get('multiplier', strategy.supertrend_multiplier or 3.0))
+        layout = 'columns' if request.args.get('format') == 'columns' else 'rows'
+        since = request.args.get('since', type=int)
+        max_points = request.args.get('max_points', type=int)
+        if max_points is not None:
+            max_points = min(max(max_points, MIN_CHART_POINTS), MAX_CHART_POINTS)
 
         # Validate parameters
         if interval not in ['3m', '5m', '10m', '15m']:
@@ -143,15 +221,16 @@ def get_chart_data(strategy_id):
             logger.debug(f"Strategy {strategy_id}: All positions closed, returning zero combined premium")
             return jsonify({
                 'status': 'success',
-                'data': [{
-                    'time': int(datetime.now().timestamp()) + 19800,  # IST offset
-                    'open': 0.0,
-                    'high': 0.0,
-                    'low': 0.0,
-                    'close': 0.0,
-                    'supertrend': None,
-                    'direction': 0
-                }],
+                'format': layout,
+                'data': _chart_payload({
+                    'time': [int(datetime.now().timestamp()) + IST_OFFSET],
+                    'open': [0.0],
+                    'high': [0.0],
+                    'low': [0.0],
+                    'close': [0.0],
+                    'supertrend': [None],
+                    'direction': [0]
+                }, layout),
                 'signal': 'CLOSED',
                 'strategy_name': strategy.name,
                 'legs_count': 0,
@@ -180,24 +259,8 @@ def get_chart_data(strategy_id):
             high, low, close, period=period, multiplier=multiplier
         )
 
-        # Prepare chart data
-        # IST offset: UTC+5:30 = 5*3600 + 30*60 = 19800 seconds
-        IST_OFFSET = 19800
-        chart_data = []
-        for i, timestamp in enumerate(spread_data.index):
-            # Skip initial NaN values
-            if i < period:
-                continue
-
-            chart_data.append({
-                'time': int(timestamp.timestamp()) + IST_OFFSET,  # Convert to IST for display
-                'open': float(spread_data['open'].iloc[i]),
-                'high': float(spread_data['high'].iloc[i]),
-                'low': float(spread_data['low'].iloc[i]),
-                'close': float(spread_data['close'].iloc[i]),
-                'supertrend': float(trend[i]) if not np.isnan(trend[i]) else None,
-                'direction': int(direction[i]) if not np.isnan(direction[i]) else 0
-            })
+        # Prepare chart data (skip the initial warm-up bars, times converted to IST for display)
+        columns = _chart_columns(spread_data, trend, direction, start=period, since=since, max_points=max_points)
 
         # Get current signal
         # Direction convention (matching Pine Script/TradingView):
@@ -211,11 +274,13 @@ def get_chart_data(strategy_id):
         else:  # direction = 1 (bearish)
             signal = 'SELL'
 
-        logger.debug(f"Returning {len(chart_data)} bars of REAL OHLC data to frontend with Supertrend signal: {signal} (active legs: {len(legs)}/{len(all_legs)})")
+        logger.debug(f"Returning {len(columns['time'])} bars of REAL OHLC data to frontend with Supertrend signal: {signal} (active legs: {len(legs)}/{len(all_legs)})")
 
         return jsonify({
             'status': 'success',
-            'data': chart_data,
+            'format': layout,
+            'data': _chart_payload(columns, layout),
+            'total_bars': max(len(spread_data) - period, 0),
             'signal': signal,
             'strategy_name': strategy.name,
             'legs_count': len(legs),
@@ -233,6 +298,233 @@ def get_chart_data(strategy_id):
         }), 500
 
 
+# Upper bound on (period, multiplier) combinations per sweep request
+MAX_SWEEP_COMBINATIONS = 1000
+
+
+def _parse_sweep_values(value, default, cast):
+    """Parse '7,10,14' or 'start:stop:step' (inclusive) into a sorted list
+
+    Raises ValueError before building the values if there would be more than
+    MAX_SWEEP_COMBINATIONS of them.
+    """
+    if not value:
+        return default
+    if ':' in value:
+        start, stop, step = (float(part) for part in value.split(':'))
+        if not all(math.isfinite(v) for v in (start, stop, step)):
+            raise ValueError(f"Invalid range '{value}'")
+        if step <= 0:
+            raise ValueError(f"Invalid step in '{value}'")
+        count = math.floor((stop - start) / step + 0.5) + 1
+        if count > MAX_SWEEP_COMBINATIONS:
+            raise ValueError(f"Too many values in '{value}' (max {MAX_SWEEP_COMBINATIONS})")
+        values = np.arange(start, stop + step / 2, step)
+    else:
+        parts = value.split(',')
+        if len(parts) > MAX_SWEEP_COMBINATIONS:
+            raise ValueError(f"Too many values in '{value[:50]}...' (max {MAX_SWEEP_COMBINATIONS})")
+        values = [float(part) for part in parts if part.strip()]
+    return sorted({cast(round(v, 4)) for v in values})
+
+
+@tradingview_bp.route('/api/supertrend-sweep/<int:strategy_id>')
+@login_required
+@api_rate_limit()
+def supertrend_sweep(strategy_id):
+    """
+    Evaluate Supertrend over a grid of (period, multiplier) settings on the strategy spread
+
+    Query Parameters:
+        - interval: Timeframe (default: from strategy settings or 10m)
+        - days: Number of days to load (1-5, default: 3)
+        - periods: '7,10,14' or 'start:stop:step' (default: 5:20:1)
+        - multipliers: '2,2.5,3' or 'start:stop:step' (default: 1:4:0.5)
+
+    Returns per-setting grids (rows = periods, columns = multipliers): current
+    direction and Supertrend value, number of direction flips, bars since the last flip.
+    """
+    try:
+        strategy = Strategy.query.filter_by(
+            id=strategy_id,
+            user_id=current_user.id
+        ).first_or_404()
+
+        interval = request.args.get('interval', strategy.supertrend_timeframe or '10m')
+        days = int(request.args.get('days', 3))
+        if interval not in ['3m', '5m', '10m', '15m']:
+            interval = '5m'
+        if days < 1 or days > 5:
+            days = 3
+
+        try:
+            periods = _parse_sweep_values(request.args.get('periods'), list(range(5, 21)), int)
+            multipliers = _parse_sweep_values(request.args.get('multipliers'),
+                                              [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0], float)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': f'Invalid sweep parameters: {e}'}), 400
+
+        if not periods or not multipliers or min(periods) < 1 or min(multipliers) <= 0:
+            return jsonify({'status': 'error', 'message': 'Periods and multipliers must be positive'}), 400
+        if len(periods) * len(multipliers) > MAX_SWEEP_COMBINATIONS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Too many combinations (max {MAX_SWEEP_COMBINATIONS})'
+            }), 400
+
+        # Sweep the legs with open positions, or the whole strategy if none are open
+        all_legs = StrategyLeg.query.filter_by(strategy_id=strategy_id).all()
+        if not all_legs:
+            return jsonify({'status': 'error', 'message': 'No legs found for strategy'}), 400
+
+        open_leg_ids = set(
+            pos.leg_id for pos in StrategyExecution.query.filter_by(strategy_id=strategy_id, status='entered').all()
+            if pos.leg_id and getattr(pos, 'broker_order_status', None) not in ['rejected', 'cancelled']
+        )
+        legs = [leg for leg in all_legs if leg.id in open_leg_ids] or all_legs
+
+        spread_data = fetch_spread_historical_data(strategy, legs, interval, days)
+        if spread_data is None or spread_data.empty:
+            return jsonify({
+                'status': 'error',
+                'message': 'Failed to fetch real historical data from OpenAlgo.'
+            }), 500
+
+        trend, direction, combos = calculate_supertrend_grid(
+            spread_data['high'].values, spread_data['low'].values, spread_data['close'].values,
+            periods, multipliers
+        )
+
+        # Flip = direction change between two bars that both have a value
+        changed = (direction[:, 1:] != direction[:, :-1]) & (direction[:, :-1] != 0)
+        flips = changed.sum(axis=1)
+        n_bars = direction.shape[1]
+        last_change = np.where(changed.any(axis=1), n_bars - 1 - np.argmax(changed[:, ::-1], axis=1), -1)
+        bars_since_flip = np.where(last_change >= 0, n_bars - 1 - last_change, -1)
+
+        shape = (len(periods), len(multipliers))
+        current_trend = np.round(trend[:, -1], 2)
+
+        return jsonify({
+            'status': 'success',
+            'strategy_name': strategy.name,
+            'interval': interval,
+            'bars': int(n_bars),
+            'close': float(spread_data['close'].iloc[-1]),
+            'periods': periods,
+            'multipliers': multipliers,
+            'direction': direction[:, -1].reshape(shape).tolist(),
+            'supertrend': np.where(np.isnan(current_trend), None, current_trend).reshape(shape).tolist(),
+            'flips': flips.reshape(shape).tolist(),
+            'bars_since_flip': bars_since_flip.reshape(shape).tolist()
+        })
+
+    except Exception as e:
+        logger.error(f"Error running Supertrend sweep for strategy {strategy_id}: {e}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+# Upper bound on (session, setting) replays per backtest request
+MAX_BACKTEST_RUNS = 20000
+
+
+@tradingview_bp.route('/api/supertrend-backtest/<int:strategy_id>')
+@login_required
+@api_rate_limit()
+def supertrend_backtest(strategy_id):
+    """
+    Replay the strategy's Supertrend exit over past sessions from the local candle store
+
+    Query Parameters:
+        - sessions: Number of most recent sessions to replay (1-250, default: 60); fewer are
+          replayed if fewer are stored (see available_sessions), a 400 only if none are
+        - interval: Timeframe (default: from strategy settings or 10m)
+        - periods / multipliers: Like the sweep (default: the strategy's own setting)
+        - exit_type: 'breakout', 'breakdown' or 'both' (default: the strategy's)
+        - slippage: Percent of price paid on every fill (default: SUPERTREND_BACKTEST_SLIPPAGE_PCT)
+
+    Returns one result per (session, setting) with entry/exit times and P&L,
+    a per-setting summary, and the sessions that could not be replayed.
+    """
+    try:
+        from app.utils.supertrend_backtest import SupertrendBacktest, summarize
+
+        strategy = Strategy.query.filter_by(
+            id=strategy_id,
+            user_id=current_user.id
+        ).first_or_404()
+
+        interval = request.args.get('interval', strategy.supertrend_timeframe or '10m')
+        if interval not in ['3m', '5m', '10m', '15m']:
+            interval = '5m'
+        sessions = min(max(int(request.args.get('sessions', 60)), 1), 250)
+
+        try:
+            periods = _parse_sweep_values(request.args.get('periods'), [strategy.supertrend_period or 10], int)
+            multipliers = _parse_sweep_values(request.args.get('multipliers'),
+                                              [strategy.supertrend_multiplier or 3.0], float)
+            slippage = float(request.args.get('slippage',
+                                              current_app.config.get('SUPERTREND_BACKTEST_SLIPPAGE_PCT', 0.5)))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': f'Invalid backtest parameters: {e}'}), 400
+
+        exit_type = request.args.get('exit_type', strategy.supertrend_exit_type or 'breakout')
+        exit_types = ['breakout', 'breakdown'] if exit_type == 'both' else [exit_type]
+        if any(t not in ('breakout', 'breakdown') for t in exit_types):
+            return jsonify({'status': 'error', 'message': 'exit_type must be breakout, breakdown or both'}), 400
+
+        if not periods or not multipliers or min(periods) < 1 or min(multipliers) <= 0 or slippage < 0:
+            return jsonify({'status': 'error', 'message': 'Periods, multipliers and slippage must be positive'}), 400
+        settings = [(p, m, t) for p in periods for m in multipliers for t in exit_types]
+        if len(settings) > MAX_SWEEP_COMBINATIONS or len(settings) * sessions > MAX_BACKTEST_RUNS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Too many combinations (max {MAX_SWEEP_COMBINATIONS} settings, '
+                           f'{MAX_BACKTEST_RUNS} session replays)'
+            }), 400
+
+        backtest = SupertrendBacktest(
+            strategy,
+            timeframe=interval,
+            policy=current_app.config.get('SPREAD_MISSING_BAR_POLICY', 'intersect'),
+            slippage_pct=slippage,
+            workers=current_app.config.get('SUPERTREND_BACKTEST_WORKERS', 0)
+        )
+        tasks, skipped = backtest.build_tasks(sessions)
+        if not tasks:
+            return jsonify({
+                'status': 'error',
+                'message': f'No stored sessions can be replayed ({len(skipped)} skipped). The candle store '
+                           f'keeps {candle_cache.store_retention_days} days, and only for symbols fetched '
+                           f'while the strategy ran.',
+                'available_sessions': 0,
+                'skipped': skipped
+            }), 400
+        results = backtest.run(settings, sessions=sessions, prepared=(tasks, skipped))
+
+        return jsonify({
+            'status': 'success',
+            'strategy_name': strategy.name,
+            'interval': interval,
+            'slippage_pct': slippage,
+            'requested_sessions': sessions,
+            'available_sessions': len(tasks),  # Fewer than requested while the store fills up
+            'sessions': int(results['session'].nunique()) if not results.empty else 0,
+            'skipped': skipped,
+            'summary': summarize(results).to_dict(orient='records'),
+            'results': results.astype(object).where(results.notna(), None).to_dict(orient='records')
+        })
+
+    except Exception as e:
+        logger.error(f"Error running Supertrend backtest for strategy {strategy_id}: {e}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
     """
     Fetch real historical data from OpenAlgo and combine into spread
@@ -308,7 +600,9 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
         # Store data with leg action (BUY/SELL) for proper spread calculation
         leg_data_dict = {}
 
-        for leg in legs:
+        def fetch_leg(leg):
+            """History for one leg (runs on the candle cache fetch pool)"""
+            leg_data = {}
             try:
                 # Try to get actual placed symbol first, otherwise fall back to base instrument
                 if leg.id in leg_symbols:
@@ -322,8 +616,9 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
 
                 logger.debug(f"Fetching {interval} data for {symbol} from {start_date_str} to {end_date_str}")
 
-                # Fetch historical data from OpenAlgo
-                response = client.history(
+                # Fetch historical data from OpenAlgo (cached; only new bars are requested)
+                response = candle_cache.get_history(
+                    client=client,
                     symbol=symbol,
                     exchange=exchange,
                     interval=interval,
@@ -340,7 +635,7 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
                         lots = leg.lots or 1  # Default to 1 lot if not set
 
                         # Store data with leg action and lots for spread calculation
-                        leg_data_dict[f"{leg.leg_number}_{symbol}"] = {
+                        leg_data[f"{leg.leg_number}_{symbol}"] = {
                             'data': response,
                             'action': leg.action,  # BUY or SELL
                             'lots': lots,  # Number of lots (NOT total quantity)
@@ -360,7 +655,8 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
                     if leg.id in leg_symbols:
                         logger.warning(f"Option symbol {symbol} failed, trying base instrument {leg.instrument}")
                         try:
-                            fallback_response = client.history(
+                            fallback_response = candle_cache.get_history(
+                                client=client,
                                 symbol=leg.instrument,
                                 exchange='NSE',
                                 interval=interval,
@@ -371,7 +667,7 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
                                 required_cols = ['open', 'high', 'low', 'close']
                                 if all(col in fallback_response.columns for col in required_cols):
                                     lots = leg.lots or 1
-                                    leg_data_dict[f"{leg.leg_number}_{leg.instrument}"] = {
+                                    leg_data[f"{leg.leg_number}_{leg.instrument}"] = {
                                         'data': fallback_response,
                                         'action': leg.action,
                                         'lots': lots,
@@ -385,7 +681,11 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
 
             except Exception as e:
                 logger.error(f"Error fetching data for leg {leg.leg_number} ({leg.instrument}): {e}")
-                continue
+            return leg_data
+
+        # Fetch all legs concurrently (identical in-flight requests share one call)
+        for leg_data in candle_cache.map_concurrent(fetch_leg, legs):
+            leg_data_dict.update(leg_data)
 
         # If we couldn't fetch any data, return None
         if not leg_data_dict:
@@ -396,82 +696,22 @@ def fetch_spread_historical_data(strategy, legs, interval='5m', days=3):
         # For Supertrend to work correctly, we need proper high/low values, not just close
         logger.debug(f"Calculating combined spread OHLC from {len(leg_data_dict)} legs...")
 
-        # Initialize combined OHLC
-        common_index = None
-        combined_open = None
-        combined_high = None
-        combined_low = None
-        combined_close = None
-
+        # Apply sign based on action: SELL = positive, BUY = negative
+        weighted_legs = []
         for leg_name, leg_info in leg_data_dict.items():
-            df = leg_info['data']
-            action = leg_info['action']
-            leg_number = leg_info['leg_number']
-
-            # Get OHLC data
-            leg_open = df['open'].copy()
-            leg_high = df['high'].copy()
-            leg_low = df['low'].copy()
-            leg_close = df['close'].copy()
-
-            # Apply sign based on action: SELL = positive, BUY = negative
-            if action == 'BUY':
-                leg_open = -leg_open
-                leg_high = -leg_high
-                leg_low = -leg_low
-                leg_close = -leg_close
-                logger.debug(f"  Leg {leg_number}: BUY (negative contribution)")
-            else:
-                logger.debug(f"  Leg {leg_number}: SELL (positive contribution)")
-
-            # Build common index (intersection of all timestamps)
-            if common_index is None:
-                common_index = df.index
-                combined_open = leg_open
-                combined_high = leg_high
-                combined_low = leg_low
-                combined_close = leg_close
-            else:
-                common_index = common_index.intersection(df.index)
-                combined_open = combined_open.add(leg_open, fill_value=0)
-                combined_high = combined_high.add(leg_high, fill_value=0)
-                combined_low = combined_low.add(leg_low, fill_value=0)
-                combined_close = combined_close.add(leg_close, fill_value=0)
-
-        if common_index is None or len(common_index) == 0:
+            weight = -1.0 if leg_info['action'] == 'BUY' else 1.0
+            weighted_legs.append((leg_info['data'], weight))
+            logger.debug(f"  Leg {leg_info['leg_number']}: {leg_info['action']} "
+                         f"({'negative' if weight < 0 else 'positive'} contribution)")
+
+        # Align legs on timestamps, sum, then take absolute values with high >= low
+        spread = build_spread(weighted_legs, policy=current_app.config.get('SPREAD_MISSING_BAR_POLICY', 'intersect'))
+        if spread is None:
             logger.error("No valid leg data found or no common timestamps")
             return None
 
-        # Reindex to common timestamps
-        combined_open = combined_open.reindex(common_index)
-        combined_high = combined_high.reindex(common_index)
-        combined_low = combined_low.reindex(common_index)
-        combined_close = combined_close.reindex(common_index)
-
-        # Take absolute values for spread (spread value should be positive)
-        combined_open = combined_open.abs()
-        combined_high = combined_high.abs()
-        combined_low = combined_low.abs()
-        combined_close = combined_close.abs()
-
-        # Ensure high >= low after abs() transformation
-        # After taking absolute value, the original high/low relationship might be inverted
-        actual_high = pd.concat([combined_high, combined_low], axis=1).max(axis=1)
-        actual_low = pd.concat([combined_high, combined_low], axis=1).min(axis=1)
-
         # Create OHLC DataFrame with proper high/low for ATR calculation
-        combined_df = pd.DataFrame({
-            'open': combined_open,
-            'high': actual_high,
-            'low': actual_low,
-            'close': combined_close
-        })
-
-        logger.debug(f"  Combined spread OHLC with proper high/low values for Supertrend")
-
-        if combined_df is None or combined_df.empty:
-            logger.error("Failed to calculate spread")
-            return None
+        combined_df = spread.to_frame()
 
         logger.debug(f"Successfully combined {len(leg_data_dict)} legs into spread OHLC with {len(combined_df)} bars (REAL DATA)")
         logger.debug(f"  Latest spread - Open: {combined_df['open'].iloc[-1]:.2f}, High: {combined_df['high'].iloc[-1]:.2f}, Low: {combined_df['low'].iloc[-1]:.2f}, Close: {combined_df['close'].iloc[-1]:.2f}")
@@ -24,6 +24,7 @@ from app.utils.websocket_manager import ProfessionalWebSocketManager
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
 from app.utils.position_monitor import position_monitor
 from app.utils.risk_manager import risk_manager
+from app.utils.trading_calendar import trading_calendar
 from app.utils.session_manager import session_manager
 
 logger = logging.getLogger(__name__)
@@ -118,6 +119,10 @@ class OptionChainBackgroundService:
             # Store immediately so other services can access it
             self.shared_websocket_manager = ws_manager
 
+            # Build live candles from this connection's ticks
+            from app.utils.bar_aggregator import bar_aggregator
+            bar_aggregator.attach(ws_manager)
+
             # Start connection with failover in background thread (non-blocking)
             def connect_websocket_with_failover():
                 for account in all_accounts:
@@ -200,8 +205,14 @@ class OptionChainBackgroundService:
         return (self.shared_websocket_manager is not None and
                 self.shared_websocket_manager.authenticated)
 
-    def start_service(self):
-        """Start the background service"""
+    def start_service(self, app=None):
+        """Start the background service
+
+        Args:
+            app: Flask app whose config holds the risk scan settings (also kept for thread app contexts)
+        """
+        if app is not None:
+            self.set_flask_app(app)
         if not self.is_running:
             # Check if scheduler is actually already running
             if self.scheduler.running:
@@ -216,18 +227,23 @@ class OptionChainBackgroundService:
             # Schedule market hours check
             self.schedule_market_hours()
 
-            # NEW: Schedule risk manager to run every 5 seconds (not 1s - prevents blocking)
+            # NEW: Schedule risk manager scan (not 1s - prevents blocking)
+            # With tick-driven risk evaluation the scan is only a safety net, so it runs
+            # less often; otherwise it stays at 5 seconds.
             # APScheduler max_instances=1 means it will skip if previous run still running
+            config = self.flask_app.config if self.flask_app else {}
+            tick_driven = config.get('RISK_TICK_DRIVEN_ENABLED', True)
+            risk_scan_seconds = int(config.get('RISK_SAFETY_SCAN_SECONDS', 30)) if tick_driven else 5
             self.scheduler.add_job(
                 func=self.run_risk_checks,
                 trigger='interval',
-                seconds=5,
+                seconds=risk_scan_seconds,
                 id='risk_manager_check',
                 replace_existing=True,
                 max_instances=1,  # Skip if previous run still active (non-blocking)
                 misfire_grace_time=10  # Allow 10s grace for misfired jobs
             )
-            logger.debug("Risk manager scheduled (5-second interval)")
+            logger.debug(f"Risk manager scheduled ({risk_scan_seconds}-second interval)")
 
             # NEW: Schedule session cleanup to run every minute
             self.scheduler.add_job(
@@ -689,70 +705,15 @@ class OptionChainBackgroundService:
     def is_trading_hours(self) -> bool:
         """Check if current time is within trading hours (including 15-min pre-market)"""
         try:
-            now = datetime.now(pytz.timezone('Asia/Kolkata'))
-            current_day = now.weekday()
-            current_time = now.time()
-            current_date = now.date()
-            
-            # Check for special trading sessions first
-            if self.has_special_session(current_date, current_time):
-                return True
-            
-            # Check if holiday (skip if special session already checked)
-            if self.is_holiday(current_date):
-                return False
-            
-            # Get trading sessions for current day
-            sessions = self.get_trading_sessions()
-            for session in sessions:
-                if session['day_of_week'] == current_day and session['is_active']:
-                    # Include 15-minute pre-market buffer for WebSocket
-                    pre_market_time = (datetime.combine(date.today(), session['start_time']) - timedelta(minutes=15)).time()
-                    if pre_market_time <= current_time <= session['end_time']:
-                        return True
-            
-            return False
-            
+            return trading_calendar.is_open(pre_open_minutes=15)
         except Exception as e:
             logger.error(f"Error checking trading hours: {e}")
             return False
     
-    def has_special_session(self, check_date, check_time) -> bool:
-        """Check if there's a special trading session at the given date and time"""
-        try:
-            # Use cached special sessions
-            if check_date not in self.cached_special_sessions:
-                return False
-            
-            for session in self.cached_special_sessions.get(check_date, []):
-                # Include 15-minute pre-market buffer
-                pre_market_time = (datetime.combine(check_date, session['start_time']) - timedelta(minutes=15)).time()
-                if pre_market_time <= check_time <= session['end_time']:
-                    logger.debug(f"Special trading session active: {session['session_name']}")
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            logger.debug(f"Could not check special sessions: {e}")
-            return False
-    
     def is_holiday(self, check_date: Optional[date] = None) -> bool:
         """Check if given date is a market holiday"""
         try:
-            if check_date is None:
-                check_date = datetime.now(pytz.timezone('Asia/Kolkata')).date()
-            
-            # Use cached holidays
-            if check_date in self.cached_holidays:
-                holiday_info = self.cached_holidays[check_date]
-                # Check if it's a holiday without special session
-                if not holiday_info.get('is_special_session', False):
-                    logger.debug(f"Market holiday: {holiday_info.get('holiday_name', 'Unknown')}")
-                    return True
-            
-            return False
-            
+            return trading_calendar.is_holiday(check_date)
         except Exception as e:
             logger.error(f"Error checking holiday: {e}")
             return False
@@ -766,6 +727,7 @@ class OptionChainBackgroundService:
             'active_option_chains': list(self.active_managers.keys()),
             'is_trading_hours': self.is_trading_hours(),
             'is_holiday': self.is_holiday(),
+            'calendar': trading_calendar.get_status(),
             'websocket_status': {
                 underlying: ws.get_status() 
                 for underlying, ws in self.websocket_managers.items()
@@ -848,6 +810,10 @@ class OptionChainBackgroundService:
                         })
 
                     self.cache_refresh_time = datetime.now(pytz.timezone('Asia/Kolkata'))
+
+                    # Rebuild the shared trading calendar index (slides the N-day window)
+                    trading_calendar.refresh()
+
                     logger.debug(f"Cache refreshed: {len(self.cached_holidays)} holidays, "
                               f"{len(self.cached_special_sessions)} special session dates, "
                               f"{len(self.cached_sessions)} regular sessions")
@@ -1018,7 +984,7 @@ class OptionChainBackgroundService:
             return
 
         try:
-            risk_manager.start()
+            risk_manager.start(app=self.flask_app)
             self.risk_manager_running = True
             logger.debug("Risk manager started")
         except Exception as e:
@@ -1037,7 +1003,7 @@ class OptionChainBackgroundService:
             logger.error(f"Error stopping risk manager: {e}")
 
     def run_risk_checks(self):
-        """Run risk checks (called by scheduler every 1 second)
+        """Run risk checks (called by scheduler; safety-net scan when tick-driven)
 
         Note: APScheduler already runs jobs in a thread pool, so we DON'T
         need to spawn additional threads here. Just run directly with app context.
@@ -0,0 +1,227 @@
+"""
+Tick-to-Bar Aggregator
+Builds live OHLCV candles from WebSocket ticks, so Supertrend exits can be
+evaluated at candle close without waiting on the broker's history endpoint.
+
+Key Features:
+- Fed by WebSocketDataProcessor quote/LTP handlers for every subscribed symbol
+- Rolling bars per symbol for 1m/3m/5m/10m/15m, aligned to the 09:15 IST
+  session open like broker history
+- O(1) work per tick per timeframe, no database access on the tick path
+- Completed bars are merged into the candle cache, so CandleCache.get_history()
+  serves the candle that just closed from memory
+- A symbol's first bar is partial (ticks started mid-bar) and is not published
+- flush_due() closes bars whose time is up even before the next bar's first tick
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Live timeframes (the Supertrend exit timeframes plus 1m)
+TIMEFRAME_MINUTES = {
+    '1m': 1,
+    '3m': 3,
+    '5m': 5,
+    '10m': 10,
+    '15m': 15
+}
+
+IST_OFFSET_SECONDS = 19800  # UTC+5:30
+SESSION_OPEN_SECONDS = (9 * 60 + 15) * 60  # 09:15 IST
+
+MAX_BARS_PER_SERIES = 500
+
+
+def bar_start(epoch_seconds: float, minutes: int) -> int:
+    """Start (epoch seconds) of the bar containing epoch_seconds, aligned to 09:15 IST"""
+    local = int(epoch_seconds) + IST_OFFSET_SECONDS
+    day = local - local % 86400
+    size = minutes * 60
+    offset = local - day - SESSION_OPEN_SECONDS
+    return day + SESSION_OPEN_SECONDS + (offset // size) * size - IST_OFFSET_SECONDS
+
+
+class _Bar:
+    """Forming bar for one symbol and timeframe"""
+
+    __slots__ = ('start', 'end', 'open', 'high', 'low', 'close', 'volume', 'partial')
+
+    def __init__(self, start: int, end: int, price: float, partial: bool):
+        self.start = start
+        self.end = end
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0
+        self.partial = partial
+
+
+class BarAggregator:
+    """
+    Singleton that turns WebSocket ticks into live candles
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the bar aggregator"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self._forming: Dict[Tuple[str, str], Dict[str, _Bar]] = {}
+        self._completed: Dict[Tuple[str, str, str], deque] = {}
+        self._last_volume: Dict[Tuple[str, str], float] = {}
+        self._processors = set()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.ticks = 0
+        self.bars_completed = 0
+
+        logger.debug("BarAggregator initialized")
+
+    def attach(self, websocket_manager):
+        """Register tick handlers on a WebSocket manager's data processor (once per processor)"""
+        processor = getattr(websocket_manager, 'data_processor', None)
+        if processor is None or id(processor) in self._processors:
+            return
+        self._processors.add(id(processor))
+        processor.register_quote_handler(self.on_tick)
+        processor.register_ltp_handler(self.on_tick)
+        logger.debug("Bar aggregator attached to WebSocket data processor")
+
+    def on_tick(self, data: Dict):
+        """WebSocketDataProcessor handler (quote or LTP mode)"""
+        try:
+            symbol = data.get('symbol')
+            ltp = data.get('ltp')
+            if not symbol or not ltp:
+                return
+            self.update(symbol, data.get('exchange', 'NFO'), float(ltp), volume=data.get('volume'))
+        except Exception as e:
+            logger.error(f"Error aggregating tick: {e}")
+
+    def update(self, symbol: str, exchange: str, price: float, now: Optional[float] = None,
+               volume: Optional[float] = None):
+        """
+        Apply one tick to every timeframe.
+
+        Bars are bucketed by arrival time (exchange timestamps of quiet option
+        contracts can lag). volume is the cumulative day volume from quote mode.
+        """
+        now = time.time() if now is None else now
+        series = (symbol, exchange)
+        completed = []
+
+        with self._lock:
+            self.ticks += 1
+
+            traded = 0.0
+            if volume is not None:
+                volume = float(volume)
+                previous = self._last_volume.get(series)
+                if previous is not None and volume >= previous:
+                    traded = volume - previous
+                self._last_volume[series] = volume
+
+            forming = self._forming.get(series)
+            first_tick = forming is None
+            if first_tick:
+                forming = self._forming[series] = {}
+
+            for timeframe, minutes in TIMEFRAME_MINUTES.items():
+                bar = forming.get(timeframe)
+                if bar is not None and now >= bar.end:
+                    completed.append((timeframe, bar))
+                    bar = None
+
+                if bar is None:
+                    start = bar_start(now, minutes)
+                    bar = forming[timeframe] = _Bar(start, start + minutes * 60, price, partial=first_tick)
+                else:
+                    if price > bar.high:
+                        bar.high = price
+                    if price < bar.low:
+                        bar.low = price
+                    bar.close = price
+                bar.volume += traded
+
+        self._publish(symbol, exchange, completed)
+
+    def flush_due(self, now: Optional[float] = None) -> int:
+        """Close every bar whose time is up; returns the number of bars published"""
+        now = time.time() if now is None else now
+        due = []
+
+        with self._lock:
+            for (symbol, exchange), forming in self._forming.items():
+                completed = [(timeframe, bar) for timeframe, bar in forming.items() if now >= bar.end]
+                for timeframe, _ in completed:
+                    del forming[timeframe]
+                if completed:
+                    due.append((symbol, exchange, completed))
+
+        published = 0
+        for symbol, exchange, completed in due:
+            published += self._publish(symbol, exchange, completed)
+        return published
+
+    def _publish(self, symbol: str, exchange: str, completed: List[Tuple[str, _Bar]]) -> int:
+        """Store completed bars and merge them into the candle cache"""
+        from app.utils.candle_cache import candle_cache
+
+        published = 0
+        for timeframe, bar in completed:
+            if bar.partial:
+                continue
+
+            key = (symbol, exchange, timeframe)
+            with self._lock:
+                bars = self._completed.get(key)
+                if bars is None:
+                    bars = self._completed[key] = deque(maxlen=MAX_BARS_PER_SERIES)
+                bars.append((bar.start, bar.open, bar.high, bar.low, bar.close, bar.volume))
+                self.bars_completed += 1
+
+            candle_cache.add_live_bar(symbol, exchange, timeframe, bar.start, bar.end - bar.start,
+                                      bar.open, bar.high, bar.low, bar.close, bar.volume)
+            published += 1
+        return published
+
+    def get_bars(self, symbol: str, exchange: str, timeframe: str) -> pd.DataFrame:
+        """Completed live bars, shaped like the OpenAlgo SDK's history() frame"""
+        with self._lock:
+            bars = list(self._completed.get((symbol, exchange, timeframe), ()))
+
+        index = pd.to_datetime([bar[0] for bar in bars], unit='s').tz_localize('UTC').tz_convert('Asia/Kolkata')
+        return pd.DataFrame(
+            [bar[1:] for bar in bars],
+            columns=['open', 'high', 'low', 'close', 'volume'],
+            index=pd.DatetimeIndex(index, name='timestamp')
+        )
+
+    def get_stats(self) -> Dict:
+        """Aggregator statistics for monitoring"""
+        return {
+            'symbols': len(self._forming),
+            'series': len(self._completed),
+            'ticks': self.ticks,
+            'bars_completed': self.bars_completed
+        }
+
+
+# Global instance
+bar_aggregator = BarAggregator()
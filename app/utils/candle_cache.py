@@ -0,0 +1,462 @@
+"""
+OHLC Candle Cache
+Local candle store for leg history, used by the TradingView chart and the
+Supertrend exit service instead of calling client.history for the full window.
+
+Key Features:
+- Keyed by (symbol, exchange, interval): strategies and users trading the same
+  symbol share one set of candles
+- Tail fetch: once a window is cached, only bars from the last stored bar's
+  date onward are requested and merged in (the last stored bar may still have
+  been forming, so it is replaced)
+- A key fetched within CANDLE_CACHE_REFRESH_SECONDS is served from memory, so
+  every strategy checking on the same candle close shares one history call
+- Candles are written through to the ohlc_candles table and reloaded after a
+  restart; memory keeps CANDLE_CACHE_RETENTION_DAYS, the table keeps
+  SUPERTREND_BACKTEST_RETENTION_DAYS for backtest replays
+- Single-flight: concurrent requests for the same history call (strategies,
+  browser tabs) wait for the one in flight and share its result
+- map_concurrent() fetches a strategy's legs in parallel on a shared pool
+- Live bars from the tick aggregator are merged in as they complete, but only
+  when contiguous with the cached series; while they cover the last closed
+  candle no history call is made, except that a network fetch replaces them
+  with the broker's bars at least every CANDLE_LIVE_RECONCILE_SECONDS
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CandleKey = Tuple[str, str, str]  # (symbol, exchange, interval)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Intervals the OpenAlgo SDK returns in UTC-naive time (everything else is IST-aware)
+DAILY_INTERVALS = ('D', 'W', 'M')
+
+
+class _Flight:
+    """One in-flight history call that concurrent identical requests wait on"""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def _epoch_seconds(index: pd.DatetimeIndex) -> pd.Index:
+    """Bar times as epoch seconds (tz-aware indexes are converted to UTC first)"""
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    return ((index - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).astype('int64')
+
+
+def _to_index(seconds, interval: str) -> pd.DatetimeIndex:
+    """Epoch seconds back to the index shape the OpenAlgo SDK returns"""
+    index = pd.to_datetime(seconds, unit='s')
+    if interval not in DAILY_INTERVALS:
+        index = index.tz_localize('UTC').tz_convert('Asia/Kolkata')
+    return pd.DatetimeIndex(index, name='timestamp')
+
+
+class CandleCache:
+    """
+    Singleton candle store shared by all history consumers
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the candle cache"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.refresh_seconds = 5
+        self.live_reconcile_seconds = 300  # Live bars are replaced by a network fetch at least this often
+        self.retention_days = 7  # Bars kept in memory
+        self.store_retention_days = 400  # Bars kept in ohlc_candles (backtest replays)
+        self.fetch_workers = 8
+        self.flight_timeout = 30.0  # Seconds a coalesced request waits for the call in flight
+
+        self._frames: Dict[CandleKey, pd.DataFrame] = {}
+        self._covered_from: Dict[CandleKey, str] = {}  # Earliest start_date fully fetched
+        self._fetched_at: Dict[CandleKey, float] = {}
+        self._inflight: Dict[Tuple, _Flight] = {}
+        self._live_until: Dict[CandleKey, Tuple[int, int]] = {}  # (end of last live bar, bar seconds)
+        self._live_since: Dict[CandleKey, float] = {}  # First live bar merged since the last network fetch
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.memory_hits = 0
+        self.tail_fetches = 0
+        self.full_fetches = 0
+        self.bars_fetched = 0
+        self.coalesced = 0
+        self.live_bars = 0
+        self.live_hits = 0
+
+        logger.debug("CandleCache initialized")
+
+    def init_app(self, app):
+        """Read cache settings from the app config"""
+        self.refresh_seconds = int(app.config.get('CANDLE_CACHE_REFRESH_SECONDS', self.refresh_seconds))
+        self.live_reconcile_seconds = int(app.config.get('CANDLE_LIVE_RECONCILE_SECONDS',
+                                                         self.live_reconcile_seconds))
+        self.retention_days = int(app.config.get('CANDLE_CACHE_RETENTION_DAYS', self.retention_days))
+        self.store_retention_days = max(self.retention_days, int(app.config.get(
+            'SUPERTREND_BACKTEST_RETENTION_DAYS', self.store_retention_days)))
+        self.fetch_workers = int(app.config.get('CANDLE_FETCH_WORKERS', self.fetch_workers))
+
+    def map_concurrent(self, func: Callable, items: Iterable) -> List:
+        """
+        Run func(item) for every item on the fetch pool and return the results in order.
+        Each call runs in its own app context of the caller's app.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        from flask import current_app, has_app_context
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def call(item):
+            if app is None:
+                return func(item)
+            with app.app_context():
+                return func(item)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.fetch_workers,
+                                                    thread_name_prefix='CandleFetch')
+            executor = self._executor
+        return list(executor.map(call, items))
+
+    def get_history(self, client, symbol: str, exchange: str, interval: str,
+                    start_date: str, end_date: str):
+        """
+        Drop-in for client.history(): candles for [start_date, end_date] (YYYY-MM-DD).
+
+        Returns a DataFrame indexed by timestamp, or the client's error dict
+        when nothing is cached and the fetch fails.
+        """
+        key = (symbol, exchange, interval)
+        with self._lock:
+            frame = self._get_frame(key)
+            covered = self._covered_from.get(key)
+            fetched_at = self._fetched_at.get(key, 0.0)
+
+        full = frame is None or covered is None or start_date < covered
+        if not full and time.monotonic() - fetched_at < self.refresh_seconds:
+            self.memory_hits += 1
+            return self._window(frame, start_date, end_date)
+        if not full and self._live_covers(key):
+            self.live_hits += 1
+            return self._window(frame, start_date, end_date)
+
+        fetch_start = start_date if full else frame.index[-1].strftime('%Y-%m-%d')
+        response = self._fetch(client, key, fetch_start, end_date, full)
+
+        if isinstance(response, pd.DataFrame) and not response.empty:
+            with self._lock:
+                frame = self._frames.get(key)
+        elif full:
+            # Nothing usable cached - hand the error back like client.history would
+            return response
+        else:
+            # No new bars (or a transient error) - keep serving the cached window
+            with self._lock:
+                self._fetched_at[key] = time.monotonic()
+            logger.debug(f"[CANDLES] {exchange}:{symbol} {interval}: no new bars since {fetch_start}")
+
+        return self._window(frame, start_date, end_date)
+
+    def _fetch(self, client, key: CandleKey, fetch_start: str, end_date: str, full: bool):
+        """
+        Single-flight history call: the first caller fetches and merges, concurrent
+        callers for the same range wait and share the response.
+        """
+        flight_key = key + (fetch_start, end_date)
+        with self._lock:
+            flight = self._inflight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[flight_key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            if not flight.done.wait(self.flight_timeout):
+                return {'status': 'error', 'message': f'Timed out waiting for history of {key[0]}'}
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        symbol, exchange, interval = key
+        try:
+            response = client.history(
+                symbol=symbol,
+                exchange=exchange,
+                interval=interval,
+                start_date=fetch_start,
+                end_date=end_date
+            )
+
+            if full:
+                self.full_fetches += 1
+            else:
+                self.tail_fetches += 1
+
+            if isinstance(response, pd.DataFrame) and not response.empty:
+                self.bars_fetched += len(response)
+                with self._lock:
+                    frame = self._merge(key, response)
+                    if full:
+                        self._covered_from[key] = fetch_start
+                    self._fetched_at[key] = time.monotonic()
+                    self._live_until.pop(key, None)
+                    self._live_since.pop(key, None)
+                self._persist(key, response)
+                logger.debug(f"[CANDLES] {exchange}:{symbol} {interval}: fetched {len(response)} bars "
+                             f"from {fetch_start} ({'full' if full else 'tail'}), {len(frame)} cached")
+
+            flight.response = response
+            return response
+
+        except Exception as e:
+            flight.error = e
+            raise
+
+        finally:
+            with self._lock:
+                self._inflight.pop(flight_key, None)
+            flight.done.set()
+
+    def add_live_bar(self, symbol: str, exchange: str, interval: str, start: int, seconds: int,
+                     open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        Merge a completed live bar (from the tick aggregator) into a cached series.
+
+        Only a bar that replaces the last cached bar or directly follows it is
+        merged. After a gap (missed ticks, a new session) the bar is dropped and
+        the series stops counting as live, so the next read tail-fetches the
+        missing bars. Returns True if merged.
+        """
+        key = (symbol, exchange, interval)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None or frame.empty:
+                return False
+
+            last_start = int(_epoch_seconds(frame.index[-1:])[0])
+            if start not in (last_start, last_start + seconds):
+                self._live_until.pop(key, None)
+                return False
+
+            row = pd.DataFrame({'open': [open_], 'high': [high], 'low': [low], 'close': [close],
+                                'volume': [volume]}, index=_to_index([start], interval))
+            self._frames[key] = pd.concat([frame[frame.index < row.index[0]], row])
+            self._live_until[key] = (start + seconds, seconds)
+            self._live_since.setdefault(key, time.monotonic())
+            self.live_bars += 1
+        return True
+
+    def _live_covers(self, key: CandleKey) -> bool:
+        """
+        True while the cached series ends with the last closed candle (from live
+        bars) and the live bars are younger than live_reconcile_seconds - after that
+        a network fetch replaces them with the broker's bars.
+        """
+        live = self._live_until.get(key)
+        if live is None or time.time() >= live[0] + live[1]:
+            return False
+        return time.monotonic() - self._live_since.get(key, 0.0) < self.live_reconcile_seconds
+
+    @staticmethod
+    def _window(frame: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        return frame.loc[start_date:end_date].copy()
+
+    def _get_frame(self, key: CandleKey) -> Optional[pd.DataFrame]:
+        """Cached frame for key, loading it from the database on first use (caller holds _lock)"""
+        if key not in self._frames:
+            frame = self._load(key)
+            self._frames[key] = frame
+            if frame is not None and not frame.empty:
+                self._covered_from[key] = frame.index[0].strftime('%Y-%m-%d')
+        return self._frames[key]
+
+    def _merge(self, key: CandleKey, response: pd.DataFrame) -> pd.DataFrame:
+        """Replace cached bars from the first fetched bar onward (caller holds _lock)"""
+        response = response.sort_index()
+        frame = self._frames.get(key)
+        if frame is not None and not frame.empty:
+            frame = pd.concat([frame[frame.index < response.index[0]], response])
+        else:
+            frame = response
+
+        cutoff = pd.Timestamp.now(tz=frame.index.tz) - pd.Timedelta(days=self.retention_days)
+        frame = frame[frame.index >= cutoff]
+
+        self._frames[key] = frame
+        return frame
+
+    def _load(self, key: CandleKey) -> Optional[pd.DataFrame]:
+        """Stored candles for key, or None without an app context/table"""
+        try:
+            from flask import has_app_context
+            if not has_app_context():
+                return None
+
+            from app.models import OHLCCandle
+            symbol, exchange, interval = key
+            cutoff = int(time.time()) - self.retention_days * 86400
+            rows = OHLCCandle.query.filter(
+                OHLCCandle.symbol == symbol,
+                OHLCCandle.exchange == exchange,
+                OHLCCandle.interval == interval,
+                OHLCCandle.timestamp >= cutoff
+            ).order_by(OHLCCandle.timestamp).all()
+            if not rows:
+                return None
+
+            frame = pd.DataFrame(
+                {column: [getattr(row, column) for row in rows] for column in OHLCV_COLUMNS},
+                index=_to_index([row.timestamp for row in rows], interval)
+            )
+            logger.debug(f"[CANDLES] Loaded {len(frame)} stored bars for {exchange}:{symbol} {interval}")
+            return frame
+
+        except Exception as e:
+            logger.error(f"[CANDLES] Error loading stored candles for {key}: {e}")
+            return None
+
+    def load_range(self, symbol: str, exchange: str, interval: str, start: int, end: int) -> Optional[pd.DataFrame]:
+        """Stored candles with bar time in [start, end) epoch seconds (for replays; needs an app context)"""
+        try:
+            from app.models import OHLCCandle
+            rows = OHLCCandle.query.filter(
+                OHLCCandle.symbol == symbol,
+                OHLCCandle.exchange == exchange,
+                OHLCCandle.interval == interval,
+                OHLCCandle.timestamp >= start,
+                OHLCCandle.timestamp < end
+            ).order_by(OHLCCandle.timestamp).all()
+            if not rows:
+                return None
+
+            return pd.DataFrame(
+                {column: [getattr(row, column) for row in rows] for column in OHLCV_COLUMNS},
+                index=_to_index([row.timestamp for row in rows], interval)
+            )
+
+        except Exception as e:
+            logger.error(f"[CANDLES] Error loading stored candles for {exchange}:{symbol} {interval}: {e}")
+            return None
+
+    def snapshot(self, exchange: str, interval: str, prefix: str, timestamp: int) -> Dict[str, Tuple[float, float]]:
+        """(open, close) of the stored bar at timestamp for every symbol starting with prefix"""
+        try:
+            from app.models import OHLCCandle
+            rows = OHLCCandle.query.filter(
+                OHLCCandle.exchange == exchange,
+                OHLCCandle.interval == interval,
+                OHLCCandle.symbol.like(f'{prefix}%'),
+                OHLCCandle.timestamp == timestamp
+            ).all()
+            return {row.symbol: (row.open, row.close) for row in rows}
+
+        except Exception as e:
+            logger.error(f"[CANDLES] Error loading stored bars for {exchange}:{prefix}* @ {timestamp}: {e}")
+            return {}
+
+    def stored_sessions(self, exchange: str, interval: str, prefix: str) -> List:
+        """IST dates that have stored candles for symbols starting with prefix"""
+        try:
+            from app import db
+            from app.models import OHLCCandle
+            rows = db.session.query(OHLCCandle.timestamp).filter(
+                OHLCCandle.exchange == exchange,
+                OHLCCandle.interval == interval,
+                OHLCCandle.symbol.like(f'{prefix}%')
+            ).distinct().all()
+            if not rows:
+                return []
+            return sorted(set(_to_index([row[0] for row in rows], interval).date))
+
+        except Exception as e:
+            logger.error(f"[CANDLES] Error listing stored sessions for {exchange}:{prefix}*: {e}")
+            return []
+
+    def _persist(self, key: CandleKey, response: pd.DataFrame):
+        """Write fetched bars through to ohlc_candles (replacing the same time range)"""
+        try:
+            from flask import has_app_context
+            if not has_app_context():
+                return
+
+            from app import db
+            from app.models import OHLCCandle
+            symbol, exchange, interval = key
+
+            seconds = _epoch_seconds(response.index)
+            cutoff = int(time.time()) - self.store_retention_days * 86400
+            key_filter = OHLCCandle.query.filter_by(symbol=symbol, exchange=exchange, interval=interval)
+
+            key_filter.filter(OHLCCandle.timestamp >= int(seconds.min())).delete(synchronize_session=False)
+            key_filter.filter(OHLCCandle.timestamp < cutoff).delete(synchronize_session=False)
+
+            columns = {column: response[column].astype(float).tolist() if column in response.columns
+                       else [None] * len(response) for column in OHLCV_COLUMNS}
+            db.session.bulk_insert_mappings(OHLCCandle, [
+                {
+                    'symbol': symbol,
+                    'exchange': exchange,
+                    'interval': interval,
+                    'timestamp': int(ts),
+                    **{column: columns[column][i] for column in OHLCV_COLUMNS}
+                }
+                for i, ts in enumerate(seconds)
+            ])
+            db.session.commit()
+
+        except Exception as e:
+            logger.error(f"[CANDLES] Error storing candles for {key}: {e}")
+            try:
+                from app import db
+                db.session.rollback()
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict:
+        """Cache statistics for monitoring"""
+        return {
+            'keys': len(self._frames),
+            'bars': sum(len(frame) for frame in self._frames.values() if frame is not None),
+            'memory_hits': self.memory_hits,
+            'tail_fetches': self.tail_fetches,
+            'full_fetches': self.full_fetches,
+            'bars_fetched': self.bars_fetched,
+            'coalesced': self.coalesced,
+            'live_bars': self.live_bars,
+            'live_hits': self.live_hits
+        }
+
+
+# Global instance
+candle_cache = CandleCache()
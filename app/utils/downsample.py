@@ -0,0 +1,125 @@
+"""
+Chart Downsampling
+Largest-Triangle-Three-Buckets (LTTB) downsampling for long chart series.
+
+Key Features:
+- LTTB picks, per bucket, the bar forming the largest triangle with the
+  previously kept bar and the next bucket's average, so the visual shape of
+  the line survives; one pass over the data (O(n)), compiled with numba like
+  the Supertrend loop (the pure-Python loop is kept as the reference)
+- Bars passed in `keep` (e.g. Supertrend flip bars) are always part of the
+  result, so signals stay exact
+- span_extremes() widens each kept candle's high/low to the bars it stands
+  for, so downsampled candles never hide a spike
+"""
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+from numba import njit
+
+logger = logging.getLogger(__name__)
+
+# Smallest sample LTTB works with (first bar, one bucket, last bar)
+MIN_POINTS = 3
+
+
+def _lttb_loop(x, y, n_out):
+    """
+    LTTB bucket loop. Returns the indices (ascending) of the n_out kept points.
+
+    Pure-Python reference implementation; _lttb_loop_jit is the same source
+    compiled with numba and must select the same indices.
+    """
+    n = len(x)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[n_out - 1] = n - 1
+
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # Average of the next bucket (the last bucket averages just the last bar)
+        avg_start = int(np.floor((i + 1) * every)) + 1
+        avg_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        if avg_start >= avg_end:
+            avg_start = n - 1
+            avg_end = n
+        avg_x = 0.0
+        avg_y = 0.0
+        for j in range(avg_start, avg_end):
+            avg_x += x[j]
+            avg_y += y[j]
+        avg_x /= avg_end - avg_start
+        avg_y /= avg_end - avg_start
+
+        # Bar of this bucket with the largest triangle
+        range_start = int(np.floor(i * every)) + 1
+        range_end = int(np.floor((i + 1) * every)) + 1
+        max_area = -1.0
+        max_index = range_start
+        for j in range(range_start, range_end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > max_area:
+                max_area = area
+                max_index = j
+
+        selected[i + 1] = max_index
+        a = max_index
+
+    return selected
+
+
+_lttb_loop_jit = njit(cache=True, nogil=True)(_lttb_loop)
+
+
+def lttb_indices(x, y, max_points: int, keep: Optional[np.ndarray] = None, use_jit: bool = True) -> np.ndarray:
+    """
+    Indices of the bars to plot so that at most max_points remain.
+
+    Args:
+        x, y: Bar positions (e.g. epoch seconds) and values (e.g. close)
+        max_points: Target number of points (the result is larger only if
+                    `keep` alone has more bars than that)
+        keep: Boolean mask of bars that must be kept
+        use_jit: Use the numba-compiled loop (False runs the pure-Python reference)
+
+    Returns:
+        Sorted int64 indices into x/y
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    n = len(x)
+    forced = np.flatnonzero(keep) if keep is not None else np.empty(0, dtype=np.int64)
+
+    if n <= max_points:
+        return np.arange(n, dtype=np.int64)
+
+    # Budget left for LTTB after the bars that must stay
+    n_out = max(MIN_POINTS, max_points - len(forced))
+    if n_out >= n:
+        return np.arange(n, dtype=np.int64)
+
+    # NaN values would poison the triangle areas
+    y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+
+    selected = (_lttb_loop_jit if use_jit else _lttb_loop)(x, y, n_out)
+    if len(forced):
+        selected = np.union1d(selected, forced)
+    return selected.astype(np.int64)
+
+
+def span_extremes(high, low, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    High/low of each kept bar widened to the bars up to the next kept one.
+
+    Returns (high, low) arrays aligned with indices.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    if len(indices) == 0:
+        return high[:0], low[:0]
+    # Spans start at each kept bar; the first kept bar also covers anything before it
+    starts = np.asarray(indices, dtype=np.int64).copy()
+    starts[0] = 0
+    return np.fmax.reduceat(high, starts), np.fmin.reduceat(low, starts)
@@ -0,0 +1,236 @@
+"""
+Funds Cache
+Per-account cache of the broker funds response used for margin-based sizing.
+
+Key Features:
+- A funds response younger than FUNDS_CACHE_TTL_SECONDS is reused, so legs and
+  concurrent strategy executions sizing against the same account share one
+  client.funds() call
+- Single-flight: concurrent callers for an account wait for the call in flight
+  and share its result
+- Fills mark the account's funds stale and refresh them in the background
+  (refresh_async), so the next sizing call finds post-fill funds
+- Every read returns a FundsSnapshot carrying its age and a stale flag (set
+  when a refresh failed and older funds were served), so callers choose
+  between fresh and cached values
+- claim_persist() lets exactly one caller write each fetched response to the
+  MarginTracker
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FundsSnapshot:
+    """Funds of one account as of one client.funds() call"""
+    account_id: int
+    data: Optional[Dict]  # Funds 'data' payload, None if no call ever succeeded
+    fetched_at: float  # time.monotonic() of the call (0.0 if never fetched)
+    seq: int  # Increases with every successful call for the account
+    stale: bool = False  # Served from cache because a refresh failed
+    error: Optional[str] = None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the funds were fetched"""
+        return time.monotonic() - self.fetched_at if self.data is not None else float('inf')
+
+
+class _Flight:
+    """One in-flight funds call that concurrent requests for the account wait on"""
+
+    __slots__ = ('done', 'generation', 'snapshot')
+
+    def __init__(self, generation: int):
+        self.done = threading.Event()
+        self.generation = generation
+        self.snapshot: Optional[FundsSnapshot] = None
+
+
+class FundsCache:
+    """
+    Singleton funds cache shared by all MarginCalculator instances.
+
+    Each account has a generation; mark_stale() bumps it after a fill. Cached
+    funds and calls in flight only count as fresh for the current generation.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the funds cache"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.ttl_seconds = 2.0
+        self.flight_timeout = 15.0  # Seconds a coalesced request waits for the call in flight
+
+        self._entries: Dict[int, FundsSnapshot] = {}
+        self._generations: Dict[int, int] = {}
+        self._entry_generations: Dict[int, int] = {}
+        self._inflight: Dict[int, _Flight] = {}
+        self._persisted: Dict[int, int] = {}
+        self._seq = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.failures = 0
+
+        logger.debug("FundsCache initialized")
+
+    def init_app(self, app):
+        """Read cache settings from the app config"""
+        self.ttl_seconds = float(app.config.get('FUNDS_CACHE_TTL_SECONDS', self.ttl_seconds))
+
+    def get(self, account_id: int, api_key: str, host_url: str,
+            max_age: Optional[float] = None) -> FundsSnapshot:
+        """
+        Funds of an account no older than max_age seconds (default: the TTL).
+
+        Joins the call in flight for the account if there is one; otherwise this
+        caller fetches. If the call fails, the last cached funds are returned
+        with stale=True (data is None if there are none).
+        """
+        max_age = self.ttl_seconds if max_age is None else max_age
+
+        with self._lock:
+            generation = self._generations.get(account_id, 0)
+            entry = self._entries.get(account_id)
+            if (entry is not None and self._entry_generations.get(account_id) == generation
+                    and entry.age <= max_age):
+                self.hits += 1
+                return entry
+
+            flight = self._inflight.get(account_id)
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = self._inflight[account_id] = _Flight(generation)
+
+        if not leader:
+            self.coalesced += 1
+            if not flight.done.wait(self.flight_timeout):
+                return self._fallback(account_id, 'Timed out waiting for funds')
+            return flight.snapshot
+
+        try:
+            flight.snapshot = self._fetch(account_id, api_key, host_url, generation)
+            return flight.snapshot
+
+        finally:
+            with self._lock:
+                if self._inflight.get(account_id) is flight:
+                    self._inflight.pop(account_id)
+            flight.done.set()
+
+    def peek(self, account_id: int) -> Optional[FundsSnapshot]:
+        """Last cached funds of an account without calling the API"""
+        return self._entries.get(account_id)
+
+    def mark_stale(self, account_id: int):
+        """Cached funds and calls in flight no longer count as fresh (e.g. after a fill)"""
+        with self._lock:
+            self._generations[account_id] = self._generations.get(account_id, 0) + 1
+
+    def refresh_async(self, account_id: int, api_key: str, host_url: str):
+        """Mark the account's funds stale and fetch them again in the background"""
+        self.mark_stale(account_id)
+        try:
+            self._get_executor().submit(self.get, account_id, api_key, host_url, 0.0)
+        except Exception as e:
+            logger.error(f"[FUNDS] Error scheduling funds refresh for account {account_id}: {e}")
+
+    def claim_persist(self, snapshot: FundsSnapshot) -> bool:
+        """True for exactly one caller per fetched response (that caller writes the MarginTracker)"""
+        if snapshot.data is None or snapshot.stale:
+            return False
+        with self._lock:
+            if self._persisted.get(snapshot.account_id, 0) >= snapshot.seq:
+                return False
+            self._persisted[snapshot.account_id] = snapshot.seq
+            return True
+
+    def clear(self):
+        """Drop all cached funds"""
+        with self._lock:
+            self._entries.clear()
+            self._entry_generations.clear()
+            self._persisted.clear()
+
+    def get_metrics(self) -> Dict:
+        """Cache counters for monitoring"""
+        return {
+            'accounts': len(self._entries),
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'coalesced': self.coalesced,
+            'failures': self.failures,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def _fetch(self, account_id: int, api_key: str, host_url: str, generation: int) -> FundsSnapshot:
+        """Call client.funds() and store the result (leader of the flight only)"""
+        started = time.monotonic()
+        try:
+            client = ExtendedOpenAlgoAPI(api_key=api_key, host=host_url)
+            response = client.funds()
+            self.fetches += 1
+        except Exception as e:
+            logger.error(f"[FUNDS] Error fetching funds for account {account_id}: {e}")
+            self.failures += 1
+            return self._fallback(account_id, str(e))
+
+        if response.get('status') != 'success':
+            logger.warning(f"[FUNDS] Funds call failed for account {account_id}: {response.get('message')}")
+            self.failures += 1
+            return self._fallback(account_id, response.get('message') or 'Funds call failed')
+
+        with self._lock:
+            self._seq += 1
+            snapshot = FundsSnapshot(account_id=account_id, data=response.get('data', {}) or {},
+                                     fetched_at=started, seq=self._seq)
+            # A slower, older call must not replace newer funds
+            current = self._entries.get(account_id)
+            if current is None or current.fetched_at <= started:
+                self._entries[account_id] = snapshot
+                self._entry_generations[account_id] = generation
+        return snapshot
+
+    def _fallback(self, account_id: int, error: str) -> FundsSnapshot:
+        """Last cached funds flagged stale, or an empty snapshot"""
+        entry = self._entries.get(account_id)
+        if entry is None:
+            return FundsSnapshot(account_id=account_id, data=None, fetched_at=0.0, seq=0, stale=True, error=error)
+        return FundsSnapshot(account_id=account_id, data=entry.data, fetched_at=entry.fetched_at,
+                             seq=entry.seq, stale=True, error=error)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the pool used for post-fill refreshes"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='FundsRefresh')
+            return self._executor
+
+
+# Global instance
+funds_cache = FundsCache()
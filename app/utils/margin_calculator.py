@@ -6,11 +6,9 @@ Handles lot size calculations based on available margin and trade quality
 import logging
 from datetime import datetime, date
 from typing import Dict, Tuple, Optional
-from app.models import (
-    MarginRequirement, TradeQuality, TradingSettings,
-    MarginTracker, TradingAccount, MarketHoliday
-)
-from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+from app.models import MarginTracker, TradingAccount, MarketHoliday
+from app.utils.funds_cache import FundsSnapshot, funds_cache
+from app.utils.margin_reference import margin_reference_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +22,11 @@ class MarginCalculator:
 
     def __init__(self, user_id: int):
         self.user_id = user_id
-        self.margin_requirements = self._load_margin_requirements()
-        self.trade_qualities = self._load_trade_qualities()
-        self.trading_settings = self._load_trading_settings()
+        # Read-only views over the process-wide reference cache (reloaded after edits)
+        reference = margin_reference_cache.get(user_id)
+        self.margin_requirements = reference.margin_requirements
+        self.trade_qualities = reference.trade_qualities
+        self.trading_settings = reference.trading_settings
 
     def get_option_buying_premium(self, instrument: str) -> float:
         """
@@ -50,65 +50,6 @@ class MarginCalculator:
 
         return self.DEFAULT_OPTION_BUYING_PREMIUM
 
-    def _load_margin_requirements(self) -> Dict:
-        """Load user's margin requirements"""
-        requirements = {}
-        margins = MarginRequirement.query.filter_by(
-            user_id=self.user_id,
-            is_active=True
-        ).all()
-
-        for margin in margins:
-            requirements[margin.instrument] = margin
-
-        # Create defaults if not exists
-        if not requirements:
-            MarginRequirement.get_or_create_defaults(self.user_id)
-            return self._load_margin_requirements()
-
-        return requirements
-
-    def _load_trade_qualities(self) -> Dict:
-        """Load user's trade quality settings"""
-        qualities = {}
-        trade_quals = TradeQuality.query.filter_by(
-            user_id=self.user_id,
-            is_active=True
-        ).all()
-
-        for qual in trade_quals:
-            qualities[qual.quality_grade] = qual
-
-        # Create defaults if not exists
-        if not qualities:
-            TradeQuality.get_or_create_defaults(self.user_id)
-            return self._load_trade_qualities()
-
-        return qualities
-
-    def _load_trading_settings(self) -> Dict:
-        """Load user's trading settings (lot sizes)"""
-        settings = {}
-        trade_settings = TradingSettings.query.filter_by(
-            user_id=self.user_id,
-            is_active=True
-        ).all()
-
-        for setting in trade_settings:
-            settings[setting.symbol] = setting
-
-        # Create defaults if not exists
-        if not settings:
-            TradingSettings.get_or_create_defaults(self.user_id)
-            trade_settings = TradingSettings.query.filter_by(
-                user_id=self.user_id,
-                is_active=True
-            ).all()
-            for setting in trade_settings:
-                settings[setting.symbol] = setting
-
-        return settings
-
     def is_expiry_day(self, instrument: str = 'NIFTY') -> bool:
         """Check if today is expiry day for the instrument"""
         today = date.today()
@@ -377,14 +318,32 @@ class MarginCalculator:
             logger.error(f"[LOT CALC DEBUG] Error calculating lot size with custom margin: {e}", exc_info=True)
             return 0, {"error": str(e)}
 
-    def get_available_margin(self, account: TradingAccount, force_refresh: bool = True) -> float:
+    def get_funds(self, account: TradingAccount, max_age: Optional[float] = None) -> FundsSnapshot:
+        """
+        Funds of an account from the shared funds cache.
+
+        Args:
+            account: Trading account object
+            max_age: Oldest acceptable funds in seconds (default: FUNDS_CACHE_TTL_SECONDS,
+                     0 = always call the API). Concurrent callers share one funds call.
+
+        Returns:
+            FundsSnapshot with the funds data, its age and a stale flag (set when the
+            API call failed and older cached funds were returned)
+        """
+        return funds_cache.get(account.id, account.get_api_key(), account.host_url, max_age)
+
+    def get_available_margin(self, account: TradingAccount, force_refresh: bool = True,
+                             max_age: Optional[float] = None) -> float:
         """
         Get available margin from account.
 
         Args:
             account: Trading account object
-            force_refresh: If True, always fetch fresh data from API (default: True)
+            force_refresh: If True, use funds no older than max_age (default: the funds
+                          cache TTL, shared with concurrent callers for the account)
                           If False, use cached data if available and < 5 minutes old
+            max_age: Override the funds age accepted when force_refresh is True
         """
         try:
             logger.debug(f"[MARGIN DEBUG] Getting available margin for account: {account.account_name} (ID: {account.id}), force_refresh={force_refresh}")
@@ -400,36 +359,35 @@ class MarginCalculator:
                     logger.debug(f"[MARGIN DEBUG] Using cached margin: ₹{tracker.free_margin:,.2f}")
                     return tracker.free_margin
 
-            # Fetch fresh margin data from API
-            logger.debug(f"[MARGIN DEBUG] Fetching fresh margin data from API: {account.host_url}")
-            client = ExtendedOpenAlgoAPI(
-                api_key=account.get_api_key(),
-                host=account.host_url
-            )
-
-            response = client.funds()
-            logger.debug(f"[MARGIN DEBUG] API Response status: {response.get('status')}")
-
-            if response.get('status') == 'success':
-                funds_data = response.get('data', {})
-                logger.debug(f"[MARGIN DEBUG] Funds data received: {funds_data}")
-
-                # Create or update margin tracker
-                if not tracker:
-                    tracker = MarginTracker(account_id=account.id)
+            # Fresh funds (one API call shared by concurrent callers for this account)
+            logger.debug(f"[MARGIN DEBUG] Getting funds for account {account.id} from {account.host_url}")
+            snapshot = self.get_funds(account, max_age)
+
+            if snapshot.data is not None:
+                funds_data = snapshot.data
+                if snapshot.stale:
+                    logger.warning(f"[MARGIN DEBUG] Funds refresh failed ({snapshot.error}), using funds from {snapshot.age:.1f}s ago")
+                logger.debug(f"[MARGIN DEBUG] Funds data ({snapshot.age:.1f}s old): {funds_data}")
+
+                # Create or update margin tracker once per funds call
+                if funds_cache.claim_persist(snapshot):
+                    if not tracker:
+                        tracker = MarginTracker(account_id=account.id)
+                        from app import db
+                        db.session.add(tracker)
+                        logger.debug(f"[MARGIN DEBUG] Created new MarginTracker for account {account.id}")
+
+                    tracker.update_margins(funds_data)
                     from app import db
-                    db.session.add(tracker)
-                    logger.debug(f"[MARGIN DEBUG] Created new MarginTracker for account {account.id}")
+                    db.session.commit()
 
-                tracker.update_margins(funds_data)
-                from app import db
-                db.session.commit()
+                    logger.debug(f"[MARGIN DEBUG] Updated tracker - Free margin: ₹{tracker.free_margin:,.2f}, Used margin: ₹{tracker.used_margin:,.2f}")
 
-                logger.debug(f"[MARGIN DEBUG] Updated tracker - Free margin: ₹{tracker.free_margin:,.2f}, Used margin: ₹{tracker.used_margin:,.2f}")
-                return tracker.free_margin
+                # Same as MarginTracker.update_margins
+                return funds_data.get('availablecash', 0) - funds_data.get('utiliseddebits', 0)
 
             else:
-                logger.warning(f"[MARGIN DEBUG] API call failed, status: {response.get('status')}, message: {response.get('message')}")
+                logger.warning(f"[MARGIN DEBUG] API call failed: {snapshot.error}")
                 # Fallback to cached data if available
                 if account.last_funds_data:
                     fallback_margin = account.last_funds_data.get('totalcash', 0)
@@ -442,7 +400,8 @@ class MarginCalculator:
             logger.error(f"[MARGIN DEBUG] Error fetching available margin: {e}", exc_info=True)
             return 0
 
-    def get_cash_margin(self, account: TradingAccount, force_refresh: bool = True) -> float:
+    def get_cash_margin(self, account: TradingAccount, force_refresh: bool = True,
+                        max_age: Optional[float] = None) -> float:
         """
         Get CASH margin only (excludes collateral) for option buyers.
 
@@ -451,7 +410,9 @@ class MarginCalculator:
 
         Args:
             account: Trading account object
-            force_refresh: If True, always fetch fresh data from API
+            force_refresh: If True, use funds no older than max_age (default: the funds
+                          cache TTL); if False, funds up to 5 minutes old are used
+            max_age: Override the funds age accepted
 
         Returns:
             Cash margin amount (availablecash from API)
@@ -459,18 +420,16 @@ class MarginCalculator:
         try:
             logger.debug(f"[CASH MARGIN] Getting cash margin for account: {account.account_name}")
 
-            # Fetch fresh funds data from API
-            client = ExtendedOpenAlgoAPI(
-                api_key=account.get_api_key(),
-                host=account.host_url
-            )
+            if max_age is None and not force_refresh:
+                max_age = 300  # 5 minutes
 
-            response = client.funds()
+            snapshot = self.get_funds(account, max_age)
 
-            if response.get('status') == 'success':
-                funds_data = response.get('data', {})
+            if snapshot.data is not None:
+                if snapshot.stale:
+                    logger.warning(f"[CASH MARGIN] Funds refresh failed ({snapshot.error}), using funds from {snapshot.age:.1f}s ago")
                 # Get availablecash - this is pure cash without collateral
-                cash_margin = float(funds_data.get('availablecash', 0))
+                cash_margin = float(snapshot.data.get('availablecash', 0))
                 logger.debug(f"[CASH MARGIN] Cash margin for {account.account_name}: {cash_margin:,.2f}")
                 return cash_margin
             else:
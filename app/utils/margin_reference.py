@@ -0,0 +1,120 @@
+"""
+Margin Reference Cache
+Process-wide cache of each user's margin reference data for MarginCalculator.
+
+Key Features:
+- Margin requirements, trade qualities and trading settings are loaded from the
+  database once per user and shared by every MarginCalculator in the process
+- Entries are plain read-only snapshots of the rows, so they can be read from
+  any thread or app context without touching a database session
+- Versioned per user: invalidate() is called by the margin and trading settings
+  edit routes, and a load that raced with an edit is never stored
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, Mapping
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MarginReference:
+    """One user's margin reference data (instrument / grade / symbol -> row snapshot)"""
+    version: int
+    margin_requirements: Mapping[str, SimpleNamespace]
+    trade_qualities: Mapping[str, SimpleNamespace]
+    trading_settings: Mapping[str, SimpleNamespace]
+
+
+def _snapshot(row) -> SimpleNamespace:
+    """Column values of a model row, detached from the session"""
+    return SimpleNamespace(**{column.key: getattr(row, column.key) for column in row.__table__.columns})
+
+
+def _load_rows(model, user_id: int, key: str) -> Dict[str, SimpleNamespace]:
+    """Active rows of a reference table keyed by `key`, creating the defaults if there are none"""
+    rows = model.query.filter_by(user_id=user_id, is_active=True).all()
+    if not rows:
+        model.get_or_create_defaults(user_id)
+        rows = model.query.filter_by(user_id=user_id, is_active=True).all()
+    return {getattr(row, key): _snapshot(row) for row in rows}
+
+
+class MarginReferenceCache:
+    """
+    Singleton per-user cache of margin reference data.
+
+    Readers get the current MarginReference without taking a lock; a miss loads
+    from the database (requires an app context) and stores the result only if
+    no invalidate() happened while it was loading.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the margin reference cache"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self._entries: Dict[int, MarginReference] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+        logger.debug("MarginReferenceCache initialized")
+
+    def get(self, user_id: int) -> MarginReference:
+        """Margin reference data for a user, loading it on first use or after an edit"""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.version == self._versions.get(user_id, 0):
+            return entry
+
+        version = self._versions.get(user_id, 0)
+        entry = self._load(user_id, version)
+
+        with self._lock:
+            if self._versions.get(user_id, 0) == version:
+                self._entries[user_id] = entry
+        return entry
+
+    def invalidate(self, user_id: int):
+        """Hook for margin / quality / trading settings edits - reload on next use"""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+        logger.debug(f"Margin reference data invalidated for user {user_id}")
+
+    def clear(self):
+        """Drop all cached users"""
+        with self._lock:
+            for user_id in self._entries:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+
+    def _load(self, user_id: int, version: int) -> MarginReference:
+        """Read a user's reference tables from the database"""
+        from app.models import MarginRequirement, TradeQuality, TradingSettings
+
+        entry = MarginReference(
+            version=version,
+            margin_requirements=MappingProxyType(_load_rows(MarginRequirement, user_id, 'instrument')),
+            trade_qualities=MappingProxyType(_load_rows(TradeQuality, user_id, 'quality_grade')),
+            trading_settings=MappingProxyType(_load_rows(TradingSettings, user_id, 'symbol'))
+        )
+        self.loads += 1
+        logger.debug(f"Loaded margin reference data for user {user_id} (version {version})")
+        return entry
+
+
+# Global instance
+margin_reference_cache = MarginReferenceCache()
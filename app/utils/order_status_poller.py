@@ -1,24 +1,38 @@
 """
 Background Order Status Polling Service
-Checks pending orders every 2 seconds and updates database without blocking order placement
+Checks pending orders and updates database without blocking order placement
+
+Polling cadence is adaptive per order: a min-heap keyed by next-check time
+polls fresh orders every ORDER_POLL_FAST_MS, then backs off exponentially up
+to ORDER_POLL_MAX_INTERVAL_SECONDS. An order goes back to fast polling when
+its LTP (from the in-memory WebSocket cache) crosses the limit price.
 
 Uses standard threading for background tasks.
 """
 
+import heapq
+import itertools
 import logging
+import os
+import queue
 import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 # Cross-platform compatibility
 from app.utils.compat import sleep, create_lock
 
 from app import db
 from app.models import StrategyExecution
+from app.utils.funds_cache import funds_cache
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
 
 logger = logging.getLogger(__name__)
 
+# Broker statuses that end polling of an order
+FINAL_ORDER_STATUSES = ('complete', 'rejected', 'cancelled')
+
 # Import PositionMonitor for real-time position tracking
 def get_position_monitor():
     """Lazy import to avoid circular dependency"""
@@ -26,15 +40,96 @@ def get_position_monitor():
     return position_monitor
 
 
+class AccountWorker:
+    """
+    Long-lived worker that checks one account's orders serially.
+
+    Holds one app context for its lifetime; the scoped session is removed after
+    every check so no ORM state carries over. Retires itself after
+    WORKER_IDLE_SECONDS without work.
+    """
+
+    WORKER_IDLE_SECONDS = 300
+
+    def __init__(self, poller: 'OrderStatusPoller', account_key: str, app):
+        self.poller = poller
+        self.account_key = account_key
+        self.app = app
+        self.queue: queue.Queue = queue.Queue()
+        self.busy = False
+
+        # Metrics
+        self.checks = 0
+        self.last_lag = 0.0  # Seconds between the scheduled check time and the check starting
+        self.max_lag = 0.0
+        self.last_duration = 0.0  # Seconds for orderbook fetch + reconciliation
+
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"OrderPoller-{account_key}")
+        self.thread.start()
+
+    def submit(self, account_orders: list, due_ids: set, due_at: float):
+        """Queue one check (caller holds the poller lock)"""
+        self.busy = True
+        self.queue.put((account_orders, due_ids, due_at))
+
+    def stop(self):
+        self.queue.put(None)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.WORKER_IDLE_SECONDS)
+                except queue.Empty:
+                    if self.poller._retire_worker(self):
+                        return
+                    continue
+
+                if item is None:
+                    return
+
+                account_orders, due_ids, due_at = item
+                started = time.monotonic()
+                self.last_lag = max(0.0, started - due_at)
+                self.max_lag = max(self.max_lag, self.last_lag)
+                checked = True
+                try:
+                    checked = self.poller._check_account_orders(account_orders, self.app, due_ids)
+                except Exception as e:
+                    logger.error(f"[ERROR] Error checking orders for {self.account_key}: {e}", exc_info=True)
+                finally:
+                    db.session.remove()
+                    finished = time.monotonic()
+                    self.last_duration = finished - started
+                    if checked:
+                        self.checks += 1
+                    # Orders still pending get their next check time
+                    self.poller._reschedule(due_ids, finished, checked=checked)
+                    self.busy = False
+                    self.poller._wakeup.set()
+
+    def get_metrics(self) -> Dict:
+        return {
+            'checks': self.checks,
+            'busy': self.busy,
+            'lag_ms': round(self.last_lag * 1000, 2),
+            'max_lag_ms': round(self.max_lag * 1000, 2),
+            'check_duration_ms': round(self.last_duration * 1000, 2)
+        }
+
+
 class OrderStatusPoller:
     """
     Background service to poll order status without blocking order placement.
-    Respects 1 req/sec/account rate limit.
+    One orderbook call per account per check, at most one check per account
+    every fast interval.
     """
 
     _instance = None
     _lock = threading.Lock()
 
+    PRICE_RETRIES = 3  # Checks of a complete order before accepting it without average_price
+
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
@@ -52,12 +147,39 @@ class OrderStatusPoller:
         self.poller_thread = None
         self.last_check_time: Dict[str, datetime] = {}  # account_key: last_check_time
         self.flask_app = None  # Store Flask app reference instead of creating new one
+        self.max_fallbacks_per_cycle = 5  # orderstatus() calls per account per cycle for orders missing from the book
+        self.orderbook_fetches = 0
+        self.orderstatus_fallbacks = 0
+
+        # Adaptive cadence: (next_check, seq, execution_id) min-heap; entries whose
+        # next_check no longer matches the order's are stale and skipped
+        self.fast_interval = 0.25  # Seconds between checks of a fresh order
+        self.fast_window = 5.0  # Seconds of fast polling after placement (or a limit crossing)
+        self.max_interval = 30.0  # Backoff cap
+        self._schedule: List[Tuple[float, int, int]] = []
+        self._schedule_seq = itertools.count()
+        self._wakeup = threading.Event()
+        self.limit_crossings = 0
+
+        # Set by OrderUpdateChannel while an order event stream is connected
+        self.push_active = False
+        self.pushed_updates = 0
+
+        # Long-lived per-account workers (account_key -> AccountWorker)
+        self._workers: Dict[str, 'AccountWorker'] = {}
+        self.last_cycle_duration = 0.0
         self._initialized = True
         logger.debug("Order Status Poller initialized")
 
     def set_flask_app(self, app):
         """Store Flask app instance for use in background thread"""
         self.flask_app = app
+        self.fast_interval = int(app.config.get(
+            'ORDER_POLL_FAST_MS', os.environ.get('ORDER_POLL_FAST_MS', 250))) / 1000.0
+        self.fast_window = float(app.config.get(
+            'ORDER_POLL_FAST_WINDOW_SECONDS', os.environ.get('ORDER_POLL_FAST_WINDOW_SECONDS', 5)))
+        self.max_interval = float(app.config.get(
+            'ORDER_POLL_MAX_INTERVAL_SECONDS', os.environ.get('ORDER_POLL_MAX_INTERVAL_SECONDS', 30)))
         logger.debug("Flask app instance registered with Order Status Poller")
 
     def start(self):
@@ -71,28 +193,225 @@ class OrderStatusPoller:
     def stop(self):
         """Stop the background polling service"""
         self.is_running = False
+        self._wakeup.set()
         if self.poller_thread:
             try:
                 self.poller_thread.join(timeout=5)
             except Exception:
                 pass
+
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
         logger.debug("[STOPPED] Order Status Poller stopped")
 
     def add_order(self, execution_id: int, account, order_id: str, strategy_name: str):
         """Add an order to the polling queue"""
         with self._lock:
-            self.pending_orders[execution_id] = {
-                'account_id': account.id,
-                'account_name': account.account_name,
-                'api_key': account.get_api_key(),
-                'host_url': account.host_url,
-                'order_id': order_id,
-                'strategy_name': strategy_name,
-                'added_time': datetime.utcnow(),
-                'check_count': 0
-            }
+            self._queue_order(execution_id, account, order_id, strategy_name)
             logger.debug(f"[POLLER] Added order {order_id} (execution {execution_id}) to polling queue. "
                        f"Queue size: {len(self.pending_orders)}")
+        self._wakeup.set()
+
+    def _queue_order(self, execution_id: int, account, order_id: str, strategy_name: str):
+        """Create the polling entry and schedule an immediate check (caller holds _lock)"""
+        now = time.monotonic()
+        self.pending_orders[execution_id] = {
+            'account_id': account.id,
+            'account_name': account.account_name,
+            'api_key': account.get_api_key(),
+            'host_url': account.host_url,
+            'order_id': order_id,
+            'strategy_name': strategy_name,
+            'added_time': datetime.utcnow(),
+            'check_count': 0,
+            # Adaptive cadence
+            'fast_until': now + self.fast_window,
+            'backoff': 0,
+            'next_check': now,
+            # Limit order details, filled in from the first broker response
+            'symbol': None,
+            'exchange': None,
+            'action': None,
+            'limit_price': None,
+            'marketable': None
+        }
+        self._push_schedule(execution_id, now)
+
+    def apply_order_event(self, data: Dict) -> bool:
+        """
+        Apply a pushed order update (order event stream) through the same
+        reconciliation path as a polled status.
+
+        Args:
+            data: Normalized order with 'orderid', 'order_status' and 'average_price'
+
+        Returns:
+            bool: True if a pending execution was updated
+        """
+        order_id = str(data.get('orderid') or '')
+        if not order_id:
+            return False
+
+        with self._lock:
+            match = next(((execution_id, info) for execution_id, info in self.pending_orders.items()
+                          if str(info['order_id']) == order_id), None)
+        polled = match is not None
+        if match is None:
+            match = self._order_info_from_db(order_id)
+            if match is None:
+                return False
+
+        execution_id, order_info = match
+        if data.get('order_status') == 'complete' and not data.get('average_price'):
+            # Fill without a price yet - the poller fetches it with orderstatus() right away
+            self.expedite_order(execution_id)
+            return False
+
+        self._reconcile_order(execution_id, order_info, data, client=None)
+        if polled:
+            self.pushed_updates += 1
+        return True
+
+    def _order_info_from_db(self, order_id: str):
+        """(execution_id, order_info) for a pending order the poller is not tracking (requires app context)"""
+        execution = StrategyExecution.query.filter(
+            db.or_(StrategyExecution.order_id == order_id, StrategyExecution.exit_order_id == order_id),
+            StrategyExecution.status.in_(['pending', 'exit_pending'])
+        ).first()
+        if not execution or not execution.account:
+            return None
+
+        return execution.id, {
+            'account_id': execution.account_id,
+            'account_name': execution.account.account_name,
+            'api_key': execution.account.get_api_key(),
+            'host_url': execution.account.host_url,
+            'order_id': order_id,
+            'strategy_name': execution.strategy.name if execution.strategy else 'Unknown',
+            'added_time': datetime.utcnow(),
+            'check_count': 0
+        }
+
+    def expedite_order(self, execution_id: int):
+        """Poll an order fast again (e.g. after its limit price was modified)"""
+        with self._lock:
+            if execution_id in self.pending_orders:
+                self._reset_to_fast(execution_id, time.monotonic())
+        self._wakeup.set()
+
+    def _push_schedule(self, execution_id: int, next_check: float):
+        """Schedule the next check of an order (caller holds _lock)"""
+        self.pending_orders[execution_id]['next_check'] = next_check
+        heapq.heappush(self._schedule, (next_check, next(self._schedule_seq), execution_id))
+
+    def _next_interval(self, order_info: Dict, now: float) -> float:
+        """Fast interval while the order is fresh, then exponential backoff up to max_interval"""
+        if self.push_active:
+            # Order events arrive by push - polling is only a reconciliation sweep
+            return self.max_interval
+        if now < order_info['fast_until']:
+            return self.fast_interval
+        return min(self.max_interval, self.fast_interval * (2 ** order_info['backoff']))
+
+    def _reschedule(self, execution_ids, now: float, checked: bool = True):
+        """Schedule the next check of orders that were just checked and are still pending
+
+        checked=False means the check was skipped (account rate limited): the
+        orders are retried after the fast interval without growing their backoff.
+        """
+        with self._lock:
+            for execution_id in execution_ids:
+                order_info = self.pending_orders.get(execution_id)
+                if order_info is None:
+                    continue
+                if not checked:
+                    self._push_schedule(execution_id, now + self.fast_interval)
+                    continue
+                interval = self._next_interval(order_info, now)
+                if now >= order_info['fast_until']:
+                    order_info['backoff'] = min(order_info['backoff'] + 1, 16)
+                self._push_schedule(execution_id, now + interval)
+
+    def _reset_to_fast(self, execution_id: int, now: float):
+        """Back to fast polling (e.g. the LTP crossed the limit price) - caller holds _lock"""
+        order_info = self.pending_orders[execution_id]
+        order_info['fast_until'] = now + self.fast_window
+        order_info['backoff'] = 0
+        if order_info['next_check'] > now:
+            self._push_schedule(execution_id, now)
+
+    def _retire_worker(self, worker: 'AccountWorker') -> bool:
+        """Drop an idle worker (it is recreated when the account has orders again)"""
+        with self._lock:
+            if worker.busy or not worker.queue.empty():
+                return False
+            if self._workers.get(worker.account_key) is worker:
+                del self._workers[worker.account_key]
+            return True
+
+    def _pop_due_orders(self, now: float) -> Dict[int, Dict]:
+        """Pop every order whose next check is due (stale heap entries are dropped)"""
+        due = {}
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                next_check, _, execution_id = heapq.heappop(self._schedule)
+                order_info = self.pending_orders.get(execution_id)
+                if order_info is None or order_info['next_check'] != next_check:
+                    continue  # Removed, or rescheduled since this entry was pushed
+                due[execution_id] = order_info
+        return due
+
+    def _seconds_until_next_check(self, now: float) -> float:
+        """Seconds until the earliest scheduled check (2s when nothing is pending)"""
+        with self._lock:
+            if not self._schedule:
+                return 2.0
+            return max(0.0, min(2.0, self._schedule[0][0] - now))
+
+    def _get_ltp_snapshot(self) -> Dict[str, float]:
+        """In-memory LTPs from the shared WebSocket ({'EXCHANGE:SYMBOL': ltp}) - no API calls"""
+        try:
+            from app.utils.background_service import option_chain_service
+            manager = option_chain_service.shared_websocket_manager
+            if manager:
+                return manager.get_ltp().get('ltp', {})
+        except Exception as e:
+            logger.debug(f"[POLLER] LTP cache unavailable: {e}")
+        return {}
+
+    def _check_limit_crossings(self, now: float):
+        """Reset orders to fast polling when the LTP moves through the limit price"""
+        with self._lock:
+            limit_orders = [(execution_id, info) for execution_id, info in self.pending_orders.items()
+                            if info['limit_price']]
+        if not limit_orders:
+            return
+
+        ltp_data = self._get_ltp_snapshot()
+        if not ltp_data:
+            return
+
+        with self._lock:
+            for execution_id, order_info in limit_orders:
+                ltp = ltp_data.get(f"{order_info['exchange']}:{order_info['symbol']}")
+                if not ltp or execution_id not in self.pending_orders:
+                    continue
+
+                # A BUY limit fills at or below the limit, a SELL limit at or above it
+                if order_info['action'] == 'BUY':
+                    marketable = ltp <= order_info['limit_price']
+                else:
+                    marketable = ltp >= order_info['limit_price']
+
+                if marketable and order_info['marketable'] is False:
+                    self.limit_crossings += 1
+                    self._reset_to_fast(execution_id, now)
+                    logger.debug(f"[POLLER] LTP {ltp} crossed limit {order_info['limit_price']} "
+                                 f"for order {order_info['order_id']} - fast polling")
+                order_info['marketable'] = marketable
 
     def remove_order(self, execution_id: int):
         """Remove an order from the polling queue"""
@@ -104,13 +423,33 @@ class OrderStatusPoller:
                 return True
             return False
 
+    def _remember_limit(self, execution_id: int, data: Dict, execution: StrategyExecution):
+        """Keep symbol and limit price of an open order for LTP crossing checks"""
+        try:
+            limit_price = float(data.get('price') or 0)
+        except (TypeError, ValueError):
+            limit_price = 0.0
+        action = (data.get('action') or (execution.leg.action if execution.leg else '') or '').upper()
+
+        with self._lock:
+            order_info = self.pending_orders.get(execution_id)
+            if order_info is None:
+                return
+            order_info['symbol'] = data.get('symbol') or execution.symbol
+            order_info['exchange'] = data.get('exchange') or execution.exchange
+            order_info['action'] = action
+            if limit_price > 0 and limit_price != order_info['limit_price']:
+                # New or modified limit - crossing state is re-evaluated on the next tick
+                order_info['limit_price'] = limit_price
+                order_info['marketable'] = None
+
     def _poll_loop(self):
         """Main polling loop - runs in background
 
         OPTIMIZED: Uses stored Flask app reference instead of creating a new one.
+        Due orders are dispatched to long-lived per-account workers (no thread
+        or app context creation per cycle); workers reschedule after each check.
         """
-        import concurrent.futures
-
         # Use stored Flask app, or create one if not set (fallback)
         if self.flask_app:
             app = self.flask_app
@@ -122,17 +461,19 @@ class OrderStatusPoller:
         with app.app_context():
             while self.is_running:
                 try:
-                    # Get copy of pending orders to avoid lock during API calls
-                    with self._lock:
-                        orders_to_check = dict(self.pending_orders)
+                    now = time.monotonic()
+                    self._check_limit_crossings(now)
 
+                    orders_to_check = self._pop_due_orders(now)
                     if not orders_to_check:
-                        sleep(2)  # Wait 2 seconds if no orders
+                        # Sleep until the earliest scheduled check (new orders wake us up)
+                        self._wakeup.wait(timeout=self._seconds_until_next_check(now) or self.fast_interval)
+                        self._wakeup.clear()
                         continue
 
-                    logger.debug(f"[POLLING] Checking {len(orders_to_check)} pending orders")
+                    logger.debug(f"[POLLING] Checking {len(orders_to_check)} due orders")
 
-                    # Group orders by account for parallel checking
+                    # Group due orders by account for parallel checking
                     # Rate limit is per-account, so different accounts can be checked in parallel
                     orders_by_account = {}
                     for execution_id, order_info in orders_to_check.items():
@@ -141,231 +482,313 @@ class OrderStatusPoller:
                             orders_by_account[account_key] = []
                         orders_by_account[account_key].append((execution_id, order_info))
 
-                    # Check orders from different accounts in parallel
-                    # Each account's orders are checked sequentially (rate limit)
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=min(10, len(orders_by_account))) as executor:
-                        futures = []
+                    # Non-due orders of the same accounts ride along: their fills and
+                    # rejections show up in the orderbook we fetch anyway
+                    with self._lock:
+                        for execution_id, order_info in self.pending_orders.items():
+                            account_key = f"{order_info['account_id']}_{order_info['account_name']}"
+                            if account_key in orders_by_account and execution_id not in orders_to_check:
+                                orders_by_account[account_key].append((execution_id, order_info))
+
+                    # Hand each account's orders to its worker (one orderbook call per account).
+                    # Accounts never wait on each other; an account whose previous check is
+                    # still running (e.g. average price retries) is tried again shortly.
+                    deferred = []
+                    with self._lock:
                         for account_key, account_orders in orders_by_account.items():
-                            # Submit one task per account - it will check all orders for that account
-                            future = executor.submit(
-                                self._check_account_orders,
-                                account_orders,
-                                app
-                            )
-                            futures.append(future)
-
-                        # Wait for all account checks to complete
-                        concurrent.futures.wait(futures, timeout=30)
-
-                    # Wait 1 second before next polling cycle (faster updates)
-                    sleep(1)
+                            due_ids = {execution_id for execution_id, _ in account_orders
+                                       if execution_id in orders_to_check}
+                            worker = self._workers.get(account_key)
+                            if worker is None:
+                                worker = AccountWorker(self, account_key, app)
+                                self._workers[account_key] = worker
+                            if worker.busy:
+                                deferred.extend(due_ids)
+                                continue
+                            due_at = min(orders_to_check[execution_id]['next_check'] for execution_id in due_ids)
+                            worker.submit(account_orders, due_ids, due_at)
+
+                        for execution_id in deferred:
+                            if execution_id in self.pending_orders:
+                                self._push_schedule(execution_id, now + self.fast_interval)
+
+                    self.last_cycle_duration = time.monotonic() - now
 
                 except Exception as e:
                     logger.error(f"[ERROR] Error in polling loop: {e}", exc_info=True)
                     sleep(3)  # Wait on error
 
-    def _check_account_orders(self, account_orders: list, app):
-        """Check all orders for a single account (called in parallel for different accounts)
+    def _check_account_orders(self, account_orders: list, app, due_ids=None):
+        """Reconcile all pending orders of a single account (accounts are checked in parallel)
 
-        IMPORTANT: This runs in a ThreadPoolExecutor thread which does NOT inherit
-        the app context from the parent thread. We must create our own context here.
-        """
-        # ThreadPoolExecutor threads need their own app context
-        with app.app_context():
-            for execution_id, order_info in account_orders:
-                self._check_order_status(execution_id, order_info, app)
+        One orderbook() call per account per cycle, indexed by order id, instead of
+        one orderstatus() call per pending order. orderstatus() is only used as a
+        fallback for orders missing from the book (e.g. not yet visible at the broker),
+        at most max_fallbacks_per_cycle per account.
 
-    def _check_order_status(self, execution_id: int, order_info: Dict, app):
-        """Check status of a single order"""
-        account_key = f"{order_info['account_id']}_{order_info['account_name']}"
-        order_id = order_info['order_id']
-        strategy_name = order_info['strategy_name']
+        Orders not in due_ids (None = all due) are only reconciled when the book
+        shows them complete, rejected or cancelled - no fallback calls for them.
+        Complete orders whose book entry has no average_price are reconciled from
+        orderstatus() right away.
 
-        # Rate limiting: Ensure 1 second between checks per account
-        now = datetime.utcnow()
+        Runs on the account's AccountWorker thread, which holds one app context
+        for its lifetime.
 
+        Returns:
+            bool: False if the check was skipped because the account is rate limited
+        """
+        first_info = account_orders[0][1]
+        account_key = f"{first_info['account_id']}_{first_info['account_name']}"
+
+        # Rate limiting: at most one orderbook call per account per fast interval
+        now = datetime.utcnow()
         if account_key in self.last_check_time:
             time_since_last_check = (now - self.last_check_time[account_key]).total_seconds()
-            if time_since_last_check < 1.0:
-                # Skip this check to respect rate limit
-                return
+            if time_since_last_check < self.fast_interval:
+                return False
 
         try:
-            # Fetch order status
             client = ExtendedOpenAlgoAPI(
-                api_key=order_info['api_key'],
-                host=order_info['host_url']
+                api_key=first_info['api_key'],
+                host=first_info['host_url']
             )
+            orders_by_id = self._fetch_orderbook(client, first_info['account_name'])
+            self.last_check_time[account_key] = datetime.utcnow()
+        except Exception as e:
+            logger.error(f"[ERROR] Error fetching orderbook for {first_info['account_name']}: {e}")
+            return True
+
+        fallbacks = 0
+        for execution_id, order_info in account_orders:
+            is_due = due_ids is None or execution_id in due_ids
+            data = orders_by_id.get(str(order_info['order_id'])) if orders_by_id is not None else None
+
+            if not is_due and (data is None or data.get('order_status') not in FINAL_ORDER_STATUSES):
+                continue
+
+            if data is None:
+                # Not in the book - fall back to a per-order status call
+                if fallbacks >= self.max_fallbacks_per_cycle:
+                    continue
+                fallbacks += 1
+                self._check_order_status(execution_id, order_info, app, client=client)
+                continue
+
+            if data.get('order_status') == 'complete' and not data.get('average_price'):
+                # Fill without a price in the book - orderstatus() carries it
+                self._check_order_status(execution_id, order_info, app, client=client)
+                continue
+
+            try:
+                self._reconcile_order(execution_id, order_info, data, client)
+            except Exception as e:
+                logger.error(f"[ERROR] Error reconciling order {order_info['order_id']}: {e}")
+
+        return True
+
+    def _fetch_orderbook(self, client, account_name: str) -> Optional[Dict[str, Dict]]:
+        """
+        Fetch the account's orderbook and index it by order id.
+
+        Returns:
+            {order_id (str): order} or None if the orderbook could not be fetched
+        """
+        response = client.orderbook()
+        self.orderbook_fetches += 1
+
+        if response.get('status') != 'success':
+            logger.warning(f"[WARNING] Failed to get orderbook for {account_name}: {response.get('message')}")
+            return None
+
+        data = response.get('data') or {}
+        orders = data.get('orders', []) if isinstance(data, dict) else data
+        return {str(order.get('orderid')): order for order in orders or [] if order.get('orderid') is not None}
+
+    def _check_order_status(self, execution_id: int, order_info: Dict, app, client=None):
+        """Check status of a single order with orderstatus() (fallback for orders missing from the orderbook)"""
+        order_id = order_info['order_id']
+        strategy_name = order_info['strategy_name']
+
+        try:
+            # Fetch order status
+            if client is None:
+                client = ExtendedOpenAlgoAPI(
+                    api_key=order_info['api_key'],
+                    host=order_info['host_url']
+                )
 
             response = client.orderstatus(order_id=order_id, strategy=strategy_name)
-            self.last_check_time[account_key] = datetime.utcnow()
+            self.orderstatus_fallbacks += 1
 
             if response.get('status') == 'success':
-                data = response.get('data', {})
-                broker_status = data.get('order_status')  # OpenAlgo API returns 'order_status' not 'status'
-                avg_price = data.get('average_price', 0)
+                self._reconcile_order(execution_id, order_info, response.get('data', {}), client)
+            else:
+                logger.warning(f"[WARNING] Failed to get status for order {order_id}: {response.get('message')}")
 
-                # Update database (app context already established by _poll_loop)
-                execution = StrategyExecution.query.get(execution_id)
-                if not execution:
-                    # Order no longer exists, remove from queue
-                    with self._lock:
-                        self.pending_orders.pop(execution_id, None)
-                    logger.warning(f"[WARNING] Execution {execution_id} not found in DB, removed from queue")
-                    return
+        except Exception as e:
+            logger.error(f"[ERROR] Error checking order {order_id}: {e}")
 
-                # Update based on broker status
-                if broker_status == 'complete':
-                    # Determine if this is entry or exit order
-                    # IMPORTANT: Use order_id comparison instead of status to avoid race condition
-                    # Status can be changed by sync_order_status (called from frontend poll) before
-                    # the background poller checks, leading to entry orders being treated as exits
-                    is_entry_order = execution.order_id == order_id and execution.exit_order_id != order_id
-                    is_exit_order = execution.exit_order_id == order_id
-
-                    # If average_price is missing/zero, retry multiple times with increasing delays
-                    # Some brokers return complete status before average_price is populated
-                    if not avg_price or avg_price == 0:
-                        logger.warning(f"[PRICE MISSING] Order {order_id} complete but average_price is {avg_price}, retrying...")
-
-                        # Try up to 3 times with increasing delays (1s, 2s, 3s)
-                        for price_retry in range(3):
-                            sleep(price_retry + 1)  # 1s, 2s, 3s delays
-
-                            retry_response = client.orderstatus(order_id=order_id, strategy=strategy_name)
-                            self.last_check_time[account_key] = datetime.utcnow()
-
-                            if retry_response.get('status') == 'success':
-                                retry_data = retry_response.get('data', {})
-                                retry_avg_price = retry_data.get('average_price', 0)
-
-                                if retry_avg_price and retry_avg_price > 0:
-                                    avg_price = retry_avg_price
-                                    logger.info(f"[PRICE FETCHED] Order {order_id} average_price after retry {price_retry + 1}: Rs.{avg_price}")
-                                    break
-                                else:
-                                    logger.warning(f"[PRICE RETRY {price_retry + 1}] Order {order_id} average_price still {retry_avg_price}")
-                            else:
-                                logger.warning(f"[RETRY FAILED] Failed to re-fetch order {order_id}: {retry_response.get('message')}")
+    def _reconcile_order(self, execution_id: int, order_info: Dict, data: Dict, client):
+        """
+        Apply broker order data (orderbook entry or orderstatus response) to the execution.
 
-                        if not avg_price or avg_price == 0:
-                            logger.error(f"[PRICE FAILED] Order {order_id} could not get average_price after 3 retries!")
+        Args:
+            execution_id: StrategyExecution id
+            order_info: Polling queue entry
+            data: Broker order with 'order_status' and 'average_price'
+            client: API client of the account (None for pushed updates)
+        """
+        order_id = order_info['order_id']
 
-                    if is_entry_order:
-                        execution.status = 'entered'
-                        execution.broker_order_status = 'complete'
-                        # Only update entry_price if we have a valid average_price
-                        if avg_price and avg_price > 0:
-                            execution.entry_price = avg_price
-                        else:
-                            logger.warning(f"[PRICE WARNING] Entry order {order_id} complete but no valid average_price, keeping existing entry_price: {execution.entry_price}")
-                        if not execution.entry_time:
-                            execution.entry_time = datetime.utcnow()
+        broker_status = data.get('order_status')  # OpenAlgo API returns 'order_status' not 'status'
+        avg_price = data.get('average_price', 0)
 
-                        # Mark leg as executed
-                        if execution.leg and not execution.leg.is_executed:
-                            execution.leg.is_executed = True
+        # Update database (app context established by _check_account_orders)
+        execution = StrategyExecution.query.get(execution_id)
+        if not execution:
+            # Order no longer exists, remove from queue
+            with self._lock:
+                self.pending_orders.pop(execution_id, None)
+            logger.warning(f"[WARNING] Execution {execution_id} not found in DB, removed from queue")
+            return
 
-                        db.session.commit()
+        # Update based on broker status
+        if broker_status == 'complete':
+            # Determine if this is entry or exit order
+            # IMPORTANT: Use order_id comparison instead of status to avoid race condition
+            # Status can be changed by sync_order_status (called from frontend poll) before
+            # the background poller checks, leading to entry orders being treated as exits
+            is_entry_order = execution.order_id == order_id and execution.exit_order_id != order_id
+            is_exit_order = execution.exit_order_id == order_id
+
+            # Some brokers report complete before average_price is populated. Leave
+            # the order pending and re-check it on the fast interval (never sleep on
+            # the account worker); after PRICE_RETRIES checks accept the fill without it.
+            if not avg_price or avg_price == 0:
+                with self._lock:
+                    tracked = self.pending_orders.get(execution_id)
+                    if tracked is not None and tracked.get('price_misses', 0) < self.PRICE_RETRIES:
+                        tracked['price_misses'] = tracked.get('price_misses', 0) + 1
+                        self._reset_to_fast(execution_id, time.monotonic())
+                        logger.warning(f"[PRICE MISSING] Order {order_id} complete but average_price is {avg_price}, "
+                                       f"re-checking (attempt {tracked['price_misses']})")
+                        return
+                logger.error(f"[PRICE FAILED] Order {order_id} could not get average_price after {self.PRICE_RETRIES} retries!")
+
+            if is_entry_order:
+                execution.status = 'entered'
+                execution.broker_order_status = 'complete'
+                # Only update entry_price if we have a valid average_price
+                if avg_price and avg_price > 0:
+                    execution.entry_price = avg_price
+                else:
+                    logger.warning(f"[PRICE WARNING] Entry order {order_id} complete but no valid average_price, keeping existing entry_price: {execution.entry_price}")
+                if not execution.entry_time:
+                    execution.entry_time = datetime.utcnow()
 
-                        # Notify PositionMonitor of new filled order
-                        try:
-                            position_monitor = get_position_monitor()
-                            position_monitor.on_order_filled(execution)
-                            logger.debug(f"[POSITION MONITOR] Notified of order fill: {order_id}")
-                        except Exception as e:
-                            logger.error(f"[POSITION MONITOR] Error notifying order fill: {e}")
+                # Mark leg as executed
+                if execution.leg and not execution.leg.is_executed:
+                    execution.leg.is_executed = True
 
-                        logger.info(f"[FILLED] Entry order {order_id} FILLED at Rs.{avg_price} ({order_info['account_name']})")
+                db.session.commit()
 
-                    elif is_exit_order:
-                        execution.status = 'exited'
-                        execution.broker_order_status = 'complete'
-                        # Only update exit_price if we have a valid average_price
-                        if avg_price and avg_price > 0:
-                            execution.exit_price = avg_price
-                            # Calculate realized P&L based on action (BUY/SELL)
-                            if execution.leg and execution.entry_price:
-                                if execution.leg.action.upper() == 'BUY':
-                                    execution.realized_pnl = (avg_price - execution.entry_price) * execution.quantity
-                                else:
-                                    execution.realized_pnl = (execution.entry_price - avg_price) * execution.quantity
-                                logger.info(f"[P&L] Calculated realized P&L for {execution.symbol}: Rs.{execution.realized_pnl:.2f}")
+                # Notify PositionMonitor of new filled order
+                try:
+                    position_monitor = get_position_monitor()
+                    position_monitor.on_order_filled(execution)
+                    logger.debug(f"[POSITION MONITOR] Notified of order fill: {order_id}")
+                except Exception as e:
+                    logger.error(f"[POSITION MONITOR] Error notifying order fill: {e}")
+
+                logger.info(f"[FILLED] Entry order {order_id} FILLED at Rs.{avg_price} ({order_info['account_name']})")
+
+            elif is_exit_order:
+                execution.status = 'exited'
+                execution.broker_order_status = 'complete'
+                # Only update exit_price if we have a valid average_price
+                if avg_price and avg_price > 0:
+                    execution.exit_price = avg_price
+                    # Calculate realized P&L based on action (BUY/SELL)
+                    if execution.leg and execution.entry_price:
+                        if execution.leg.action.upper() == 'BUY':
+                            execution.realized_pnl = (avg_price - execution.entry_price) * execution.quantity
                         else:
-                            logger.warning(f"[PRICE WARNING] Exit order {order_id} complete but no valid average_price, keeping existing exit_price: {execution.exit_price}")
-                            # Fallback: use unrealized_pnl if exit price unavailable
-                            if execution.unrealized_pnl:
-                                execution.realized_pnl = execution.unrealized_pnl
-                        execution.exit_time = datetime.utcnow()
+                            execution.realized_pnl = (execution.entry_price - avg_price) * execution.quantity
+                        logger.info(f"[P&L] Calculated realized P&L for {execution.symbol}: Rs.{execution.realized_pnl:.2f}")
+                else:
+                    logger.warning(f"[PRICE WARNING] Exit order {order_id} complete but no valid average_price, keeping existing exit_price: {execution.exit_price}")
+                    # Fallback: use unrealized_pnl if exit price unavailable
+                    if execution.unrealized_pnl:
+                        execution.realized_pnl = execution.unrealized_pnl
+                execution.exit_time = datetime.utcnow()
 
-                        db.session.commit()
+                db.session.commit()
 
-                        # Notify PositionMonitor of position closure
-                        try:
-                            position_monitor = get_position_monitor()
-                            position_monitor.on_position_closed(execution)
-                            logger.debug(f"[POSITION MONITOR] Notified of position close: {order_id}")
-                        except Exception as e:
-                            logger.error(f"[POSITION MONITOR] Error notifying position close: {e}")
+                # Notify PositionMonitor of position closure
+                try:
+                    position_monitor = get_position_monitor()
+                    position_monitor.on_position_closed(execution)
+                    logger.debug(f"[POSITION MONITOR] Notified of position close: {order_id}")
+                except Exception as e:
+                    logger.error(f"[POSITION MONITOR] Error notifying position close: {e}")
 
-                        logger.info(f"[CLOSED] Exit order {order_id} FILLED at Rs.{avg_price} ({order_info['account_name']})")
+                logger.info(f"[CLOSED] Exit order {order_id} FILLED at Rs.{avg_price} ({order_info['account_name']})")
 
-                    else:
-                        # Edge case: order_id doesn't match either entry or exit
-                        # This can happen if the execution record was modified
-                        # Skip processing but log for debugging
-                        logger.warning(f"[WARNING] Order {order_id} doesn't match execution's order_id ({execution.order_id}) or exit_order_id ({execution.exit_order_id}), skipping")
+            else:
+                # Edge case: order_id doesn't match either entry or exit
+                # This can happen if the execution record was modified
+                # Skip processing but log for debugging
+                logger.warning(f"[WARNING] Order {order_id} doesn't match execution's order_id ({execution.order_id}) or exit_order_id ({execution.exit_order_id}), skipping")
 
-                    # Remove from polling queue (only if we processed it)
-                    if is_entry_order or is_exit_order:
-                        with self._lock:
-                            self.pending_orders.pop(execution_id, None)
+            # Remove from polling queue (only if we processed it)
+            if is_entry_order or is_exit_order:
+                with self._lock:
+                    self.pending_orders.pop(execution_id, None)
 
-                elif broker_status in ['rejected', 'cancelled']:
-                    execution.status = 'failed'
-                    execution.broker_order_status = broker_status
-                    db.session.commit()
+                # Funds changed with the fill - refresh them before the next sizing call
+                funds_cache.refresh_async(order_info['account_id'], order_info['api_key'], order_info['host_url'])
 
-                    # Notify PositionMonitor of cancelled order
-                    try:
-                        position_monitor = get_position_monitor()
-                        position_monitor.on_order_cancelled(execution)
-                        logger.debug(f"[POSITION MONITOR] Notified of order cancel: {order_id}")
-                    except Exception as e:
-                        logger.error(f"[POSITION MONITOR] Error notifying order cancel: {e}")
+        elif broker_status in ['rejected', 'cancelled']:
+            execution.status = 'failed'
+            execution.broker_order_status = broker_status
+            db.session.commit()
 
-                    # Remove from polling queue
-                    with self._lock:
-                        self.pending_orders.pop(execution_id, None)
+            # Notify PositionMonitor of cancelled order
+            try:
+                position_monitor = get_position_monitor()
+                position_monitor.on_order_cancelled(execution)
+                logger.debug(f"[POSITION MONITOR] Notified of order cancel: {order_id}")
+            except Exception as e:
+                logger.error(f"[POSITION MONITOR] Error notifying order cancel: {e}")
 
-                    logger.warning(f"[REJECTED] Order {order_id} {broker_status.upper()} ({order_info['account_name']})")
+            # Remove from polling queue
+            with self._lock:
+                self.pending_orders.pop(execution_id, None)
 
-                else:  # Still 'open'
-                    execution.broker_order_status = 'open'
-                    db.session.commit()
+            logger.warning(f"[REJECTED] Order {order_id} {broker_status.upper()} ({order_info['account_name']})")
 
-                    # Increment check count
-                    with self._lock:
-                        if execution_id in self.pending_orders:
-                            self.pending_orders[execution_id]['check_count'] += 1
+        else:  # Still 'open'
+            execution.broker_order_status = 'open'
+            db.session.commit()
+            self._remember_limit(execution_id, data, execution)
 
-                    logger.debug(f"[PENDING] Order {order_id} still OPEN (check #{order_info['check_count']})")
+            # Increment check count
+            with self._lock:
+                if execution_id in self.pending_orders:
+                    self.pending_orders[execution_id]['check_count'] += 1
 
-                # Extended timeout: Remove after 8 hours (28800 seconds) for LIMIT orders
-                # LIMIT orders can take much longer to fill than MARKET orders
-                # Only remove if order has been open for too long (likely stale/forgotten)
-                order_age = (datetime.utcnow() - order_info['added_time']).total_seconds()
-                max_age_seconds = 28800  # 8 hours - allows full trading day for LIMIT orders
+            logger.debug(f"[PENDING] Order {order_id} still OPEN (check #{order_info['check_count']})")
 
-                if order_age > max_age_seconds:
-                    with self._lock:
-                        self.pending_orders.pop(execution_id, None)
-                    logger.warning(f"[TIMEOUT] Order {order_id} removed from polling (timeout after {int(order_age)}s / {max_age_seconds}s max)")
-            else:
-                logger.warning(f"[WARNING] Failed to get status for order {order_id}: {response.get('message')}")
+        # Extended timeout: Remove after 8 hours (28800 seconds) for LIMIT orders
+        # LIMIT orders can take much longer to fill than MARKET orders
+        # Only remove if order has been open for too long (likely stale/forgotten)
+        order_age = (datetime.utcnow() - order_info['added_time']).total_seconds()
+        max_age_seconds = 28800  # 8 hours - allows full trading day for LIMIT orders
 
-        except Exception as e:
-            logger.error(f"[ERROR] Error checking order {order_id}: {e}")
+        if order_age > max_age_seconds:
+            with self._lock:
+                self.pending_orders.pop(execution_id, None)
+            logger.warning(f"[TIMEOUT] Order {order_id} removed from polling (timeout after {int(order_age)}s / {max_age_seconds}s max)")
 
     def get_status(self):
         """Get current poller status (for monitoring)"""
@@ -373,7 +796,15 @@ class OrderStatusPoller:
             return {
                 'is_running': self.is_running,
                 'pending_orders_count': len(self.pending_orders),
-                'pending_order_ids': [info['order_id'] for info in self.pending_orders.values()]
+                'pending_order_ids': [info['order_id'] for info in self.pending_orders.values()],
+                'orderbook_fetches': self.orderbook_fetches,
+                'orderstatus_fallbacks': self.orderstatus_fallbacks,
+                'scheduled_checks': len(self._schedule),
+                'limit_crossings': self.limit_crossings,
+                'cycle_duration_ms': round(self.last_cycle_duration * 1000, 2),
+                'push_active': self.push_active,
+                'pushed_updates': self.pushed_updates,
+                'accounts': {worker.account_key: worker.get_metrics() for worker in self._workers.values()}
             }
 
     def recover_pending_orders(self, app=None):
@@ -420,18 +851,9 @@ class OrderStatusPoller:
                 else:
                     order_id_to_poll = execution.order_id
 
-                # Add to polling queue
+                # Add to polling queue (timers reset for recovered orders)
                 with self._lock:
-                    self.pending_orders[execution.id] = {
-                        'account_id': account.id,
-                        'account_name': account.account_name,
-                        'api_key': account.get_api_key(),
-                        'host_url': account.host_url,
-                        'order_id': order_id_to_poll,
-                        'strategy_name': strategy_name,
-                        'added_time': datetime.utcnow(),  # Reset timer for recovered orders
-                        'check_count': 0
-                    }
+                    self._queue_order(execution.id, account, order_id_to_poll, strategy_name)
                     recovered_count += 1
                     logger.debug(f"[RECOVERY] Recovered {execution.status} order {order_id_to_poll} for execution {execution.id}")
 
@@ -542,6 +964,10 @@ class OrderStatusPoller:
 
                         logger.info(f"[SYNC] Exit order {order_id_to_check} synced: {old_status}->{execution.status}")
 
+                    # Funds changed with the fill
+                    if old_status != execution.status:
+                        funds_cache.refresh_async(account.id, account.get_api_key(), account.host_url)
+
                 elif broker_status in ['rejected', 'cancelled']:
                     execution.status = 'failed'
                     execution.broker_order_status = broker_status
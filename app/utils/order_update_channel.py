@@ -0,0 +1,232 @@
+"""
+Order Update Channel
+Push-based ingestion of order events (fills, rejections, cancellations).
+
+Key Features:
+- Pluggable event sources: a broker or OpenAlgo order-event stream implements
+  OrderEventSource; LocalOrderEventSource stands in for one in tests and for
+  manual injection
+- Events are queued by the source thread and applied on one worker thread that
+  holds a single app context, so a slow database never blocks the stream
+- Updates go through OrderStatusPoller's reconciliation path: StrategyExecution
+  status/prices and PositionMonitor subscriptions change the moment the event
+  arrives
+- While a source is connected the poller only runs a slow reconciliation sweep
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Broker status spellings -> OpenAlgo order_status
+STATUS_ALIASES = {
+    'complete': 'complete',
+    'completed': 'complete',
+    'filled': 'complete',
+    'traded': 'complete',
+    'executed': 'complete',
+    'rejected': 'rejected',
+    'cancelled': 'cancelled',
+    'canceled': 'cancelled',
+    'open': 'open',
+    'pending': 'open',
+    'trigger pending': 'open',
+}
+
+
+def normalize_order_event(event: Dict) -> Optional[Dict]:
+    """
+    Map an order event onto the OpenAlgo orderstatus/orderbook shape.
+
+    Accepts 'orderid' / 'order_id', 'order_status' / 'status' and
+    'average_price' / 'avg_price'. Returns None if the event has no order id
+    or an unknown status.
+    """
+    order_id = event.get('orderid') or event.get('order_id')
+    status = str(event.get('order_status') or event.get('status') or '').strip().lower()
+    status = STATUS_ALIASES.get(status)
+    if not order_id or not status:
+        return None
+
+    try:
+        average_price = float(event.get('average_price') or event.get('avg_price') or 0)
+    except (TypeError, ValueError):
+        average_price = 0.0
+
+    data = dict(event)
+    data.update(orderid=str(order_id), order_status=status, average_price=average_price)
+    return data
+
+
+class OrderEventSource:
+    """Base class for order event streams"""
+
+    def start(self, on_event: Callable[[Dict], None]):
+        """Begin delivering raw order events to on_event (must not block)"""
+        raise NotImplementedError
+
+    def stop(self):
+        """Stop delivering events"""
+
+
+class LocalOrderEventSource(OrderEventSource):
+    """In-process source: publish() delivers an event immediately (tests, manual injection)"""
+
+    def __init__(self):
+        self._on_event = None
+
+    def start(self, on_event: Callable[[Dict], None]):
+        self._on_event = on_event
+
+    def stop(self):
+        self._on_event = None
+
+    def publish(self, event: Dict):
+        if self._on_event:
+            self._on_event(event)
+
+
+class OrderUpdateChannel:
+    """
+    Singleton that applies pushed order events.
+    OrderStatusPoller stays in place as the reconciliation sweep.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the order update channel"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.app = None
+        self.sources: List[OrderEventSource] = []
+        self._events: queue.Queue = queue.Queue()
+        self._worker_thread = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.events_received = 0
+        self.events_applied = 0
+        self.events_ignored = 0
+        self.last_latency = 0.0  # Seconds from receipt to database update
+        self.max_latency = 0.0
+
+        logger.debug("OrderUpdateChannel initialized")
+
+    def init_app(self, app):
+        """Register the Flask app (the worker starts when the first source is added)"""
+        self.app = app
+
+    def add_source(self, source: OrderEventSource):
+        """Connect an order event stream"""
+        with self._lock:
+            self.sources.append(source)
+            self._ensure_worker()
+        source.start(self.publish)
+        self._set_push_active(True)
+        logger.info(f"[ORDER UPDATES] Connected {type(source).__name__}")
+
+    def remove_source(self, source: OrderEventSource):
+        """Disconnect an order event stream (polling takes over when none is left)"""
+        source.stop()
+        with self._lock:
+            if source in self.sources:
+                self.sources.remove(source)
+            remaining = bool(self.sources)
+        self._set_push_active(remaining)
+        logger.info(f"[ORDER UPDATES] Disconnected {type(source).__name__}")
+
+    def stop(self):
+        """Disconnect all sources and stop the worker"""
+        for source in list(self.sources):
+            self.remove_source(source)
+        self._events.put(None)
+        if self._worker_thread:
+            self._worker_thread.join(timeout=5)
+            self._worker_thread = None
+
+    def publish(self, event: Dict):
+        """Queue a raw order event - called on the source's thread"""
+        self.events_received += 1
+        self._events.put((event, time.monotonic()))
+
+    def _set_push_active(self, active: bool):
+        from app.utils.order_status_poller import order_status_poller
+        order_status_poller.push_active = active
+
+    def _ensure_worker(self):
+        """Start the worker thread (caller holds _lock)"""
+        if self._worker_thread and self._worker_thread.is_alive():
+            return
+        if self.app is None:
+            raise RuntimeError("OrderUpdateChannel.init_app() must be called before adding sources")
+        self._worker_thread = threading.Thread(target=self._run, daemon=True, name="OrderUpdateChannel")
+        self._worker_thread.start()
+
+    def _run(self):
+        """Apply queued events in arrival order, in one long-lived app context"""
+        with self.app.app_context():
+            while True:
+                item = self._events.get()
+                if item is None:
+                    return
+
+                event, received_at = item
+                try:
+                    self._apply(event, received_at)
+                except Exception as e:
+                    logger.error(f"[ORDER UPDATES] Error applying order event {event}: {e}", exc_info=True)
+                finally:
+                    db.session.remove()
+
+    def _apply(self, event: Dict, received_at: float):
+        from app.utils.order_status_poller import order_status_poller
+
+        data = normalize_order_event(event)
+        if data is None:
+            self.events_ignored += 1
+            logger.debug(f"[ORDER UPDATES] Ignoring unrecognized event: {event}")
+            return
+
+        if not order_status_poller.apply_order_event(data):
+            # Not a pending order of ours (or already reconciled by the poller)
+            self.events_ignored += 1
+            logger.debug(f"[ORDER UPDATES] No pending execution for order {data['orderid']}")
+            return
+
+        self.events_applied += 1
+        self.last_latency = time.monotonic() - received_at
+        self.max_latency = max(self.max_latency, self.last_latency)
+        logger.debug(f"[ORDER UPDATES] Order {data['orderid']} {data['order_status']} applied "
+                     f"in {self.last_latency * 1000:.1f}ms")
+
+    def get_status(self) -> Dict:
+        """Channel status for monitoring"""
+        return {
+            'sources': [type(source).__name__ for source in self.sources],
+            'queued_events': self._events.qsize(),
+            'events_received': self.events_received,
+            'events_applied': self.events_applied,
+            'events_ignored': self.events_ignored,
+            'last_latency_ms': round(self.last_latency * 1000, 2),
+            'max_latency_ms': round(self.max_latency * 1000, 2)
+        }
+
+
+# Global instance
+order_update_channel = OrderUpdateChannel()
@@ -0,0 +1,263 @@
+"""
+Portfolio P&L Engine
+Vectorized P&L evaluation shared by all RiskManager checks.
+
+Every execution of the strategies under risk monitoring is loaded once per
+risk cycle into a column-oriented positions book (NumPy arrays). Strategy,
+account and user P&L then come out of a single groupby-sum (np.bincount)
+instead of a per-strategy Python loop with lazy-loaded legs.
+
+Price priority matches the original per-strategy calculation:
+WebSocket price (execution.last_price) > API price (positionbook) > entry price.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app import db
+from app.models import Strategy, StrategyExecution, StrategyLeg
+
+logger = logging.getLogger(__name__)
+
+# A WebSocket price older than this triggers an API price fetch
+STALE_PRICE_SECONDS = 60
+
+
+class PositionsBook:
+    """
+    Column-oriented snapshot of strategy executions.
+
+    Columns (one row per execution):
+        execution_id, strategy_id, account_id, user_id (int64)
+        entry_price, exit_price, last_price, last_price_ts, quantity (float64)
+        sign: +1 for BUY legs, -1 for SELL legs (and legs that cannot be resolved)
+        is_open / is_exited (bool)
+
+    symbol_index maps each symbol to the rows holding it, so prices can be
+    applied per symbol without scanning the book.
+    """
+
+    def __init__(self, rows: List[tuple]):
+        n = len(rows)
+        self.size = n
+        self.execution_id = np.empty(n, dtype=np.int64)
+        self.strategy_id = np.empty(n, dtype=np.int64)
+        self.account_id = np.empty(n, dtype=np.int64)
+        self.user_id = np.empty(n, dtype=np.int64)
+        self.entry_price = np.zeros(n, dtype=np.float64)
+        self.exit_price = np.zeros(n, dtype=np.float64)
+        self.last_price = np.zeros(n, dtype=np.float64)
+        self.last_price_ts = np.full(n, np.nan, dtype=np.float64)
+        self.quantity = np.zeros(n, dtype=np.float64)
+        self.sign = np.empty(n, dtype=np.float64)
+        self.is_open = np.zeros(n, dtype=bool)
+        self.is_exited = np.zeros(n, dtype=bool)
+        self.symbols: List[str] = []
+
+        symbol_rows: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            (execution_id, strategy_id, account_id, user_id, symbol, status,
+             entry_price, exit_price, quantity, last_price, last_price_updated, action) = row
+
+            self.execution_id[i] = execution_id
+            self.strategy_id[i] = strategy_id
+            self.account_id[i] = account_id
+            self.user_id[i] = user_id
+            self.entry_price[i] = entry_price or 0.0
+            self.exit_price[i] = exit_price or 0.0
+            self.last_price[i] = last_price or 0.0
+            if last_price_updated:
+                self.last_price_ts[i] = last_price_updated.timestamp()
+            self.quantity[i] = quantity or 0
+            self.sign[i] = 1.0 if action and action.upper() == 'BUY' else -1.0
+            self.is_open[i] = status == 'entered'
+            self.is_exited[i] = status == 'exited'
+
+            self.symbols.append(symbol or '')
+            symbol_rows.setdefault(symbol or '', []).append(i)
+
+        self.symbol_index: Dict[str, np.ndarray] = {
+            symbol: np.asarray(indices, dtype=np.intp) for symbol, indices in symbol_rows.items()
+        }
+
+    @classmethod
+    def load(cls, strategy_ids: Optional[Iterable[int]] = None) -> 'PositionsBook':
+        """
+        Load executions for the given strategies (or all strategies) in one query.
+        The leg action and the owning user are joined in, so no lazy loads happen.
+        """
+        query = db.session.query(
+            StrategyExecution.id,
+            StrategyExecution.strategy_id,
+            StrategyExecution.account_id,
+            Strategy.user_id,
+            StrategyExecution.symbol,
+            StrategyExecution.status,
+            StrategyExecution.entry_price,
+            StrategyExecution.exit_price,
+            StrategyExecution.quantity,
+            StrategyExecution.last_price,
+            StrategyExecution.last_price_updated,
+            StrategyLeg.action
+        ).join(
+            Strategy, StrategyExecution.strategy_id == Strategy.id
+        ).outerjoin(
+            StrategyLeg, StrategyExecution.leg_id == StrategyLeg.id
+        )
+
+        if strategy_ids is not None:
+            strategy_ids = list(strategy_ids)
+            if not strategy_ids:
+                return cls([])
+            query = query.filter(StrategyExecution.strategy_id.in_(strategy_ids))
+
+        return cls(query.all())
+
+    def needs_api_prices(self, now: Optional[datetime] = None) -> bool:
+        """True if any open position is missing a fresh WebSocket price"""
+        if not self.size:
+            return False
+
+        now_ts = (now or datetime.now()).timestamp()
+        age = now_ts - self.last_price_ts  # NaN when never updated
+        stale = ~(self.last_price > 0) | ~(age <= STALE_PRICE_SECONDS)
+        return bool(np.any(self.is_open & stale))
+
+    def apply_live_prices(self, live_prices: Dict[str, tuple]):
+        """
+        Overlay in-memory tick prices on the WebSocket price column.
+
+        Args:
+            live_prices: symbol -> (ltp, epoch seconds) from the WebSocket feed; these are
+                         newer than execution.last_price, which is written in batches
+        """
+        for symbol, (ltp, ts) in live_prices.items():
+            rows = self.symbol_index.get(symbol)
+            if rows is not None and ltp:
+                self.last_price[rows] = float(ltp)
+                self.last_price_ts[rows] = ts
+
+    def open_exposure(self) -> Dict[str, set]:
+        """Map each symbol with an open position to the strategies holding it"""
+        exposure: Dict[str, set] = {}
+        for symbol, rows in self.symbol_index.items():
+            open_rows = rows[self.is_open[rows]]
+            if len(open_rows):
+                exposure[symbol] = set(self.strategy_id[open_rows].tolist())
+        return exposure
+
+    def prices_for(self, api_prices: Dict[str, float]) -> np.ndarray:
+        """Scatter a symbol -> price dict onto book rows (0.0 where missing)"""
+        prices = np.zeros(self.size, dtype=np.float64)
+        for symbol, price in api_prices.items():
+            rows = self.symbol_index.get(symbol)
+            if rows is not None and price:
+                prices[rows] = float(price)
+        return prices
+
+    def evaluate(self, api_prices: Optional[Dict[str, float]] = None) -> 'PnLSnapshot':
+        """Compute P&L for every strategy, account and user in one vectorized pass"""
+        api = self.prices_for(api_prices or {})
+
+        has_ws = self.last_price > 0
+        has_api = api > 0
+        has_entry = self.entry_price > 0
+
+        # PRIORITY: WebSocket price > API price > entry price (assume breakeven)
+        mark = np.where(has_ws, self.last_price, np.where(has_api, api, np.where(has_entry, self.entry_price, np.nan)))
+        priced = self.is_open & ~np.isnan(mark)
+        fallback = self.is_open & ~has_ws & ~has_api & has_entry
+
+        unrealized = np.where(priced, self.sign * (np.nan_to_num(mark) - self.entry_price) * self.quantity, 0.0)
+        closed = self.is_exited & (self.exit_price > 0)
+        realized = np.where(closed, self.sign * (self.exit_price - self.entry_price) * self.quantity, 0.0)
+
+        # Premium of open legs (BUY = debit, SELL = credit) for trailing SL sizing
+        premium = np.where(
+            self.is_open & (self.entry_price != 0) & (self.quantity != 0),
+            self.entry_price * self.quantity, 0.0
+        )
+        is_buy = self.sign > 0
+
+        unpriced = int(np.count_nonzero(self.is_open & ~priced))
+        if unpriced:
+            logger.error(f"[P&L] {unpriced} OPEN position(s) with NO price data - excluded from P&L")
+
+        strategy_keys, strategy_codes = np.unique(self.strategy_id, return_inverse=True)
+        account_keys, account_codes = np.unique(self.account_id, return_inverse=True)
+        user_keys, user_codes = np.unique(self.user_id, return_inverse=True)
+        total = realized + unrealized
+
+        def group_sum(codes, keys, values):
+            return np.bincount(codes, weights=values, minlength=len(keys))
+
+        return PnLSnapshot(
+            strategy_ids=strategy_keys,
+            realized=group_sum(strategy_codes, strategy_keys, realized),
+            unrealized=group_sum(strategy_codes, strategy_keys, unrealized),
+            open_count=group_sum(strategy_codes, strategy_keys, self.is_open.astype(np.float64)),
+            fallback_count=group_sum(strategy_codes, strategy_keys, fallback.astype(np.float64)),
+            buy_premium=group_sum(strategy_codes, strategy_keys, np.where(is_buy, premium, 0.0)),
+            sell_premium=group_sum(strategy_codes, strategy_keys, np.where(is_buy, 0.0, premium)),
+            account_pnl=dict(zip(account_keys.tolist(), group_sum(account_codes, account_keys, total).tolist())),
+            user_pnl=dict(zip(user_keys.tolist(), group_sum(user_codes, user_keys, total).tolist())),
+        )
+
+
+class PnLSnapshot:
+    """Result of one vectorized P&L evaluation (read-only)"""
+
+    def __init__(self, strategy_ids: np.ndarray, realized: np.ndarray, unrealized: np.ndarray,
+                 open_count: np.ndarray, fallback_count: np.ndarray, buy_premium: np.ndarray,
+                 sell_premium: np.ndarray, account_pnl: Dict[int, float], user_pnl: Dict[int, float]):
+        self.evaluated_at = datetime.now()
+        self._row_by_strategy = {sid: i for i, sid in enumerate(strategy_ids.tolist())}
+        self._realized = realized
+        self._unrealized = unrealized
+        self._open_count = open_count
+        self._fallback_count = fallback_count
+        self._buy_premium = buy_premium
+        self._sell_premium = sell_premium
+        self.account_pnl = account_pnl
+        self.user_pnl = user_pnl
+
+    def __contains__(self, strategy_id: int) -> bool:
+        return strategy_id in self._row_by_strategy
+
+    def strategy_pnl(self, strategy_id: int) -> Dict:
+        """
+        P&L for one strategy in the same shape RiskManager.calculate_strategy_pnl returns,
+        plus the open-leg premiums used by the trailing stop loss.
+        """
+        row = self._row_by_strategy.get(strategy_id)
+        if row is None:
+            return {
+                'realized_pnl': 0.0,
+                'unrealized_pnl': 0.0,
+                'total_pnl': 0.0,
+                'valid': True,
+                'prices_unreliable': False,
+                'fallback_count': 0,
+                'open_count': 0,
+                'buy_premium': 0.0,
+                'sell_premium': 0.0
+            }
+
+        realized = float(self._realized[row])
+        unrealized = float(self._unrealized[row])
+        open_count = int(self._open_count[row])
+        fallback_count = int(self._fallback_count[row])
+
+        return {
+            'realized_pnl': round(realized, 2),
+            'unrealized_pnl': round(unrealized, 2),
+            'total_pnl': round(realized + unrealized, 2),
+            'valid': True,
+            'prices_unreliable': open_count > 0 and fallback_count == open_count,
+            'fallback_count': fallback_count,
+            'open_count': open_count,
+            'buy_premium': float(self._buy_premium[row]),
+            'sell_premium': float(self._sell_premium[row])
+        }
@@ -11,21 +11,57 @@ Key Features:
 Uses standard threading for background tasks
 """
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Set, Optional
-import pytz
-from sqlalchemy import and_
+from typing import Dict, List, Set, Optional, Tuple
+from sqlalchemy import and_, bindparam
 from sqlalchemy.orm import joinedload
 
 from app import db
-from app.models import (
-    TradingAccount, StrategyExecution, Strategy, StrategyLeg,
-    TradingHoursTemplate, TradingSession, MarketHoliday
-)
+from app.models import TradingAccount, StrategyExecution, Strategy, StrategyLeg
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+from app.utils.risk_manager import risk_manager
+from app.utils.trading_calendar import trading_calendar
 
 logger = logging.getLogger(__name__)
 
+_NO_SYMBOLS: Dict[str, int] = {}
+
+
+class PositionRecord:
+    """
+    Compact, session-independent view of one open execution.
+
+    Replaces live StrategyExecution instances in the position map: no ORM
+    state, no lazy loads, and safe to read from the WebSocket thread.
+    """
+
+    __slots__ = ('execution_id', 'strategy_id', 'account_id', 'quantity', 'sign', 'entry_price')
+
+    def __init__(self, execution_id: int, strategy_id: int, account_id: int,
+                 quantity: int, sign: int, entry_price: float):
+        self.execution_id = execution_id
+        self.strategy_id = strategy_id
+        self.account_id = account_id
+        self.quantity = quantity
+        self.sign = sign
+        self.entry_price = entry_price
+
+    @classmethod
+    def from_execution(cls, execution: StrategyExecution) -> 'PositionRecord':
+        """Snapshot an execution (leg action gives the sign: BUY +1, SELL -1)"""
+        leg = execution.leg
+        action = leg.action.upper() if leg and leg.action else 'SELL'
+        return cls(
+            execution_id=execution.id,
+            strategy_id=execution.strategy_id,
+            account_id=execution.account_id,
+            quantity=execution.quantity or 0,
+            sign=1 if action == 'BUY' else -1,
+            entry_price=execution.entry_price or 0.0
+        )
+
 
 class PositionMonitor:
     """
@@ -55,20 +91,75 @@ class PositionMonitor:
         self._initialized = True
         self.is_running = False
         self.websocket_manager = None
-        self.subscribed_symbols: Set[str] = set()
-        self.position_map: Dict[str, List[StrategyExecution]] = {}
+        # Symbols are interned to small integer ids when first subscribed:
+        # exchange -> symbol -> symbol id, and symbol id -> (symbol, exchange)
+        self._symbol_ids: Dict[str, Dict[str, int]] = {}
+        self._symbol_keys: List[Tuple[str, str]] = []
+        self.subscribed_symbols: Set[int] = set()  # Subscribed symbol ids
+        # Arrays indexed by symbol id: position records and their execution ids
+        # (rebuilt together whenever positions change; the tick path only reads them)
+        self.position_map: List[Tuple[PositionRecord, ...]] = []
+        self._execution_ids: List[Tuple[int, ...]] = []
+        # Guards symbol id allocation (subscribe, fill and refresh run on different threads)
+        self._symbol_lock = threading.Lock()
         self.app = None  # Store Flask app instance for creating app context
 
         # Batch update mechanism for WebSocket price updates
-        # Stores {symbol_exchange: {'ltp': float, 'updated': datetime}}
-        self._pending_price_updates: Dict[str, Dict] = {}
+        # Stores {symbol_id: ltp} - latest tick per symbol since the last flush
+        self._pending_price_updates: Dict[int, float] = {}
         self._price_update_lock = None  # Will be initialized with threading.Lock()
-        self._batch_flush_interval = 2.0  # Flush every 2 seconds
+        self._min_flush_interval = 2.0  # Flush every 2 seconds when writes are cheap
+        self._max_flush_interval = 10.0  # Back off to this when the DB writer is slow
+        self._flush_duty_cycle = 0.1  # Target share of time spent holding the writer lock
+        self._batch_flush_interval = self._min_flush_interval
         self._last_flush_time = None
         self._flush_thread = None
 
+        # Flush metrics (exposed in get_monitoring_status)
+        self._flush_latency_ewma = 0.0
+        self._last_flush_latency = 0.0
+        self._last_flush_rows = 0
+        self._total_rows_written = 0
+        self._flush_count = 0
+
         logger.debug("PositionMonitor initialized")
 
+    def _intern_symbol(self, symbol: str, exchange: str) -> int:
+        """Symbol id for (symbol, exchange), allocating one on first use"""
+        with self._symbol_lock:
+            symbols = self._symbol_ids.setdefault(exchange, {})
+            symbol_id = symbols.get(symbol)
+            if symbol_id is None:
+                symbol_id = len(self._symbol_keys)
+                self._symbol_keys.append((symbol, exchange))
+                self.position_map.append(())
+                self._execution_ids.append(())
+                symbols[symbol] = symbol_id
+            return symbol_id
+
+    def _lookup_symbol(self, symbol: str, exchange: str) -> Optional[int]:
+        """Symbol id if the symbol was ever tracked (no allocation)"""
+        return self._symbol_ids.get(exchange, _NO_SYMBOLS).get(symbol)
+
+    def _symbol_name(self, symbol_id: int) -> str:
+        symbol, exchange = self._symbol_keys[symbol_id]
+        return f"{symbol}:{exchange}"
+
+    def _set_positions(self, symbol_id: int, records: List[PositionRecord]):
+        """Replace the records tracked for a symbol (keeps execution id array in sync)"""
+        self.position_map[symbol_id] = tuple(records)
+        self._execution_ids[symbol_id] = tuple(r.execution_id for r in records)
+
+    def _add_position(self, symbol_id: int, execution: StrategyExecution):
+        """Track one more execution for a symbol (no duplicates by id)"""
+        if execution.id in self._execution_ids[symbol_id]:
+            return
+        self._set_positions(symbol_id, list(self.position_map[symbol_id]) + [PositionRecord.from_execution(execution)])
+
+    def _remove_position(self, symbol_id: int, execution_id: int):
+        """Stop tracking an execution"""
+        self._set_positions(symbol_id, [r for r in self.position_map[symbol_id] if r.execution_id != execution_id])
+
     def should_start_monitoring(self) -> bool:
         """
         Check if monitoring should start.
@@ -123,47 +214,12 @@ class PositionMonitor:
     def is_trading_hours(self) -> bool:
         """
         Check if current time is within trading hours.
-        Uses TradingHoursTemplate from database (NO HARDCODING).
+        Uses the shared trading calendar (compiled from TradingHoursTemplate, no DB access).
 
         Returns:
             bool: True if within trading hours, False otherwise
         """
-        now = datetime.now(pytz.timezone('Asia/Kolkata'))
-        today = now.date()
-        current_time = now.time()
-        day_of_week = now.weekday()  # 0=Monday, 6=Sunday
-
-        # Check if today is a market holiday
-        is_holiday = MarketHoliday.query.filter(
-            MarketHoliday.holiday_date == today
-        ).first()
-
-        if is_holiday:
-            logger.debug(f"Market holiday: {is_holiday.holiday_name}")
-            return False
-
-        # Get trading sessions for today
-        sessions = TradingSession.query.join(TradingHoursTemplate).filter(
-            TradingSession.day_of_week == day_of_week,
-            TradingSession.is_active == True,
-            TradingHoursTemplate.is_active == True
-        ).all()
-
-        if not sessions:
-            logger.debug(f"No trading sessions configured for day {day_of_week}")
-            return False
-
-        # Check if current time is within any session
-        for session in sessions:
-            if session.start_time <= current_time <= session.end_time:
-                logger.debug(
-                    f"Within trading hours: {session.session_name} "
-                    f"({session.start_time} - {session.end_time})"
-                )
-                return True
-
-        logger.debug(f"Outside all trading sessions for day {day_of_week}")
-        return False
+        return trading_calendar.is_open()
 
     def get_open_positions(self) -> List[StrategyExecution]:
         """
@@ -261,22 +317,21 @@ class PositionMonitor:
         # Group by symbol to avoid duplicate subscriptions
         symbols_to_subscribe = {}
         for execution in open_executions:
-            # Create unique key from symbol and exchange
-            key = f"{execution.symbol}_{execution.exchange}"
+            symbol_id = self._intern_symbol(execution.symbol, execution.exchange)
 
-            if key not in symbols_to_subscribe:
-                symbols_to_subscribe[key] = {
+            if symbol_id not in symbols_to_subscribe:
+                symbols_to_subscribe[symbol_id] = {
                     'symbol': execution.symbol,
                     'exchange': execution.exchange,
-                    'executions': []
+                    'records': []
                 }
 
-            symbols_to_subscribe[key]['executions'].append(execution)
+            symbols_to_subscribe[symbol_id]['records'].append(PositionRecord.from_execution(execution))
 
         logger.debug(f"Subscribing to {len(symbols_to_subscribe)} unique symbols")
 
         # Subscribe to each unique symbol
-        for key, data in symbols_to_subscribe.items():
+        for symbol_id, data in symbols_to_subscribe.items():
             try:
                 # Subscribe to WebSocket
                 self.websocket_manager.subscribe({
@@ -286,12 +341,12 @@ class PositionMonitor:
                 })
 
                 # Update internal tracking
-                self.subscribed_symbols.add(key)
-                self.position_map[key] = data['executions']
+                self.subscribed_symbols.add(symbol_id)
+                self._set_positions(symbol_id, data['records'])
 
                 logger.debug(
                     f"Subscribed to {data['symbol']} "
-                    f"({len(data['executions'])} positions)"
+                    f"({len(data['records'])} positions)"
                 )
 
             except Exception as e:
@@ -310,9 +365,9 @@ class PositionMonitor:
             symbol: Trading symbol
             exchange: Exchange name
         """
-        key = f"{symbol}_{exchange}"
+        symbol_id = self._lookup_symbol(symbol, exchange)
 
-        if key not in self.subscribed_symbols:
+        if symbol_id is None or symbol_id not in self.subscribed_symbols:
             return
 
         try:
@@ -322,8 +377,8 @@ class PositionMonitor:
                     'exchange': exchange
                 })
 
-            self.subscribed_symbols.discard(key)
-            self.position_map.pop(key, None)
+            self.subscribed_symbols.discard(symbol_id)
+            self._set_positions(symbol_id, [])
 
             logger.debug(f"Unsubscribed from {symbol}")
 
@@ -366,13 +421,15 @@ class PositionMonitor:
             logger.debug(f"Order filled for {execution.symbol} but no risk management configured - skipping WebSocket subscription")
             return
 
-        key = f"{execution.symbol}_{execution.exchange}"
+        symbol_id = self._intern_symbol(execution.symbol, execution.exchange)
+
+        # Route ticks of this symbol to the risk worker right away
+        risk_manager.watch_strategy_symbol(execution.strategy_id, execution.symbol)
 
         # Check if we're already monitoring this symbol
-        if key in self.subscribed_symbols:
+        if symbol_id in self.subscribed_symbols:
             # Add to existing position tracking
-            if key in self.position_map:
-                self.position_map[key].append(execution)
+            self._add_position(symbol_id, execution)
             logger.debug(f"Added {execution.symbol} to existing monitoring")
             return
 
@@ -385,8 +442,8 @@ class PositionMonitor:
                     'mode': 'quote'
                 })
 
-                self.subscribed_symbols.add(key)
-                self.position_map[key] = [execution]
+                self.subscribed_symbols.add(symbol_id)
+                self._set_positions(symbol_id, [PositionRecord.from_execution(execution)])
 
                 logger.debug(f"New position filled with risk management - subscribed to {execution.symbol}")
 
@@ -412,22 +469,16 @@ class PositionMonitor:
             execution: The closed strategy execution
         """
         try:
-            key = f"{execution.symbol}_{execution.exchange}"
+            symbol_id = self._lookup_symbol(execution.symbol, execution.exchange)
 
             logger.info(f"[POSITION_CLOSE] Received notification for {execution.symbol} (execution_id={execution.id})")
-            logger.info(f"[POSITION_CLOSE] Currently subscribed symbols: {list(self.subscribed_symbols)}")
-
-            # Remove from position map by ID (not object identity)
-            if key in self.position_map:
-                positions = self.position_map[key]
-                # Remove by ID since object instances may differ
-                self.position_map[key] = [p for p in positions if p.id != execution.id]
-                remaining = len(self.position_map[key])
-                logger.info(f"[POSITION_CLOSE] Removed execution {execution.id} from position map, {remaining} remaining")
+            logger.info(f"[POSITION_CLOSE] Currently subscribed symbols: {[self._symbol_name(i) for i in self.subscribed_symbols]}")
 
-                # If no more positions in our map, remove the key
-                if remaining == 0:
-                    self.position_map.pop(key, None)
+            # Remove from position map by execution id
+            if symbol_id is not None and self.position_map[symbol_id]:
+                self._remove_position(symbol_id, execution.id)
+                remaining = len(self.position_map[symbol_id])
+                logger.info(f"[POSITION_CLOSE] Removed execution {execution.id} from position map, {remaining} remaining")
 
             # Query database to check if ANY open positions remain for this symbol
             # This is the source of truth, not our in-memory map
@@ -444,7 +495,7 @@ class PositionMonitor:
                 logger.info(f"[POSITION_CLOSE] No more open positions - unsubscribing from {execution.symbol}")
 
                 # Force unsubscribe regardless of internal tracking
-                if key in self.subscribed_symbols:
+                if symbol_id in self.subscribed_symbols:
                     self.unsubscribe_from_symbol(execution.symbol, execution.exchange)
                     logger.info(f"[POSITION_CLOSE] Unsubscribed {execution.symbol} from WebSocket")
                 else:
@@ -472,31 +523,35 @@ class PositionMonitor:
 
         Instead of writing to DB immediately, queues the update for batch flush.
         This reduces DB writes from potentially 100s per second to 1 per 2 seconds.
+        Hot path: two dict lookups to the interned symbol id - no string
+        formatting and no ORM access.
 
         Args:
             symbol: Trading symbol
             exchange: Exchange name
             ltp: Last traded price
         """
-        key = f"{symbol}_{exchange}"
+        symbol_id = self._symbol_ids.get(exchange, _NO_SYMBOLS).get(symbol)
 
-        if key not in self.position_map:
+        if symbol_id is None or not self._execution_ids[symbol_id]:
             return
 
         # Queue for batch update instead of immediate DB write
         if self._price_update_lock:
             with self._price_update_lock:
-                self._pending_price_updates[key] = {
-                    'symbol': symbol,
-                    'exchange': exchange,
-                    'ltp': ltp,
-                    'updated': datetime.utcnow()
-                }
+                self._pending_price_updates[symbol_id] = ltp
+
+        # Tick-driven risk evaluation: mark strategies holding this symbol dirty
+        risk_manager.on_price_tick(symbol, ltp)
 
     def _flush_pending_updates(self):
         """
-        Flush all pending price updates to database in a single transaction.
+        Flush all pending price updates to database in one bulk statement.
         Called periodically by the flush thread.
+
+        One UPDATE is prepared and executed for every tracked execution
+        (executemany), instead of one statement per symbol. Execution ids come
+        from the precomputed per-symbol lists.
         """
         if not self._pending_price_updates:
             return
@@ -509,39 +564,38 @@ class PositionMonitor:
         # Get pending updates with lock
         if self._price_update_lock:
             with self._price_update_lock:
-                updates_to_process = self._pending_price_updates.copy()
-                self._pending_price_updates.clear()
+                updates_to_process = self._pending_price_updates
+                self._pending_price_updates = {}
 
         if not updates_to_process:
             return
 
+        # One parameter row per execution holding a symbol that ticked
+        rows = []
+        for symbol_id, ltp in updates_to_process.items():
+            for execution_id in self._execution_ids[symbol_id]:
+                rows.append({'b_id': execution_id, 'b_ltp': ltp})
+
+        if not rows:
+            return
+
+        started = time.monotonic()
         try:
             with self.app.app_context():
-                # Get all execution IDs that need updating
-                execution_ids = []
-                for key, data in updates_to_process.items():
-                    if key in self.position_map:
-                        execution_ids.extend([e.id for e in self.position_map[key]])
-
-                if not execution_ids:
-                    return
-
-                # Batch update all positions in a single query
-                now = datetime.utcnow()
-                for key, data in updates_to_process.items():
-                    if key in self.position_map:
-                        position_ids = [e.id for e in self.position_map[key]]
-                        if position_ids:
-                            StrategyExecution.query.filter(
-                                StrategyExecution.id.in_(position_ids)
-                            ).update({
-                                'last_price': data['ltp'],
-                                'last_price_updated': now,
-                                'websocket_subscribed': True
-                            }, synchronize_session=False)
-
+                table = StrategyExecution.__table__
+                stmt = table.update().where(
+                    table.c.id == bindparam('b_id')
+                ).values(
+                    last_price=bindparam('b_ltp'),
+                    last_price_updated=datetime.utcnow(),
+                    websocket_subscribed=True
+                )
+                db.session.execute(stmt, rows)
                 db.session.commit()
-                logger.debug(f"Batch flushed {len(updates_to_process)} price updates")
+
+            self._record_flush(time.monotonic() - started, len(rows))
+            logger.debug(f"Batch flushed {len(updates_to_process)} symbols ({len(rows)} rows) "
+                         f"in {self._last_flush_latency * 1000:.1f}ms")
 
         except Exception as e:
             logger.error(f"Error flushing price updates: {e}")
@@ -551,9 +605,28 @@ class PositionMonitor:
             except:
                 pass
 
+    def _record_flush(self, latency: float, rows_written: int):
+        """
+        Update flush metrics and adapt the flush interval to write latency.
+
+        The interval grows while a flush holds the DB writer for more than
+        _flush_duty_cycle of the interval (slow disk, SQLite lock contention)
+        and returns to the minimum once writes are cheap again.
+        """
+        self._last_flush_latency = latency
+        self._last_flush_rows = rows_written
+        self._total_rows_written += rows_written
+        self._flush_count += 1
+        self._last_flush_time = datetime.utcnow()
+        self._flush_latency_ewma = latency if self._flush_count == 1 else (
+            0.8 * self._flush_latency_ewma + 0.2 * latency
+        )
+
+        target = self._flush_latency_ewma / self._flush_duty_cycle
+        self._batch_flush_interval = min(max(target, self._min_flush_interval), self._max_flush_interval)
+
     def _flush_thread_runner(self):
         """Background thread that periodically flushes price updates."""
-        import time
         while self.is_running:
             time.sleep(self._batch_flush_interval)
             try:
@@ -597,8 +670,6 @@ class PositionMonitor:
             websocket_manager: WebSocket manager instance (can be None or not-yet-connected)
             app: Flask app instance (for creating app context in WebSocket callbacks)
         """
-        import threading
-
         if self.is_running:
             logger.warning("Position monitor already running")
             return
@@ -660,13 +731,17 @@ class PositionMonitor:
             self._flush_thread.join(timeout=5.0)
 
         # Unsubscribe from all symbols
-        for key in list(self.subscribed_symbols):
-            symbol, exchange = key.split('_', 1)
+        for symbol_id in list(self.subscribed_symbols):
+            symbol, exchange = self._symbol_keys[symbol_id]
             self.unsubscribe_from_symbol(symbol, exchange)
 
         self.subscribed_symbols.clear()
-        self.position_map.clear()
         self._pending_price_updates.clear()
+        with self._symbol_lock:
+            self._symbol_ids = {}
+            self._symbol_keys = []
+            self.position_map = []
+            self._execution_ids = []
 
     def refresh_positions(self):
         """
@@ -690,14 +765,12 @@ class PositionMonitor:
 
             # Subscribe to any new positions
             for execution in open_executions:
-                key = f"{execution.symbol}_{execution.exchange}"
+                symbol_id = self._intern_symbol(execution.symbol, execution.exchange)
 
                 # Skip if already subscribed
-                if key in self.subscribed_symbols:
+                if symbol_id in self.subscribed_symbols:
                     # Make sure it's in the position map
-                    if key in self.position_map:
-                        if execution not in self.position_map[key]:
-                            self.position_map[key].append(execution)
+                    self._add_position(symbol_id, execution)
                     continue
 
                 # Subscribe to new symbol
@@ -707,8 +780,8 @@ class PositionMonitor:
                     'mode': 'quote'
                 })
 
-                self.subscribed_symbols.add(key)
-                self.position_map[key] = [execution]
+                self.subscribed_symbols.add(symbol_id)
+                self._set_positions(symbol_id, [PositionRecord.from_execution(execution)])
                 logger.debug(f"Refresh: Subscribed to {execution.symbol}")
 
         except Exception as e:
@@ -724,8 +797,15 @@ class PositionMonitor:
         return {
             'is_running': self.is_running,
             'subscribed_symbols': len(self.subscribed_symbols),
-            'total_positions': sum(len(positions) for positions in self.position_map.values()),
-            'symbols': list(self.subscribed_symbols),
+            'total_positions': sum(len(ids) for ids in self._execution_ids),
+            'symbols': [self._symbol_name(symbol_id) for symbol_id in self.subscribed_symbols],
+            'flush_interval_seconds': round(self._batch_flush_interval, 2),
+            'last_flush_latency_ms': round(self._last_flush_latency * 1000, 2),
+            'avg_flush_latency_ms': round(self._flush_latency_ewma * 1000, 2),
+            'last_flush_rows': self._last_flush_rows,
+            'total_rows_written': self._total_rows_written,
+            'flush_count': self._flush_count,
+            'last_flush_time': self._last_flush_time.isoformat() if self._last_flush_time else None,
             'can_start': self.should_start_monitoring()
         }
 
@@ -7,11 +7,16 @@ Key Features:
 - Max Profit monitoring with auto-exit
 - Trailing Stop Loss implementation
 - Real-time P&L calculations using WebSocket data
+- Tick-driven evaluation: only strategies exposed to a ticking symbol are re-checked
 - Audit logging of all risk events
 
 Uses standard threading for background tasks
 """
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
@@ -30,6 +35,9 @@ from app.models import (
     TradingAccount
 )
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+from app.utils.pnl_engine import PositionsBook, PnLSnapshot
+from app.utils.trading_calendar import trading_calendar
+from app.utils.trailing_stop import TrailingStopState
 
 logger = logging.getLogger(__name__)
 
@@ -74,18 +82,137 @@ class RiskManager:
         self._failed_accounts: Dict[int, datetime] = {}  # Track failed accounts with timestamp
         self._failed_account_cooldown = 60  # Retry failed account after 60 seconds
 
+        # Hedged price fetch: cached account list, per-account health, shared request pool
+        self._price_accounts: Optional[List[Dict]] = None
+        self._price_accounts_loaded = 0.0
+        self._account_cache_ttl = 60  # Re-read active accounts every 60 seconds
+        self._price_health: Dict[int, Dict] = {}
+        self._price_health_lock = threading.Lock()
+        self._default_hedge_delay = 1.0  # Hedge delay until an account has latency history
+        self._min_hedge_delay = 0.2
+        self._price_fetch_deadline = 10.0  # Matches the OpenAlgo client timeout
+        self._price_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='RiskPriceFetch')
+        self._hedged_requests = 0
+
+        # Most recent vectorized P&L evaluation (strategy/account/user totals)
+        self._last_snapshot: Optional[PnLSnapshot] = None
+
+        # Tick-driven evaluation
+        # Ticks mark the strategies holding the symbol dirty; the risk worker re-checks
+        # only those, at most once per debounce window per strategy.
+        # The scheduler scan (run_risk_checks) remains as a lower-frequency safety net.
+        self.app = None
+        self.tick_driven_enabled = True
+        self._debounce_seconds = 0.25
+        self._exposure: Dict[str, set] = {}  # symbol -> strategy ids with open positions
+        self._live_prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (ltp, epoch seconds)
+        self._dirty_strategies: set = set()
+        self._last_evaluated: Dict[int, float] = {}  # strategy_id -> monotonic time
+        self._dirty_lock = threading.Lock()
+        self._dirty_event = threading.Event()
+        self._evaluation_lock = threading.Lock()  # Scheduler scan and worker never check concurrently
+        self._worker_thread: Optional[threading.Thread] = None
+        self._ticks_received = 0
+        self._tick_evaluations = 0
+
+        # Trailing SL ratchet state held in memory, written behind to the Strategy row
+        self._tsl_states: Dict[int, TrailingStopState] = {}
+        self._tsl_lock = threading.Lock()
+        self._tsl_write_lock = threading.Lock()  # One flush at a time, so writes land in state order
+        self._tsl_flush_event = threading.Event()
+        self._tsl_persist_seconds = 5.0
+        self._tsl_flush_thread: Optional[threading.Thread] = None
+        self._tsl_rows_written = 0
+
         logger.debug("RiskManager initialized")
 
+    def _get_price_accounts(self) -> List[Dict]:
+        """
+        Active accounts usable for price feeds, cached for _account_cache_ttl seconds.
+
+        Plain dicts (id, name, decrypted API key, host) so the hedged fetch threads
+        never touch ORM objects or need an app context.
+        """
+        now = time.monotonic()
+        if self._price_accounts is not None and now - self._price_accounts_loaded < self._account_cache_ttl:
+            return self._price_accounts
+
+        accounts = TradingAccount.query.filter_by(
+            is_active=True
+        ).order_by(
+            TradingAccount.is_primary.desc(),  # Primary first
+            TradingAccount.id.asc()  # Then by ID
+        ).all()
+
+        price_accounts = []
+        for account in accounts:
+            try:
+                price_accounts.append({
+                    'id': account.id,
+                    'account_name': account.account_name,
+                    'api_key': account.get_api_key(),
+                    'host_url': account.host_url,
+                    'is_primary': account.is_primary
+                })
+            except Exception as e:
+                logger.warning(f"Skipping account {account.account_name} for price feeds: {e}")
+
+        self._price_accounts = price_accounts
+        self._price_accounts_loaded = now
+        return price_accounts
+
+    def invalidate_price_accounts(self):
+        """Drop the cached account list (call after accounts are added/removed/toggled)"""
+        self._price_accounts = None
+
+    def _account_health(self, account_id: int) -> Dict:
+        """In-memory health record for an account (created on first use)"""
+        health = self._price_health.get(account_id)
+        if health is None:
+            health = {
+                'score': 1.0,  # EWMA of success (1.0 = always answers)
+                'latencies': deque(maxlen=50),  # Recent successful response times (seconds)
+                'successes': 0,
+                'failures': 0,
+                'last_error': None
+            }
+            self._price_health[account_id] = health
+        return health
+
+    def _record_price_result(self, account_id: int, ok: bool, latency: float, error: Optional[str] = None):
+        """Update an account's health score after a positionbook call"""
+        with self._price_health_lock:
+            health = self._account_health(account_id)
+            health['score'] = 0.7 * health['score'] + 0.3 * (1.0 if ok else 0.0)
+            if ok:
+                health['successes'] += 1
+                health['latencies'].append(latency)
+                self._failed_accounts.pop(account_id, None)
+            else:
+                health['failures'] += 1
+                health['last_error'] = error
+                self._failed_accounts[account_id] = datetime.now()
+
+    def _hedge_delay(self, account_id: int) -> float:
+        """p95 response time of an account - how long to wait before hedging to the next one"""
+        with self._price_health_lock:
+            latencies = sorted(self._account_health(account_id)['latencies'])
+        if len(latencies) < 5:
+            return self._default_hedge_delay
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return min(max(p95, self._min_hedge_delay), self._default_hedge_delay * 3)
+
     def _get_prices_with_failover(self) -> Dict[str, float]:
         """
-        Get current prices with automatic failover across accounts.
+        Get current prices with hedged requests across accounts.
 
-        Failover Logic:
+        Hedging Logic:
         1. Check if within trading hours (skip API calls if market closed)
-        2. Try last working account first (if known)
-        3. Try primary account
-        4. If primary fails, try next active account (max 3 attempts)
-        5. Failed accounts are retried after cooldown period (60s)
+        2. Rank accounts by in-memory health score (last working account, then primary, break ties)
+        3. Fire to the best account; if it has not answered within its p95 latency
+           (or fails), fire to the next one as well (max 3 accounts)
+        4. First response with prices wins; late responses only update health scores
+        5. Failed accounts are skipped for a cooldown period (60s)
 
         Returns:
             Dict mapping symbol to LTP price
@@ -93,140 +220,119 @@ class RiskManager:
         now = datetime.now()
 
         # OPTIMIZATION: Skip API calls if outside trading hours
-        if not self._is_within_trading_hours():
+        if not trading_calendar.is_open():
             logger.debug("Outside trading hours - skipping API price fetch")
             return {}
 
-        # Get all active accounts ordered by: primary first, then by id
-        accounts = TradingAccount.query.filter_by(
-            is_active=True
-        ).order_by(
-            TradingAccount.is_primary.desc(),  # Primary first
-            TradingAccount.id.asc()  # Then by ID
-        ).all()
-
+        accounts = self._get_price_accounts()
         if not accounts:
             logger.warning("No active accounts available for price feeds")
             return {}
 
-        # OPTIMIZATION: If we have a known working account, try it first
-        if self._current_price_account_id:
-            working_account = next(
-                (a for a in accounts if a.id == self._current_price_account_id),
-                None
-            )
-            if working_account:
-                # Move working account to front of list
-                accounts = [working_account] + [a for a in accounts if a.id != self._current_price_account_id]
-
-        # OPTIMIZATION: Limit failover attempts to 3 accounts max
-        # This prevents 10+ API calls when all accounts are down
-        max_failover_attempts = 3
-        attempts = 0
-        skipped_due_to_cooldown = 0
-
-        # Try each account in order
-        for account in accounts:
-            if attempts >= max_failover_attempts:
-                logger.warning(f"Reached max failover attempts ({max_failover_attempts}), stopping")
-                break
-
-            # Skip recently failed accounts (unless cooldown expired)
-            if account.id in self._failed_accounts:
-                fail_time = self._failed_accounts[account.id]
-                if (now - fail_time).total_seconds() < self._failed_account_cooldown:
-                    skipped_due_to_cooldown += 1
+        # Skip recently failed accounts (unless cooldown expired). Fetch threads update
+        # _failed_accounts under the health lock, so the whole selection holds it too.
+        with self._price_health_lock:
+            candidates = []
+            for account in accounts:
+                fail_time = self._failed_accounts.get(account['id'])
+                if fail_time and (now - fail_time).total_seconds() < self._failed_account_cooldown:
                     continue
-                else:
-                    # Cooldown expired, remove from failed list
-                    del self._failed_accounts[account.id]
-
-            attempts += 1
-
-            # Try to get prices from this account
-            prices = self._get_cached_positions(account)
+                candidates.append(account)
 
-            if prices:
-                # Success - track this as the working account
-                if self._current_price_account_id != account.id:
-                    if self._current_price_account_id is not None:
-                        logger.warning(f"Price feed failover: switched to account {account.account_name}")
-                    self._current_price_account_id = account.id
-                return prices
-            else:
-                # Failed - mark account and try next
-                self._failed_accounts[account.id] = now
-                logger.warning(f"Price feed failed for account {account.account_name}, trying next...")
-
-        # All attempts failed
-        if attempts == 0 and skipped_due_to_cooldown > 0:
-            # All accounts in cooldown - clear cooldown and try again next cycle
-            logger.warning(f"All {skipped_due_to_cooldown} accounts in cooldown (failed recently). Will retry in {self._failed_account_cooldown}s")
-            # Reduce cooldown for next attempt if all accounts failed
-            if len(self._failed_accounts) == len(accounts):
-                # Clear oldest failure to allow retry
-                oldest_account = min(self._failed_accounts.keys(), key=lambda k: self._failed_accounts[k])
+            if not candidates:
+                # All accounts in cooldown - clear oldest failure so the next cycle can retry
+                oldest_account = min((a['id'] for a in accounts), key=lambda k: self._failed_accounts[k])
                 del self._failed_accounts[oldest_account]
-                logger.debug(f"Cleared cooldown for account {oldest_account} to allow retry")
-        elif attempts > 0:
-            logger.error(f"All {attempts} failover attempts failed to provide price feeds")
-        return {}
-
-    def _is_within_trading_hours(self) -> bool:
-        """
-        Check if current time is within trading hours.
-        Uses TradingSession from database.
+            else:
+                # Best account first: last working account, then health score, then primary/id order
+                scores = {a['id']: self._account_health(a['id'])['score'] for a in candidates}
 
-        Returns:
-            bool: True if within trading hours
-        """
-        try:
-            now = datetime.now(pytz.timezone('Asia/Kolkata'))
-            current_time = now.time()
-            day_of_week = now.weekday()
-
-            # Import here to avoid circular imports
-            from app.models import TradingSession, TradingHoursTemplate, MarketHoliday
-
-            # Check if today is a holiday
-            today = now.date()
-            is_holiday = MarketHoliday.query.filter_by(holiday_date=today).first()
-            if is_holiday:
-                return False
-
-            # Get active trading sessions for today
-            sessions = TradingSession.query.join(TradingHoursTemplate).filter(
-                TradingSession.day_of_week == day_of_week,
-                TradingSession.is_active == True,
-                TradingHoursTemplate.is_active == True
-            ).all()
-
-            for session in sessions:
-                if session.start_time <= current_time <= session.end_time:
-                    return True
+        if not candidates:
+            logger.warning(f"All {len(accounts)} accounts in cooldown (failed recently). Will retry in {self._failed_account_cooldown}s")
+            logger.debug(f"Cleared cooldown for account {oldest_account} to allow retry")
+            return {}
 
-            return False
+        candidates.sort(key=lambda a: (
+            a['id'] != self._current_price_account_id,
+            -scores[a['id']],
+            not a['is_primary'],
+            a['id']
+        ))
 
-        except Exception as e:
-            logger.error(f"Error checking trading hours: {e}")
-            # Default to True to avoid blocking risk checks due to DB errors
-            return True
+        # OPTIMIZATION: Limit hedged requests to 3 accounts max
+        # This prevents 10+ API calls when all accounts are down
+        max_hedged_requests = 3
+        candidates = candidates[:max_hedged_requests]
+
+        pending = {}
+        next_index = 0
+        deadline = time.monotonic() + self._price_fetch_deadline
+
+        def fire_next():
+            nonlocal next_index
+            account = candidates[next_index]
+            next_index += 1
+            future = self._price_executor.submit(self._get_cached_positions, account)
+            pending[future] = account
+            return account
+
+        first = fire_next()
+        hedge_at = time.monotonic() + self._hedge_delay(first['id'])
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = remaining
+            if next_index < len(candidates):
+                timeout = max(0.0, min(remaining, hedge_at - time.monotonic()))
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                account = pending.pop(future)
+                prices = future.result() if not future.exception() else {}
+                if prices:
+                    # First success wins - track this as the working account
+                    if self._current_price_account_id != account['id']:
+                        if self._current_price_account_id is not None:
+                            logger.warning(f"Price feed failover: switched to account {account['account_name']}")
+                        self._current_price_account_id = account['id']
+                    if next_index > 1:
+                        self._hedged_requests += next_index - 1
+                    return prices
+                logger.warning(f"Price feed failed for account {account['account_name']}, trying next...")
+
+            # Hedge: previous request failed or is slower than its p95
+            if next_index < len(candidates) and (done or time.monotonic() >= hedge_at):
+                hedged = fire_next()
+                hedge_at = time.monotonic() + self._hedge_delay(hedged['id'])
+
+            if not pending and next_index < len(candidates):
+                hedged = fire_next()
+                hedge_at = time.monotonic() + self._hedge_delay(hedged['id'])
+
+        if pending:
+            logger.error(f"Price fetch deadline ({self._price_fetch_deadline}s) reached with {len(pending)} request(s) outstanding")
+        else:
+            logger.error(f"All {next_index} hedged price requests failed to provide price feeds")
+        return {}
 
-    def _get_cached_positions(self, account: TradingAccount) -> Dict[str, float]:
+    def _get_cached_positions(self, account: Dict) -> Dict[str, float]:
         """
         Get positions from cache or fetch from API if cache expired.
 
         Uses a 5-second cache to reduce API calls and prevent blocking.
-        Includes a 3-second timeout to prevent indefinite hangs.
+        Runs on the hedging pool - records latency/outcome in the account's health score.
 
         Args:
-            account: Trading account to fetch positions for
+            account: Cached price account (see _get_price_accounts)
 
         Returns:
             Dict mapping symbol to LTP price
         """
         now = datetime.now()
-        cache_entry = self._positions_cache.get(account.id)
+        cache_entry = self._positions_cache.get(account['id'])
 
         # Check if cache is valid (use 5-second cache to reduce API load)
         if cache_entry:
@@ -234,40 +340,41 @@ class RiskManager:
             if cache_age < self._cache_ttl_seconds:
                 return cache_entry['positions']
 
-        # Fetch fresh positions from API with timeout
+        # Fetch fresh positions from API
         current_prices = {}
+        started = time.monotonic()
         try:
-            import requests
             client = ExtendedOpenAlgoAPI(
-                api_key=account.get_api_key(),
-                host=account.host_url
+                api_key=account['api_key'],
+                host=account['host_url']
             )
-            # Set a 3-second timeout on the API call to prevent blocking
-            original_timeout = getattr(requests, 'DEFAULT_TIMEOUT', None)
-            try:
-                positions_response = client.positionbook()
-            except requests.exceptions.Timeout:
-                logger.warning(f"Positions API timeout for account {account.account_name}")
+            positions_response = client.positionbook()
+
+            if positions_response.get('status') != 'success':
+                self._record_price_result(account['id'], False, time.monotonic() - started,
+                                          positions_response.get('message', 'positionbook failed'))
                 if cache_entry:
                     return cache_entry['positions']
                 return {}
 
-            if positions_response.get('status') == 'success':
-                positions_data = positions_response.get('data', [])
-                for pos in positions_data:
-                    symbol = pos.get('symbol', '')
-                    ltp = pos.get('ltp', 0)
-                    if symbol and ltp:
-                        current_prices[symbol] = float(ltp)
+            positions_data = positions_response.get('data', [])
+            for pos in positions_data:
+                symbol = pos.get('symbol', '')
+                ltp = pos.get('ltp', 0)
+                if symbol and ltp:
+                    current_prices[symbol] = float(ltp)
+
+            self._record_price_result(account['id'], True, time.monotonic() - started)
 
             # Update cache
-            self._positions_cache[account.id] = {
+            self._positions_cache[account['id']] = {
                 'positions': current_prices,
                 'timestamp': now
             }
 
         except Exception as api_err:
-            logger.warning(f"Failed to fetch positions for account {account.account_name}: {api_err}")
+            self._record_price_result(account['id'], False, time.monotonic() - started, str(api_err))
+            logger.warning(f"Failed to fetch positions for account {account['account_name']}: {api_err}")
             # Return cached data if API fails
             if cache_entry:
                 return cache_entry['positions']
@@ -326,148 +433,204 @@ class RiskManager:
 
         return (realized_pnl, unrealized_pnl)
 
-    def calculate_strategy_pnl(self, strategy: Strategy) -> Dict:
+    def evaluate_portfolio_pnl(self, strategy_ids: Optional[List[int]] = None) -> PnLSnapshot:
+        """
+        Evaluate P&L for many strategies in one vectorized pass.
+
+        Loads all executions of the given strategies into a PositionsBook (one query),
+        fetches API prices once if any open position lacks a fresh WebSocket price,
+        and computes strategy/account/user P&L with a single groupby-sum.
+
+        Args:
+            strategy_ids: Strategies to evaluate (None = all strategies)
+
+        Returns:
+            PnLSnapshot shared by every risk check in the cycle
+        """
+        book = PositionsBook.load(strategy_ids)
+
+        # Latest ticks are newer than execution.last_price (written in batches)
+        with self._dirty_lock:
+            live_prices = dict(self._live_prices)
+        book.apply_live_prices(live_prices)
+        self._update_exposure(book, strategy_ids)
+
+        # ALWAYS fetch fresh prices from API when WebSocket prices are missing/stale
+        # This ensures TSL checks use real prices, not stale execution.last_price
+        api_prices = {}
+        if book.needs_api_prices():
+            logger.debug("[P&L] WebSocket prices missing/stale, fetching from API")
+            api_prices = self._get_prices_with_failover()
+            if api_prices:
+                logger.info(f"[P&L] Got API prices for {len(api_prices)} symbols")
+            else:
+                logger.warning("[P&L] API price fetch returned empty - will use entry price fallback")
+
+        snapshot = book.evaluate(api_prices)
+        self._last_snapshot = snapshot
+        return snapshot
+
+    def _update_exposure(self, book: PositionsBook, strategy_ids: Optional[List[int]]):
+        """
+        Refresh the symbol -> strategies map used to route ticks.
+
+        A full evaluation replaces the map; a partial one only replaces the
+        entries of the strategies it loaded.
+        """
+        exposure = book.open_exposure()
+        with self._dirty_lock:
+            if strategy_ids is None:
+                self._exposure = exposure
+            else:
+                evaluated = set(strategy_ids)
+                for symbol in list(self._exposure):
+                    remaining = self._exposure[symbol] - evaluated
+                    if remaining:
+                        self._exposure[symbol] = remaining
+                    else:
+                        del self._exposure[symbol]
+                for symbol, holders in exposure.items():
+                    self._exposure.setdefault(symbol, set()).update(holders)
+
+            # Forget prices of symbols nobody holds anymore
+            for symbol in list(self._live_prices):
+                if symbol not in self._exposure:
+                    del self._live_prices[symbol]
+
+    def _retain_exposure(self, strategy_ids: List[int]):
+        """Drop strategies that no longer hold open positions from the tick routing map"""
+        keep = set(strategy_ids)
+        with self._dirty_lock:
+            for symbol in list(self._exposure):
+                holders = self._exposure[symbol] & keep
+                if holders:
+                    self._exposure[symbol] = holders
+                else:
+                    del self._exposure[symbol]
+                    self._live_prices.pop(symbol, None)
+
+    def watch_strategy_symbol(self, strategy_id: int, symbol: str):
+        """
+        Register a newly filled position so its ticks reach the risk worker
+        before the next safety scan rebuilds the exposure map.
+        """
+        with self._dirty_lock:
+            self._exposure.setdefault(symbol, set()).add(strategy_id)
+
+    def on_price_tick(self, symbol: str, ltp: float):
+        """
+        Called by PositionMonitor for every WebSocket tick of a monitored symbol.
+
+        Records the price in memory and marks the strategies holding the symbol
+        dirty. Cheap by design - no DB access on the tick path.
+
+        Args:
+            symbol: Trading symbol
+            ltp: Last traded price
+        """
+        if not self.is_running or not self.tick_driven_enabled or not ltp:
+            return
+
+        with self._dirty_lock:
+            holders = self._exposure.get(symbol)
+            if not holders:
+                return
+            self._ticks_received += 1
+            self._live_prices[symbol] = (float(ltp), time.time())
+            self._dirty_strategies.update(holders)
+
+        self._dirty_event.set()
+
+    def _risk_worker(self):
+        """
+        Re-evaluate dirty strategies, debounced per strategy.
+
+        A strategy evaluated less than the debounce window ago stays dirty and
+        is picked up as soon as its window expires.
+        """
+        logger.debug("[RISK WORKER] Started")
+        wait_timeout = 1.0
+
+        while self.is_running:
+            self._dirty_event.wait(timeout=wait_timeout)
+            self._dirty_event.clear()
+            if not self.is_running:
+                break
+
+            now = time.monotonic()
+            due = []
+            next_due = None
+            with self._dirty_lock:
+                for strategy_id in list(self._dirty_strategies):
+                    elapsed = now - self._last_evaluated.get(strategy_id, 0.0)
+                    if elapsed >= self._debounce_seconds:
+                        due.append(strategy_id)
+                        self._dirty_strategies.discard(strategy_id)
+                    else:
+                        remaining = self._debounce_seconds - elapsed
+                        next_due = remaining if next_due is None else min(next_due, remaining)
+
+            wait_timeout = next_due if next_due is not None else 1.0
+
+            if due:
+                try:
+                    self._evaluate_dirty_strategies(due)
+                except Exception as e:
+                    logger.error(f"[RISK WORKER] Error evaluating strategies {due}: {e}")
+
+        logger.debug("[RISK WORKER] Stopped")
+
+    def _evaluate_dirty_strategies(self, strategy_ids: List[int]):
+        """Run risk checks for the given strategies only (worker thread)"""
+        if not self.app:
+            return
+
+        with self.app.app_context():
+            with self._evaluation_lock:
+                strategies = Strategy.query.filter(
+                    Strategy.id.in_(strategy_ids),
+                    Strategy.is_active == True,
+                    Strategy.risk_monitoring_enabled == True
+                ).all()
+                if not strategies:
+                    return
+
+                snapshot = self.evaluate_portfolio_pnl([s.id for s in strategies])
+                evaluated_at = time.monotonic()
+                for strategy in strategies:
+                    self.check_strategy(strategy, snapshot)
+                    self._last_evaluated[strategy.id] = evaluated_at
+
+                self._tick_evaluations += 1
+
+    def calculate_strategy_pnl(self, strategy: Strategy, snapshot: Optional[PnLSnapshot] = None) -> Dict:
         """
         Calculate total P&L for a strategy across all executions.
 
         PRICE SOURCES (in order of preference):
         1. PRIMARY: WebSocket prices from execution.last_price (updated by position_monitor)
-        2. FALLBACK: REST API (positionbook) only if WebSocket price is stale (>30s old)
-
-        This reduces API calls from ~12/min to nearly zero when WebSocket is working.
+        2. FALLBACK: REST API (positionbook) only if WebSocket price is stale (>60s old)
+        3. FINAL: Entry price (assume breakeven)
 
         Args:
             strategy: Strategy to calculate P&L for
+            snapshot: P&L evaluation of the current risk cycle; evaluated on demand if
+                      not given or if it does not cover this strategy
 
         Returns:
             Dict with realized_pnl, unrealized_pnl, total_pnl, valid (bool)
         """
-        total_realized = 0.0
-        total_unrealized = 0.0
-
         try:
-            # Get all executions for this strategy
-            executions = StrategyExecution.query.filter_by(
-                strategy_id=strategy.id
-            ).all()
-
-            # Get open executions
-            open_executions = [e for e in executions if e.status == 'entered']
-
-            # Log execution status summary
-            if executions:
-                status_counts = {}
-                for e in executions:
-                    status_counts[e.status] = status_counts.get(e.status, 0) + 1
-                logger.debug(f"[P&L] Strategy {strategy.name}: {len(executions)} executions, statuses: {status_counts}")
-                print(f"[P&L DEBUG] {strategy.name}: {len(executions)} executions, open={len(open_executions)}, statuses={status_counts}")
-
-            # ALWAYS fetch fresh prices from API for accurate P&L calculation
-            # This ensures TSL checks use real prices, not stale execution.last_price
-            api_prices = {}
-            executions_with_fallback_price = 0  # Track how many executions use fallback
-
-            if open_executions:
-                # Check if any execution is missing WebSocket price or has stale data
-                # Consider price stale if last_price_updated is missing or > 60 seconds old
-                now = datetime.now()
-                stale_threshold_seconds = 60
-
-                missing_ws_price = False
-                for exec in open_executions:
-                    if not exec.last_price or exec.last_price <= 0:
-                        missing_ws_price = True
-                        logger.debug(f"[P&L] {exec.symbol}: last_price missing or zero")
-                        break
-                    if not exec.last_price_updated:
-                        missing_ws_price = True
-                        logger.debug(f"[P&L] {exec.symbol}: last_price_updated is None")
-                        break
-                    # Check if price is stale
-                    try:
-                        age = (now - exec.last_price_updated).total_seconds()
-                        if age > stale_threshold_seconds:
-                            missing_ws_price = True
-                            logger.debug(f"[P&L] {exec.symbol}: price is stale ({age:.0f}s old)")
-                            break
-                    except Exception:
-                        missing_ws_price = True
-                        break
-
-                if missing_ws_price:
-                    logger.debug("[P&L] WebSocket prices missing/stale, fetching from API")
-                    api_prices = self._get_prices_with_failover()
-                    if api_prices:
-                        logger.info(f"[P&L] Got API prices for {len(api_prices)} symbols")
-                        print(f"[P&L] Fetched API prices: {list(api_prices.keys())}")
-                    else:
-                        logger.warning("[P&L] API price fetch returned empty - will use entry price fallback")
-
-            for execution in executions:
-                # PRIORITY: WebSocket price (fresh) > API price (fallback) > entry price
-                current_price = None
-                price_source = None
-
-                if execution.status == 'entered':
-                    # Try WebSocket price first (from position_monitor)
-                    if execution.last_price and execution.last_price > 0:
-                        current_price = float(execution.last_price)
-                        price_source = 'websocket'
-                        logger.debug(f"[P&L] {execution.symbol}: Using WebSocket price {current_price}")
-                    # Fallback to API price if WebSocket stale
-                    elif api_prices.get(execution.symbol):
-                        current_price = api_prices.get(execution.symbol)
-                        price_source = 'api'
-                        logger.debug(f"[P&L] {execution.symbol}: Using API price {current_price}")
-                    # FINAL fallback to entry price (assume breakeven)
-                    elif execution.entry_price and execution.entry_price > 0:
-                        current_price = float(execution.entry_price)
-                        price_source = 'entry_fallback'
-                        executions_with_fallback_price += 1
-                        logger.warning(f"[P&L] {execution.symbol}: NO PRICE DATA! Using entry price {current_price} as fallback (P&L=0)")
-                        print(f"[P&L WARNING] {execution.symbol}: No WebSocket/API price, using entry price {current_price}")
-
-                if current_price and execution.status == 'entered':
-                    # Calculate P&L using best available price
-                    entry_price = float(execution.entry_price or 0)
-                    quantity = int(execution.quantity or 0)
-                    is_long = execution.leg and execution.leg.action.upper() == 'BUY'
+            if snapshot is None or strategy.id not in snapshot:
+                snapshot = self.evaluate_portfolio_pnl([strategy.id])
 
-                    if is_long:
-                        pnl = (current_price - entry_price) * quantity
-                        total_unrealized += pnl
-                    else:
-                        pnl = (entry_price - current_price) * quantity
-                        total_unrealized += pnl
-
-                    logger.debug(f"[P&L] {execution.symbol}: entry={entry_price}, current={current_price}, qty={quantity}, pnl={pnl:.2f}")
-                elif execution.status == 'entered':
-                    # OPEN position but no price - this shouldn't happen!
-                    logger.error(f"[P&L] {execution.symbol}: OPEN position with NO price data! status={execution.status}, last_price={execution.last_price}, entry_price={execution.entry_price}")
-                    print(f"[P&L ERROR] {execution.symbol}: OPEN position but NO PRICE! last_price={execution.last_price}")
-                else:
-                    # Exited positions - calculate realized P&L
-                    realized, unrealized = self.calculate_execution_pnl(execution)
-                    total_realized += realized
-                    total_unrealized += unrealized
+            pnl_data = snapshot.strategy_pnl(strategy.id)
 
-            total_pnl = total_realized + total_unrealized
-
-            # Flag if P&L is unreliable (all executions using entry price fallback)
-            prices_unreliable = (executions_with_fallback_price == len(open_executions)) and len(open_executions) > 0
-            if prices_unreliable:
-                logger.warning(f"[P&L] Strategy {strategy.name}: ALL {len(open_executions)} executions using entry price fallback - P&L is UNRELIABLE")
+            if pnl_data['prices_unreliable']:
+                logger.warning(f"[P&L] Strategy {strategy.name}: ALL {pnl_data['open_count']} executions using entry price fallback - P&L is UNRELIABLE")
                 print(f"[P&L UNRELIABLE] {strategy.name}: All prices are entry price fallbacks!")
 
-            return {
-                'realized_pnl': round(total_realized, 2),
-                'unrealized_pnl': round(total_unrealized, 2),
-                'total_pnl': round(total_pnl, 2),
-                'valid': True,  # Calculation succeeded
-                'prices_unreliable': prices_unreliable,  # True if all prices are fallbacks
-                'fallback_count': executions_with_fallback_price,
-                'open_count': len(open_executions)
-            }
+            return pnl_data
 
         except Exception as e:
             logger.error(f"Error calculating strategy P&L for {strategy.name}: {e}")
@@ -481,12 +644,13 @@ class RiskManager:
                 'open_count': 0
             }
 
-    def check_max_loss(self, strategy: Strategy) -> Optional[RiskEvent]:
+    def check_max_loss(self, strategy: Strategy, pnl_data: Optional[Dict] = None) -> Optional[RiskEvent]:
         """
         Check if strategy has breached max loss threshold.
 
         Args:
             strategy: Strategy to check
+            pnl_data: P&L already evaluated for this risk cycle (calculated if None)
 
         Returns:
             RiskEvent if threshold breached, None otherwise
@@ -502,8 +666,9 @@ class RiskManager:
         if strategy.max_loss_triggered_at:
             return None
 
-        # Calculate current P&L
-        pnl_data = self.calculate_strategy_pnl(strategy)
+        # Calculate current P&L (shared across checks within a risk cycle)
+        if pnl_data is None:
+            pnl_data = self.calculate_strategy_pnl(strategy)
         current_pnl = pnl_data['total_pnl']
 
         # Skip if P&L calculation failed (prevents false triggers)
@@ -545,12 +710,13 @@ class RiskManager:
 
         return None
 
-    def check_max_profit(self, strategy: Strategy) -> Optional[RiskEvent]:
+    def check_max_profit(self, strategy: Strategy, pnl_data: Optional[Dict] = None) -> Optional[RiskEvent]:
         """
         Check if strategy has breached max profit threshold.
 
         Args:
             strategy: Strategy to check
+            pnl_data: P&L already evaluated for this risk cycle (calculated if None)
 
         Returns:
             RiskEvent if threshold breached, None otherwise
@@ -566,8 +732,9 @@ class RiskManager:
         if strategy.max_profit_triggered_at:
             return None
 
-        # Calculate current P&L
-        pnl_data = self.calculate_strategy_pnl(strategy)
+        # Calculate current P&L (shared across checks within a risk cycle)
+        if pnl_data is None:
+            pnl_data = self.calculate_strategy_pnl(strategy)
         current_pnl = pnl_data['total_pnl']
 
         # Skip if P&L calculation failed (prevents false triggers)
@@ -609,7 +776,128 @@ class RiskManager:
 
         return None
 
-    def check_trailing_sl(self, strategy: Strategy) -> Optional[RiskEvent]:
+    def _get_tsl_state(self, strategy: Strategy) -> TrailingStopState:
+        """In-memory TSL state for a strategy, recovered from the Strategy row on first use"""
+        with self._tsl_lock:
+            tsl = self._tsl_states.get(strategy.id)
+            if tsl is None:
+                tsl = TrailingStopState.from_strategy(strategy)
+                self._tsl_states[strategy.id] = tsl
+                logger.debug(f"[TSL STATE] Strategy {strategy.name}: recovered state={tsl.state} "
+                             f"(peak={tsl.peak_pnl}, stop={tsl.stop})")
+            return tsl
+
+    def reset_trailing_sl(self, strategy_id: int, initial_stop: Optional[float] = None) -> TrailingStopState:
+        """
+        Start a new trade's TSL state (RESET -> WAITING, or ACTIVE with initial_stop).
+
+        The previous trade's state is replaced, not popped, so it is never
+        recovered from a Strategy row an earlier flush is still writing. The new
+        state is dirty and written by the next persist_trailing_sl_states(),
+        which runs after any flush already in progress.
+        """
+        tsl = TrailingStopState(strategy_id=strategy_id, active=initial_stop is not None,
+                                initial_stop=initial_stop, stop=initial_stop)
+        tsl.dirty = True
+        tsl.transitioned = True
+        with self._tsl_lock:
+            self._tsl_states[strategy_id] = tsl
+        self._tsl_flush_event.set()
+        return tsl
+
+    def observe_trailing_sl(self, strategy: Strategy, current_pnl: float,
+                            initial_stop_pnl: Optional[float]) -> Dict:
+        """
+        Apply a P&L observation made outside the risk loop (e.g. the positions
+        route) to the in-memory TSL state and return a snapshot of it.
+
+        Args:
+            strategy: Strategy with trailing SL enabled
+            current_pnl: Combined strategy P&L
+            initial_stop_pnl: Initial stop if none is set yet; None when the strategy
+                has no open positions (clears active tracking)
+
+        Returns:
+            Dict with active, peak_pnl, initial_stop, stop, triggered_at and exit_reason.
+            A triggered state is returned unchanged. Persisted by the write-behind flush.
+        """
+        tsl = self._get_tsl_state(strategy)
+        with self._tsl_lock:
+            if initial_stop_pnl is None:
+                tsl.deactivate()
+            elif not tsl.triggered_at:
+                tsl.update(current_pnl, initial_stop_pnl)
+            snapshot = {
+                'active': tsl.active,
+                'peak_pnl': tsl.peak_pnl,
+                'initial_stop': tsl.initial_stop,
+                'stop': tsl.stop,
+                'triggered_at': tsl.triggered_at,
+                'exit_reason': tsl.exit_reason
+            }
+            transitioned = tsl.transitioned
+        if transitioned:
+            self._tsl_flush_event.set()
+        return snapshot
+
+    def persist_trailing_sl_states(self, force: bool = False) -> int:
+        """
+        Write dirty TSL states to the Strategy table in one bulk UPDATE.
+
+        A state is written when it changed state (transition) or its last write is
+        older than TSL_PERSIST_SECONDS; force=True writes every dirty state.
+        Requires an app context.
+
+        Returns:
+            Number of strategy rows written
+        """
+        from sqlalchemy import update
+
+        # Rows are built and written under one write lock: a state replaced by
+        # reset_trailing_sl() is always written after any older rows still in flight
+        with self._tsl_write_lock:
+            now = time.monotonic()
+            with self._tsl_lock:
+                pending = [tsl for tsl in self._tsl_states.values()
+                           if tsl.dirty and (force or tsl.due(self._tsl_persist_seconds, now))]
+                rows = [tsl.to_row() for tsl in pending]
+                for tsl in pending:
+                    tsl.mark_persisted()
+
+            if not rows:
+                return 0
+
+            try:
+                db.session.execute(update(Strategy), rows)
+                db.session.commit()
+                self._tsl_rows_written += len(rows)
+                logger.debug(f"[TSL] Persisted trailing SL state for {len(rows)} strategies")
+                return len(rows)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"[TSL] Error persisting trailing SL state: {e}")
+                # Keep them dirty so the next flush retries
+                with self._tsl_lock:
+                    for tsl in pending:
+                        if self._tsl_states.get(tsl.strategy_id) is tsl:
+                            tsl.dirty = True
+                            tsl.transitioned = True
+                return 0
+
+    def _tsl_flush_worker(self):
+        """Write-behind loop: flush TSL state every interval, or right away on transitions"""
+        logger.debug("[TSL FLUSH] Started")
+        while self.is_running:
+            self._tsl_flush_event.wait(timeout=self._tsl_persist_seconds)
+            self._tsl_flush_event.clear()
+            try:
+                with self.app.app_context():
+                    self.persist_trailing_sl_states()
+            except Exception as e:
+                logger.error(f"[TSL FLUSH] Error: {e}")
+        logger.debug("[TSL FLUSH] Stopped")
+
+    def check_trailing_sl(self, strategy: Strategy, pnl_data: Optional[Dict] = None) -> Optional[RiskEvent]:
         """
         Check if trailing stop loss should be triggered based on COMBINED strategy P&L.
 
@@ -636,6 +924,7 @@ class RiskManager:
 
         Args:
             strategy: Strategy to check
+            pnl_data: P&L already evaluated for this risk cycle (calculated if None)
 
         Returns:
             RiskEvent if trailing SL triggered, None otherwise
@@ -645,36 +934,33 @@ class RiskManager:
             return None
 
         try:
-            # Get all open executions
-            open_executions = StrategyExecution.query.filter_by(
-                strategy_id=strategy.id,
-                status='entered'
-            ).all()
-
-            if not open_executions:
-                # No open positions - clean up TSL active state (but preserve triggered_at for history)
-                if strategy.trailing_sl_active:
-                    strategy.trailing_sl_active = False
-                    strategy.trailing_sl_peak_pnl = 0.0
-                    strategy.trailing_sl_initial_stop = None
-                    strategy.trailing_sl_trigger_pnl = None
-                    db.session.commit()
-                return None
-
-            # If TSL was already triggered for this trade, don't re-process
-            if strategy.trailing_sl_triggered_at:
-                logger.debug(f"[TSL] Strategy {strategy.name}: TSL already triggered at {strategy.trailing_sl_triggered_at}, skipping")
-                return None
-
             # Calculate COMBINED strategy P&L (not individual execution P&L)
-            pnl_data = self.calculate_strategy_pnl(strategy)
+            if pnl_data is None:
+                pnl_data = self.calculate_strategy_pnl(strategy)
             current_pnl = pnl_data['total_pnl']
+            open_count = pnl_data.get('open_count', 0)
 
             # CRITICAL: Skip TSL check if P&L calculation failed (API error, etc.)
             if not pnl_data.get('valid', True):
                 logger.warning(f"[TSL] Strategy {strategy.name}: P&L calculation INVALID, skipping TSL check")
                 return None
 
+            tsl = self._get_tsl_state(strategy)
+
+            if not open_count:
+                # No open positions - clean up TSL active state (but preserve triggered_at for history)
+                with self._tsl_lock:
+                    tsl.deactivate()
+                    transitioned = tsl.transitioned
+                if transitioned:
+                    self._tsl_flush_event.set()
+                return None
+
+            # If TSL was already triggered for this trade, don't re-process
+            if tsl.triggered_at:
+                logger.debug(f"[TSL] Strategy {strategy.name}: TSL already triggered at {tsl.triggered_at}, skipping")
+                return None
+
             # CRITICAL: Skip TSL check if prices are unreliable (all fallback to entry price)
             # This prevents both false positive (exit when profitable) and false negative (miss exit when losing)
             if pnl_data.get('prices_unreliable', False):
@@ -706,20 +992,10 @@ class RiskManager:
             #   SELL CE 24100 @ 150 * 75 = -11,250 (credit)
             #   Net Premium = +3,750 (net debit paid)
 
-            net_premium = 0
-            buy_premium = 0
-            sell_premium = 0
-
-            for exec in open_executions:
-                if exec.entry_price and exec.quantity:
-                    premium = (exec.entry_price or 0) * (exec.quantity or 0)
-                    # Check leg action to determine direction
-                    if exec.leg and exec.leg.action and exec.leg.action.upper() == 'BUY':
-                        net_premium += premium  # Debit (cost)
-                        buy_premium += premium
-                    else:  # SELL
-                        net_premium -= premium  # Credit (received)
-                        sell_premium += premium
+            # Open-leg premiums come from the same vectorized evaluation as the P&L
+            buy_premium = pnl_data.get('buy_premium', 0.0)
+            sell_premium = pnl_data.get('sell_premium', 0.0)
+            net_premium = buy_premium - sell_premium
 
             # For TSL calculation, use absolute value of net premium
             # This represents the actual capital at risk
@@ -743,36 +1019,19 @@ class RiskManager:
             else:  # 'amount'
                 initial_stop_pnl = -trailing_value
 
-            # Set initial stop if not already set
-            if strategy.trailing_sl_initial_stop is None:
-                strategy.trailing_sl_initial_stop = initial_stop_pnl
-                logger.debug(f"[TSL STATE] Strategy {strategy.name}: Initial stop set at {initial_stop_pnl:.2f} (Net Premium: {net_premium:.2f}, Entry Value: {entry_value:.2f})")
-
-            # TSL is ALWAYS active from entry (no waiting state)
-            strategy.trailing_sl_active = True
-
-            # Track peak P&L (highest P&L achieved)
-            current_peak = strategy.trailing_sl_peak_pnl or 0.0
-            if current_pnl > current_peak:
-                strategy.trailing_sl_peak_pnl = current_pnl
-                current_peak = current_pnl
-                logger.debug(f"[TSL] Strategy {strategy.name}: New peak P&L = {current_peak:.2f}")
-
-            # Calculate trailing stop based on peak P&L
-            # Logic: Current Stop = Initial Stop + Peak P&L
-            # The stop trails UP from initial stop level by the amount of peak profit
-            # Example: Initial=-860, Peak=100 -> Stop = -860 + 100 = -760
-            current_stop = strategy.trailing_sl_initial_stop + current_peak
-            logger.debug(f"[TSL] Strategy {strategy.name}: Initial={strategy.trailing_sl_initial_stop:.2f} + Peak={current_peak:.2f} = Stop={current_stop:.2f}")
-
-            # Ratchet: current stop can only increase from previous value
-            previous_stop = strategy.trailing_sl_trigger_pnl or strategy.trailing_sl_initial_stop
-            if current_stop > previous_stop:
-                logger.debug(f"[TSL] Strategy {strategy.name}: Stop ratcheted UP from {previous_stop:.2f} to {current_stop:.2f}")
-            current_stop = max(current_stop, previous_stop)
-
-            strategy.trailing_sl_trigger_pnl = current_stop
-            db.session.commit()
+            # Update the in-memory ratchet (initial stop set on first observation)
+            # Persisted by the write-behind flush, not on every evaluation
+            with self._tsl_lock:
+                was_waiting = tsl.initial_stop is None
+                current_stop = tsl.update(current_pnl, initial_stop_pnl)
+                current_peak = tsl.peak_pnl
+                initial_stop = tsl.initial_stop
+                transitioned = tsl.transitioned
+            if was_waiting:
+                logger.debug(f"[TSL STATE] Strategy {strategy.name}: Initial stop set at {initial_stop:.2f} (Net Premium: {net_premium:.2f}, Entry Value: {entry_value:.2f})")
+            if transitioned:
+                self._tsl_flush_event.set()
+            logger.debug(f"[TSL] Strategy {strategy.name}: Initial={initial_stop:.2f} + Peak={current_peak:.2f} -> Stop={current_stop:.2f}")
 
             # Log current TSL status
             logger.info(f"[TSL CHECK] Strategy {strategy.name}: P&L={current_pnl:.2f}, Peak={current_peak:.2f}, Stop={current_stop:.2f}")
@@ -781,12 +1040,12 @@ class RiskManager:
             # SECONDARY SAFETY NET: Skip if P&L is suspiciously close to zero with open positions
             # P&L exactly 0 is very rare during market hours - likely indicates price data issue
             # This catches edge cases not covered by the `prices_unreliable` check
-            if abs(current_pnl) < 1.0 and len(open_executions) > 0:
+            if abs(current_pnl) < 1.0 and open_count > 0:
                 logger.warning(
                     f"[TSL] Strategy {strategy.name}: SKIPPING - P&L={current_pnl:.2f} is near-zero with "
-                    f"{len(open_executions)} open positions (likely price data issue). Stop={current_stop:.2f}"
+                    f"{open_count} open positions (likely price data issue). Stop={current_stop:.2f}"
                 )
-                print(f"[TSL SKIP] {strategy.name}: P&L~0 with {len(open_executions)} open positions - waiting for real prices")
+                print(f"[TSL SKIP] {strategy.name}: P&L~0 with {open_count} open positions - waiting for real prices")
                 return None
 
             # Exit when P&L drops to or below current stop
@@ -794,13 +1053,22 @@ class RiskManager:
                 # State transition: ACTIVE -> TRIGGERED
                 logger.warning(
                     f"[TSL STATE] Strategy {strategy.name}: ACTIVE -> TRIGGERED | "
-                    f"P&L={current_pnl:.2f} <= Stop={current_stop:.2f} (Peak={current_peak:.2f}, Initial={strategy.trailing_sl_initial_stop:.2f})"
+                    f"P&L={current_pnl:.2f} <= Stop={current_stop:.2f} (Peak={current_peak:.2f}, Initial={initial_stop:.2f})"
                 )
                 print(f"[TSL TRIGGERED] {strategy.name}: P&L={current_pnl:.2f} <= Stop={current_stop:.2f}")
 
                 # Store exit reason and timestamp
-                exit_reason = f"TSL: P&L {current_pnl:.2f} <= Stop {current_stop:.2f} (Peak: {current_peak:.2f}, Initial: {strategy.trailing_sl_initial_stop:.2f})"
-                strategy.trailing_sl_triggered_at = get_ist_now()
+                # The transition is written synchronously (with the ratchet state) before the exit
+                exit_reason = f"TSL: P&L {current_pnl:.2f} <= Stop {current_stop:.2f} (Peak: {current_peak:.2f}, Initial: {initial_stop:.2f})"
+                triggered_at = get_ist_now()
+                with self._tsl_lock:
+                    tsl.trigger(exit_reason, triggered_at)
+                    tsl.mark_persisted()
+                strategy.trailing_sl_active = tsl.active
+                strategy.trailing_sl_peak_pnl = tsl.peak_pnl
+                strategy.trailing_sl_initial_stop = tsl.initial_stop
+                strategy.trailing_sl_trigger_pnl = tsl.stop
+                strategy.trailing_sl_triggered_at = triggered_at
                 strategy.trailing_sl_exit_reason = exit_reason
                 db.session.commit()
 
@@ -841,13 +1109,18 @@ class RiskManager:
         print(f"[CLOSE_POSITIONS] Event type: {risk_event.event_type}")
 
         try:
-            # Get all open executions
-            open_executions = StrategyExecution.query.filter_by(
-                strategy_id=strategy.id,
-                status='entered'
-            ).all()
+            # Calculate COMBINED strategy P&L (not individual execution P&L)
+            if pnl_data is None:
+                pnl_data = self.calculate_strategy_pnl(strategy)
+            current_pnl = pnl_data['total_pnl']
+            open_count = pnl_data.get('open_count', 0)
+
+            # CRITICAL: Skip TSL check if P&L calculation failed (API error, etc.)
+            if not pnl_data.get('valid', True):
+                logger.warning(f"[TSL] Strategy {strategy.name}: P&L calculation INVALID, skipping TSL check")
+                return None
 
-            if not open_executions:
+            if not open_count:
                 logger.warning(f"[CLOSE_POSITIONS] No open positions found for {strategy.name}")
                 print(f"[CLOSE_POSITIONS] No open positions to close for {strategy.name}")
                 return True
@@ -1053,20 +1326,26 @@ class RiskManager:
             db.session.rollback()
             return False
 
-    def check_strategy(self, strategy: Strategy):
+    def check_strategy(self, strategy: Strategy, snapshot: Optional[PnLSnapshot] = None):
         """
         Check all risk thresholds for a strategy.
 
+        P&L is evaluated once and shared by the max loss, max profit and
+        trailing SL checks.
+
         Args:
             strategy: Strategy to check
+            snapshot: P&L evaluation of the current risk cycle (evaluated if None)
         """
         try:
             # Check if risk monitoring is enabled
             if not strategy.risk_monitoring_enabled:
                 return
 
+            pnl_data = self.calculate_strategy_pnl(strategy, snapshot)
+
             # Check max loss
-            risk_event = self.check_max_loss(strategy)
+            risk_event = self.check_max_loss(strategy, pnl_data)
             if risk_event:
                 db.session.add(risk_event)
                 db.session.commit()
@@ -1074,6 +1353,7 @@ class RiskManager:
                 # Close positions if auto-exit enabled
                 if strategy.auto_exit_on_max_loss:
                     self.close_strategy_positions(strategy, risk_event)
+                    pnl_data = None  # Positions changed - next check re-evaluates P&L
             else:
                 # RETRY MECHANISM: If max loss was already triggered but positions still open, retry closing
                 if strategy.max_loss_triggered_at:
@@ -1091,9 +1371,10 @@ class RiskManager:
                             action_taken='close_remaining'
                         )
                         self.close_strategy_positions(strategy, retry_event)
+                        pnl_data = None  # Positions changed - next check re-evaluates P&L
 
             # Check max profit
-            risk_event = self.check_max_profit(strategy)
+            risk_event = self.check_max_profit(strategy, pnl_data)
             if risk_event:
                 db.session.add(risk_event)
                 db.session.commit()
@@ -1101,6 +1382,7 @@ class RiskManager:
                 # Close positions if auto-exit enabled
                 if strategy.auto_exit_on_max_profit:
                     self.close_strategy_positions(strategy, risk_event)
+                    pnl_data = None  # Positions changed - next check re-evaluates P&L
             else:
                 # RETRY MECHANISM: If max profit was already triggered but positions still open, retry closing
                 if strategy.max_profit_triggered_at:
@@ -1118,9 +1400,10 @@ class RiskManager:
                             action_taken='close_remaining'
                         )
                         self.close_strategy_positions(strategy, retry_event)
+                        pnl_data = None  # Positions changed - next check re-evaluates P&L
 
             # Check trailing SL
-            risk_event = self.check_trailing_sl(strategy)
+            risk_event = self.check_trailing_sl(strategy, pnl_data)
             if risk_event:
                 db.session.add(risk_event)
                 db.session.commit()
@@ -1174,26 +1457,69 @@ class RiskManager:
                 StrategyExecution.status == 'entered'
             )
 
-            strategies_with_positions = Strategy.query.filter(
-                Strategy.is_active == True,
-                Strategy.risk_monitoring_enabled == True,
-                has_open_positions
-            ).all()
+            with self._evaluation_lock:
+                strategies_with_positions = Strategy.query.filter(
+                    Strategy.is_active == True,
+                    Strategy.risk_monitoring_enabled == True,
+                    has_open_positions
+                ).all()
+
+                if not strategies_with_positions:
+                    with self._dirty_lock:
+                        self._exposure.clear()
+                        self._live_prices.clear()
+                    return
+
+                # One vectorized P&L evaluation for every strategy in this cycle
+                # (also rebuilds the symbol -> strategies map used to route ticks)
+                strategy_ids = [s.id for s in strategies_with_positions]
+                snapshot = self.evaluate_portfolio_pnl(strategy_ids)
+                self._retain_exposure(strategy_ids)
 
-            for strategy in strategies_with_positions:
-                self.check_strategy(strategy)
+                evaluated_at = time.monotonic()
+                for strategy in strategies_with_positions:
+                    self.check_strategy(strategy, snapshot)
+                    self._last_evaluated[strategy.id] = evaluated_at
+
+                # Without the write-behind thread (no app registered), persist from the scan
+                if self._tsl_flush_thread is None:
+                    self.persist_trailing_sl_states()
 
         except Exception as e:
             logger.error(f"Error running risk checks: {e}")
 
-    def start(self):
-        """Start risk monitoring"""
+    def start(self, app=None):
+        """
+        Start risk monitoring.
+
+        Args:
+            app: Flask app used by the tick-driven risk worker for its app context
+        """
         if self.is_running:
             logger.warning("Risk manager already running")
             return
 
+        if app is not None:
+            self.app = app
+        if self.app is not None:
+            self.tick_driven_enabled = self.app.config.get('RISK_TICK_DRIVEN_ENABLED', True)
+            self._debounce_seconds = int(self.app.config.get('RISK_TICK_DEBOUNCE_MS', 250)) / 1000.0
+            self._tsl_persist_seconds = float(self.app.config.get('TSL_PERSIST_SECONDS', 5))
+
         self.is_running = True
-        logger.debug("Risk monitoring started")
+
+        if self.app is not None:
+            self._tsl_flush_event.clear()
+            self._tsl_flush_thread = threading.Thread(target=self._tsl_flush_worker, daemon=True, name='TSLFlush')
+            self._tsl_flush_thread.start()
+
+        if self.tick_driven_enabled and self.app is not None:
+            self._dirty_event.clear()
+            self._worker_thread = threading.Thread(target=self._risk_worker, daemon=True, name='RiskWorker')
+            self._worker_thread.start()
+            logger.debug(f"Risk monitoring started (tick-driven, debounce {int(self._debounce_seconds * 1000)}ms)")
+        else:
+            logger.debug("Risk monitoring started (scheduler scan only)")
 
     def stop(self):
         """Stop risk monitoring"""
@@ -1201,9 +1527,51 @@ class RiskManager:
             return
 
         self.is_running = False
+        self._dirty_event.set()  # Wake the worker so it exits
+        if self._worker_thread and self._worker_thread.is_alive():
+            self._worker_thread.join(timeout=2)
+        self._worker_thread = None
+
+        # Final write-behind flush of the trailing SL state
+        self._tsl_flush_event.set()
+        if self._tsl_flush_thread and self._tsl_flush_thread.is_alive():
+            self._tsl_flush_thread.join(timeout=2)
+        self._tsl_flush_thread = None
+        if self.app is not None:
+            try:
+                with self.app.app_context():
+                    self.persist_trailing_sl_states(force=True)
+            except Exception as e:
+                logger.error(f"[TSL] Error flushing trailing SL state on stop: {e}")
+        with self._tsl_lock:
+            # Persisted states are recovered from the DB on the next start
+            self._tsl_states = {sid: tsl for sid, tsl in self._tsl_states.items() if tsl.dirty}
+
+        with self._dirty_lock:
+            self._dirty_strategies.clear()
+            self._live_prices.clear()
+            self._exposure.clear()
+        self._last_evaluated.clear()
+
         self.monitored_strategies.clear()
         logger.debug("Risk monitoring stopped")
 
+    def _price_health_summary(self) -> Dict[int, Dict]:
+        """Per-account price feed health for the admin dashboard"""
+        with self._price_health_lock:
+            summary = {}
+            for account_id, health in self._price_health.items():
+                latencies = sorted(health['latencies'])
+                summary[account_id] = {
+                    'score': round(health['score'], 3),
+                    'successes': health['successes'],
+                    'failures': health['failures'],
+                    'p95_latency_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000)
+                    if latencies else None,
+                    'last_error': health['last_error']
+                }
+            return summary
+
     def get_monitoring_status(self) -> Dict:
         """
         Get current monitoring status for admin dashboard.
@@ -1234,11 +1602,25 @@ class RiskManager:
                 RiskEvent.triggered_at >= yesterday
             ).count()
 
+            snapshot = self._last_snapshot
             return {
                 'is_running': self.is_running,
                 'total_strategies': total_strategies,
                 'active_strategies': strategies_with_positions,
-                'recent_events_24h': recent_events
+                'recent_events_24h': recent_events,
+                'last_pnl_evaluation': snapshot.evaluated_at.isoformat() if snapshot else None,
+                'tick_driven': self.tick_driven_enabled and self._worker_thread is not None,
+                'ticks_received': self._ticks_received,
+                'tick_evaluations': self._tick_evaluations,
+                'dirty_strategies': len(self._dirty_strategies),
+                'watched_symbols': len(self._exposure),
+                'tsl_states_in_memory': len(self._tsl_states),
+                'tsl_rows_written': self._tsl_rows_written,
+                'price_feed_account': self._current_price_account_id,
+                'price_feed_hedged_requests': self._hedged_requests,
+                'price_feed_health': self._price_health_summary(),
+                'pnl_by_account': {k: round(v, 2) for k, v in snapshot.account_pnl.items()} if snapshot else {},
+                'pnl_by_user': {k: round(v, 2) for k, v in snapshot.user_pnl.items()} if snapshot else {}
             }
 
         except Exception as e:
@@ -0,0 +1,155 @@
+"""
+Spread Builder
+Combines leg OHLC histories into one spread series with NumPy instead of
+pandas Series arithmetic and index alignment.
+
+Key Features:
+- Legs are aligned on int64 epoch timestamps (sorted merge via searchsorted)
+- Signed, weighted sums are accumulated into preallocated float64 arrays
+- Configurable policy for bars missing from some legs:
+    'intersect' - keep only timestamps every leg has
+    'ffill'     - union of timestamps once every leg has started; a missing bar
+                  is a flat bar at the leg's previous close
+    'zero'      - union of timestamps; a missing bar contributes nothing
+- Output arrays are contiguous float64 and feed calculate_supertrend /
+  SupertrendState directly; to_frame() rebuilds the DataFrame callers expect
+"""
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MISSING_BAR_POLICIES = ('intersect', 'ffill', 'zero')
+
+OHLC = ('open', 'high', 'low', 'close')
+
+
+class SpreadSeries:
+    """
+    Column-oriented spread OHLC.
+
+    Columns (one row per bar):
+        time: epoch nanoseconds (int64, ascending)
+        open, high, low, close (float64)
+    tz and unit describe the leg indexes (used by to_frame)
+    """
+
+    def __init__(self, time: np.ndarray, open_: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, tz=None, unit: str = 'ns'):
+        self.time = time
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.tz = tz
+        self.unit = unit
+
+    def __len__(self):
+        return len(self.time)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Spread as a DataFrame indexed by timestamp (like the leg history frames)"""
+        index = pd.DatetimeIndex(pd.to_datetime(self.time, unit='ns', utc=True), name='timestamp').as_unit(self.unit)
+        index = index.tz_convert(self.tz) if self.tz is not None else index.tz_localize(None)
+        return pd.DataFrame({'open': self.open, 'high': self.high, 'low': self.low, 'close': self.close},
+                            index=index)
+
+
+def _leg_arrays(df: pd.DataFrame) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Epoch-ns timestamps (sorted, unique) and float64 OHLC columns of one leg frame"""
+    index = pd.DatetimeIndex(df.index)
+    times = index.as_unit('ns').asi8
+    columns = [np.asarray(df[column].to_numpy(), dtype=np.float64) for column in OHLC]
+
+    if len(times) > 1 and not (np.diff(times) > 0).all():
+        # Keep the last bar for each timestamp, in time order
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        keep = np.append(times[1:] != times[:-1], True)
+        times = times[keep]
+        columns = [column[order][keep] for column in columns]
+    return times, columns
+
+
+def build_spread(legs: Iterable[Tuple[pd.DataFrame, float]], policy: str = 'intersect',
+                 absolute: bool = True) -> Optional[SpreadSeries]:
+    """
+    Combine legs into a spread: sum of weight * leg OHLC at each aligned timestamp.
+
+    Args:
+        legs: (ohlc_frame, weight) pairs - weight carries sign and size
+              (e.g. +lots for SELL, -lots for BUY)
+        policy: Missing bar policy ('intersect', 'ffill' or 'zero')
+        absolute: Take abs() of the spread and re-order high/low afterwards
+
+    Returns:
+        SpreadSeries, or None if there are no legs or no aligned bars
+    """
+    if policy not in MISSING_BAR_POLICIES:
+        raise ValueError(f"Unknown missing bar policy '{policy}' (expected one of {MISSING_BAR_POLICIES})")
+
+    prepared = []
+    tz = None
+    unit = None
+    for df, weight in legs:
+        if df is None or len(df) == 0:
+            continue
+        if unit is None:
+            tz = getattr(df.index, 'tz', None)
+            unit = getattr(df.index, 'unit', 'ns')
+        times, columns = _leg_arrays(df)
+        prepared.append((times, columns, float(weight)))
+
+    if not prepared:
+        return None
+
+    # Output timestamps
+    if policy == 'intersect':
+        time = prepared[0][0]
+        for times, _, _ in prepared[1:]:
+            time = np.intersect1d(time, times, assume_unique=True)
+    else:
+        time = np.unique(np.concatenate([times for times, _, _ in prepared]))
+        if policy == 'ffill':
+            # A leg cannot be carried forward before its first bar
+            time = time[time >= max(times[0] for times, _, _ in prepared)]
+
+    n = len(time)
+    if n == 0:
+        return None
+
+    out = [np.zeros(n, dtype=np.float64) for _ in OHLC]
+
+    for times, columns, weight in prepared:
+        if policy == 'ffill':
+            # Last bar at or before each output time
+            pos = np.searchsorted(times, time, side='right') - 1
+            exact = times[pos] == time
+            carried = columns[3][pos]  # previous close
+            for target, column in zip(out, columns):
+                target += weight * np.where(exact, column[pos], carried)
+        else:
+            pos = np.searchsorted(times, time)
+            if policy == 'intersect':
+                for target, column in zip(out, columns):
+                    target += weight * column[pos]
+            else:
+                pos_clipped = np.minimum(pos, len(times) - 1)
+                present = times[pos_clipped] == time
+                rows = pos_clipped[present]
+                for target, column in zip(out, columns):
+                    target[present] += weight * column[rows]
+
+    open_, high, low, close = out
+    if absolute:
+        np.abs(open_, out=open_)
+        np.abs(high, out=high)
+        np.abs(low, out=low)
+        np.abs(close, out=close)
+        # abs() can invert the high/low relationship
+        high, low = np.maximum(high, low), np.minimum(high, low)
+
+    return SpreadSeries(time, open_, high, low, close, tz=tz, unit=unit)
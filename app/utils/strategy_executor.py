@@ -20,9 +20,53 @@ from app.utils.openalgo_client import ExtendedOpenAlgoAPI
 from app.utils.websocket_manager import ProfessionalWebSocketManager
 from app.utils.background_service import option_chain_service
 from app.utils.order_status_poller import order_status_poller
+from app.utils.risk_manager import risk_manager
 
 logger = logging.getLogger(__name__)
 
+# Strike step per instrument (ATM = spot rounded to the nearest step)
+STRIKE_STEPS = {
+    'NIFTY': 50,
+    'BANKNIFTY': 100,
+    'FINNIFTY': 50,
+    'MIDCPNIFTY': 50,
+    'SENSEX': 100
+}
+
+# Lot sizes used when the user has no TradingSettings row for the instrument
+DEFAULT_LOT_SIZES = {
+    'NIFTY': 75,
+    'BANKNIFTY': 30,
+    'FINNIFTY': 25,
+    'MIDCPNIFTY': 50,
+    'SENSEX': 10,
+    'BANKEX': 15
+}
+
+
+def leg_exchange(instrument: str, product_type: str) -> str:
+    """Exchange a leg trades on"""
+    if instrument == 'SENSEX':
+        return 'BFO' if product_type in ['options', 'futures'] else 'BSE'
+    elif instrument in ['NIFTY', 'BANKNIFTY', 'FINNIFTY', 'MIDCPNIFTY']:
+        return 'NFO' if product_type in ['options', 'futures'] else 'NSE'
+    else:
+        return 'NSE'  # Default to NSE
+
+
+def offset_strike(atm_strike: int, strike_step: int, strike_selection: str, offset: int, option_type: str) -> int:
+    """ITM/OTM strike `offset` steps away from ATM (offset clamped to 1-20)"""
+    # If offset is 0, it means we're at ATM which is wrong for ITM/OTM
+    if not offset:
+        offset = 1
+    offset = max(1, min(20, offset))
+
+    if option_type == 'CE':
+        # ITM calls are below spot, OTM calls above
+        return atm_strike - offset * strike_step if strike_selection == 'ITM' else atm_strike + offset * strike_step
+    # ITM puts are above spot, OTM puts below
+    return atm_strike + offset * strike_step if strike_selection == 'ITM' else atm_strike - offset * strike_step
+
 
 class StrategyExecutor:
     """Execute trading strategies across multiple accounts"""
@@ -72,6 +116,9 @@ class StrategyExecutor:
         from flask import current_app
         self.app = current_app._get_current_object()
 
+        # Basket fast path: one basketorder per account per phase instead of one order per leg
+        self.use_basket_orders = self.app.config.get('BASKET_ORDERS_ENABLED', True)
+
         if use_margin_calculator:
             from app.utils.margin_calculator import MarginCalculator
             self.margin_calculator = MarginCalculator(strategy.user_id)
@@ -214,7 +261,13 @@ class StrategyExecutor:
             logger.debug(f"[PHASE 1] Starting BUY legs execution")
 
             buy_threads = []
-            for i, leg in enumerate(buy_legs, 1):
+            if self._should_use_basket(buy_legs):
+                self._execute_phase_basket(buy_legs, results, results_lock, 'BUY')
+                buy_legs_parallel = []
+            else:
+                buy_legs_parallel = buy_legs
+
+            for i, leg in enumerate(buy_legs_parallel, 1):
                 logger.debug(f"[BUY LEG {i}] Starting parallel thread: "
                            f"{leg.instrument} {leg.action} {leg.option_type if leg.product_type == 'options' else ''}")
 
@@ -241,7 +294,13 @@ class StrategyExecutor:
             logger.debug(f"[PHASE 2] Starting SELL legs execution")
 
             sell_threads = []
-            for i, leg in enumerate(sell_legs, 1):
+            if self._should_use_basket(sell_legs):
+                self._execute_phase_basket(sell_legs, results, results_lock, 'SELL')
+                sell_legs_parallel = []
+            else:
+                sell_legs_parallel = sell_legs
+
+            for i, leg in enumerate(sell_legs_parallel, 1):
                 logger.debug(f"[SELL LEG {i}] Starting parallel thread: "
                            f"{leg.instrument} {leg.action} {leg.option_type if leg.product_type == 'options' else ''}")
 
@@ -371,13 +430,10 @@ class StrategyExecutor:
             else:  # 'amount'
                 initial_stop_pnl = -trailing_value
 
-            # Set TSL values
-            strategy.trailing_sl_initial_stop = initial_stop_pnl
-            strategy.trailing_sl_active = True
-            strategy.trailing_sl_peak_pnl = 0.0  # Start at 0, will be updated by risk manager
-            strategy.trailing_sl_trigger_pnl = initial_stop_pnl  # Current stop = initial stop at start
-
-            db.session.commit()
+            # Set TSL values through the risk manager's in-memory state (peak starts at 0,
+            # current stop = initial stop); the write-behind flush persists the columns
+            risk_manager.reset_trailing_sl(strategy.id, initial_stop=initial_stop_pnl)
+            risk_manager.persist_trailing_sl_states()
 
             logger.info(f"[TSL INIT] Strategy {strategy.name}: Initial Stop={initial_stop_pnl:.2f}, "
                        f"Entry Value={entry_value:.2f}, Type={trailing_type}, Value={trailing_value}")
@@ -640,6 +696,232 @@ class StrategyExecutor:
 
         return results
 
+    def _should_use_basket(self, phase_legs: List[StrategyLeg]) -> bool:
+        """A basket only saves round trips when a phase has more than one leg"""
+        return self.use_basket_orders and len(phase_legs) > 1
+
+    def _execute_phase_basket(self, phase_legs: List[StrategyLeg], results: List, results_lock, phase_name: str):
+        """
+        Execute all legs of one phase (BUY or SELL) as one basket order per account.
+
+        Baskets are submitted concurrently across accounts. Legs that need freeze
+        splitting and legs explicitly rejected inside the basket fall back to the
+        regular per-leg order path (_execute_on_account); legs whose basket outcome
+        is unknown are reported as errors and never resubmitted.
+        """
+        from app.utils.freeze_quantity_handler import should_split_order
+
+        # Resolve symbol/exchange once per leg - shared by every account's basket
+        resolved_legs = []
+        for leg in phase_legs:
+            symbol = self._build_symbol(leg)
+            if not symbol:
+                logger.error(f"Failed to build symbol for leg {leg.leg_number}")
+                with results_lock:
+                    results.append({
+                        'leg': leg.leg_number,
+                        'status': 'error',
+                        'error': 'Failed to build symbol'
+                    })
+                continue
+
+            base_quantity = None
+            if not self.use_margin_calculator:
+                base_quantity = self._calculate_quantity(leg, len(self.accounts))
+                if base_quantity <= 0:
+                    logger.error(f"Invalid quantity calculated for leg {leg.leg_number}: {base_quantity}")
+                    with results_lock:
+                        results.append({
+                            'leg': leg.leg_number,
+                            'status': 'error',
+                            'error': f'Invalid quantity: {base_quantity}'
+                        })
+                    continue
+
+            resolved_legs.append((leg, symbol, self._get_exchange(leg), base_quantity))
+
+        # Build the basket for each account; legs needing split orders go per-leg
+        account_plans = []
+        for account in self.accounts:
+            basket_items = []
+            per_leg_items = []
+
+            for leg, symbol, exchange, base_quantity in resolved_legs:
+                if self.use_margin_calculator:
+                    quantity = self._calculate_quantity(leg, 1, account)
+                    if quantity <= 0:
+                        logger.warning(f"Skipping {account.account_name} - insufficient margin for {leg.instrument}")
+                        with results_lock:
+                            results.append({
+                                'account': account.account_name,
+                                'symbol': symbol,
+                                'status': 'skipped',
+                                'error': 'Insufficient margin',
+                                'leg': leg.leg_number
+                            })
+                        continue
+                else:
+                    quantity = base_quantity
+
+                needs_split, _ = should_split_order(self.strategy.user_id, symbol, quantity)
+                if needs_split:
+                    per_leg_items.append((leg, symbol, exchange, quantity))
+                else:
+                    basket_items.append((leg, symbol, exchange, quantity))
+
+            # A single-order basket saves nothing over placeorder
+            if len(basket_items) < 2:
+                per_leg_items = basket_items + per_leg_items
+                basket_items = []
+
+            account_plans.append((account, basket_items, per_leg_items))
+
+        logger.debug(f"[{phase_name} BASKET] Submitting baskets for {len(account_plans)} accounts "
+                     f"({len(resolved_legs)} legs each)")
+
+        threads = []
+        for account, basket_items, per_leg_items in account_plans:
+            thread = threading.Thread(
+                target=self._execute_basket_on_account,
+                args=(account, basket_items, per_leg_items, results, results_lock),
+                name=f"{phase_name}-Basket-{account.account_name}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+        THREAD_TIMEOUT = 60
+        for thread in threads:
+            thread.join(timeout=THREAD_TIMEOUT)
+            if thread.is_alive():
+                logger.error(f"[THREAD TIMEOUT] {thread.name} still running after {THREAD_TIMEOUT}s")
+
+    def _execute_basket_on_account(self, account: TradingAccount, basket_items: List[tuple],
+                                   per_leg_items: List[tuple], results: List, results_lock):
+        """Place one account's basket, then place any remaining legs one by one"""
+        account_results = []
+
+        try:
+            with self.app.app_context():
+                if basket_items:
+                    rejected_items = self._place_basket_order(account, basket_items, account_results)
+                    if rejected_items:
+                        logger.warning(f"[BASKET FALLBACK] {len(rejected_items)} leg(s) on {account.account_name} "
+                                       f"falling back to per-leg orders")
+                    per_leg_items = rejected_items + per_leg_items
+
+                for leg, symbol, exchange, quantity in per_leg_items:
+                    self._execute_on_account(account, leg, symbol, exchange, quantity, account_results, 0)
+
+        except Exception as e:
+            logger.error(f"[BASKET ERROR] Error executing basket on account {account.account_name}: {e}", exc_info=True)
+            placed_legs = {r.get('leg') for r in account_results}
+            for leg, symbol, exchange, quantity in basket_items + per_leg_items:
+                if leg.leg_number not in placed_legs:
+                    account_results.append({
+                        'account': account.account_name,
+                        'symbol': symbol,
+                        'status': 'error',
+                        'error': str(e),
+                        'leg': leg.leg_number
+                    })
+
+        with results_lock:
+            results.extend(account_results)
+
+    def _place_basket_order(self, account: TradingAccount, basket_items: List[tuple],
+                            account_results: List) -> List[tuple]:
+        """
+        Submit a basket order and record a pending execution for every accepted leg.
+
+        Only legs the broker explicitly rejected are returned for a per-leg retry.
+        When the outcome is unknown (the call raised, the basket response was not a
+        success, or a leg has no usable result) the broker may already hold the
+        orders, so those legs are reported as errors instead of being resubmitted.
+
+        Returns:
+            The basket items that were rejected and need a per-leg order
+        """
+        client = ExtendedOpenAlgoAPI(
+            api_key=account.get_api_key(),
+            host=account.host_url
+        )
+
+        orders = []
+        for leg, symbol, exchange, quantity in basket_items:
+            order_params = self._build_order_params(leg, symbol, exchange, quantity)
+            order = {
+                'symbol': order_params['symbol'],
+                'exchange': order_params['exchange'],
+                'action': order_params['action'],
+                'quantity': order_params['quantity'],
+                'pricetype': order_params.get('price_type', 'MARKET'),
+                'product': order_params['product']
+            }
+            if 'price' in order_params:
+                order['price'] = order_params['price']
+            orders.append(order)
+
+        logger.debug(f"[BASKET ORDER] Placing {len(orders)} orders for {account.account_name}")
+
+        try:
+            response = client.basketorder(strategy=self.strategy.name, orders=orders)
+            logger.debug(f"[BASKET RESPONSE] {account.account_name}: status={response.get('status') if isinstance(response, dict) else response}")
+        except Exception as e:
+            self._record_unknown_basket_outcome(account, basket_items, f'Basket order raised: {e}', account_results)
+            return []
+
+        if not isinstance(response, dict) or response.get('status') != 'success':
+            message = response.get('message') if isinstance(response, dict) else response
+            self._record_unknown_basket_outcome(account, basket_items, f'Basket order failed: {message}',
+                                                account_results)
+            return []
+
+        # Map returned order IDs back to legs by symbol (in submission order for duplicates)
+        entries_by_symbol = {}
+        for entry in response.get('results') or []:
+            entries_by_symbol.setdefault(entry.get('symbol'), []).append(entry)
+
+        rejected_items = []
+        unknown_items = []
+        for item in basket_items:
+            leg, symbol, exchange, quantity = item
+            symbol_entries = entries_by_symbol.get(symbol)
+            entry = symbol_entries.pop(0) if symbol_entries else None
+
+            if entry is None:
+                unknown_items.append(item)
+            elif entry.get('status') == 'success':
+                if entry.get('orderid'):
+                    self._record_pending_order(account, leg, symbol, exchange, quantity,
+                                               entry.get('orderid'), account_results)
+                else:
+                    unknown_items.append(item)
+            else:
+                error_msg = entry.get('message', 'Rejected in basket')
+                logger.warning(f"[BASKET LEG REJECTED] Leg {leg.leg_number} {symbol} on {account.account_name}: {error_msg}")
+                rejected_items.append(item)
+
+        if unknown_items:
+            self._record_unknown_basket_outcome(account, unknown_items, 'No order ID returned in basket response',
+                                                account_results)
+
+        return rejected_items
+
+    def _record_unknown_basket_outcome(self, account: TradingAccount, items: List[tuple], reason: str,
+                                       account_results: List):
+        """Report basket legs whose outcome is unknown as errors (never resubmitted - the broker may hold them)"""
+        logger.error(f"[BASKET UNKNOWN] {len(items)} leg(s) on {account.account_name} not resubmitted: {reason}. "
+                     f"Check the broker orderbook before retrying.")
+        for leg, symbol, exchange, quantity in items:
+            account_results.append({
+                'account': account.account_name,
+                'symbol': symbol,
+                'status': 'error',
+                'error': f'{reason} - order state unknown, check the broker orderbook',
+                'leg': leg.leg_number
+            })
+
     def _execute_on_account(self, account: TradingAccount, leg: StrategyLeg,
                            symbol: str, exchange: str, quantity: int, results: List, thread_index: int):
         """Execute order on a specific account"""
@@ -672,24 +954,7 @@ class StrategyExecutor:
                 )
 
                 # Prepare order parameters based on order type and price condition
-                order_params = {
-                    'strategy': self.strategy.name,
-                    'symbol': symbol,
-                    'action': leg.action,
-                    'exchange': exchange,
-                    'product': self.strategy.product_order_type or 'MIS',  # Use strategy's product order type
-                    'quantity': quantity
-                }
-
-                # Handle different order types
-                if leg.order_type == 'MARKET':
-                    order_params['price_type'] = 'MARKET'
-
-                elif leg.order_type == 'LIMIT':
-                    # Simple LIMIT order
-                    order_params['price_type'] = 'LIMIT'
-                    if leg.limit_price:
-                        order_params['price'] = leg.limit_price
+                order_params = self._build_order_params(leg, symbol, exchange, quantity)
 
                 print(f"[ORDER PARAMS] Placing order for {account_name}: {order_params}")
                 logger.debug(f"Order params: {order_params}")
@@ -739,71 +1004,7 @@ class StrategyExecutor:
                     # Background poller will update status asynchronously
                     logger.debug(f"[ORDER PLACED] Order ID: {order_id} for {symbol} on {account_name} (will poll status)")
 
-                    # IMPORTANT: Do NOT pre-set entry_price to limit_price
-                    # The actual execution price may differ (e.g., LIMIT converts to MARKET)
-                    # Always let the poller fetch the real average_price from broker
-                    initial_entry_price = None
-
-                    # Create execution record (already in app context from _execute_leg_parallel)
-                    execution = StrategyExecution(
-                        strategy_id=self.strategy.id,
-                        account_id=account_id,
-                        leg_id=leg.id,
-                        order_id=order_id,
-                        symbol=symbol,
-                        exchange=exchange,
-                        quantity=quantity,
-                        product=self.strategy.product_order_type or 'MIS',  # MIS, NRML, CNC
-                        status='pending',  # Will be updated by background poller
-                        broker_order_status='open',  # Assume open until poller updates
-                        entry_time=datetime.utcnow(),
-                        entry_price=initial_entry_price  # Set to limit price for LIMIT orders, None for MARKET
-                    )
-
-                    with self.lock:
-                        db.session.add(execution)
-
-                        # Note: leg.is_executed is set in main session after all threads complete
-                        # This avoids session conflicts between threads
-
-                        # Retry commit with exponential backoff for SQLite locks
-                        max_retries = 5
-                        for attempt in range(max_retries):
-                            try:
-                                db.session.commit()
-                                break
-                            except Exception as commit_error:
-                                if attempt < max_retries - 1:
-                                    import time as time_sleep
-                                    db.session.rollback()
-                                    wait_time = 0.1 * (2 ** attempt)  # Exponential backoff: 0.1, 0.2, 0.4, 0.8, 1.6 seconds
-                                    logger.debug(f"DB locked, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                                    time_sleep.sleep(wait_time)
-                                else:
-                                    logger.error(f"Failed to commit after {max_retries} attempts: {commit_error}")
-                                    db.session.rollback()
-                                    raise
-
-                        # PHASE 2: Add order to background poller for status tracking
-                        order_status_poller.add_order(
-                            execution_id=execution.id,
-                            account=account,
-                            order_id=order_id,
-                            strategy_name=self.strategy.name
-                        )
-
-                        # Report as pending - background poller will update status
-                        results.append({
-                            'account': account_name,
-                            'symbol': symbol,
-                            'order_id': order_id,
-                            'status': 'pending',
-                            'message': 'Order placed, checking status in background',
-                            'order_status': 'open',
-                            'leg': leg.leg_number
-                        })
-
-                        logger.debug(f"[THREAD SUCCESS] Leg {leg.leg_number} order placed on {account_name}, order_id: {order_id} (polling in background)")
+                    self._record_pending_order(account, leg, symbol, exchange, quantity, order_id, results)
 
                 else:
                     # Order failed - create execution record for visibility and tracking
@@ -862,6 +1063,98 @@ class StrategyExecutor:
 
         logger.debug(f"[THREAD END] Completed execution for leg {leg.leg_number} on account {account_name}")
 
+    def _build_order_params(self, leg: StrategyLeg, symbol: str, exchange: str, quantity: int) -> Dict[str, Any]:
+        """Build placeorder parameters for a leg based on its order type"""
+        order_params = {
+            'strategy': self.strategy.name,
+            'symbol': symbol,
+            'action': leg.action,
+            'exchange': exchange,
+            'product': self.strategy.product_order_type or 'MIS',  # Use strategy's product order type
+            'quantity': quantity
+        }
+
+        # Handle different order types
+        if leg.order_type == 'MARKET':
+            order_params['price_type'] = 'MARKET'
+
+        elif leg.order_type == 'LIMIT':
+            # Simple LIMIT order
+            order_params['price_type'] = 'LIMIT'
+            if leg.limit_price:
+                order_params['price'] = leg.limit_price
+
+        return order_params
+
+    def _record_pending_order(self, account: TradingAccount, leg: StrategyLeg, symbol: str,
+                              exchange: str, quantity: int, order_id: str, results: List):
+        """Create the pending StrategyExecution for a placed order and hand it to the poller"""
+        # IMPORTANT: Do NOT pre-set entry_price to limit_price
+        # The actual execution price may differ (e.g., LIMIT converts to MARKET)
+        # Always let the poller fetch the real average_price from broker
+        initial_entry_price = None
+
+        # Create execution record (caller provides the app context)
+        execution = StrategyExecution(
+            strategy_id=self.strategy.id,
+            account_id=account.id,
+            leg_id=leg.id,
+            order_id=order_id,
+            symbol=symbol,
+            exchange=exchange,
+            quantity=quantity,
+            product=self.strategy.product_order_type or 'MIS',  # MIS, NRML, CNC
+            status='pending',  # Will be updated by background poller
+            broker_order_status='open',  # Assume open until poller updates
+            entry_time=datetime.utcnow(),
+            entry_price=initial_entry_price  # Set to limit price for LIMIT orders, None for MARKET
+        )
+
+        with self.lock:
+            db.session.add(execution)
+
+            # Note: leg.is_executed is set in main session after all threads complete
+            # This avoids session conflicts between threads
+
+            # Retry commit with exponential backoff for SQLite locks
+            max_retries = 5
+            for attempt in range(max_retries):
+                try:
+                    db.session.commit()
+                    break
+                except Exception as commit_error:
+                    if attempt < max_retries - 1:
+                        import time as time_sleep
+                        db.session.rollback()
+                        wait_time = 0.1 * (2 ** attempt)  # Exponential backoff: 0.1, 0.2, 0.4, 0.8, 1.6 seconds
+                        logger.debug(f"DB locked, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
+                        time_sleep.sleep(wait_time)
+                    else:
+                        logger.error(f"Failed to commit after {max_retries} attempts: {commit_error}")
+                        db.session.rollback()
+                        raise
+
+            # PHASE 2: Add order to background poller for status tracking
+            order_status_poller.add_order(
+                execution_id=execution.id,
+                account=account,
+                order_id=order_id,
+                strategy_name=self.strategy.name
+            )
+
+            # Report as pending - background poller will update status
+            results.append({
+                'account': account.account_name,
+                'symbol': symbol,
+                'order_id': order_id,
+                'status': 'pending',
+                'message': 'Order placed, checking status in background',
+                'order_status': 'open',
+                'leg': leg.leg_number
+            })
+
+            logger.debug(f"[THREAD SUCCESS] Leg {leg.leg_number} order placed on {account.account_name}, order_id: {order_id} (polling in background)")
+
     def _get_order_status(self, client: ExtendedOpenAlgoAPI, order_id: str, strategy_name: str) -> Dict:
         """Fetch order status from broker using OpenAlgo API"""
         try:
@@ -951,12 +1244,7 @@ class StrategyExecutor:
 
     def _get_exchange(self, leg: StrategyLeg) -> str:
         """Get exchange based on instrument"""
-        if leg.instrument == 'SENSEX':
-            return 'BFO' if leg.product_type in ['options', 'futures'] else 'BSE'
-        elif leg.instrument in ['NIFTY', 'BANKNIFTY', 'FINNIFTY', 'MIDCPNIFTY']:
-            return 'NFO' if leg.product_type in ['options', 'futures'] else 'NSE'
-        else:
-            return 'NSE'  # Default to NSE
+        return leg_exchange(leg.instrument, leg.product_type)
 
     def _get_expiry_string(self, leg: StrategyLeg) -> str:
         """Get actual expiry date from OpenAlgo API"""
@@ -1157,14 +1445,7 @@ class StrategyExecutor:
                 return "0"
 
             # Determine strike step based on instrument
-            strike_steps = {
-                'NIFTY': 50,
-                'BANKNIFTY': 100,
-                'FINNIFTY': 50,
-                'MIDCPNIFTY': 50,
-                'SENSEX': 100
-            }
-            strike_step = strike_steps.get(leg.instrument, 50)
+            strike_step = STRIKE_STEPS.get(leg.instrument, 50)
 
             # Calculate ATM strike (round to nearest strike)
             atm_strike = round(spot_price / strike_step) * strike_step
@@ -1188,22 +1469,7 @@ class StrategyExecutor:
                 # Validate offset range (1-20)
                 offset = max(1, min(20, offset))  # Changed min from 0 to 1
 
-                if leg.option_type == 'CE':
-                    # For Call options
-                    if leg.strike_selection == 'ITM':
-                        # ITM calls are below spot
-                        strike = atm_strike - (offset * strike_step)
-                    else:  # OTM
-                        # OTM calls are above spot
-                        strike = atm_strike + (offset * strike_step)
-                else:  # PE
-                    # For Put options
-                    if leg.strike_selection == 'ITM':
-                        # ITM puts are above spot
-                        strike = atm_strike + (offset * strike_step)
-                    else:  # OTM
-                        # OTM puts are below spot
-                        strike = atm_strike - (offset * strike_step)
+                strike = offset_strike(atm_strike, strike_step, leg.strike_selection, offset, leg.option_type)
 
                 print(f"[STRIKE RESULT] {leg.instrument} {leg.option_type}: Spot={spot_price}, ATM={atm_strike}, "
                       f"{leg.strike_selection}{offset}={strike}")
@@ -1918,15 +2184,7 @@ class StrategyExecutor:
                     return setting.lot_size
 
         # Fallback to defaults if not found (shouldn't happen if settings are initialized)
-        default_lot_sizes = {
-            'NIFTY': 75,
-            'BANKNIFTY': 30,
-            'FINNIFTY': 25,
-            'MIDCPNIFTY': 50,
-            'SENSEX': 10,
-            'BANKEX': 15
-        }
-        lot_size = default_lot_sizes.get(leg.instrument, 75)
+        lot_size = DEFAULT_LOT_SIZES.get(leg.instrument, 75)
         logger.warning(f"Using default lot size {lot_size} for {leg.instrument}")
         return lot_size
 
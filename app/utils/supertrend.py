@@ -1,6 +1,10 @@
 """
 Supertrend Indicator Module
-Uses TA-Lib ATR with Pine Script logic for TradingView compatibility
+Uses TA-Lib ATR with Pine Script logic for TradingView compatibility.
+The per-bar band ratchet runs as a numba-compiled loop; the pure-Python
+version of the same loop is kept as the reference implementation.
+SupertrendState streams the same calculation one bar at a time;
+calculate_supertrend_grid evaluates a (period, multiplier) grid in one call.
 
 Direction convention (matching Pine Script/TradingView):
     - direction = -1: Bullish (Up direction, green) - price above supertrend (lower band)
@@ -10,11 +14,123 @@ import numpy as np
 import pandas as pd
 import talib
 import logging
+from numba import njit
 
 logger = logging.getLogger(__name__)
 
 
-def calculate_supertrend(high, low, close, period=7, multiplier=3):
+def _supertrend_loop(close, atr, upper_band, lower_band):
+    """
+    Pine Script band ratchet and direction logic over pre-computed basic bands.
+
+    Pure-Python reference implementation; _supertrend_loop_jit is the same
+    source compiled with numba and must produce bit-identical output.
+
+    Returns:
+        Tuple of (supertrend, direction, long_line, short_line)
+    """
+    n = len(close)
+
+    # Initialize arrays
+    final_upper = np.full(n, np.nan)
+    final_lower = np.full(n, np.nan)
+    supertrend = np.full(n, np.nan)
+    direction = np.full(n, np.nan)
+    long_line = np.full(n, np.nan)
+    short_line = np.full(n, np.nan)
+
+    # Find first valid ATR index
+    first_valid = -1
+    for i in range(n):
+        if not np.isnan(atr[i]):
+            first_valid = i
+            break
+
+    if first_valid < 0 or first_valid >= n:
+        return supertrend, direction, long_line, short_line
+
+    # Initialize first valid values
+    # Pine Script: if na(atr[1]) _direction := 1 (first bar is downtrend)
+    final_upper[first_valid] = upper_band[first_valid]
+    final_lower[first_valid] = lower_band[first_valid]
+    direction[first_valid] = 1.0  # downtrend (red in Pine Script)
+    supertrend[first_valid] = final_upper[first_valid]
+    short_line[first_valid] = final_upper[first_valid]
+
+    # Pine Script logic for subsequent bars
+    for i in range(first_valid + 1, n):
+        # Final lower band: lowerBand > prevLowerBand or close[1] < prevLowerBand ? lowerBand : prevLowerBand
+        if lower_band[i] > final_lower[i-1] or close[i-1] < final_lower[i-1]:
+            final_lower[i] = lower_band[i]
+        else:
+            final_lower[i] = final_lower[i-1]
+
+        # Final upper band: upperBand < prevUpperBand or close[1] > prevUpperBand ? upperBand : prevUpperBand
+        if upper_band[i] < final_upper[i-1] or close[i-1] > final_upper[i-1]:
+            final_upper[i] = upper_band[i]
+        else:
+            final_upper[i] = final_upper[i-1]
+
+        # Direction logic (Pine Script)
+        # if prevSuperTrend == prevUpperBand
+        #     _direction := close > upperBand ? -1 : 1
+        # else
+        #     _direction := close < lowerBand ? 1 : -1
+        if supertrend[i-1] == final_upper[i-1]:
+            # Previous was upper band (downtrend)
+            if close[i] > final_upper[i]:
+                direction[i] = -1.0  # Change to uptrend (green)
+            else:
+                direction[i] = 1.0   # Continue downtrend (red)
+        else:
+            # Previous was lower band (uptrend)
+            if close[i] < final_lower[i]:
+                direction[i] = 1.0   # Change to downtrend (red)
+            else:
+                direction[i] = -1.0  # Continue uptrend (green)
+
+        # Supertrend assignment: _direction == -1 ? lowerBand : upperBand
+        if direction[i] == -1.0:  # uptrend (green)
+            supertrend[i] = final_lower[i]
+            long_line[i] = final_lower[i]
+        else:  # downtrend (red)
+            supertrend[i] = final_upper[i]
+            short_line[i] = final_upper[i]
+
+    return supertrend, direction, long_line, short_line
+
+
+# Same loop compiled to machine code (compiled on first call, cached on disk).
+# No fastmath: IEEE semantics are kept so results match the reference bit for bit.
+_supertrend_loop_jit = njit(cache=True, nogil=True)(_supertrend_loop)
+
+
+def _supertrend_grid_rows(close, atr, hl_avg, multipliers, trend, direction, row):
+    """
+    Fill one row of trend/direction per multiplier, starting at `row`, for one
+    period's ATR. Compiled as _supertrend_grid_rows_jit so a whole period runs
+    in one call; bands are formed exactly as in calculate_supertrend.
+    """
+    for k in range(len(multipliers)):
+        offset = multipliers[k] * atr
+        st, st_direction, _, _ = _supertrend_loop_jit(close, atr, hl_avg + offset, hl_avg - offset)
+        for i in range(len(close)):
+            trend[row + k, i] = st[i]
+            if not np.isnan(st_direction[i]):
+                direction[row + k, i] = np.int8(st_direction[i])
+
+
+_supertrend_grid_rows_jit = njit(cache=True, nogil=True)(_supertrend_grid_rows)
+
+
+def _as_float_array(values):
+    """Convert a pandas Series or array-like to a float64 numpy array"""
+    if hasattr(values, 'values'):
+        return values.values.astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def calculate_supertrend(high, low, close, period=7, multiplier=3, use_jit=True):
     """
     Calculate Supertrend indicator matching TradingView Pine Script
 
@@ -24,6 +140,7 @@ def calculate_supertrend(high, low, close, period=7, multiplier=3):
         close: Close price array (numpy array or pandas Series)
         period: ATR period (default: 7)
         multiplier: ATR multiplier/factor (default: 3)
+        use_jit: Use the numba-compiled loop (False runs the pure-Python reference)
 
     Returns:
         Tuple of (trend, direction, long, short)
@@ -34,22 +151,9 @@ def calculate_supertrend(high, low, close, period=7, multiplier=3):
     """
     try:
         # Convert to numpy arrays if needed
-        if hasattr(high, 'values'):
-            high = high.values.astype(np.float64)
-        else:
-            high = np.asarray(high, dtype=np.float64)
-
-        if hasattr(low, 'values'):
-            low = low.values.astype(np.float64)
-        else:
-            low = np.asarray(low, dtype=np.float64)
-
-        if hasattr(close, 'values'):
-            close = close.values.astype(np.float64)
-        else:
-            close = np.asarray(close, dtype=np.float64)
-
-        n = len(close)
+        high = _as_float_array(high)
+        low = _as_float_array(low)
+        close = _as_float_array(close)
 
         # Calculate ATR using TA-Lib (Wilder's smoothing)
         atr = talib.ATR(high, low, close, period)
@@ -59,71 +163,8 @@ def calculate_supertrend(high, low, close, period=7, multiplier=3):
         upper_band = hl_avg + multiplier * atr
         lower_band = hl_avg - multiplier * atr
 
-        # Initialize arrays
-        final_upper = np.full(n, np.nan)
-        final_lower = np.full(n, np.nan)
-        supertrend = np.full(n, np.nan)
-        direction = np.full(n, np.nan)
-        long_line = np.full(n, np.nan)
-        short_line = np.full(n, np.nan)
-
-        # Find first valid ATR index
-        first_valid = -1
-        for i in range(n):
-            if not np.isnan(atr[i]):
-                first_valid = i
-                break
-
-        if first_valid < 0 or first_valid >= n:
-            return supertrend, direction, long_line, short_line
-
-        # Initialize first valid values
-        # Pine Script: if na(atr[1]) _direction := 1 (first bar is downtrend)
-        final_upper[first_valid] = upper_band[first_valid]
-        final_lower[first_valid] = lower_band[first_valid]
-        direction[first_valid] = 1.0  # downtrend (red in Pine Script)
-        supertrend[first_valid] = final_upper[first_valid]
-        short_line[first_valid] = final_upper[first_valid]
-
-        # Pine Script logic for subsequent bars
-        for i in range(first_valid + 1, n):
-            # Final lower band: lowerBand > prevLowerBand or close[1] < prevLowerBand ? lowerBand : prevLowerBand
-            if lower_band[i] > final_lower[i-1] or close[i-1] < final_lower[i-1]:
-                final_lower[i] = lower_band[i]
-            else:
-                final_lower[i] = final_lower[i-1]
-
-            # Final upper band: upperBand < prevUpperBand or close[1] > prevUpperBand ? upperBand : prevUpperBand
-            if upper_band[i] < final_upper[i-1] or close[i-1] > final_upper[i-1]:
-                final_upper[i] = upper_band[i]
-            else:
-                final_upper[i] = final_upper[i-1]
-
-            # Direction logic (Pine Script)
-            # if prevSuperTrend == prevUpperBand
-            #     _direction := close > upperBand ? -1 : 1
-            # else
-            #     _direction := close < lowerBand ? 1 : -1
-            if supertrend[i-1] == final_upper[i-1]:
-                # Previous was upper band (downtrend)
-                if close[i] > final_upper[i]:
-                    direction[i] = -1.0  # Change to uptrend (green)
-                else:
-                    direction[i] = 1.0   # Continue downtrend (red)
-            else:
-                # Previous was lower band (uptrend)
-                if close[i] < final_lower[i]:
-                    direction[i] = 1.0   # Change to downtrend (red)
-                else:
-                    direction[i] = -1.0  # Continue uptrend (green)
-
-            # Supertrend assignment: _direction == -1 ? lowerBand : upperBand
-            if direction[i] == -1.0:  # uptrend (green)
-                supertrend[i] = final_lower[i]
-                long_line[i] = final_lower[i]
-            else:  # downtrend (red)
-                supertrend[i] = final_upper[i]
-                short_line[i] = final_upper[i]
+        loop = _supertrend_loop_jit if use_jit else _supertrend_loop
+        supertrend, direction, long_line, short_line = loop(close, atr, upper_band, lower_band)
 
         logger.debug(f"Supertrend calculated: period={period}, multiplier={multiplier}")
 
@@ -135,6 +176,218 @@ def calculate_supertrend(high, low, close, period=7, multiplier=3):
         return nan_array, nan_array, nan_array, nan_array
 
 
+def calculate_supertrend_grid(high, low, close, periods, multipliers, use_jit=True):
+    """
+    Calculate Supertrend for every (period, multiplier) pair over the same OHLC
+
+    ATR is computed once per period and shared by all multipliers, which then
+    run through the compiled band loop in a single call. Row k matches
+    calculate_supertrend(high, low, close, *combos[k]) bit for bit.
+
+    Args:
+        high, low, close: Price arrays (numpy arrays or pandas Series)
+        periods: Iterable of ATR periods
+        multipliers: Iterable of ATR multipliers
+        use_jit: Use the numba-compiled loop (False runs the pure-Python reference)
+
+    Returns:
+        Tuple of (trend, direction, combos)
+        - trend: float64 array of shape (len(combos), n_bars)
+        - direction: int8 array of the same shape (-1, 1, or 0 before ATR is available)
+        - combos: List of (period, multiplier), period-major
+    """
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    close = _as_float_array(close)
+    periods = [int(p) for p in periods]
+    multipliers = np.array([float(m) for m in multipliers], dtype=np.float64)
+
+    combos = [(period, float(multiplier)) for period in periods for multiplier in multipliers]
+    trend = np.full((len(combos), len(close)), np.nan)
+    direction = np.zeros((len(combos), len(close)), dtype=np.int8)
+
+    hl_avg = (high + low) / 2.0
+
+    row = 0
+    for period in periods:
+        atr = talib.ATR(high, low, close, period)
+        if use_jit:
+            _supertrend_grid_rows_jit(close, atr, hl_avg, multipliers, trend, direction, row)
+        else:
+            for k, multiplier in enumerate(multipliers):
+                offset = multiplier * atr
+                st, st_direction, _, _ = _supertrend_loop(close, atr, hl_avg + offset, hl_avg - offset)
+                trend[row + k] = st
+                direction[row + k] = np.nan_to_num(st_direction, nan=0.0)
+        row += len(multipliers)
+
+    logger.debug(f"Supertrend grid calculated: {len(periods)} periods x {len(multipliers)} multipliers")
+
+    return trend, direction, combos
+
+
+class SupertrendState:
+    """
+    Streaming Supertrend: O(1) update per closed bar.
+
+    Holds the Wilder ATR accumulator, the final (ratcheted) bands and the
+    direction. The ATR uses TA-Lib's seed (SMA of the first `period` true
+    ranges) and smoothing, and the bands follow _supertrend_loop, so
+    update() returns what calculate_supertrend returns for the last bar
+    (up to last-bit rounding where a TA-Lib build fuses multiply-adds).
+
+    A bar with the same time as the last one replaces it (the forming
+    candle can be revised); to_dict()/from_dict() survive restarts.
+    """
+
+    _FIELDS = ('bars', 'prev_close', 'tr_sum', 'atr', 'final_upper', 'final_lower',
+               'supertrend', 'direction', 'last_time')
+
+    def __init__(self, period=7, multiplier=3):
+        self.period = int(period)
+        self.multiplier = multiplier
+        self.bars = 0
+        self.prev_close = np.nan
+        self.tr_sum = 0.0        # Sum of the first `period` true ranges (ATR seed)
+        self.atr = np.nan
+        self.final_upper = np.nan
+        self.final_lower = np.nan
+        self.supertrend = np.nan
+        self.direction = np.nan
+        self.last_time = None
+        self._prev = None        # State before the last bar, for same-time replacement
+
+    def _snapshot(self):
+        return tuple(getattr(self, name) for name in self._FIELDS)
+
+    def _restore(self, snapshot):
+        for name, value in zip(self._FIELDS, snapshot):
+            setattr(self, name, value)
+
+    def update(self, high, low, close, time=None):
+        """
+        Apply one bar.
+
+        Args:
+            high, low, close: Bar prices
+            time: Bar timestamp (any comparable value, e.g. epoch seconds);
+                  a bar with the same time as the last one replaces it
+
+        Returns:
+            Tuple of (supertrend, direction, long, short) for this bar
+        """
+        if time is not None and time == self.last_time and self._prev is not None:
+            self._restore(self._prev)
+        self._prev = self._snapshot()
+
+        high = float(high)
+        low = float(low)
+        close = float(close)
+        period = self.period
+        self.bars += 1
+
+        # Wilder ATR: SMA seed, then atr = (atr * (period - 1) + tr) / period
+        if self.bars > 1:
+            prev_close = self.prev_close
+            true_range = high - low
+            gap = abs(prev_close - high)
+            if gap > true_range:
+                true_range = gap
+            gap = abs(prev_close - low)
+            if gap > true_range:
+                true_range = gap
+
+            if period <= 1:
+                self.atr = true_range
+            elif self.bars <= period:
+                self.tr_sum += true_range
+            elif self.bars == period + 1:
+                self.tr_sum += true_range
+                self.atr = self.tr_sum / period
+            else:
+                atr = self.atr * (period - 1)
+                atr += true_range
+                self.atr = atr / period
+
+        if not np.isnan(self.atr):
+            hl_avg = (high + low) / 2.0
+            upper_band = hl_avg + self.multiplier * self.atr
+            lower_band = hl_avg - self.multiplier * self.atr
+
+            if np.isnan(self.direction):
+                # First valid ATR: Pine Script starts in a downtrend
+                self.final_upper = upper_band
+                self.final_lower = lower_band
+                self.direction = 1.0
+            else:
+                prev_upper = self.final_upper
+                prev_lower = self.final_lower
+                prev_close = self.prev_close
+                was_upper = self.supertrend == prev_upper
+
+                if lower_band > prev_lower or prev_close < prev_lower:
+                    self.final_lower = lower_band
+                if upper_band < prev_upper or prev_close > prev_upper:
+                    self.final_upper = upper_band
+
+                if was_upper:
+                    self.direction = -1.0 if close > self.final_upper else 1.0
+                else:
+                    self.direction = 1.0 if close < self.final_lower else -1.0
+
+            self.supertrend = self.final_lower if self.direction == -1.0 else self.final_upper
+
+        self.prev_close = close
+        self.last_time = time
+        return self.values
+
+    @property
+    def values(self):
+        """(supertrend, direction, long, short) for the last bar"""
+        long_line = self.supertrend if self.direction == -1.0 else np.nan
+        short_line = self.supertrend if self.direction == 1.0 else np.nan
+        return self.supertrend, self.direction, long_line, short_line
+
+    @property
+    def ready(self) -> bool:
+        return not np.isnan(self.direction)
+
+    @classmethod
+    def seed(cls, high, low, close, period=7, multiplier=3, times=None) -> 'SupertrendState':
+        """Build the state from history (once per session), then stream with update()"""
+        state = cls(period, multiplier)
+        high = _as_float_array(high)
+        low = _as_float_array(low)
+        close = _as_float_array(close)
+        for i in range(len(close)):
+            state.update(high[i], low[i], close[i], times[i] if times is not None else None)
+        return state
+
+    def to_dict(self):
+        """JSON-safe representation (NaN stored as None)"""
+        def encode(value):
+            return None if isinstance(value, float) and np.isnan(value) else value
+
+        return {
+            'period': self.period,
+            'multiplier': self.multiplier,
+            'state': [encode(value) for value in self._snapshot()],
+            'prev': [encode(value) for value in self._prev] if self._prev is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> 'SupertrendState':
+        def decode(snapshot):
+            return tuple(np.nan if value is None and name != 'last_time' else value
+                         for name, value in zip(cls._FIELDS, snapshot))
+
+        state = cls(data['period'], data['multiplier'])
+        state._restore(decode(data['state']))
+        if data.get('prev') is not None:
+            state._prev = decode(data['prev'])
+        return state
+
+
 def get_supertrend_signal(direction):
     """
     Get current Supertrend signal
@@ -183,34 +436,32 @@ def calculate_spread_supertrend(leg_prices_dict, high_col='high', low_col='low',
             logger.error("No leg prices provided")
             return None
 
-        # Calculate combined spread
-        combined_high = None
-        combined_low = None
-        combined_close = None
-
-        for leg_name, df in leg_prices_dict.items():
-            if combined_close is None:
-                combined_high = df[high_col].copy()
-                combined_low = df[low_col].copy()
-                combined_close = df[close_col].copy()
-            else:
-                combined_high += df[high_col]
-                combined_low += df[low_col]
-                combined_close += df[close_col]
+        # Calculate combined spread (legs aligned on their common timestamps)
+        from app.utils.spread_builder import build_spread
+        spread = build_spread(
+            ((pd.DataFrame({'open': df[close_col], 'high': df[high_col], 'low': df[low_col],
+                            'close': df[close_col]}), 1.0)
+             for df in leg_prices_dict.values()),
+            absolute=False
+        )
+        if spread is None:
+            logger.error("No common timestamps across legs")
+            return None
+        combined = spread.to_frame()
 
         # Calculate Supertrend on combined spread
         trend, direction, long_line, short_line = calculate_supertrend(
-            combined_high.values,
-            combined_low.values,
-            combined_close.values,
+            spread.high,
+            spread.low,
+            spread.close,
             period=period,
             multiplier=multiplier
         )
 
         return {
-            'high': combined_high,
-            'low': combined_low,
-            'close': combined_close,
+            'high': combined['high'],
+            'low': combined['low'],
+            'close': combined['close'],
             'supertrend': trend,
             'direction': direction,
             'long': long_line,
@@ -0,0 +1,475 @@
+"""
+Supertrend Exit Backtester
+Replays a strategy's Supertrend exit over past sessions from the local candle
+store (ohlc_candles) for a grid of (period, multiplier) settings.
+
+Key Features:
+- Legs are rebuilt per session the way StrategyExecutor builds them: expiry
+  picked from the contracts stored for that session, ATM from the index at the
+  entry bar (put-call parity on the stored chain when the index is not stored),
+  ITM/OTM offsets, fixed strikes and premium_near
+- Spread and Supertrend as the exit service computes them: SELL +lots /
+  BUY -lots, absolute spread, SPREAD_MISSING_BAR_POLICY, two calendar days of
+  history before the session
+- Exit rule of check_supertrend_exit at every candle close after entry: at
+  least period + 5 bars and direction -1 (breakout) or 1 (breakdown);
+  otherwise the position is squared off at the strategy's square-off time
+- Fills follow trigger_sequential_exit: SELL legs are closed first, then BUY
+  legs, at the signal candle's close; every fill pays slippage_pct
+- Sessions are loaded once in the parent; (session, settings) tasks run on a
+  process pool, so long replays use every core
+
+The replay reaches back only as far as the store does (SUPERTREND_BACKTEST_RETENTION_DAYS),
+and only over sessions whose symbols were fetched while the strategy ran.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from app.utils.spread_builder import build_spread
+from app.utils.supertrend import calculate_supertrend_grid
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+TIMEFRAME_MINUTES = {
+    '1m': 1,
+    '3m': 3,
+    '5m': 5,
+    '10m': 10,
+    '15m': 15
+}
+
+DEFAULT_ENTRY_TIME = time(9, 20)
+DEFAULT_SQUARE_OFF_TIME = time(15, 15)
+HISTORY_DAYS = 2  # Calendar days of history the exit service seeds Supertrend from
+
+RESULT_COLUMNS = [
+    'session', 'period', 'multiplier', 'exit_type', 'entry_time', 'exit_time', 'exit_reason',
+    'bars_held', 'entry_spread', 'exit_spread', 'exit_supertrend', 'gross_pnl', 'slippage', 'net_pnl',
+    'exit_sequence'
+]
+
+
+class SessionSkipped(Exception):
+    """A session that cannot be replayed (missing contracts or candles)"""
+
+
+def _epoch_seconds(frame: pd.DataFrame) -> np.ndarray:
+    return pd.DatetimeIndex(frame.index).as_unit('ns').asi8 // 1_000_000_000
+
+
+def _leg_prices(frame: pd.DataFrame, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Leg open/close on the spread timeline (a missing bar is flat at the previous close)"""
+    times = _epoch_seconds(frame)
+    opens = frame['open'].to_numpy(dtype=np.float64)
+    closes = frame['close'].to_numpy(dtype=np.float64)
+
+    pos = np.searchsorted(times, starts, side='right') - 1
+    valid = pos >= 0
+    pos = np.maximum(pos, 0)
+    exact = valid & (times[pos] == starts)
+    leg_close = np.where(valid, closes[pos], np.nan)
+    leg_open = np.where(exact, opens[pos], leg_close)
+    return leg_open, leg_close
+
+
+def simulate_session(task: Dict, settings: Sequence[Tuple[int, float, str]], slippage_pct: float) -> List[Dict]:
+    """
+    Replay one session for every (period, multiplier, exit_type) setting.
+
+    Pure function of its arguments (runs in pool worker processes).
+    """
+    legs = task['legs']
+    spread = build_spread(
+        [(leg['frame'], leg['lots'] if leg['action'] == 'SELL' else -leg['lots']) for leg in legs],
+        policy=task['policy']
+    )
+    if spread is None:
+        return []
+
+    bar_seconds = task['bar_seconds']
+    starts = spread.time // 1_000_000_000
+
+    # First bar starting at entry, last bar closing by square-off
+    entry_idx = int(np.searchsorted(starts, task['entry_ts']))
+    last_idx = int(np.searchsorted(starts + bar_seconds, task['square_off_ts'], side='right')) - 1
+    if entry_idx >= len(starts) or starts[entry_idx] >= task['session_end'] or last_idx < entry_idx:
+        return []
+
+    prices = [_leg_prices(leg['frame'], starts) for leg in legs]
+
+    periods = sorted({int(period) for period, _, _ in settings})
+    multipliers = sorted({float(multiplier) for _, multiplier, _ in settings})
+    trend, direction, combos = calculate_supertrend_grid(spread.high, spread.low, spread.close,
+                                                         periods, multipliers)
+    rows = {combo: i for i, combo in enumerate(combos)}
+
+    # trigger_sequential_exit order: SELL legs first (BUY to close), then BUY legs
+    exit_order = sorted(range(len(legs)), key=lambda k: legs[k]['action'] != 'SELL')
+    bar_numbers = np.arange(entry_idx, last_idx + 1) + 1  # len(spread_data) at each check
+    slip = slippage_pct / 100.0
+
+    results = []
+    for period, multiplier, exit_type in settings:
+        row = rows[(int(period), float(multiplier))]
+        target = -1 if exit_type == 'breakout' else 1
+
+        hits = np.flatnonzero((direction[row, entry_idx:last_idx + 1] == target) & (bar_numbers >= period + 5))
+        if hits.size:
+            exit_idx = entry_idx + int(hits[0])
+            exit_reason = f'supertrend_{exit_type}'
+        else:
+            exit_idx = last_idx
+            exit_reason = 'square_off'
+
+        gross = 0.0
+        net = 0.0
+        for k in exit_order:
+            leg = legs[k]
+            quantity = leg['lots'] * leg['lot_size']
+            sign = 1.0 if leg['action'] == 'SELL' else -1.0  # Short legs gain when price falls
+            entry_price = prices[k][0][entry_idx]
+            exit_price = prices[k][1][exit_idx]
+            gross += sign * (entry_price - exit_price) * quantity
+            net += sign * (entry_price * (1 - sign * slip) - exit_price * (1 + sign * slip)) * quantity
+
+        exit_supertrend = trend[row, exit_idx]
+        results.append({
+            'session': task['session'].isoformat(),
+            'period': int(period),
+            'multiplier': float(multiplier),
+            'exit_type': exit_type,
+            'entry_time': datetime.fromtimestamp(int(starts[entry_idx]), IST).replace(tzinfo=None).isoformat(),
+            'exit_time': datetime.fromtimestamp(int(starts[exit_idx]) + bar_seconds, IST).replace(tzinfo=None).isoformat(),
+            'exit_reason': exit_reason,
+            'bars_held': exit_idx - entry_idx + 1,
+            'entry_spread': round(float(spread.open[entry_idx]), 2),
+            'exit_spread': round(float(spread.close[exit_idx]), 2),
+            'exit_supertrend': None if np.isnan(exit_supertrend) else round(float(exit_supertrend), 2),
+            'gross_pnl': round(gross, 2),
+            'slippage': round(gross - net, 2),
+            'net_pnl': round(net, 2),
+            'exit_sequence': ','.join(legs[k]['symbol'] for k in exit_order)
+        })
+    return results
+
+
+def _simulate_job(job):
+    task, settings, slippage_pct = job
+    return simulate_session(task, settings, slippage_pct)
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """Per-setting totals: trades, Supertrend exits, win rate and net P&L"""
+    if results.empty:
+        return pd.DataFrame(columns=['period', 'multiplier', 'exit_type', 'trades', 'supertrend_exits',
+                                     'win_rate', 'total_net_pnl', 'avg_net_pnl', 'worst_net_pnl'])
+    grouped = results.groupby(['period', 'multiplier', 'exit_type'])
+    summary = grouped.agg(
+        trades=('net_pnl', 'size'),
+        supertrend_exits=('exit_reason', lambda reasons: int((reasons != 'square_off').sum())),
+        win_rate=('net_pnl', lambda pnl: round(float((pnl > 0).mean() * 100), 1)),
+        total_net_pnl=('net_pnl', 'sum'),
+        avg_net_pnl=('net_pnl', 'mean'),
+        worst_net_pnl=('net_pnl', 'min')
+    ).reset_index()
+    return summary.round({'total_net_pnl': 2, 'avg_net_pnl': 2, 'worst_net_pnl': 2})
+
+
+class SupertrendBacktest:
+    """
+    Replay a strategy's Supertrend exit from stored candles (needs an app context)
+    """
+
+    def __init__(self, strategy, timeframe: Optional[str] = None, policy: str = 'intersect',
+                 slippage_pct: float = 0.5, workers: int = 0):
+        from app.models import StrategyLeg
+
+        self.strategy = strategy
+        self.legs = StrategyLeg.query.filter_by(strategy_id=strategy.id).order_by(StrategyLeg.leg_number).all()
+        self.timeframe = timeframe or strategy.supertrend_timeframe or '10m'
+        if self.timeframe not in TIMEFRAME_MINUTES:
+            raise ValueError(f"Unsupported timeframe '{self.timeframe}'")
+        self.bar_seconds = TIMEFRAME_MINUTES[self.timeframe] * 60
+        self.policy = policy
+        self.slippage_pct = slippage_pct
+        self.workers = workers or os.cpu_count() or 1
+        self.entry_time = strategy.entry_time or DEFAULT_ENTRY_TIME
+        self.square_off_time = strategy.square_off_time or strategy.exit_time or DEFAULT_SQUARE_OFF_TIME
+
+        self._lot_sizes: Dict[Tuple[str, bool], int] = {}
+
+    # ---- session preparation (parent process, database access) ----
+
+    def _session_ts(self, session: date, at: time) -> int:
+        return int(IST.localize(datetime.combine(session, at)).timestamp())
+
+    def _entry_bar_ts(self, session: date) -> int:
+        """Start of the first bar at or after the entry time"""
+        from app.utils.bar_aggregator import bar_start
+
+        entry = self._session_ts(session, self.entry_time)
+        start = bar_start(entry, TIMEFRAME_MINUTES[self.timeframe])
+        return start if start == entry else start + self.bar_seconds
+
+    def _lot_size(self, leg) -> int:
+        """Lot size as StrategyExecutor resolves it (the user's current trading settings)"""
+        from app.models import TradingSettings
+        from app.utils.strategy_executor import DEFAULT_LOT_SIZES
+
+        is_next_month = leg.expiry == 'next_month'
+        key = (leg.instrument, is_next_month)
+        if key not in self._lot_sizes:
+            setting = TradingSettings.query.filter_by(
+                user_id=self.strategy.user_id, symbol=leg.instrument, is_active=True
+            ).first()
+            if setting:
+                lot_size = setting.next_month_lot_size if is_next_month and setting.next_month_lot_size \
+                    else setting.lot_size
+            else:
+                lot_size = DEFAULT_LOT_SIZES.get(leg.instrument, 75)
+            self._lot_sizes[key] = lot_size
+        return self._lot_sizes[key]
+
+    @staticmethod
+    def _parse_contracts(instrument: str, chain: Dict[str, Tuple[float, float]]) -> Dict[str, Tuple]:
+        """Stored symbols -> (expiry date, expiry token, strike, option type or 'FUT')"""
+        option = re.compile(rf'^{re.escape(instrument)}(\d{{2}}[A-Z]{{3}}\d{{2}})(\d+)(CE|PE)$')
+        future = re.compile(rf'^{re.escape(instrument)}(\d{{2}}[A-Z]{{3}}\d{{2}})FUT$')
+
+        contracts = {}
+        for symbol in chain:
+            match = option.match(symbol)
+            if match:
+                token, strike, kind = match.group(1), int(match.group(2)), match.group(3)
+            else:
+                match = future.match(symbol)
+                if not match:
+                    continue
+                token, strike, kind = match.group(1), None, 'FUT'
+            try:
+                expiry = datetime.strptime(token, '%d%b%y').date()
+            except ValueError:
+                continue
+            contracts[symbol] = (expiry, token, strike, kind)
+        return contracts
+
+    @staticmethod
+    def _select_expiry(leg, expiries: List[Tuple[date, str]], session: date) -> Optional[Tuple[date, str]]:
+        """StrategyExecutor._get_expiry_string() selection, with the session as 'today'"""
+        if not expiries:
+            return None
+        futures = leg.product_type == 'futures'
+
+        if leg.expiry in ('current_week', None, ''):
+            return expiries[0]
+        if leg.expiry == 'next_week' or (futures and leg.expiry == 'next_month'):
+            return expiries[1] if len(expiries) > 1 else expiries[0]
+        if leg.expiry == 'current_month':
+            if futures:
+                return expiries[0]
+            monthly = [e for e in expiries if (e[0].year, e[0].month) == (session.year, session.month)]
+            return monthly[-1] if monthly else expiries[0]
+        if leg.expiry == 'next_month':
+            year, month = (session.year + 1, 1) if session.month == 12 else (session.year, session.month + 1)
+            monthly = [e for e in expiries if (e[0].year, e[0].month) == (year, month)]
+            if monthly:
+                return monthly[-1]
+            later = [e for e in expiries if (e[0].year, e[0].month) > (session.year, session.month)]
+            return later[0] if later else None
+        return expiries[0]
+
+    def _spot(self, instrument: str, session: date, entry_ts: int, chain: Dict, contracts: Dict) -> float:
+        """Index price at the entry bar: stored index candles, else put-call parity on the chain"""
+        from app.utils.candle_cache import candle_cache
+
+        index_exchange = 'BSE_INDEX' if instrument == 'SENSEX' else 'NSE_INDEX'
+        for exchange in (index_exchange, 'BSE' if instrument == 'SENSEX' else 'NSE'):
+            bars = candle_cache.snapshot(exchange, self.timeframe, instrument, entry_ts)
+            if instrument in bars and bars[instrument][0]:
+                return float(bars[instrument][0])
+
+        # Nearest expiry: strike where call and put are closest, spot ~ K + C - P
+        options = [c for c in contracts.values() if c[3] != 'FUT' and c[0] >= session]
+        if options:
+            nearest = min(c[0] for c in options)
+            pairs = {}
+            for symbol, (expiry, _, strike, kind) in contracts.items():
+                if expiry == nearest and kind != 'FUT' and chain[symbol][0]:
+                    pairs.setdefault(strike, {})[kind] = chain[symbol][0]
+            pairs = {k: v for k, v in pairs.items() if len(v) == 2}
+            if pairs:
+                strike = min(pairs, key=lambda k: abs(pairs[k]['CE'] - pairs[k]['PE']))
+                return strike + pairs[strike]['CE'] - pairs[strike]['PE']
+
+        raise SessionSkipped(f'no {instrument} index price at entry')
+
+    def _resolve_symbol(self, leg, session: date, entry_ts: int, chains: Dict) -> Tuple[str, str]:
+        """Contract the executor would have traded for this leg on this session"""
+        from app.utils.candle_cache import candle_cache
+        from app.utils.strategy_executor import STRIKE_STEPS, leg_exchange, offset_strike
+
+        exchange = leg_exchange(leg.instrument, leg.product_type)
+        if leg.product_type not in ('options', 'futures'):
+            return leg.instrument, exchange
+
+        if leg.instrument not in chains:
+            chain = candle_cache.snapshot(exchange, self.timeframe, leg.instrument, entry_ts)
+            chains[leg.instrument] = (chain, self._parse_contracts(leg.instrument, chain))
+        chain, contracts = chains[leg.instrument]
+
+        kind = 'FUT' if leg.product_type == 'futures' else leg.option_type
+        expiries = sorted({(c[0], c[1]) for c in contracts.values() if c[3] == kind and c[0] >= session})
+        selected = self._select_expiry(leg, expiries, session)
+        if not selected:
+            raise SessionSkipped(f'no stored {leg.instrument} {kind} contracts')
+        expiry, token = selected
+
+        if kind == 'FUT':
+            return f"{leg.instrument}{token}FUT", exchange
+
+        if leg.strike_selection == 'strike_price':
+            strike = int(leg.strike_price)
+        else:
+            strike_step = STRIKE_STEPS.get(leg.instrument, 50)
+            spot = self._spot(leg.instrument, session, entry_ts, chain, contracts)
+            atm_strike = round(spot / strike_step) * strike_step
+
+            if leg.strike_selection in ('ITM', 'OTM'):
+                strike = offset_strike(atm_strike, strike_step, leg.strike_selection,
+                                       leg.strike_offset, leg.option_type)
+            elif leg.strike_selection == 'premium_near':
+                target = leg.premium_value or 50
+                candidates = {
+                    c[2]: chain[symbol][0] for symbol, c in contracts.items()
+                    if c[0] == expiry and c[3] == kind and chain[symbol][0]
+                    and abs(c[2] - atm_strike) <= 20 * strike_step
+                }
+                if not candidates:
+                    raise SessionSkipped(f'no stored {leg.instrument} {kind} premiums at entry')
+                strike = min(candidates, key=lambda k: abs(candidates[k] - target))
+            else:
+                strike = atm_strike
+
+        return f"{leg.instrument}{token}{strike}{leg.option_type}", exchange
+
+    def build_task(self, session: date) -> Dict:
+        """Leg candles and timings for one session (raises SessionSkipped)"""
+        from app.utils.candle_cache import candle_cache
+
+        if not self.legs:
+            raise SessionSkipped('strategy has no legs')
+
+        entry_ts = self._entry_bar_ts(session)
+        session_start = self._session_ts(session, time(0, 0))
+        session_end = session_start + 86400
+        window_start = self._session_ts(session - timedelta(days=HISTORY_DAYS), time(0, 0))
+
+        chains = {}
+        legs = []
+        for leg in self.legs:
+            symbol, exchange = self._resolve_symbol(leg, session, entry_ts, chains)
+            frame = candle_cache.load_range(symbol, exchange, self.timeframe, window_start, session_end)
+            if frame is None or frame.empty:
+                raise SessionSkipped(f'no stored candles for {symbol}')
+            legs.append({
+                'leg_number': leg.leg_number,
+                'symbol': symbol,
+                'action': leg.action,
+                'lots': leg.lots or 1,
+                'lot_size': self._lot_size(leg),
+                'frame': frame[['open', 'high', 'low', 'close']]
+            })
+
+        # market_condition: only replay the sessions the strategy would have traded
+        condition = self.strategy.market_condition
+        if condition in ('expiry', 'non_expiry'):
+            chain, contracts = next(iter(chains.values()), ({}, {}))
+            expiries = [c[0] for c in contracts.values() if c[0] >= session]
+            is_expiry = bool(expiries) and min(expiries) == session
+            if is_expiry != (condition == 'expiry'):
+                raise SessionSkipped(f'not a {condition.replace("_", "-")} day')
+
+        return {
+            'session': session,
+            'legs': legs,
+            'policy': self.policy,
+            'bar_seconds': self.bar_seconds,
+            'entry_ts': entry_ts,
+            'square_off_ts': self._session_ts(session, self.square_off_time),
+            'session_end': session_end
+        }
+
+    def sessions(self) -> List[date]:
+        """Sessions with stored candles for the strategy's first instrument"""
+        from app.utils.candle_cache import candle_cache
+        from app.utils.strategy_executor import leg_exchange
+
+        if not self.legs:
+            return []
+        leg = self.legs[0]
+        return candle_cache.stored_sessions(leg_exchange(leg.instrument, leg.product_type),
+                                            self.timeframe, leg.instrument)
+
+    def build_tasks(self, limit: int = 60) -> Tuple[List[Dict], List[Dict]]:
+        """Tasks for the latest `limit` replayable sessions, and the sessions skipped on the way"""
+        tasks, skipped = [], []
+        for session in reversed(self.sessions()):
+            if len(tasks) >= limit:
+                break
+            try:
+                tasks.append(self.build_task(session))
+            except SessionSkipped as e:
+                skipped.append({'session': session.isoformat(), 'reason': str(e)})
+        tasks.reverse()
+        return tasks, skipped
+
+    # ---- replay ----
+
+    def run(self, settings: Sequence[Tuple[int, float, str]], sessions: int = 60,
+            prepared: Optional[Tuple[List[Dict], List[Dict]]] = None) -> pd.DataFrame:
+        """
+        Replay the latest `sessions` sessions for every setting.
+
+        prepared: (tasks, skipped) from build_tasks(), if the caller built them already.
+
+        Returns one row per (session, setting) with RESULT_COLUMNS;
+        result.attrs['skipped'] lists the sessions that could not be replayed.
+        """
+        settings = [(int(p), float(m), t) for p, m, t in settings]
+        tasks, skipped = prepared if prepared is not None else self.build_tasks(sessions)
+
+        # Split the settings so there are at least as many jobs as workers
+        chunks = max(1, min(len(settings), math.ceil(self.workers / max(1, len(tasks)))))
+        size = math.ceil(len(settings) / chunks) if settings else 0
+        jobs = [(task, settings[i:i + size], self.slippage_pct)
+                for task in tasks for i in range(0, len(settings), size)]
+
+        if self.workers <= 1 or len(jobs) <= 1:
+            outputs = [_simulate_job(job) for job in jobs]
+        else:
+            # spawn: the parent runs scheduler and WebSocket threads that must not be forked
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), mp_context=context) as pool:
+                outputs = list(pool.map(_simulate_job, jobs))
+
+        rows = [row for output in outputs for row in output]
+        results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+        if not results.empty:
+            results = results.sort_values(['session', 'period', 'multiplier', 'exit_type'], ignore_index=True)
+        results.attrs['skipped'] = skipped
+
+        logger.info(f"[BACKTEST] Strategy {self.strategy.id}: {len(tasks)} sessions x {len(settings)} settings "
+                    f"on {min(self.workers, max(1, len(jobs)))} worker(s), {len(skipped)} sessions skipped")
+        return results
@@ -1,26 +1,48 @@
 """
 Background Service for Supertrend-based Exit Monitoring
 Monitors strategies with Supertrend exit enabled and triggers exits on signal
+
+Supertrend is streamed per strategy: a SupertrendState is seeded from history
+once per session (and leg set), then only new bars are applied on each candle
+close. The state is persisted on the Strategy row so a restart resumes it.
+Leg candles come from the candle cache, which live bars built from WebSocket
+ticks keep current, so a check at candle close normally makes no history call.
+
+Due strategies are evaluated concurrently on a bounded pool (one app, created
+once); exits are serialized per strategy, and each evaluation's lag behind the
+candle boundary is recorded.
 """
 
+import hashlib
+import json
 import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, time, timedelta
 import time as time_module
 from typing import Dict, Any, List
 from apscheduler.schedulers.background import BackgroundScheduler
+from flask import current_app
 import pytz
 
 # IST timezone for storing timestamps
 IST = pytz.timezone('Asia/Kolkata')
 
+# Closed bars before the streaming state's last bar that must be unchanged to keep streaming
+# (broker bars replacing live bars, a lagging leg filling in an intersected bar)
+FINGERPRINT_BARS = 50
+
+
 def get_ist_now():
     """Get current time in IST (naive datetime for DB storage)"""
     return datetime.now(IST).replace(tzinfo=None)
 
 from app.models import Strategy, StrategyExecution, TradingAccount
-from app.utils.supertrend import calculate_supertrend
+from app.utils.supertrend import SupertrendState
 from app.utils.openalgo_client import ExtendedOpenAlgoAPI
+from app.utils.candle_cache import candle_cache
+from app.utils.spread_builder import build_spread
+from app.utils.bar_aggregator import bar_aggregator
 import pandas as pd
 import numpy as np
 
@@ -51,12 +73,32 @@ class SupertrendExitService:
         self.scheduler = BackgroundScheduler(timezone=pytz.timezone('Asia/Kolkata'))
         self.is_running = False
         self.monitoring_strategies = {}  # strategy_id -> last_check_time
+        self.supertrend_states = {}  # strategy_id -> (state_key, SupertrendState, bars fingerprint)
+        self.app = None
+        self.max_workers = 4
+        self._executor = None
+        self._exit_locks = {}  # strategy_id -> Lock (one exit at a time per strategy)
+        self._exit_locks_guard = threading.Lock()
+
+        # Evaluation lag behind the candle boundary
+        self.evaluation_metrics = {}  # strategy_id -> {'boundary', 'lag_ms', 'duration_ms'}
+        self.max_lag_ms = 0.0
+        self.last_cycle_lag_ms = 0.0
         self._initialized = True
 
         logger.debug("Supertrend Exit Service initialized")
 
-    def start_service(self):
-        """Start the background service"""
+    def start_service(self, app=None):
+        """
+        Start the background service
+
+        Args:
+            app: Flask app reused by every monitoring cycle (created once if not given)
+        """
+        if app is not None:
+            self.app = app
+            self.max_workers = int(app.config.get('SUPERTREND_EVAL_WORKERS', self.max_workers))
+
         if not self.is_running:
             # Check if scheduler is actually already running
             if self.scheduler.running:
@@ -88,8 +130,32 @@ class SupertrendExitService:
         if self.is_running:
             self.scheduler.shutdown(wait=False)
             self.is_running = False
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
             logger.debug("Supertrend Exit Service stopped")
 
+    def _get_app(self):
+        """Flask app for background work - created once, never per cycle"""
+        if self.app is None:
+            from app import create_app
+            self.app = create_app()
+        return self.app
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='SupertrendEval')
+        return self._executor
+
+    def _exit_lock(self, strategy_id: int) -> threading.Lock:
+        """Per-strategy lock that serializes exit triggering"""
+        with self._exit_locks_guard:
+            lock = self._exit_locks.get(strategy_id)
+            if lock is None:
+                lock = self._exit_locks[strategy_id] = threading.Lock()
+            return lock
+
     def monitor_strategies(self):
         """
         Monitor all strategies with Supertrend exit enabled
@@ -98,16 +164,22 @@ class SupertrendExitService:
         import uuid
         cycle_id = str(uuid.uuid4())[:8]  # Unique ID for this execution cycle
 
-        try:
-            from app import create_app
+        # Candle boundary this cycle evaluates (the job runs at :00 of each minute)
+        boundary = time_module.time() // 60 * 60
 
-            # Create Flask app context
-            app = create_app()
+        try:
+            # Reuse the long-lived app (never build one per cycle)
+            app = self._get_app()
             with app.app_context():
                 from app import db
 
                 logger.info(f"[SUPERTREND CYCLE {cycle_id}] === Starting monitor_strategies ===")
 
+                # Close live candles that just ended so the candle cache serves them without a history call
+                live_bars = bar_aggregator.flush_due()
+                if live_bars:
+                    logger.debug(f"[SUPERTREND CYCLE {cycle_id}] Published {live_bars} live bar(s)")
+
                 # Track strategies processed in THIS execution cycle to prevent double-processing
                 # This prevents the RETRY loop from re-processing strategies that were just triggered
                 strategies_processed_this_cycle = set()
@@ -121,21 +193,22 @@ class SupertrendExitService:
 
                 logger.info(f"[SUPERTREND CYCLE {cycle_id}] Found {len(strategies)} non-triggered strategies")
 
-                if strategies:
-                    for strategy in strategies:
-                        try:
-                            # Check if we should monitor this strategy based on timeframe
-                            should_check = self.should_check_strategy(strategy)
-                            logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy.id} ({strategy.name}): should_check={should_check}")
-
-                            if should_check:
-                                # Track that we're processing this strategy in this cycle
-                                strategies_processed_this_cycle.add(strategy.id)
-                                logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy.id}: Added to processed set, calling check_supertrend_exit")
-                                self.check_supertrend_exit(strategy, app)
-                                logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy.id}: check_supertrend_exit completed")
-                        except Exception as e:
-                            logger.error(f"Error monitoring strategy {strategy.id}: {e}", exc_info=True)
+                due_strategy_ids = []
+                for strategy in strategies:
+                    try:
+                        # Check if we should monitor this strategy based on timeframe
+                        should_check = self.should_check_strategy(strategy)
+                        logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy.id} ({strategy.name}): should_check={should_check}")
+
+                        if should_check:
+                            # Track that we're processing this strategy in this cycle
+                            strategies_processed_this_cycle.add(strategy.id)
+                            due_strategy_ids.append(strategy.id)
+                    except Exception as e:
+                        logger.error(f"Error monitoring strategy {strategy.id}: {e}", exc_info=True)
+
+                if due_strategy_ids:
+                    self.evaluate_strategies(due_strategy_ids, app, boundary, cycle_id)
 
                 logger.info(f"[SUPERTREND CYCLE {cycle_id}] Processed set after first loop: {strategies_processed_this_cycle}")
 
@@ -199,6 +272,58 @@ class SupertrendExitService:
         except Exception as e:
             logger.error(f"Error in monitor_strategies: {e}", exc_info=True)
 
+    def evaluate_strategies(self, strategy_ids: List[int], app, boundary: float, cycle_id: str = ''):
+        """
+        Evaluate due strategies concurrently on the bounded pool and wait for all of them.
+
+        Args:
+            strategy_ids: Strategies whose candle just closed
+            app: Flask app (each evaluation runs in its own app context)
+            boundary: Candle boundary (epoch seconds) used for the lag metric
+        """
+        futures = [
+            self._get_executor().submit(self._evaluate_strategy, strategy_id, app, boundary, cycle_id)
+            for strategy_id in strategy_ids
+        ]
+        lags = [future.result() for future in as_completed(futures)]
+
+        self.last_cycle_lag_ms = max(lags) if lags else 0.0
+        logger.info(f"[SUPERTREND CYCLE {cycle_id}] Evaluated {len(strategy_ids)} strategies, "
+                    f"last finished {self.last_cycle_lag_ms:.0f}ms after the candle boundary")
+
+    def _evaluate_strategy(self, strategy_id: int, app, boundary: float, cycle_id: str) -> float:
+        """Run check_supertrend_exit for one strategy; returns its lag in ms"""
+        started = time_module.time()
+        try:
+            with app.app_context():
+                strategy = Strategy.query.get(strategy_id)
+                if strategy:
+                    logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy_id}: calling check_supertrend_exit")
+                    self.check_supertrend_exit(strategy, app)
+        except Exception as e:
+            logger.error(f"Error monitoring strategy {strategy_id}: {e}", exc_info=True)
+
+        finished = time_module.time()
+        lag_ms = (finished - boundary) * 1000
+        self.evaluation_metrics[strategy_id] = {
+            'boundary': datetime.fromtimestamp(boundary, IST).replace(tzinfo=None),
+            'start_lag_ms': round((started - boundary) * 1000, 1),
+            'lag_ms': round(lag_ms, 1),
+            'duration_ms': round((finished - started) * 1000, 1)
+        }
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        logger.info(f"[SUPERTREND CYCLE {cycle_id}] Strategy {strategy_id}: evaluated {lag_ms:.0f}ms after the candle boundary")
+        return lag_ms
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Evaluation lag metrics for monitoring"""
+        return {
+            'workers': self.max_workers,
+            'last_cycle_lag_ms': round(self.last_cycle_lag_ms, 1),
+            'max_lag_ms': round(self.max_lag_ms, 1),
+            'strategies': dict(self.evaluation_metrics)
+        }
+
     def should_check_strategy(self, strategy: Strategy) -> bool:
         """
         Determine if this is a candle close time for the strategy's timeframe.
@@ -284,20 +409,12 @@ class SupertrendExitService:
 
                 # Calculate Supertrend on spread OHLC
                 # NOTE: Direction is calculated based on CLOSE price only (not high/low)
-                high = spread_data['high'].values
-                low = spread_data['low'].values
-                close = spread_data['close'].values
-
-                trend, direction, long, short = calculate_supertrend(
-                    high, low, close,
-                    period=strategy.supertrend_period,
-                    multiplier=strategy.supertrend_multiplier
-                )
+                state = self.update_supertrend_state(strategy, open_leg_ids, spread_data)
 
                 # Get latest values from COMPLETED candle (checked on candle close only)
-                latest_close = close[-1]
-                latest_supertrend = trend[-1]
-                latest_direction = direction[-1]  # Direction based on CLOSE crossing Supertrend
+                latest_close = state.prev_close
+                latest_supertrend = state.supertrend
+                latest_direction = state.direction  # Direction based on CLOSE crossing Supertrend
 
                 logger.info(f"[CHECK_EXIT] Strategy {strategy.id}: Supertrend values - close={latest_close:.2f}, ST={latest_supertrend:.2f}, direction={latest_direction} ({('BULLISH/UP' if latest_direction == -1 else 'BEARISH/DOWN')})")
                 logger.info(f"[CHECK_EXIT] Strategy {strategy.id}: Exit type={strategy.supertrend_exit_type}, Looking for direction={-1 if strategy.supertrend_exit_type == 'breakout' else 1}")
@@ -337,6 +454,92 @@ class SupertrendExitService:
             except Exception as e:
                 logger.error(f"Error checking Supertrend exit for strategy {strategy.id}: {e}", exc_info=True)
 
+    def _state_key(self, strategy: Strategy, open_leg_ids: set) -> str:
+        """Identifies what a SupertrendState was seeded for - a new session, leg set or config reseeds"""
+        legs = ','.join(str(leg_id) for leg_id in sorted(open_leg_ids or ()))
+        return (f"{get_ist_now().date().isoformat()}|{strategy.supertrend_timeframe}|"
+                f"{strategy.supertrend_period}|{strategy.supertrend_multiplier}|{legs}")
+
+    def _load_state(self, strategy: Strategy, key: str):
+        """
+        (state, fingerprint) in memory for this key, else the pair persisted on the
+        Strategy row; (None, None) if there is none
+        """
+        cached = self.supertrend_states.get(strategy.id)
+        if cached and cached[0] == key:
+            return cached[1], cached[2]
+
+        if strategy.supertrend_state:
+            try:
+                saved = json.loads(strategy.supertrend_state)
+                if saved.get('key') == key:
+                    return SupertrendState.from_dict(saved['state']), saved.get('fingerprint')
+            except Exception as e:
+                logger.warning(f"Strategy {strategy.id}: discarding unreadable Supertrend state: {e}")
+        return None, None
+
+    @staticmethod
+    def _bars_fingerprint(spread_data: pd.DataFrame, times: List[float], end: int) -> str:
+        """Hash of time and OHLC of the FINGERPRINT_BARS bars before index `end`"""
+        start = max(0, end - FINGERPRINT_BARS)
+        digest = hashlib.sha1(np.asarray(times[start:end], dtype=np.float64).tobytes())
+        for column in ('open', 'high', 'low', 'close'):
+            if column in spread_data:
+                digest.update(spread_data[column].to_numpy(dtype=np.float64)[start:end].tobytes())
+        return digest.hexdigest()
+
+    def update_supertrend_state(self, strategy: Strategy, open_leg_ids: set,
+                                spread_data: pd.DataFrame) -> SupertrendState:
+        """
+        Bring the strategy's streaming Supertrend up to the last bar of spread_data.
+
+        Seeds from the full history once per session/leg set; afterwards only bars
+        from the state's last bar onward are applied (the last bar is re-applied
+        in case it was still forming). The closed bars before it are fingerprinted;
+        if any of them changed since the last update (or the state's last bar is
+        gone) the state is reseeded. Persists the state on the Strategy row.
+        """
+        from app import db
+
+        key = self._state_key(strategy, open_leg_ids)
+        high = spread_data['high'].values
+        low = spread_data['low'].values
+        close = spread_data['close'].values
+        times = [pd.Timestamp(t).timestamp() for t in spread_data.index]
+
+        state, fingerprint = self._load_state(strategy, key)
+        start = times.index(state.last_time) if state is not None and state.last_time in times else None
+        if start is not None and fingerprint != self._bars_fingerprint(spread_data, times, start):
+            logger.info(f"Strategy {strategy.id}: bars before the Supertrend state's last bar changed - reseeding")
+            start = None
+
+        if start is not None:
+            for i in range(start, len(times)):
+                state.update(high[i], low[i], close[i], times[i])
+            logger.debug(f"Strategy {strategy.id}: streamed {len(times) - start} bar(s) into Supertrend state")
+        else:
+            state = SupertrendState.seed(high, low, close,
+                                         period=strategy.supertrend_period,
+                                         multiplier=strategy.supertrend_multiplier,
+                                         times=times)
+            logger.info(f"Strategy {strategy.id}: seeded Supertrend state from {len(times)} bars")
+
+        # The last bar may still be forming - it is re-applied next time, so it is not fingerprinted
+        fingerprint = self._bars_fingerprint(spread_data, times, max(len(times) - 1, 0))
+        self.supertrend_states[strategy.id] = (key, state, fingerprint)
+
+        try:
+            Strategy.query.filter_by(id=strategy.id).update(
+                {'supertrend_state': json.dumps({'key': key, 'state': state.to_dict(),
+                                                 'fingerprint': fingerprint})}
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Strategy {strategy.id}: failed to persist Supertrend state: {e}")
+
+        return state
+
     def fetch_combined_spread_data(self, strategy: Strategy, open_leg_ids: set = None) -> pd.DataFrame:
         """
         Fetch real-time combined spread data for strategy legs
@@ -437,7 +640,9 @@ class SupertrendExitService:
 
             leg_data_dict = {}
 
-            for leg in legs:
+            def fetch_leg(leg):
+                """History for one leg (runs on the candle cache fetch pool)"""
+                leg_data = {}
                 try:
                     # Use actual placed symbol if available
                     if leg.id in leg_symbols:
@@ -447,8 +652,9 @@ class SupertrendExitService:
                         symbol = leg.instrument
                         exchange = 'NSE'
 
-                    # Fetch historical data
-                    response = client.history(
+                    # Fetch historical data (cached; only new bars are requested)
+                    response = candle_cache.get_history(
+                        client=client,
                         symbol=symbol,
                         exchange=exchange,
                         interval=strategy.supertrend_timeframe,
@@ -461,7 +667,7 @@ class SupertrendExitService:
                         if all(col in response.columns for col in required_cols):
                             # Store data with action and lot size for proper spread calculation
                             lots = leg.lots or 1
-                            leg_data_dict[f"{leg.leg_number}_{symbol}"] = {
+                            leg_data[f"{leg.leg_number}_{symbol}"] = {
                                 'data': response,
                                 'action': leg.action,
                                 'lots': lots,
@@ -471,7 +677,8 @@ class SupertrendExitService:
                     elif isinstance(response, dict):
                         # Try fallback to base instrument
                         logger.warning(f"Option symbol {symbol} failed, trying {leg.instrument}")
-                        fallback_response = client.history(
+                        fallback_response = candle_cache.get_history(
+                            client=client,
                             symbol=leg.instrument,
                             exchange='NSE',
                             interval=strategy.supertrend_timeframe,
@@ -480,7 +687,7 @@ class SupertrendExitService:
                         )
                         if isinstance(fallback_response, pd.DataFrame) and not fallback_response.empty:
                             lots = leg.lots or 1
-                            leg_data_dict[f"{leg.leg_number}_{leg.instrument}"] = {
+                            leg_data[f"{leg.leg_number}_{leg.instrument}"] = {
                                 'data': fallback_response,
                                 'action': leg.action,
                                 'lots': lots,
@@ -489,84 +696,30 @@ class SupertrendExitService:
 
                 except Exception as e:
                     logger.error(f"Error fetching data for leg {leg.leg_number}: {e}")
-                    continue
+                return leg_data
+
+            # Fetch all legs concurrently (identical in-flight requests share one call)
+            for leg_data in candle_cache.map_concurrent(fetch_leg, legs):
+                leg_data_dict.update(leg_data)
 
             if not leg_data_dict:
                 logger.error(f"No data fetched for strategy {strategy.id}")
                 return None
 
-            # Combine OHLC data into spread using CORRECT formula: SELL - BUY with lot sizes
-            sell_dfs = []
-            buy_dfs = []
-
+            # Combine OHLC data into spread using CORRECT formula: SELL - BUY with lot sizes,
+            # then take absolute value (spread values should always be positive)
+            weighted_legs = []
             for leg_name, leg_info in leg_data_dict.items():
-                df = leg_info['data']
-                action = leg_info['action']
                 lots = leg_info['lots']
+                weight = lots if leg_info['action'] == 'SELL' else -lots
+                weighted_legs.append((leg_info['data'], weight))
+                logger.debug(f"  {leg_info['action']} leg {leg_info['leg_number']} x {lots} lots")
 
-                # Multiply OHLC by lot size
-                weighted_df = df[['open', 'high', 'low', 'close']].copy()
-                weighted_df['open'] = weighted_df['open'] * lots
-                weighted_df['high'] = weighted_df['high'] * lots
-                weighted_df['low'] = weighted_df['low'] * lots
-                weighted_df['close'] = weighted_df['close'] * lots
-
-                if action == 'SELL':
-                    sell_dfs.append(weighted_df)
-                    logger.debug(f"  SELL leg {leg_info['leg_number']} x {lots} lots")
-                else:  # BUY
-                    buy_dfs.append(weighted_df)
-                    logger.debug(f"  BUY leg {leg_info['leg_number']} x {lots} lots")
-
-            # Sum SELL legs
-            sell_total = None
-            if sell_dfs:
-                sell_total = sell_dfs[0].copy()
-                for df in sell_dfs[1:]:
-                    sell_total['open'] = sell_total['open'].add(df['open'], fill_value=0)
-                    sell_total['high'] = sell_total['high'].add(df['high'], fill_value=0)
-                    sell_total['low'] = sell_total['low'].add(df['low'], fill_value=0)
-                    sell_total['close'] = sell_total['close'].add(df['close'], fill_value=0)
-
-            # Sum BUY legs
-            buy_total = None
-            if buy_dfs:
-                buy_total = buy_dfs[0].copy()
-                for df in buy_dfs[1:]:
-                    buy_total['open'] = buy_total['open'].add(df['open'], fill_value=0)
-                    buy_total['high'] = buy_total['high'].add(df['high'], fill_value=0)
-                    buy_total['low'] = buy_total['low'].add(df['low'], fill_value=0)
-                    buy_total['close'] = buy_total['close'].add(df['close'], fill_value=0)
-
-            # Calculate spread = SELL - BUY, then take absolute value
-            # Spread values should always be positive
-            if sell_total is not None and buy_total is not None:
-                combined_df = sell_total.copy()
-                combined_df['open'] = sell_total['open'] - buy_total['open']
-                combined_df['high'] = sell_total['high'] - buy_total['high']
-                combined_df['low'] = sell_total['low'] - buy_total['low']
-                combined_df['close'] = sell_total['close'] - buy_total['close']
-
-                # Take absolute value of all OHLC - spread cannot be negative
-                combined_df['open'] = combined_df['open'].abs()
-                combined_df['high'] = combined_df['high'].abs()
-                combined_df['low'] = combined_df['low'].abs()
-                combined_df['close'] = combined_df['close'].abs()
-
-                # Ensure high >= low (swap if needed after abs())
-                high_vals = combined_df['high'].copy()
-                low_vals = combined_df['low'].copy()
-                combined_df['high'] = pd.concat([high_vals, low_vals], axis=1).max(axis=1)
-                combined_df['low'] = pd.concat([high_vals, low_vals], axis=1).min(axis=1)
-
-                logger.debug(f"  Spread calculated with absolute values (always positive)")
-            elif sell_total is not None:
-                combined_df = sell_total
-            elif buy_total is not None:
-                combined_df = buy_total
-            else:
+            spread = build_spread(weighted_legs, policy=current_app.config.get('SPREAD_MISSING_BAR_POLICY', 'intersect'))
+            if spread is None:
                 logger.error(f"No valid leg data for strategy {strategy.id}")
                 return None
+            combined_df = spread.to_frame()
 
             logger.debug(f"Combined spread data: {len(combined_df)} bars for strategy {strategy.id}")
             return combined_df
@@ -578,6 +731,14 @@ class SupertrendExitService:
     def trigger_sequential_exit(self, strategy: Strategy, exit_reason: str, app):
         """
         Trigger sequential exit for all open positions in the strategy.
+        Serialized per strategy: concurrent evaluations never exit the same strategy twice at once.
+        """
+        with self._exit_lock(strategy.id):
+            self._trigger_sequential_exit(strategy, exit_reason, app)
+
+    def _trigger_sequential_exit(self, strategy: Strategy, exit_reason: str, app):
+        """
+        Sequential exit for all open positions in the strategy (caller holds the strategy's exit lock).
 
         IMPORTANT: For multi-account strategies, each execution is closed on its own account.
         This ensures orders are placed to the correct broker account.
@@ -0,0 +1,287 @@
+"""
+Trading Calendar Service
+Single source of truth for market open/close shared by all background components.
+
+Key Features:
+- Compiles trading hours templates, holidays and special sessions into a sorted
+  interval index covering the next N days
+- is_open / next_open / next_close answered with a binary search (O(log n)),
+  no database access on the query path
+- Refreshed from the database on startup, by the daily cache refresh job, and
+  through invalidate() whenever trading hours are edited
+
+Precedence per date (matches the existing background service behaviour):
+1. Special trading sessions on that date (Muhurat etc.) - used even on holidays
+2. Market holiday (without special session flag) - market closed all day
+3. Holiday flagged as special session with its own start/end time
+4. Regular template sessions for that weekday
+"""
+import logging
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Default NSE hours when the database is not available (Monday to Friday)
+DEFAULT_SESSIONS = {day: [(time(9, 15), time(15, 30))] for day in range(5)}
+
+
+def get_ist_now() -> datetime:
+    """Get current time in IST (naive datetime)"""
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def compile_intervals(weekly_sessions: Dict[int, List[Tuple[time, time]]],
+                      holidays: Dict[date, Dict],
+                      special_sessions: Dict[date, List[Tuple[time, time]]],
+                      start_date: date,
+                      days: int) -> List[Tuple[datetime, datetime]]:
+    """
+    Compile calendar sources into sorted, non-overlapping (open, close) intervals.
+
+    Args:
+        weekly_sessions: weekday (0=Monday) -> [(start_time, end_time)]
+        holidays: date -> {'is_special_session', 'special_start_time', 'special_end_time'}
+        special_sessions: date -> [(start_time, end_time)]
+        start_date: First date of the window
+        days: Number of days in the window
+
+    Returns:
+        List of (open, close) naive IST datetimes sorted by open time
+    """
+    intervals = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+
+        if day in special_sessions:
+            day_sessions = special_sessions[day]
+        elif day in holidays:
+            holiday = holidays[day]
+            if not holiday.get('is_special_session'):
+                continue
+            if holiday.get('special_start_time') and holiday.get('special_end_time'):
+                day_sessions = [(holiday['special_start_time'], holiday['special_end_time'])]
+            else:
+                day_sessions = weekly_sessions.get(day.weekday(), [])
+        else:
+            day_sessions = weekly_sessions.get(day.weekday(), [])
+
+        for start_time, end_time in day_sessions:
+            if start_time < end_time:
+                intervals.append((datetime.combine(day, start_time), datetime.combine(day, end_time)))
+
+    # Merge overlapping sessions so each instant belongs to at most one interval
+    intervals.sort()
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class TradingCalendar:
+    """
+    Singleton precomputed trading calendar.
+
+    The index is two parallel sorted lists (opens, closes) swapped in as one
+    tuple, so readers never see a half-built index and never take a lock.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        """Singleton pattern - only one instance"""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        """Initialize the trading calendar"""
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.app = None
+        self.horizon_days = 14
+
+        # Raw sources (kept so the window can slide forward without the DB)
+        self._weekly_sessions: Dict[int, List[Tuple[time, time]]] = dict(DEFAULT_SESSIONS)
+        self._holidays: Dict[date, Dict] = {}
+        self._special_sessions: Dict[date, List[Tuple[time, time]]] = {}
+
+        # Index: (window_start, window_end, opens, closes)
+        self._index: Optional[Tuple[date, date, List[datetime], List[datetime]]] = None
+        self._build_lock = threading.Lock()
+        self.loaded_from_db = False
+        self.refreshed_at: Optional[datetime] = None
+
+        logger.debug("TradingCalendar initialized")
+
+    def init_app(self, app):
+        """Register the Flask app and build the index from the database"""
+        self.app = app
+        self.horizon_days = int(app.config.get('TRADING_CALENDAR_DAYS', self.horizon_days))
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload holidays, special sessions and template sessions from the database
+        and rebuild the index. Falls back to default NSE hours if the database
+        is not available.
+        """
+        try:
+            from flask import has_app_context
+
+            if has_app_context():
+                self._load_sources()
+            elif self.app is not None:
+                with self.app.app_context():
+                    self._load_sources()
+            else:
+                logger.warning("No Flask app available for trading calendar refresh - using defaults")
+                self._build_index()
+                return
+
+            self.loaded_from_db = True
+
+        except Exception as e:
+            logger.error(f"Error loading trading calendar from database: {e}")
+
+        self._build_index()
+
+    def invalidate(self):
+        """Hook for trading hours edits - rebuild the index from the database"""
+        logger.debug("Trading calendar invalidated - rebuilding")
+        self.refresh()
+
+    def _load_sources(self):
+        """Read calendar sources from the database (requires app context)"""
+        from app.models import TradingHoursTemplate, TradingSession, MarketHoliday, SpecialTradingSession
+
+        today = get_ist_now().date()
+        # Sources cover a wider window than the index so it can slide without the DB
+        window_end = today + timedelta(days=self.horizon_days * 2)
+
+        sessions = TradingSession.query.join(TradingHoursTemplate).filter(
+            TradingSession.is_active == True,
+            TradingHoursTemplate.is_active == True
+        ).all()
+        weekly_sessions: Dict[int, List[Tuple[time, time]]] = {}
+        for session in sessions:
+            weekly_sessions.setdefault(session.day_of_week, []).append((session.start_time, session.end_time))
+
+        holidays = {}
+        for holiday in MarketHoliday.query.filter(
+            MarketHoliday.holiday_date >= today,
+            MarketHoliday.holiday_date <= window_end
+        ).all():
+            holidays[holiday.holiday_date] = {
+                'holiday_name': holiday.holiday_name,
+                'is_special_session': holiday.is_special_session,
+                'special_start_time': holiday.special_start_time,
+                'special_end_time': holiday.special_end_time
+            }
+
+        special_sessions: Dict[date, List[Tuple[time, time]]] = {}
+        for session in SpecialTradingSession.query.filter(
+            SpecialTradingSession.session_date >= today,
+            SpecialTradingSession.session_date <= window_end,
+            SpecialTradingSession.is_active == True
+        ).all():
+            special_sessions.setdefault(session.session_date, []).append((session.start_time, session.end_time))
+
+        self._weekly_sessions = weekly_sessions
+        self._holidays = holidays
+        self._special_sessions = special_sessions
+
+    def _build_index(self, start_date: Optional[date] = None):
+        """Compile the interval index for [start_date, start_date + horizon_days)"""
+        with self._build_lock:
+            start_date = start_date or get_ist_now().date()
+            intervals = compile_intervals(
+                self._weekly_sessions, self._holidays, self._special_sessions,
+                start_date, self.horizon_days
+            )
+            self._index = (
+                start_date,
+                start_date + timedelta(days=self.horizon_days),
+                [opens for opens, _ in intervals],
+                [closes for _, closes in intervals]
+            )
+            self.refreshed_at = get_ist_now()
+
+        logger.debug(f"Trading calendar compiled: {len(intervals)} sessions over {self.horizon_days} days "
+                     f"from {start_date}")
+
+    def _get_index(self, now: datetime):
+        """Current index, slid forward in memory if `now` left the window"""
+        index = self._index
+        if index is None or not (index[0] <= now.date() < index[1] - timedelta(days=1)):
+            # Rebuild from in-memory sources - no DB access on the query path
+            self._build_index(now.date())
+            index = self._index
+        return index
+
+    def is_open(self, now: Optional[datetime] = None, pre_open_minutes: int = 0) -> bool:
+        """
+        Check if the market is open.
+
+        Args:
+            now: Naive IST datetime (defaults to current IST time)
+            pre_open_minutes: Treat the market as open this many minutes before each session
+
+        Returns:
+            bool: True if within a trading session (session end inclusive)
+        """
+        now = now or get_ist_now()
+        _, _, opens, closes = self._get_index(now)
+        i = bisect_right(opens, now + timedelta(minutes=pre_open_minutes)) - 1
+        return i >= 0 and now <= closes[i]
+
+    def next_open(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Start of the first session opening after `now` (None if none in the window)"""
+        now = now or get_ist_now()
+        _, _, opens, _ = self._get_index(now)
+        i = bisect_right(opens, now)
+        return opens[i] if i < len(opens) else None
+
+    def next_close(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """End of the current session, or of the next one if the market is closed"""
+        now = now or get_ist_now()
+        _, _, opens, closes = self._get_index(now)
+        i = bisect_right(opens, now) - 1
+        if i >= 0 and now <= closes[i]:
+            return closes[i]
+        return closes[i + 1] if i + 1 < len(closes) else None
+
+    def is_holiday(self, check_date: Optional[date] = None) -> bool:
+        """Check if the date is a market holiday without a special session"""
+        check_date = check_date or get_ist_now().date()
+        holiday = self._holidays.get(check_date)
+        return bool(holiday) and not holiday.get('is_special_session') and check_date not in self._special_sessions
+
+    def get_status(self) -> Dict:
+        """Calendar status for admin pages"""
+        now = get_ist_now()
+        next_open = self.next_open(now)
+        next_close = self.next_close(now)
+        return {
+            'is_open': self.is_open(now),
+            'next_open': next_open.isoformat() if next_open else None,
+            'next_close': next_close.isoformat() if next_close else None,
+            'loaded_from_db': self.loaded_from_db,
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None
+        }
+
+
+# Global instance
+trading_calendar = TradingCalendar()
@@ -0,0 +1,142 @@
+"""
+Trailing Stop Loss State
+In-memory AFL-style ratchet state for one strategy, owned by RiskManager.
+
+The state is updated on every P&L evaluation (so intra-cycle peaks are not
+missed) and written back to the Strategy row by RiskManager's write-behind
+flush - at most every TSL_PERSIST_SECONDS, and immediately on a state
+transition. On restart it is recovered from the Strategy row.
+
+States:
+    WAITING   - no initial stop yet (fresh entry)
+    ACTIVE    - tracking peak P&L and ratcheting the stop UP
+    TRIGGERED - P&L dropped to/below the stop, positions being exited
+"""
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+WAITING = 'waiting'
+ACTIVE = 'active'
+TRIGGERED = 'triggered'
+
+
+class TrailingStopState:
+    """
+    Ratchet state for one strategy.
+
+    Stop = Initial Stop + Peak P&L, and the stop never moves down.
+    """
+
+    def __init__(self, strategy_id: int, active: bool = False, peak_pnl: float = 0.0,
+                 initial_stop: Optional[float] = None, stop: Optional[float] = None,
+                 triggered_at: Optional[datetime] = None, exit_reason: Optional[str] = None):
+        self.strategy_id = strategy_id
+        self.active = bool(active)
+        self.peak_pnl = peak_pnl or 0.0
+        self.initial_stop = initial_stop
+        self.stop = stop
+        self.triggered_at = triggered_at
+        self.exit_reason = exit_reason
+
+        # Write-behind bookkeeping
+        self.dirty = False
+        self.transitioned = False  # Set on state change - flushed without waiting for the interval
+        self.last_persisted = time.monotonic()
+
+    @classmethod
+    def from_strategy(cls, strategy) -> 'TrailingStopState':
+        """Recover state from the persisted Strategy row"""
+        return cls(
+            strategy_id=strategy.id,
+            active=strategy.trailing_sl_active,
+            peak_pnl=strategy.trailing_sl_peak_pnl,
+            initial_stop=strategy.trailing_sl_initial_stop,
+            stop=strategy.trailing_sl_trigger_pnl,
+            triggered_at=strategy.trailing_sl_triggered_at,
+            exit_reason=strategy.trailing_sl_exit_reason
+        )
+
+    @property
+    def state(self) -> str:
+        if self.triggered_at:
+            return TRIGGERED
+        if self.initial_stop is None:
+            return WAITING
+        return ACTIVE
+
+    def _changed(self, transition: bool = False):
+        self.dirty = True
+        if transition:
+            self.transitioned = True
+
+    def update(self, current_pnl: float, initial_stop_pnl: float) -> float:
+        """
+        Apply one P&L observation and return the (ratcheted) stop.
+
+        Args:
+            current_pnl: Combined strategy P&L
+            initial_stop_pnl: Initial stop to use if none is set yet (max loss from entry)
+        """
+        if self.initial_stop is None:
+            # WAITING -> ACTIVE
+            self.initial_stop = initial_stop_pnl
+            self._changed(transition=True)
+
+        if not self.active:
+            self.active = True
+            self._changed(transition=True)
+
+        if current_pnl > self.peak_pnl:
+            self.peak_pnl = current_pnl
+            self._changed()
+
+        # Ratchet: current stop can only increase from previous value
+        new_stop = self.initial_stop + self.peak_pnl
+        previous_stop = self.stop if self.stop is not None else self.initial_stop
+        new_stop = max(new_stop, previous_stop)
+        if new_stop != self.stop:
+            self.stop = new_stop
+            self._changed()
+
+        return self.stop
+
+    def trigger(self, exit_reason: str, triggered_at: datetime):
+        """ACTIVE -> TRIGGERED"""
+        self.triggered_at = triggered_at
+        self.exit_reason = exit_reason
+        self._changed(transition=True)
+
+    def deactivate(self):
+        """No open positions - clear active tracking (triggered_at kept for history)"""
+        if self.active or self.initial_stop is not None or self.peak_pnl or self.stop is not None:
+            self.active = False
+            self.peak_pnl = 0.0
+            self.initial_stop = None
+            self.stop = None
+            self._changed(transition=True)
+
+    def due(self, interval_seconds: float, now: Optional[float] = None) -> bool:
+        """True if the state should be written now"""
+        if not self.dirty:
+            return False
+        if self.transitioned:
+            return True
+        return (now or time.monotonic()) - self.last_persisted >= interval_seconds
+
+    def to_row(self) -> Dict:
+        """Strategy column values for a bulk UPDATE"""
+        return {
+            'id': self.strategy_id,
+            'trailing_sl_active': self.active,
+            'trailing_sl_peak_pnl': self.peak_pnl,
+            'trailing_sl_initial_stop': self.initial_stop,
+            'trailing_sl_trigger_pnl': self.stop,
+            'trailing_sl_triggered_at': self.triggered_at,
+            'trailing_sl_exit_reason': self.exit_reason
+        }
+
+    def mark_persisted(self):
+        self.dirty = False
+        self.transitioned = False
+        self.last_persisted = time.monotonic()
@@ -111,6 +111,42 @@ class Config:
     PING_MONITORING_ENABLED = os.environ.get('PING_MONITORING_ENABLED', 'true').lower() == 'true'
     PING_MAX_FAILURES = int(os.environ.get('PING_MAX_FAILURES', 3))
     PING_QUIET_MODE = os.environ.get('PING_QUIET_MODE', 'false').lower() == 'true'  # Reduces log noise
+
+    # Strategy execution: place multi-leg entries as one basket order per account per phase
+    BASKET_ORDERS_ENABLED = os.environ.get('BASKET_ORDERS_ENABLED', 'true').lower() == 'true'
+
+    # Risk management: re-check strategies on WebSocket ticks instead of only polling
+    RISK_TICK_DRIVEN_ENABLED = os.environ.get('RISK_TICK_DRIVEN_ENABLED', 'true').lower() == 'true'
+    RISK_TICK_DEBOUNCE_MS = int(os.environ.get('RISK_TICK_DEBOUNCE_MS', 250))  # Max one check per strategy per window
+    RISK_SAFETY_SCAN_SECONDS = int(os.environ.get('RISK_SAFETY_SCAN_SECONDS', 30))  # Full scan interval when tick-driven
+    TSL_PERSIST_SECONDS = int(os.environ.get('TSL_PERSIST_SECONDS', 5))  # Trailing SL write-behind interval
+
+    # Trading calendar: days of sessions compiled into the in-memory interval index
+    TRADING_CALENDAR_DAYS = int(os.environ.get('TRADING_CALENDAR_DAYS', 14))
+
+    # Order status polling: fast checks for fresh orders, then exponential backoff
+    ORDER_POLL_FAST_MS = int(os.environ.get('ORDER_POLL_FAST_MS', 250))
+    ORDER_POLL_FAST_WINDOW_SECONDS = int(os.environ.get('ORDER_POLL_FAST_WINDOW_SECONDS', 5))
+    ORDER_POLL_MAX_INTERVAL_SECONDS = int(os.environ.get('ORDER_POLL_MAX_INTERVAL_SECONDS', 30))
+
+    # OHLC candle cache: shared leg history, only bars newer than the last stored bar are fetched
+    CANDLE_CACHE_REFRESH_SECONDS = int(os.environ.get('CANDLE_CACHE_REFRESH_SECONDS', 5))  # Reuse a fetch this long
+    CANDLE_CACHE_RETENTION_DAYS = int(os.environ.get('CANDLE_CACHE_RETENTION_DAYS', 7))
+    CANDLE_FETCH_WORKERS = int(os.environ.get('CANDLE_FETCH_WORKERS', 8))  # Legs fetched concurrently
+    CANDLE_LIVE_RECONCILE_SECONDS = int(os.environ.get('CANDLE_LIVE_RECONCILE_SECONDS', 300))  # Tick-built bars re-fetched
+
+    # Funds cache: margin sizing reuses a funds response this long (refreshed after every fill)
+    FUNDS_CACHE_TTL_SECONDS = float(os.environ.get('FUNDS_CACHE_TTL_SECONDS', 2))
+
+    # Supertrend exits: strategies due at a candle close are evaluated concurrently
+    SUPERTREND_EVAL_WORKERS = int(os.environ.get('SUPERTREND_EVAL_WORKERS', 4))
+    # Bars missing from some legs of a spread: 'intersect' (drop), 'ffill' (flat at previous close) or 'zero'
+    SPREAD_MISSING_BAR_POLICY = os.environ.get('SPREAD_MISSING_BAR_POLICY', 'intersect')
+
+    # Supertrend exit backtests (replayed from the candle store on a process pool; 0 = one per core)
+    SUPERTREND_BACKTEST_WORKERS = int(os.environ.get('SUPERTREND_BACKTEST_WORKERS', 0))
+    SUPERTREND_BACKTEST_SLIPPAGE_PCT = float(os.environ.get('SUPERTREND_BACKTEST_SLIPPAGE_PCT', 0.5))  # Per fill
+    SUPERTREND_BACKTEST_RETENTION_DAYS = int(os.environ.get('SUPERTREND_BACKTEST_RETENTION_DAYS', 400))  # ohlc_candles
     
 class DevelopmentConfig(Config):
     DEBUG = True
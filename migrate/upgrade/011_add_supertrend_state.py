@@ -0,0 +1,34 @@
+"""
+Migration: Add supertrend_state column to strategies table
+
+This column stores the serialized streaming Supertrend state (Wilder ATR
+accumulator, final bands, direction) used by the Supertrend exit service:
+- supertrend_state: JSON of SupertrendState.to_dict() plus the session and
+  leg set it was seeded for, so a restart continues without a full recompute
+"""
+
+from sqlalchemy import text
+
+
+def upgrade(db):
+    """Add supertrend_state column to strategies table"""
+
+    # Check existing columns
+    result = db.session.execute(text("PRAGMA table_info(strategies)"))
+    columns = [row[1] for row in result.fetchall()]
+
+    if 'supertrend_state' not in columns:
+        db.session.execute(text(
+            "ALTER TABLE strategies ADD COLUMN supertrend_state TEXT"
+        ))
+        db.session.commit()
+        print("  Added column: supertrend_state")
+    else:
+        print("  Column supertrend_state already exists, skipping")
+
+
+def downgrade(db):
+    """Remove supertrend_state column (SQLite doesn't support DROP COLUMN easily)"""
+    # SQLite doesn't support DROP COLUMN directly
+    # Would need to recreate table - not implemented for simplicity
+    pass
@@ -0,0 +1,145 @@
+"""
+Unit tests for the tick-to-bar aggregator and its hand-off to the candle cache
+"""
+
+import pandas as pd
+import pytest
+
+from app.utils.bar_aggregator import BarAggregator, bar_start
+from app.utils.candle_cache import candle_cache
+
+
+def _epoch(ist):
+    return int(pd.Timestamp(ist, tz='Asia/Kolkata').timestamp())
+
+
+def test_bars_align_to_session_open():
+    assert bar_start(_epoch('2026-01-05 09:24:59'), 10) == _epoch('2026-01-05 09:15')
+    assert bar_start(_epoch('2026-01-05 09:25:00'), 10) == _epoch('2026-01-05 09:25')
+    assert bar_start(_epoch('2026-01-05 09:20:30'), 3) == _epoch('2026-01-05 09:18')
+    assert bar_start(_epoch('2026-01-05 15:29:59'), 15) == _epoch('2026-01-05 15:15')
+
+
+@pytest.fixture
+def aggregator():
+    agg = BarAggregator()
+    agg._forming.clear()
+    agg._completed.clear()
+    agg._last_volume.clear()
+    for state in (candle_cache._frames, candle_cache._covered_from, candle_cache._fetched_at,
+                  candle_cache._live_until, candle_cache._live_since):
+        state.clear()
+    yield agg
+    agg._forming.clear()
+    agg._completed.clear()
+    agg._last_volume.clear()
+    for state in (candle_cache._frames, candle_cache._covered_from, candle_cache._fetched_at,
+                  candle_cache._live_until, candle_cache._live_since):
+        state.clear()
+
+
+def test_ticks_build_bars_and_partial_first_bar_is_dropped(aggregator):
+    t0 = _epoch('2026-01-05 09:16:30')  # stream starts mid-bar
+    aggregator.update('OPT', 'NFO', 100.0, now=t0, volume=1000)
+    aggregator.update('OPT', 'NFO', 101.0, now=_epoch('2026-01-05 09:17:10'), volume=1100)
+    aggregator.update('OPT', 'NFO', 99.0, now=_epoch('2026-01-05 09:17:20'), volume=1150)
+    aggregator.update('OPT', 'NFO', 102.0, now=_epoch('2026-01-05 09:17:50'), volume=1200)
+    aggregator.update('OPT', 'NFO', 103.0, now=_epoch('2026-01-05 09:18:05'), volume=1260)
+
+    one_minute = aggregator.get_bars('OPT', 'NFO', '1m')
+    assert len(one_minute) == 1  # 09:16 was partial
+    bar = one_minute.iloc[0]
+    assert one_minute.index[0] == pd.Timestamp('2026-01-05 09:17', tz='Asia/Kolkata')
+    assert (bar.open, bar.high, bar.low, bar.close, bar.volume) == (101.0, 102.0, 99.0, 102.0, 200.0)
+    assert aggregator.get_bars('OPT', 'NFO', '3m').empty  # 09:15 3m bar was partial too
+
+
+def test_flush_closes_bars_without_a_next_tick(aggregator):
+    aggregator.update('OPT', 'NFO', 100.0, now=_epoch('2026-01-05 09:19:59'))
+    aggregator.update('OPT', 'NFO', 100.5, now=_epoch('2026-01-05 09:20:10'))
+    aggregator.update('OPT', 'NFO', 98.0, now=_epoch('2026-01-05 09:24:40'))
+
+    assert aggregator.flush_due(now=_epoch('2026-01-05 09:24:59')) == 0
+    assert aggregator.flush_due(now=_epoch('2026-01-05 09:25:00')) == 2  # 09:24 1m and 09:20 5m bars
+
+    assert list(aggregator.get_bars('OPT', 'NFO', '1m').close) == [100.5, 98.0]  # partial 09:19 dropped
+    five_minute = aggregator.get_bars('OPT', 'NFO', '5m')
+    assert list(five_minute.close) == [98.0] and list(five_minute.high) == [100.5]
+    assert aggregator.get_bars('OPT', 'NFO', '10m').empty  # 09:15 10m bar was partial
+
+
+def test_live_bars_extend_cached_history_without_a_history_call(aggregator, monkeypatch):
+    now = pd.Timestamp.now(tz='Asia/Kolkata').floor('5min')
+    start = now - pd.Timedelta(minutes=30)
+    index = pd.date_range(start, periods=5, freq='5min', name='timestamp')  # live bar extends this
+    history = pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0}, index=index)
+    candle_cache._frames[('OPT', 'NFO', '5m')] = history
+    candle_cache._covered_from[('OPT', 'NFO', '5m')] = start.strftime('%Y-%m-%d')
+    candle_cache._fetched_at[('OPT', 'NFO', '5m')] = 0.0
+
+    last_start = int((now - pd.Timedelta(minutes=5)).timestamp())
+    aggregator._publish('OPT', 'NFO', [('5m', _closed_bar(last_start, 300))])
+
+    class NoHistory:
+        def history(self, **kwargs):
+            raise AssertionError('history endpoint called')
+
+    frame = candle_cache.get_history(NoHistory(), 'OPT', 'NFO', '5m', start.strftime('%Y-%m-%d'),
+                                     now.strftime('%Y-%m-%d'))
+    assert len(frame) == 6 and frame['close'].iloc[-1] == 3.5
+
+
+def _closed_bar(start, seconds):
+    from app.utils.bar_aggregator import _Bar
+    bar = _Bar(start, start + seconds, 3.0, partial=False)
+    bar.high, bar.low, bar.close = 4.0, 2.5, 3.5
+    return bar
+
+
+def _cached_history(now, periods=5):
+    start = now - pd.Timedelta(minutes=5 * (periods + 1))
+    index = pd.date_range(start, periods=periods, freq='5min', name='timestamp')
+    history = pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0}, index=index)
+    candle_cache._frames[('OPT', 'NFO', '5m')] = history
+    candle_cache._covered_from[('OPT', 'NFO', '5m')] = start.strftime('%Y-%m-%d')
+    candle_cache._fetched_at[('OPT', 'NFO', '5m')] = 0.0
+    return start
+
+
+class TailHistory:
+    def __init__(self):
+        self.calls = []
+
+    def history(self, **kwargs):
+        self.calls.append(kwargs)
+        return pd.DataFrame()
+
+
+def test_live_bar_after_a_gap_is_dropped_and_history_is_fetched(aggregator):
+    now = pd.Timestamp.now(tz='Asia/Kolkata').floor('5min')
+    start = _cached_history(now)  # last cached bar at now - 10 minutes
+
+    gap_start = int(now.timestamp())  # skips the now - 5 minutes bar
+    assert not candle_cache.add_live_bar('OPT', 'NFO', '5m', gap_start, 300, 3.0, 4.0, 2.5, 3.5, 1.0)
+
+    client = TailHistory()
+    frame = candle_cache.get_history(client, 'OPT', 'NFO', '5m', start.strftime('%Y-%m-%d'),
+                                     now.strftime('%Y-%m-%d'))
+    assert len(client.calls) == 1 and len(frame) == 5
+
+
+def test_live_bars_are_reconciled_with_a_periodic_fetch(aggregator, monkeypatch):
+    now = pd.Timestamp.now(tz='Asia/Kolkata').floor('5min')
+    start = _cached_history(now)
+    last_start = int((now - pd.Timedelta(minutes=5)).timestamp())
+    assert candle_cache.add_live_bar('OPT', 'NFO', '5m', last_start, 300, 3.0, 4.0, 2.5, 3.5, 1.0)
+
+    client = TailHistory()
+    dates = (start.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d'))
+    candle_cache.get_history(client, 'OPT', 'NFO', '5m', *dates)
+    assert client.calls == []
+
+    # Live bars older than the reconcile interval no longer stand in for the broker's bars
+    monkeypatch.setattr(candle_cache, 'live_reconcile_seconds', 0)
+    candle_cache.get_history(client, 'OPT', 'NFO', '5m', *dates)
+    assert len(client.calls) == 1
@@ -0,0 +1,114 @@
+"""
+Unit tests for the basket order fast path of StrategyExecutor (result mapping and fallback rules)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from app.utils import strategy_executor as executor_module
+from app.utils.strategy_executor import StrategyExecutor
+
+ACCOUNT = SimpleNamespace(id=1, account_name='acc', host_url='h', get_api_key=lambda: 'k')
+
+
+def _leg(number, action='SELL'):
+    return SimpleNamespace(leg_number=number, action=action, order_type='MARKET', limit_price=None)
+
+
+def _items(*symbols):
+    return [(_leg(i + 1), symbol, 'NFO', 75) for i, symbol in enumerate(symbols)]
+
+
+class _Lock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeBasketClient:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.baskets = []
+
+    def basketorder(self, strategy, orders):
+        self.baskets.append(orders)
+        if self.error:
+            raise self.error
+        return self.response
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    ex = StrategyExecutor.__new__(StrategyExecutor)
+    ex.strategy = SimpleNamespace(name='straddle', product_order_type='MIS', user_id=1)
+    ex.app = Flask('basket_test')
+    ex.recorded = []
+    ex.per_leg = []
+    monkeypatch.setattr(ex, '_record_pending_order',
+                        lambda account, leg, symbol, exchange, quantity, order_id, results:
+                        (ex.recorded.append((leg.leg_number, symbol, order_id)),
+                         results.append({'leg': leg.leg_number, 'status': 'pending', 'order_id': order_id})))
+    monkeypatch.setattr(ex, '_execute_on_account',
+                        lambda account, leg, symbol, exchange, quantity, results, index:
+                        (ex.per_leg.append(leg.leg_number),
+                         results.append({'leg': leg.leg_number, 'status': 'pending'})))
+    return ex
+
+
+def _use_client(monkeypatch, client):
+    monkeypatch.setattr(executor_module, 'ExtendedOpenAlgoAPI', lambda api_key, host: client)
+
+
+def test_results_map_back_to_legs_by_symbol(executor, monkeypatch):
+    # Two legs on the same symbol are matched in submission order
+    client = FakeBasketClient({'status': 'success', 'results': [
+        {'symbol': 'NIFTYPE', 'status': 'success', 'orderid': 'B2'},
+        {'symbol': 'NIFTYCE', 'status': 'success', 'orderid': 'B1'},
+        {'symbol': 'NIFTYCE', 'status': 'success', 'orderid': 'B3'},
+    ]})
+    _use_client(monkeypatch, client)
+
+    rejected = executor._place_basket_order(ACCOUNT, _items('NIFTYCE', 'NIFTYPE', 'NIFTYCE'), [])
+
+    assert rejected == []
+    assert executor.recorded == [(1, 'NIFTYCE', 'B1'), (2, 'NIFTYPE', 'B2'), (3, 'NIFTYCE', 'B3')]
+    assert [order['pricetype'] for order in client.baskets[0]] == ['MARKET'] * 3
+
+
+def test_only_explicitly_rejected_legs_fall_back(executor, monkeypatch):
+    _use_client(monkeypatch, FakeBasketClient({'status': 'success', 'results': [
+        {'symbol': 'NIFTYCE', 'status': 'success', 'orderid': 'B1'},
+        {'symbol': 'NIFTYPE', 'status': 'error', 'message': 'Margin exceeded'},
+        {'symbol': 'BANKCE', 'status': 'success'},
+    ]}))
+    results = []
+
+    executor._execute_basket_on_account(ACCOUNT, _items('NIFTYCE', 'NIFTYPE', 'BANKCE', 'BANKPE'), [],
+                                        results, _Lock())
+
+    # Leg 2 was rejected: retried per leg. Legs 3 (no order id) and 4 (no result) are not resubmitted.
+    assert executor.per_leg == [2]
+    errors = {r['leg']: r for r in results if r['status'] == 'error'}
+    assert set(errors) == {3, 4}
+    assert 'check the broker orderbook' in errors[4]['error']
+
+
+@pytest.mark.parametrize('client', [
+    FakeBasketClient(error=TimeoutError('read timed out')),
+    FakeBasketClient({'status': 'error', 'message': 'gateway error'}),
+])
+def test_unknown_basket_outcome_is_never_resubmitted(executor, monkeypatch, client):
+    _use_client(monkeypatch, client)
+    results = []
+
+    executor._execute_basket_on_account(ACCOUNT, _items('NIFTYCE', 'NIFTYPE'), [], results, _Lock())
+
+    assert executor.per_leg == [] and executor.recorded == []
+    assert len(client.baskets) == 1
+    assert sorted(r['leg'] for r in results) == [1, 2]
+    assert all(r['status'] == 'error' for r in results)
@@ -0,0 +1,164 @@
+"""
+Unit tests for the shared OHLC candle cache (tail fetch, memory reuse, write-through,
+single-flight and concurrent leg fetch)
+"""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+from flask import Flask, has_app_context
+
+from app import db
+from app.models import OHLCCandle
+from app.utils.candle_cache import CandleCache
+
+TODAY = pd.Timestamp.now(tz='Asia/Kolkata').normalize()
+START = (TODAY - pd.Timedelta(days=2)).strftime('%Y-%m-%d')
+END = TODAY.strftime('%Y-%m-%d')
+
+
+def _bars(start, count, close=100.0):
+    """5m bars shaped like the OpenAlgo SDK's history() frame"""
+    index = pd.date_range(start, periods=count, freq='5min', tz='Asia/Kolkata', name='timestamp')
+    values = [close + i for i in range(count)]
+    return pd.DataFrame({'open': values, 'high': values, 'low': values, 'close': values,
+                         'volume': [10] * count}, index=index)
+
+
+class FakeClient:
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = []
+
+    def history(self, symbol, exchange, interval, start_date, end_date):
+        self.calls.append(start_date)
+        window = self.frame.loc[start_date:end_date]
+        if window.empty:
+            return {'status': 'error', 'message': 'No data available', 'error_type': 'no_data'}
+        return window.copy()
+
+
+@pytest.fixture
+def cache():
+    app = Flask('candle_cache_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        c = CandleCache()
+        c._frames.clear()
+        c._covered_from.clear()
+        c._fetched_at.clear()
+        c.refresh_seconds = 0
+        yield c
+        c._frames.clear()
+        c._covered_from.clear()
+        c._fetched_at.clear()
+        db.session.remove()
+
+
+def test_first_call_fetches_window_then_only_the_tail(cache):
+    history = pd.concat([_bars(TODAY - pd.Timedelta(days=1) + pd.Timedelta(hours=9), 75),
+                         _bars(TODAY + pd.Timedelta(hours=9, minutes=15), 10, close=200.0)])
+    client = FakeClient(history)
+
+    first = cache.get_history(client, 'NIFTY', 'NFO', '5m', START, END)
+    assert client.calls == [START] and len(first) == 85
+
+    # Forming bar revised, one new bar appended
+    revised = pd.concat([history.iloc[:-1], _bars(history.index[-1], 2, close=300.0)])
+    client.frame = revised
+    second = cache.get_history(client, 'NIFTY', 'NFO', '5m', START, END)
+
+    assert client.calls == [START, END]  # tail only: from the last stored bar's date
+    pd.testing.assert_frame_equal(second, revised.loc[START:END], check_freq=False)
+
+
+def test_recent_fetch_is_shared_without_calling_history(cache):
+    client = FakeClient(_bars(TODAY + pd.Timedelta(hours=9, minutes=15), 20))
+    cache.refresh_seconds = 60
+
+    cache.get_history(client, 'BANKNIFTY', 'NFO', '5m', START, END)
+    again = cache.get_history(client, 'BANKNIFTY', 'NFO', '5m', START, END)
+
+    assert client.calls == [START] and len(again) == 20
+
+
+def test_error_without_cache_is_returned_and_cached_window_survives_errors(cache):
+    client = FakeClient(_bars(TODAY + pd.Timedelta(hours=9, minutes=15), 5))
+    missing = cache.get_history(client, 'NOPE', 'NFO', '5m', '2000-01-01', '2000-01-02')
+    assert isinstance(missing, dict)
+
+    cache.get_history(client, 'NIFTY', 'NFO', '5m', START, END)
+    client.history = lambda **kwargs: {'status': 'error', 'message': 'timeout'}
+    assert len(cache.get_history(client, 'NIFTY', 'NFO', '5m', START, END)) == 5
+
+
+def test_candles_are_written_through_and_reloaded(cache):
+    bars = _bars(TODAY + pd.Timedelta(hours=9, minutes=15), 12)
+    cache.get_history(FakeClient(bars), 'NIFTY', 'NFO', '5m', START, END)
+    assert OHLCCandle.query.count() == 12
+
+    # Restart: in-memory frames gone, stored candles reloaded - only the tail is fetched
+    cache._frames.clear()
+    cache._covered_from.clear()
+    cache._fetched_at.clear()
+    client = FakeClient(bars)
+    reloaded = cache.get_history(client, 'NIFTY', 'NFO', '5m', END, END)
+
+    assert client.calls == [END]
+    pd.testing.assert_frame_equal(reloaded, bars, check_freq=False, check_dtype=False)
+    assert OHLCCandle.query.count() == 12
+
+
+
+def test_table_keeps_backtest_retention_while_memory_keeps_recent_bars(cache, monkeypatch):
+    monkeypatch.setattr(cache, 'retention_days', 7)
+    monkeypatch.setattr(cache, 'store_retention_days', 400)
+    old = _bars(TODAY - pd.Timedelta(days=20) + pd.Timedelta(hours=9, minutes=15), 6)
+    recent = _bars(TODAY + pd.Timedelta(hours=9, minutes=15), 4)
+    start = (TODAY - pd.Timedelta(days=21)).strftime('%Y-%m-%d')
+
+    frame = cache.get_history(FakeClient(pd.concat([old, recent])), 'NIFTY', 'NFO', '5m', start, END)
+
+    assert len(frame) == 4
+    assert OHLCCandle.query.count() == 10
+    assert len(cache.stored_sessions('NFO', '5m', 'NIFTY')) == 2
+
+class SlowClient(FakeClient):
+    def history(self, **kwargs):
+        time.sleep(0.2)
+        return super().history(**kwargs)
+
+
+def test_concurrent_identical_requests_share_one_call(cache):
+    client = SlowClient(_bars(TODAY + pd.Timedelta(hours=9, minutes=15), 8))
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_history(client, 'NIFTY', 'NFO', '5m', START, END))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == [START]
+    assert [len(result) for result in results] == [8, 8, 8, 8]
+
+
+def test_map_concurrent_runs_legs_in_parallel_in_order(cache):
+    client = SlowClient(_bars(TODAY + pd.Timedelta(hours=9, minutes=15), 3))
+    symbols = ['A', 'B', 'C', 'D']
+
+    started = time.monotonic()
+    frames = cache.map_concurrent(
+        lambda symbol: (symbol, has_app_context(), cache.get_history(client, symbol, 'NFO', '5m', START, END)),
+        symbols
+    )
+
+    assert time.monotonic() - started < 0.6  # 4 x 0.2s sequentially
+    assert [symbol for symbol, _, _ in frames] == symbols
+    assert all(in_context and len(frame) == 3 for _, in_context, frame in frames)
+    assert OHLCCandle.query.count() == 12  # written through from the pool threads
@@ -0,0 +1,73 @@
+"""
+Unit tests for the column-wise chart payload of the TradingView chart-data endpoint
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.tradingview.routes import IST_OFFSET, _chart_columns, _chart_payload
+from app.utils.supertrend import calculate_supertrend
+
+
+def _spread(n=600):
+    rng = np.random.default_rng(7)
+    close = 150 + np.cumsum(rng.normal(0, 1, n))
+    index = pd.date_range('2026-01-05 09:15', periods=n, freq='3min', tz='Asia/Kolkata', name='timestamp')
+    return pd.DataFrame({'open': close + 0.5, 'high': close + 1, 'low': close - 1, 'close': close}, index=index)
+
+
+def _reference_rows(spread_data, trend, direction, period):
+    """The per-bar .iloc loop the endpoint used before"""
+    rows = []
+    for i, timestamp in enumerate(spread_data.index):
+        if i < period:
+            continue
+        rows.append({
+            'time': int(timestamp.timestamp()) + IST_OFFSET,
+            'open': float(spread_data['open'].iloc[i]),
+            'high': float(spread_data['high'].iloc[i]),
+            'low': float(spread_data['low'].iloc[i]),
+            'close': float(spread_data['close'].iloc[i]),
+            'supertrend': float(trend[i]) if not np.isnan(trend[i]) else None,
+            'direction': int(direction[i]) if not np.isnan(direction[i]) else 0
+        })
+    return rows
+
+
+def test_rows_match_the_per_bar_loop():
+    spread = _spread()
+    trend, direction, _, _ = calculate_supertrend(spread['high'].values, spread['low'].values,
+                                                  spread['close'].values, 10, 3)
+
+    rows = _chart_payload(_chart_columns(spread, trend, direction, start=10), 'rows')
+
+    assert rows == _reference_rows(spread, trend, direction, 10)
+    assert isinstance(rows[-1]['time'], int) and isinstance(rows[-1]['direction'], int)
+
+    # Bars before ATR is available
+    warmup = _chart_payload(_chart_columns(spread, trend, direction), 'rows')
+    assert warmup[0]['supertrend'] is None and warmup[0]['direction'] == 0
+
+
+def test_columns_layout_and_since():
+    spread = _spread()
+    trend, direction, _, _ = calculate_supertrend(spread['high'].values, spread['low'].values,
+                                                  spread['close'].values, 7, 2)
+    full = _chart_columns(spread, trend, direction, start=7)
+
+    since = full['time'][-3]
+    tail = _chart_payload(_chart_columns(spread, trend, direction, start=7, since=since), 'columns')
+
+    assert set(tail) == {'time', 'open', 'high', 'low', 'close', 'supertrend', 'direction'}
+    for name, values in tail.items():
+        assert values == full[name][-3:]
+
+
+def test_since_after_last_bar_returns_nothing():
+    spread = _spread(50)
+    trend, direction, _, _ = calculate_supertrend(spread['high'].values, spread['low'].values,
+                                                  spread['close'].values, 7, 2)
+    columns = _chart_columns(spread, trend, direction, start=7, since=2 ** 40)
+
+    assert all(values == [] for values in columns.values())
+    assert _chart_payload(columns, 'rows') == []
@@ -0,0 +1,79 @@
+"""
+Unit tests for LTTB chart downsampling and its use in the chart-data payload
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.tradingview.routes import _chart_columns
+from app.utils.downsample import lttb_indices, span_extremes
+from app.utils.supertrend import calculate_supertrend
+
+
+def _walk(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64) * 60, 100 + np.cumsum(rng.normal(0, 1, n))
+
+
+def test_jit_matches_reference_loop():
+    x, y = _walk(5000)
+
+    compiled = lttb_indices(x, y, 400)
+    reference = lttb_indices(x, y, 400, use_jit=False)
+
+    np.testing.assert_array_equal(compiled, reference)
+    assert len(compiled) == 400
+    assert compiled[0] == 0 and compiled[-1] == len(x) - 1
+    assert np.all(np.diff(compiled) > 0)
+
+
+def test_short_series_and_forced_bars():
+    x, y = _walk(100)
+    np.testing.assert_array_equal(lttb_indices(x, y, 100), np.arange(100))
+
+    keep = np.zeros(100, dtype=bool)
+    keep[[13, 14, 57, 58]] = True
+    selected = lttb_indices(x, y, 20, keep=keep)
+
+    assert set(np.flatnonzero(keep)) <= set(selected)
+    assert len(selected) <= 20
+
+    # NaN values do not break the selection
+    y[40:45] = np.nan
+    assert len(lttb_indices(x, y, 20)) == 20
+
+
+def test_span_extremes_cover_skipped_bars():
+    high = np.array([5.0, 9.0, 4.0, 6.0, 12.0, 3.0, 7.0])
+    low = np.array([1.0, 0.5, 2.0, np.nan, 1.5, -1.0, 2.0])
+
+    span_high, span_low = span_extremes(high, low, np.array([0, 3, 6]))
+
+    np.testing.assert_array_equal(span_high, [9.0, 12.0, 7.0])
+    np.testing.assert_array_equal(span_low, [0.5, -1.0, 2.0])
+
+
+def test_chart_columns_keep_every_flip():
+    n = 3000
+    rng = np.random.default_rng(11)
+    close = 150 + np.cumsum(rng.normal(0, 1, n))
+    index = pd.date_range('2026-01-05 09:15', periods=n, freq='min', tz='Asia/Kolkata', name='timestamp')
+    spread = pd.DataFrame({'open': close + 0.5, 'high': close + 1, 'low': close - 1, 'close': close}, index=index)
+    trend, direction, _, _ = calculate_supertrend(spread['high'].values, spread['low'].values,
+                                                  spread['close'].values, 10, 1.5)
+
+    full = _chart_columns(spread, trend, direction, start=10)
+    sampled = _chart_columns(spread, trend, direction, start=10, max_points=300)
+
+    assert len(sampled['time']) < len(full['time'])
+    assert sampled['time'][0] == full['time'][0] and sampled['time'][-1] == full['time'][-1]
+    assert max(sampled['high']) == max(full['high']) and min(sampled['low']) == min(full['low'])
+
+    # Every flip in the full series is present, with the bar before it, so the flip times are identical
+    def flips(columns):
+        d = columns['direction']
+        return [(columns['time'][i - 1], columns['time'][i], d[i])
+                for i in range(1, len(d)) if d[i] != d[i - 1] and d[i] and d[i - 1]]
+
+    assert len(flips(full)) > 0
+    assert flips(sampled) == flips(full)
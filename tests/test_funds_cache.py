@@ -0,0 +1,155 @@
+"""
+Unit tests for the single-flight, TTL funds cache behind MarginCalculator sizing
+"""
+
+import itertools
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import app.utils.funds_cache as funds_module
+from app import db
+from app.models import MarginTracker
+from app.utils.funds_cache import funds_cache
+from app.utils.margin_calculator import MarginCalculator
+
+ACCOUNT_IDS = itertools.count(1000)
+
+
+class FakeFundsClient:
+    """Counts funds() calls; `gate` holds calls until set, `fail` returns an error response"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False
+        self.lock = threading.Lock()
+
+    def funds(self):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        self.gate.wait(5)
+        if self.fail:
+            return {'status': 'error', 'message': 'broker down'}
+        return {'status': 'success', 'data': {'availablecash': 100000.0 + calls, 'utiliseddebits': 40000.0}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeFundsClient()
+    monkeypatch.setattr(funds_module, 'ExtendedOpenAlgoAPI', lambda api_key, host: fake)
+    monkeypatch.setattr(funds_cache, 'ttl_seconds', 60.0)
+    return fake
+
+
+def test_ttl_reuses_one_call(client):
+    account_id = next(ACCOUNT_IDS)
+
+    first = funds_cache.get(account_id, 'k', 'h')
+    second = funds_cache.get(account_id, 'k', 'h')
+
+    assert client.calls == 1
+    assert second is first and not first.stale and first.age < 60
+
+    fresh = funds_cache.get(account_id, 'k', 'h', max_age=0)
+    assert client.calls == 2 and fresh.seq > first.seq
+
+
+def test_concurrent_callers_share_the_call_in_flight(client):
+    account_id = next(ACCOUNT_IDS)
+    client.gate.clear()
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(funds_cache.get(account_id, 'k', 'h')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while client.calls == 0:
+        pass
+    client.gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert client.calls == 1
+    assert len({snapshot.seq for snapshot in results}) == 1 and len(results) == 8
+    # Exactly one caller gets to write the MarginTracker
+    assert sum(funds_cache.claim_persist(snapshot) for snapshot in results) == 1
+
+
+def test_fill_marks_funds_stale_and_refreshes(client):
+    account_id = next(ACCOUNT_IDS)
+    funds_cache.get(account_id, 'k', 'h')
+
+    funds_cache.mark_stale(account_id)
+    after_fill = funds_cache.get(account_id, 'k', 'h')
+
+    assert client.calls == 2 and after_fill.data['availablecash'] == 100002.0
+
+    # refresh_async fetches in the background; the next reader joins or reuses that call
+    funds_cache.refresh_async(account_id, 'k', 'h')
+    while client.calls < 3:
+        pass
+    refreshed = funds_cache.get(account_id, 'k', 'h')
+    assert client.calls == 3 and refreshed.data['availablecash'] == 100003.0
+
+
+def test_call_in_flight_before_a_fill_is_not_joined(client):
+    account_id = next(ACCOUNT_IDS)
+    client.gate.clear()
+    results = {}
+
+    before = threading.Thread(target=lambda: results.update(before=funds_cache.get(account_id, 'k', 'h')))
+    before.start()
+    while client.calls == 0:
+        pass
+    funds_cache.mark_stale(account_id)
+    after = threading.Thread(target=lambda: results.update(after=funds_cache.get(account_id, 'k', 'h')))
+    after.start()
+    while client.calls == 1:
+        pass
+    client.gate.set()
+    before.join(5)
+    after.join(5)
+
+    assert client.calls == 2
+    assert results['after'].seq != results['before'].seq
+
+
+def test_failed_refresh_serves_stale_funds(client):
+    account_id = next(ACCOUNT_IDS)
+    client.fail = True
+
+    missing = funds_cache.get(account_id, 'k', 'h')
+    assert missing.data is None and missing.stale and missing.error == 'broker down'
+
+    client.fail = False
+    good = funds_cache.get(account_id, 'k', 'h')
+    client.fail = True
+    stale = funds_cache.get(account_id, 'k', 'h', max_age=0)
+
+    assert stale.stale and stale.data == good.data and stale.error == 'broker down'
+    assert not funds_cache.claim_persist(stale)
+
+
+def test_margin_calculator_sizes_from_one_funds_call(client):
+    app = Flask('funds_cache_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        account = SimpleNamespace(id=next(ACCOUNT_IDS), account_name='acc', host_url='h',
+                                  get_api_key=lambda: 'k', last_funds_data=None)
+        calculator = MarginCalculator(1)
+
+        margins = [calculator.get_available_margin(account) for _ in range(3)]
+        cash = calculator.get_cash_margin(account)
+
+        assert client.calls == 1
+        assert margins == [60001.0] * 3 and cash == 100001.0
+        tracker = MarginTracker.query.filter_by(account_id=account.id).first()
+        assert tracker.update_count == 1 and tracker.free_margin == 60001.0
+        db.session.remove()
@@ -0,0 +1,98 @@
+"""
+Unit tests for the process-wide margin reference cache behind MarginCalculator
+"""
+
+import threading
+
+import pytest
+from flask import Flask
+
+from app import db
+from app.models import MarginRequirement, TradeQuality, TradingSettings
+from app.utils.margin_calculator import MarginCalculator
+from app.utils.margin_reference import margin_reference_cache
+
+
+@pytest.fixture
+def app():
+    app = Flask('margin_reference_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        margin_reference_cache.clear()
+        yield app
+        margin_reference_cache.clear()
+        db.session.remove()
+
+
+def test_calculators_share_one_load(app):
+    loads = margin_reference_cache.loads
+
+    first = MarginCalculator(1)
+    second = MarginCalculator(1)
+
+    assert margin_reference_cache.loads == loads + 1
+    assert first.trade_qualities is second.trade_qualities
+    # Defaults are created on first use, as before
+    assert set(first.trade_qualities) == {'A', 'B', 'C'}
+    assert set(first.trading_settings) == {'NIFTY', 'BANKNIFTY', 'SENSEX'}
+    assert first.get_margin_requirement('NIFTY', 'futures', is_expiry=False) == 215000
+    with pytest.raises(TypeError):
+        first.trade_qualities['D'] = None
+
+
+def test_invalidate_reloads_edits(app):
+    MarginCalculator(1)
+    MarginCalculator(2)
+
+    quality = TradeQuality.query.filter_by(user_id=1, quality_grade='B').first()
+    quality.margin_percentage = 50.0
+    requirement = MarginRequirement.query.filter_by(user_id=1, instrument='NIFTY').first()
+    requirement.option_buying_premium = 25000.0
+    db.session.commit()
+
+    # Not visible until the edit route invalidates the user
+    assert MarginCalculator(1).trade_qualities['B'].margin_percentage == 65.0
+
+    loads = margin_reference_cache.loads
+    margin_reference_cache.invalidate(1)
+    calculator = MarginCalculator(1)
+
+    assert calculator.trade_qualities['B'].margin_percentage == 50.0
+    assert calculator.get_option_buying_premium('NIFTY') == 25000.0
+    MarginCalculator(2)
+    assert margin_reference_cache.loads == loads + 1
+
+
+def test_load_racing_an_edit_is_not_stored(app):
+    TradingSettings.get_or_create_defaults(1)
+    loaded = threading.Event()
+    release = threading.Event()
+    original = margin_reference_cache._load
+
+    def slow_load(user_id, version):
+        entry = original(user_id, version)
+        loaded.set()
+        release.wait(5)
+        return entry
+
+    margin_reference_cache._load = slow_load
+    try:
+        def reader():
+            with app.app_context():
+                margin_reference_cache.get(1)
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        loaded.wait(5)
+        margin_reference_cache.invalidate(1)
+        release.set()
+        thread.join(5)
+    finally:
+        margin_reference_cache._load = original
+
+    # The stale load was dropped, so the next read goes to the database
+    loads = margin_reference_cache.loads
+    margin_reference_cache.get(1)
+    assert margin_reference_cache.loads == loads + 1
@@ -0,0 +1,106 @@
+"""
+Unit tests for the adaptive per-order polling cadence in OrderStatusPoller
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.order_status_poller import OrderStatusPoller
+
+ACCOUNT = SimpleNamespace(id=1, account_name='acc', host_url='h', get_api_key=lambda: 'k')
+
+
+@pytest.fixture
+def poller():
+    p = OrderStatusPoller()
+    p.pending_orders.clear()
+    p._schedule.clear()
+    p.fast_interval, p.fast_window, p.max_interval = 0.25, 5.0, 30.0
+    yield p
+    p.pending_orders.clear()
+    p._schedule.clear()
+
+
+def test_fresh_orders_poll_fast_then_back_off_to_cap(poller):
+    poller.add_order(1, ACCOUNT, 'A1', 's')
+    info = poller.pending_orders[1]
+    start = info['next_check']
+
+    assert list(poller._pop_due_orders(start)) == [1]
+
+    # Within the fast window
+    poller._reschedule([1], start + 1)
+    assert info['next_check'] == pytest.approx(start + 1.25)
+
+    # After the fast window: 0.25, 0.5, 1, 2, ... capped at max_interval
+    intervals = []
+    now = start + 10
+    for _ in range(10):
+        poller._reschedule([1], now)
+        intervals.append(info['next_check'] - now)
+    assert intervals[:4] == pytest.approx([0.25, 0.5, 1.0, 2.0])
+    assert intervals[-1] == pytest.approx(30.0)
+
+
+def test_stale_and_removed_entries_are_skipped(poller):
+    poller.add_order(1, ACCOUNT, 'A1', 's')
+    poller.add_order(2, ACCOUNT, 'A2', 's')
+    now = poller.pending_orders[2]['next_check']
+
+    poller._reschedule([1], now + 100)  # Old heap entry for order 1 is now stale
+    poller.remove_order(2)
+
+    assert poller._pop_due_orders(now + 1) == {}
+    assert list(poller._pop_due_orders(now + 200)) == [1]
+
+
+def test_ltp_crossing_the_limit_resets_to_fast_polling(poller, monkeypatch):
+    poller.add_order(1, ACCOUNT, 'A1', 's')
+    info = poller.pending_orders[1]
+    info.update(symbol='NIFTY25JAN24000CE', exchange='NFO', action='BUY', limit_price=100.0)
+    now = info['next_check'] + 60
+    poller._pop_due_orders(now)
+    info['backoff'] = 6
+    poller._reschedule([1], now)
+
+    ltp = {'NFO:NIFTY25JAN24000CE': 104.0}
+    monkeypatch.setattr(poller, '_get_ltp_snapshot', lambda: ltp)
+
+    poller._check_limit_crossings(now)  # Above a BUY limit - not marketable
+    assert info['next_check'] > now and poller.limit_crossings == 0
+
+    ltp['NFO:NIFTY25JAN24000CE'] = 99.5
+    crossings = poller.limit_crossings
+    poller._check_limit_crossings(now + 1)
+    assert poller.limit_crossings == crossings + 1
+    assert info['backoff'] == 0
+    assert list(poller._pop_due_orders(now + 1)) == [1]
+
+
+def test_account_worker_checks_serially_and_reschedules(poller, monkeypatch):
+    from flask import Flask
+    from app import db
+    from app.utils.order_status_poller import AccountWorker
+
+    app = Flask('worker_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    checked = []
+    monkeypatch.setattr(poller, '_check_account_orders',
+                        lambda orders, app, due_ids: checked.append(sorted(due_ids)) or True)
+
+    poller.add_order(1, ACCOUNT, 'A1', 's')
+    due_at = poller.pending_orders[1]['next_check']
+    due = poller._pop_due_orders(due_at)
+
+    worker = AccountWorker(poller, '1_acc', app)
+    worker.submit(list(due.items()), set(due), due_at)
+    worker.stop()
+    worker.thread.join(timeout=2)
+
+    assert checked == [[1]]
+    assert not worker.busy and worker.checks == 1
+    assert poller.pending_orders[1]['next_check'] > due_at  # Rescheduled
+    assert set(worker.get_metrics()) == {'checks', 'busy', 'lag_ms', 'max_lag_ms', 'check_duration_ms'}
@@ -0,0 +1,131 @@
+"""
+Unit tests for orderbook-based bulk reconciliation in OrderStatusPoller
+"""
+
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils import order_status_poller as poller_module
+from app.utils.order_status_poller import OrderStatusPoller
+
+APP = SimpleNamespace(app_context=nullcontext)
+
+
+class FakeClient:
+    def __init__(self, book, status='open'):
+        self.book = book
+        self.status = status
+        self.status_calls = []
+
+    def orderbook(self):
+        if self.book is None:
+            return {'status': 'error', 'message': 'down'}
+        return {'status': 'success', 'data': {'orders': self.book}}
+
+    def orderstatus(self, order_id, strategy):
+        self.status_calls.append(order_id)
+        return {'status': 'success', 'data': {'orderid': order_id, 'order_status': self.status, 'average_price': 101.5}}
+
+
+def _orders(count):
+    return [(i, {'account_id': 1, 'account_name': 'acc', 'api_key': 'k', 'host_url': 'h',
+                 'order_id': str(100 + i), 'strategy_name': 's', 'check_count': 0})
+            for i in range(count)]
+
+
+@pytest.fixture
+def poller(monkeypatch):
+    p = OrderStatusPoller()
+    p.last_check_time.clear()
+    reconciled = []
+    monkeypatch.setattr(p, '_reconcile_order',
+                        lambda execution_id, info, data, client: reconciled.append((execution_id, data['order_status'])))
+    p.reconciled = reconciled
+    yield p
+    p.last_check_time.clear()
+    p.pending_orders.clear()
+    p._schedule.clear()
+
+
+def _use_client(monkeypatch, client):
+    monkeypatch.setattr(poller_module, 'ExtendedOpenAlgoAPI', lambda api_key, host: client)
+
+
+def test_one_orderbook_call_reconciles_every_pending_order(poller, monkeypatch):
+    client = FakeClient([{'orderid': 100 + i, 'order_status': 'complete', 'average_price': 100.0}
+                         for i in range(30)])
+    _use_client(monkeypatch, client)
+
+    poller._check_account_orders(_orders(30), APP)
+
+    assert len(poller.reconciled) == 30
+    assert all(status == 'complete' for _, status in poller.reconciled)
+    assert client.status_calls == []
+
+    # Same account again within the fast interval is rate limited
+    assert poller._check_account_orders(_orders(30), APP) is False
+    assert len(poller.reconciled) == 30
+
+
+def test_orders_missing_from_book_fall_back_to_orderstatus(poller, monkeypatch):
+    client = FakeClient([{'orderid': '100', 'order_status': 'complete', 'average_price': 100.0}])
+    _use_client(monkeypatch, client)
+
+    poller._check_account_orders(_orders(3), APP)
+
+    assert client.status_calls == ['101', '102']
+    assert sorted(poller.reconciled) == [(0, 'complete'), (1, 'open'), (2, 'open')]
+
+
+def test_fallback_calls_are_capped_when_orderbook_fails(poller, monkeypatch):
+    client = FakeClient(None)
+    _use_client(monkeypatch, client)
+
+    poller._check_account_orders(_orders(20), APP)
+
+    assert len(client.status_calls) == poller.max_fallbacks_per_cycle
+
+
+def test_non_due_orders_only_ride_along_for_final_statuses(poller, monkeypatch):
+    client = FakeClient([{'orderid': '100', 'order_status': 'open'},
+                         {'orderid': '101', 'order_status': 'open'},
+                         {'orderid': '102', 'order_status': 'complete', 'average_price': 100.0}])
+    _use_client(monkeypatch, client)
+
+    poller._check_account_orders(_orders(4), APP, due_ids={0})
+
+    assert sorted(poller.reconciled) == [(0, 'open'), (2, 'complete')]
+    assert client.status_calls == []
+
+
+def test_fill_without_price_in_book_is_read_from_orderstatus(poller, monkeypatch):
+    client = FakeClient([{'orderid': '100', 'order_status': 'complete'},
+                         {'orderid': '101', 'order_status': 'complete', 'average_price': 100.0}], status='complete')
+    _use_client(monkeypatch, client)
+
+    poller._check_account_orders(_orders(2), APP)
+
+    assert client.status_calls == ['100']
+    assert sorted(poller.reconciled) == [(0, 'complete'), (1, 'complete')]
+
+
+def test_rate_limited_check_does_not_grow_backoff(poller, monkeypatch):
+    _use_client(monkeypatch, FakeClient([{'orderid': '100', 'order_status': 'open'}]))
+    account = SimpleNamespace(id=1, account_name='acc', host_url='h', get_api_key=lambda: 'k')
+    with poller._lock:
+        poller._queue_order(0, account, '100', 's')
+    order_info = poller.pending_orders[0]
+    order_info['fast_until'] = 0.0
+    order_info['backoff'] = 3
+
+    assert poller._check_account_orders(_orders(1), APP) is True
+    assert poller._check_account_orders(_orders(1), APP) is False
+    poller._reschedule({0}, 1000.0, checked=False)
+
+    assert order_info['backoff'] == 3 and order_info['check_count'] == 0
+    assert order_info['next_check'] == 1000.0 + poller.fast_interval
+
+    poller._reschedule({0}, 1001.0)
+    assert order_info['backoff'] == 4
@@ -0,0 +1,123 @@
+"""
+Unit tests for push-based order updates (OrderUpdateChannel with a local event source)
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from app import db
+from app.utils.order_status_poller import order_status_poller
+from app.utils.order_update_channel import (
+    LocalOrderEventSource, OrderUpdateChannel, normalize_order_event
+)
+
+ACCOUNT = SimpleNamespace(id=1, account_name='acc', host_url='h', get_api_key=lambda: 'k')
+
+
+def test_normalize_order_event_aliases():
+    data = normalize_order_event({'order_id': 42, 'status': 'FILLED', 'avg_price': '101.5'})
+    assert (data['orderid'], data['order_status'], data['average_price']) == ('42', 'complete', 101.5)
+    assert normalize_order_event({'orderid': '1', 'status': 'weird'}) is None
+    assert normalize_order_event({'status': 'complete'}) is None
+
+
+@pytest.fixture
+def channel(monkeypatch):
+    app = Flask('channel_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    applied = []
+    monkeypatch.setattr(order_status_poller, '_reconcile_order',
+                        lambda execution_id, info, data, client: applied.append((execution_id, data['order_status'])))
+    monkeypatch.setattr(order_status_poller, '_order_info_from_db', lambda order_id: None)
+    order_status_poller.pending_orders.clear()
+    order_status_poller._schedule.clear()
+
+    ch = OrderUpdateChannel()
+    ch.init_app(app)
+    ch.applied = applied
+    yield ch
+    ch.stop()
+    order_status_poller.pending_orders.clear()
+    order_status_poller._schedule.clear()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_pushed_fill_is_applied_and_poller_becomes_a_sweep(channel):
+    order_status_poller.add_order(7, ACCOUNT, 'A7', 's')
+    source = LocalOrderEventSource()
+    channel.add_source(source)
+    assert order_status_poller.push_active
+    assert order_status_poller._next_interval(order_status_poller.pending_orders[7], time.monotonic()) == \
+        order_status_poller.max_interval
+
+    ignored = channel.events_ignored
+    source.publish({'orderid': 'A7', 'order_status': 'complete', 'average_price': 99.0})
+    source.publish({'orderid': 'UNKNOWN', 'order_status': 'complete', 'average_price': 1.0})
+    _wait_for(lambda: channel.events_ignored > ignored)
+
+    assert channel.applied == [(7, 'complete')]
+
+    channel.remove_source(source)
+    assert not order_status_poller.push_active
+
+
+def test_fill_without_price_is_left_to_the_poller(channel):
+    order_status_poller.add_order(8, ACCOUNT, 'A8', 's')
+    source = LocalOrderEventSource()
+    channel.add_source(source)
+
+    ignored = channel.events_ignored
+    source.publish({'orderid': 'A8', 'order_status': 'complete'})
+    _wait_for(lambda: channel.events_ignored > ignored)
+
+    assert channel.applied == []
+    assert order_status_poller.pending_orders[8]['backoff'] == 0
+
+
+def test_pushed_fill_for_untracked_order_refreshes_funds(monkeypatch):
+    from app.models import Strategy, StrategyExecution, StrategyLeg, TradingAccount
+    from app.utils import order_status_poller as poller_module
+    from app.utils.funds_cache import funds_cache
+
+    app = Flask('untracked_fill_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    refreshed = []
+    monkeypatch.setattr(funds_cache, 'refresh_async', lambda *args: refreshed.append(args))
+    monkeypatch.setattr(poller_module, 'get_position_monitor',
+                        lambda: SimpleNamespace(on_order_filled=lambda execution: None))
+    order_status_poller.pending_orders.clear()
+
+    with app.app_context():
+        db.create_all()
+        account = TradingAccount(user_id=1, account_name='acc', broker_name='b', host_url='http://h',
+                                 websocket_url='ws://h')
+        account.set_api_key('secret')
+        strategy = Strategy(user_id=1, name='s')
+        db.session.add_all([account, strategy])
+        db.session.flush()
+        leg = StrategyLeg(strategy_id=strategy.id, leg_number=1)
+        db.session.add(leg)
+        db.session.flush()
+        execution = StrategyExecution(strategy_id=strategy.id, account_id=account.id, leg_id=leg.id,
+                                      order_id='DB1', status='pending', quantity=75)
+        db.session.add(execution)
+        db.session.commit()
+
+        applied = order_status_poller.apply_order_event(
+            {'orderid': 'DB1', 'order_status': 'complete', 'average_price': 101.5})
+
+        assert applied
+        assert StrategyExecution.query.get(execution.id).status == 'entered'
+        assert refreshed == [(account.id, 'secret', 'http://h')]
+        db.session.remove()
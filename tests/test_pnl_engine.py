@@ -0,0 +1,104 @@
+"""
+Unit tests for the vectorized portfolio P&L engine used by RiskManager
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils.pnl_engine import PositionsBook
+
+
+def _row(execution_id, strategy_id, account_id, user_id, symbol, status, entry, qty, action,
+         last_price=None, last_price_updated=None, exit_price=None):
+    return (execution_id, strategy_id, account_id, user_id, symbol, status,
+            entry, exit_price, qty, last_price, last_price_updated, action)
+
+
+def test_strategy_account_and_user_pnl():
+    fresh = datetime.now()
+    book = PositionsBook([
+        # Strategy 1: short straddle on account 10 (user 1)
+        _row(1, 1, 10, 1, 'NIFTYCE', 'entered', 100.0, 75, 'SELL', 90.0, fresh),
+        _row(2, 1, 10, 1, 'NIFTYPE', 'entered', 80.0, 75, 'SELL', 85.0, fresh),
+        # Strategy 2: long call on account 20 (user 1), plus a closed leg
+        _row(3, 2, 20, 1, 'BNCE', 'entered', 200.0, 30, 'BUY', 210.0, fresh),
+        _row(4, 2, 20, 1, 'BNPE', 'exited', 150.0, 30, 'BUY', exit_price=140.0),
+        # Strategy 3 belongs to user 2 and has a failed order (ignored)
+        _row(5, 3, 30, 2, 'SENSEXCE', 'failed', None, 20, 'BUY'),
+    ])
+
+    snapshot = book.evaluate()
+
+    s1 = snapshot.strategy_pnl(1)
+    assert s1['unrealized_pnl'] == pytest.approx((100 - 90) * 75 + (80 - 85) * 75)
+    assert s1['open_count'] == 2
+    assert s1['sell_premium'] == pytest.approx(100 * 75 + 80 * 75)
+    assert s1['buy_premium'] == 0
+
+    s2 = snapshot.strategy_pnl(2)
+    assert s2['unrealized_pnl'] == pytest.approx(10 * 30)
+    assert s2['realized_pnl'] == pytest.approx(-10 * 30)
+    assert s2['total_pnl'] == pytest.approx(0)
+
+    assert snapshot.strategy_pnl(3)['total_pnl'] == 0
+    assert snapshot.account_pnl[10] == pytest.approx(375)
+    assert snapshot.user_pnl[1] == pytest.approx(375)
+    assert snapshot.user_pnl[2] == 0
+
+
+def test_price_priority_and_fallback():
+    stale = datetime.now() - timedelta(minutes=5)
+    book = PositionsBook([
+        _row(1, 1, 10, 1, 'A', 'entered', 100.0, 10, 'BUY'),  # no WebSocket price
+        _row(2, 1, 10, 1, 'B', 'entered', 50.0, 10, 'SELL', 45.0, stale),
+    ])
+
+    assert book.needs_api_prices()
+
+    # API price only used where the WebSocket price is missing
+    snapshot = book.evaluate({'A': 110.0, 'B': 60.0})
+    pnl = snapshot.strategy_pnl(1)
+    assert pnl['unrealized_pnl'] == pytest.approx((110 - 100) * 10 + (50 - 45) * 10)
+    assert pnl['fallback_count'] == 0
+    assert not pnl['prices_unreliable']
+
+    # No API price for A - entry price fallback
+    pnl = book.evaluate({}).strategy_pnl(1)
+    assert pnl['fallback_count'] == 1
+    assert not pnl['prices_unreliable']
+
+
+def test_all_fallback_prices_are_unreliable():
+    book = PositionsBook([
+        _row(1, 7, 10, 1, 'A', 'entered', 100.0, 10, 'BUY'),
+        _row(2, 7, 10, 1, 'B', 'entered', 50.0, 10, 'SELL'),
+    ])
+
+    pnl = book.evaluate().strategy_pnl(7)
+    assert pnl['prices_unreliable']
+    assert pnl['total_pnl'] == 0
+
+
+def test_unknown_strategy_is_empty():
+    snapshot = PositionsBook([]).evaluate()
+    assert 5 not in snapshot
+    assert snapshot.strategy_pnl(5)['open_count'] == 0
+
+
+def test_live_prices_override_stored_price_and_exposure():
+    stale = datetime.now() - timedelta(minutes=5)
+    book = PositionsBook([
+        _row(1, 1, 10, 1, 'A', 'entered', 100.0, 10, 'BUY', 101.0, stale),
+        _row(2, 2, 10, 1, 'A', 'entered', 100.0, 10, 'SELL', 101.0, stale),
+        _row(3, 2, 10, 1, 'B', 'exited', 50.0, 10, 'SELL', exit_price=40.0),
+    ])
+
+    assert book.open_exposure() == {'A': {1, 2}}
+
+    book.apply_live_prices({'A': (105.0, datetime.now().timestamp())})
+    assert not book.needs_api_prices()
+
+    snapshot = book.evaluate()
+    assert snapshot.strategy_pnl(1)['unrealized_pnl'] == pytest.approx(50)
+    assert snapshot.strategy_pnl(2)['total_pnl'] == pytest.approx(-50 + 100)
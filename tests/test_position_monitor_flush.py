@@ -0,0 +1,110 @@
+"""
+Unit tests for PositionMonitor's slot-based position records, symbol interning
+and adaptive flush interval
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.position_monitor import PositionMonitor, PositionRecord
+
+
+def _reset(pm):
+    pm._symbol_ids = {}
+    pm._symbol_keys = []
+    pm.position_map = []
+    pm._execution_ids = []
+    pm.subscribed_symbols.clear()
+    pm._pending_price_updates.clear()
+
+
+def _execution(execution_id, action='SELL', symbol='NIFTYCE', exchange='NFO'):
+    return SimpleNamespace(id=execution_id, strategy_id=7, account_id=3, quantity=75,
+                           entry_price=100.0, symbol=symbol, exchange=exchange,
+                           leg=SimpleNamespace(action=action))
+
+
+@pytest.fixture
+def monitor():
+    pm = PositionMonitor()
+    _reset(pm)
+    yield pm
+    _reset(pm)
+    pm._batch_flush_interval = pm._min_flush_interval
+    pm._flush_count = 0
+    pm._total_rows_written = 0
+    pm._flush_latency_ewma = 0.0
+
+
+def test_position_record_is_compact_snapshot():
+    record = PositionRecord.from_execution(_execution(1, action='buy'))
+    assert (record.execution_id, record.strategy_id, record.account_id) == (1, 7, 3)
+    assert (record.quantity, record.sign, record.entry_price) == (75, 1, 100.0)
+    assert PositionRecord.from_execution(_execution(2)).sign == -1
+    assert not hasattr(record, '__dict__')
+
+
+def test_execution_ids_follow_position_map(monitor):
+    ce = monitor._intern_symbol('NIFTYCE', 'NFO')
+    pe = monitor._intern_symbol('NIFTYPE', 'NFO')
+    assert monitor._intern_symbol('NIFTYCE', 'NFO') == ce
+    assert monitor._lookup_symbol('NIFTYCE', 'BFO') is None
+
+    monitor._set_positions(ce, [PositionRecord.from_execution(_execution(1))])
+    monitor._add_position(ce, _execution(2))
+    monitor._add_position(ce, _execution(2))  # Same execution, other instance
+    monitor._add_position(pe, _execution(3, symbol='NIFTYPE'))
+    assert monitor._execution_ids == [(1, 2), (3,)]
+
+    monitor._remove_position(pe, 3)
+    assert monitor.position_map[pe] == ()
+    assert monitor._execution_ids[pe] == ()
+
+
+def test_concurrent_interning_allocates_each_symbol_once(monitor):
+    symbols = [f'SYM{i}' for i in range(50)]
+    barrier = threading.Barrier(8)
+    ids = []
+
+    def intern_all():
+        barrier.wait()
+        ids.append([monitor._intern_symbol(symbol, 'NFO') for symbol in symbols])
+
+    threads = [threading.Thread(target=intern_all) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    # Every thread saw the same id per symbol and the id arrays stayed aligned
+    assert all(thread_ids == ids[0] for thread_ids in ids) and len(ids) == 8
+    assert sorted(ids[0]) == list(range(50))
+    assert len(monitor._symbol_keys) == len(monitor.position_map) == len(monitor._execution_ids) == 50
+    assert [monitor._symbol_keys[i][0] for i in ids[0]] == symbols
+
+def test_ticks_queue_by_symbol_id(monitor):
+    monitor._price_update_lock = threading.Lock()  # Created by start()
+    symbol_id = monitor._intern_symbol('NIFTYCE', 'NFO')
+    monitor._set_positions(symbol_id, [PositionRecord.from_execution(_execution(1))])
+
+    monitor.update_last_price('NIFTYCE', 'NFO', 101.5)
+    monitor.update_last_price('NIFTYCE', 'NFO', 102.0)
+    monitor.update_last_price('BANKNIFTYCE', 'NFO', 300.0)  # Not tracked
+    assert monitor._pending_price_updates == {symbol_id: 102.0}
+
+
+def test_flush_interval_backs_off_on_slow_writes_and_recovers(monitor):
+    monitor._record_flush(0.005, 10)
+    assert monitor._batch_flush_interval == monitor._min_flush_interval
+
+    for _ in range(10):
+        monitor._record_flush(0.8, 50)  # Writer lock contention
+    assert monitor._batch_flush_interval > monitor._min_flush_interval
+    assert monitor._batch_flush_interval <= monitor._max_flush_interval
+
+    for _ in range(30):
+        monitor._record_flush(0.005, 50)
+    assert monitor._batch_flush_interval == monitor._min_flush_interval
+    assert monitor._total_rows_written == 10 + 10 * 50 + 30 * 50
@@ -0,0 +1,67 @@
+"""
+Unit tests for the hedged price fetch in RiskManager._get_prices_with_failover
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import risk_manager as risk_manager_module
+from app.utils.risk_manager import RiskManager
+
+ACCOUNTS = [
+    {'id': 1, 'account_name': 'primary', 'api_key': 'k1', 'host_url': 'h1', 'is_primary': True},
+    {'id': 2, 'account_name': 'backup', 'api_key': 'k2', 'host_url': 'h2', 'is_primary': False},
+]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    rm = RiskManager()
+    monkeypatch.setattr(risk_manager_module.trading_calendar, 'is_open', lambda *a, **k: True)
+    monkeypatch.setattr(rm, '_get_price_accounts', lambda: ACCOUNTS)
+    monkeypatch.setattr(rm, '_default_hedge_delay', 0.05)
+    yield rm
+    rm._failed_accounts.clear()
+    rm._price_health.clear()
+    rm._current_price_account_id = None
+
+
+def test_slow_primary_is_hedged_and_fast_backup_wins(manager, monkeypatch):
+    def fetch(account):
+        if account['id'] == 1:
+            time.sleep(0.5)  # Dead/slow primary
+            return {'A': 1.0}
+        return {'A': 2.0}
+
+    monkeypatch.setattr(manager, '_get_cached_positions', fetch)
+
+    started = time.monotonic()
+    prices = manager._get_prices_with_failover()
+
+    assert prices == {'A': 2.0}
+    assert time.monotonic() - started < 0.4
+    assert manager._current_price_account_id == 2
+
+
+def test_failed_account_goes_to_cooldown(manager, monkeypatch):
+    def fetch(account):
+        ok = account['id'] == 2
+        manager._record_price_result(account['id'], ok, 0.01, None if ok else 'down')
+        return {'A': 2.0} if ok else {}
+
+    monkeypatch.setattr(manager, '_get_cached_positions', fetch)
+
+    assert manager._get_prices_with_failover() == {'A': 2.0}
+    assert 1 in manager._failed_accounts
+    assert manager._price_health[1]['score'] < manager._price_health[2]['score']
+
+
+def test_all_accounts_in_cooldown_releases_the_oldest_listed(manager):
+    now = datetime.now()
+    manager._failed_accounts.update({1: now - timedelta(seconds=5), 2: now - timedelta(seconds=10),
+                                     99: now - timedelta(seconds=30)})  # 99: a deleted account
+
+    assert manager._get_prices_with_failover() == {}
+    assert set(manager._failed_accounts) == {1, 99}
@@ -0,0 +1,43 @@
+"""
+Unit tests for tick-driven risk evaluation routing in RiskManager
+"""
+
+import pytest
+
+from app.utils.risk_manager import RiskManager
+
+
+@pytest.fixture
+def manager():
+    rm = RiskManager()
+    rm.is_running = True
+    rm.tick_driven_enabled = True
+    yield rm
+    rm.is_running = False
+    rm._dirty_strategies.clear()
+    rm._live_prices.clear()
+    rm._exposure.clear()
+
+
+def test_tick_marks_only_exposed_strategies_dirty(manager):
+    manager.watch_strategy_symbol(1, 'NIFTYCE')
+    manager.watch_strategy_symbol(2, 'NIFTYCE')
+    manager.watch_strategy_symbol(3, 'BANKNIFTYPE')
+
+    manager.on_price_tick('NIFTYCE', 95.5)
+    manager.on_price_tick('UNHELD', 10.0)
+
+    assert manager._dirty_strategies == {1, 2}
+    assert manager._live_prices['NIFTYCE'][0] == 95.5
+    assert 'UNHELD' not in manager._live_prices
+
+
+def test_retain_exposure_drops_closed_strategies(manager):
+    manager.watch_strategy_symbol(1, 'NIFTYCE')
+    manager.watch_strategy_symbol(2, 'BANKNIFTYPE')
+    manager.on_price_tick('BANKNIFTYPE', 120.0)
+
+    manager._retain_exposure([1])
+
+    assert manager._exposure == {'NIFTYCE': {1}}
+    assert 'BANKNIFTYPE' not in manager._live_prices
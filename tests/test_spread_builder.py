@@ -0,0 +1,107 @@
+"""
+Unit tests for the NumPy spread builder (leg alignment, weights, missing bar policies)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.spread_builder import build_spread
+from app.utils.supertrend import calculate_supertrend
+
+
+def _leg(start, periods, seed, drop=()):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=periods, freq='5min', tz='Asia/Kolkata', name='timestamp')
+    close = 100 + np.cumsum(rng.normal(0, 1, periods))
+    df = pd.DataFrame({'open': close + rng.normal(0, 0.5, periods), 'high': close + rng.random(periods) * 2,
+                       'low': close - rng.random(periods) * 2, 'close': close, 'volume': 1.0}, index=index)
+    return df.drop(df.index[list(drop)])
+
+
+def _pandas_intersect(legs):
+    """The pandas alignment previously used by the chart: signed sum on common timestamps, abs, high >= low"""
+    common = None
+    total = None
+    for df, weight in legs:
+        ohlc = df[['open', 'high', 'low', 'close']] * weight
+        common = df.index if common is None else common.intersection(df.index)
+        total = ohlc if total is None else total.add(ohlc, fill_value=0)
+    total = total.reindex(common).abs()
+    high, low = total['high'].copy(), total['low'].copy()
+    total['high'] = pd.concat([high, low], axis=1).max(axis=1)
+    total['low'] = pd.concat([high, low], axis=1).min(axis=1)
+    return total
+
+
+def test_intersect_matches_pandas_alignment():
+    legs = [(_leg('2026-01-05 09:15', 300, 1, drop=(5, 40)), 2.0),
+            (_leg('2026-01-05 09:30', 300, 2, drop=(7,)), -1.0),
+            (_leg('2026-01-05 09:15', 310, 3), 1.0)]
+
+    spread = build_spread(legs, policy='intersect')
+    expected = _pandas_intersect(legs)
+
+    pd.testing.assert_frame_equal(spread.to_frame(), expected, check_freq=False, check_names=False)
+    assert spread.to_frame().index.tz is not None
+
+
+def test_ffill_carries_previous_close_after_every_leg_started():
+    a = _leg('2026-01-05 09:15', 10, 4, drop=(6,))
+    b = _leg('2026-01-05 09:25', 8, 5)
+
+    spread = build_spread([(a, 1.0), (b, 1.0)], policy='ffill', absolute=False)
+    frame = spread.to_frame()
+
+    # Starts at b's first bar (a cannot be carried into it from nothing, and b has no bars before)
+    assert frame.index[0] == b.index[0]
+    assert len(frame) == len(b)
+
+    missing = b.index[6 - 2]  # a's dropped bar
+    previous_close = a['close'].iloc[5]
+    for column in ('open', 'high', 'low', 'close'):
+        assert frame.loc[missing, column] == pytest.approx(previous_close + b.loc[missing, column])
+
+
+def test_zero_policy_uses_union_and_skips_missing_legs():
+    a = _leg('2026-01-05 09:15', 6, 6)
+    b = _leg('2026-01-05 09:25', 6, 7)
+
+    frame = build_spread([(a, 1.0), (b, -1.0)], policy='zero', absolute=False).to_frame()
+
+    assert len(frame) == 8
+    assert frame['close'].iloc[0] == a['close'].iloc[0]
+    assert frame['close'].iloc[-1] == -b['close'].iloc[-1]
+    assert frame['close'].iloc[3] == pytest.approx(a['close'].iloc[3] - b['close'].iloc[1])
+
+
+def test_arrays_feed_the_supertrend_kernel():
+    legs = [(_leg('2026-01-05 09:15', 200, 8), 1.0), (_leg('2026-01-05 09:15', 200, 9), -1.0)]
+    spread = build_spread(legs)
+
+    for column in (spread.high, spread.low, spread.close):
+        assert column.dtype == np.float64 and column.flags['C_CONTIGUOUS']
+    assert (spread.high >= spread.low).all()
+
+    trend, direction, _, _ = calculate_supertrend(spread.high, spread.low, spread.close, 7, 3)
+    assert len(trend) == len(spread) == 200
+
+
+def test_unsorted_and_duplicate_bars_keep_the_last():
+    df = _leg('2026-01-05 09:15', 5, 10)
+    revised = df.iloc[[2]].assign(close=999.0)
+    messy = pd.concat([df.iloc[::-1], revised])
+
+    frame = build_spread([(messy, 1.0)], absolute=False).to_frame()
+
+    assert frame.index.is_monotonic_increasing and len(frame) == 5
+    assert frame['close'].iloc[2] == 999.0
+
+
+def test_no_common_bars_and_bad_policy():
+    a = _leg('2026-01-05 09:15', 3, 11)
+    b = _leg('2026-01-06 09:15', 3, 12)
+    assert build_spread([(a, 1.0), (b, 1.0)]) is None
+    assert build_spread([]) is None
+    with pytest.raises(ValueError):
+        build_spread([(a, 1.0)], policy='backfill')
@@ -0,0 +1,184 @@
+"""
+Unit tests for the Supertrend exit backtester (session replay, strike reconstruction, process pool)
+"""
+
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+import pytest
+import pytz
+from flask import Flask
+
+from app import db
+from app.models import OHLCCandle, Strategy, StrategyLeg
+from app.utils.supertrend import calculate_supertrend
+from app.utils.supertrend_backtest import SupertrendBacktest, simulate_session, summarize
+
+IST = pytz.timezone('Asia/Kolkata')
+
+SESSIONS = [date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 7)]
+EXPIRIES = {'06JAN26': date(2026, 1, 6), '13JAN26': date(2026, 1, 13)}
+STRIKES = range(24900, 25150, 50)
+
+
+def _session_index(session, periods=75):
+    start = IST.localize(datetime.combine(session, time(9, 15)))
+    return pd.date_range(start, periods=periods, freq='5min', name='timestamp')
+
+
+def _frame(index, seed, level):
+    rng = np.random.default_rng(seed)
+    close = np.maximum(level + np.cumsum(rng.normal(0, level * 0.01, len(index))), 1.0)
+    return pd.DataFrame({'open': np.r_[close[0], close[:-1]], 'high': close * 1.01, 'low': close * 0.99,
+                         'close': close}, index=index)
+
+
+def _task(frames, actions, entry_bar=1, square_off_bar=72):
+    index = frames[0].index
+    starts = index.as_unit('s').asi8
+    return {
+        'session': index[0].date(),
+        'legs': [{'leg_number': i + 1, 'symbol': f'LEG{i + 1}', 'action': action, 'lots': 2, 'lot_size': 75,
+                  'frame': frame} for i, (frame, action) in enumerate(zip(frames, actions))],
+        'policy': 'intersect',
+        'bar_seconds': 300,
+        'entry_ts': int(starts[entry_bar]),
+        'square_off_ts': int(starts[square_off_bar]) + 300,
+        'session_end': int(starts[-1]) + 3600
+    }
+
+
+def test_exit_matches_the_live_rule():
+    index = _session_index(SESSIONS[0])
+    frames = [_frame(index, 1, 120), _frame(index, 2, 110)]
+    task = _task(frames, ['SELL', 'SELL'])
+    settings = [(p, m, t) for p in (5, 7) for m in (1.0, 2.0) for t in ('breakout', 'breakdown')]
+
+    results = simulate_session(task, settings, slippage_pct=0.0)
+
+    spread = frames[0] + frames[1]
+    for result, (period, multiplier, exit_type) in zip(results, settings):
+        _, direction, _, _ = calculate_supertrend(spread['high'].values, spread['low'].values,
+                                                  spread['close'].values, period, multiplier)
+        target = -1 if exit_type == 'breakout' else 1
+        # check_supertrend_exit at each candle close: enough bars and direction in the exit state
+        expected = next((i for i in range(1, 73) if i + 1 >= period + 5 and direction[i] == target), None)
+        exit_idx = 72 if expected is None else expected
+
+        assert result['exit_reason'] == ('square_off' if expected is None else f'supertrend_{exit_type}')
+        assert result['bars_held'] == exit_idx
+        assert result['exit_time'] == (index[exit_idx] + pd.Timedelta(minutes=5)).tz_localize(None).isoformat()
+        expected_pnl = sum((f['open'].iloc[1] - f['close'].iloc[exit_idx]) * 150 for f in frames)
+        assert result['gross_pnl'] == pytest.approx(expected_pnl, abs=0.01)
+        assert result['net_pnl'] == result['gross_pnl']
+
+
+def test_slippage_and_sequential_exit_order():
+    index = _session_index(SESSIONS[0])
+    frames = [_frame(index, 3, 40), _frame(index, 4, 120), _frame(index, 5, 35)]
+    task = _task(frames, ['BUY', 'SELL', 'BUY'])
+
+    clean, = simulate_session(task, [(7, 3.0, 'breakout')], slippage_pct=0.0)
+    slipped, = simulate_session(task, [(7, 3.0, 'breakout')], slippage_pct=1.0)
+
+    exit_idx = clean['bars_held']
+    turnover = sum((f['open'].iloc[1] + f['close'].iloc[exit_idx]) * 150 for f in frames)
+    assert slipped['slippage'] == pytest.approx(turnover * 0.01, abs=0.02)
+    assert slipped['net_pnl'] == pytest.approx(clean['gross_pnl'] - slipped['slippage'], abs=0.01)
+    # SELL legs are closed first, then BUY legs
+    assert clean['exit_sequence'] == 'LEG2,LEG1,LEG3'
+
+
+@pytest.fixture
+def store():
+    app = Flask('supertrend_backtest_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+        rows = []
+        seed = 10
+        for session in SESSIONS:
+            index = _session_index(session)
+            seconds = index.as_unit('s').asi8
+            spot = 25010 + np.cumsum(np.random.default_rng(seed).normal(0, 5, len(index)))
+            series = {('NIFTY', 'NSE_INDEX'): pd.DataFrame({'open': spot, 'high': spot + 5, 'low': spot - 5,
+                                                            'close': spot}, index=index)}
+            for token, expiry in EXPIRIES.items():
+                if expiry < session:
+                    continue
+                for strike in STRIKES:
+                    for kind in ('CE', 'PE'):
+                        seed += 1
+                        intrinsic = max(25010 - strike, 0) if kind == 'CE' else max(strike - 25010, 0)
+                        series[(f'NIFTY{token}{strike}{kind}', 'NFO')] = _frame(index, seed, intrinsic + 80)
+            for (symbol, exchange), frame in series.items():
+                rows.extend({'symbol': symbol, 'exchange': exchange, 'interval': '5m', 'timestamp': int(ts),
+                             'open': o, 'high': h, 'low': l, 'close': c, 'volume': 0.0}
+                            for ts, o, h, l, c in zip(seconds, frame['open'], frame['high'], frame['low'],
+                                                      frame['close']))
+        db.session.bulk_insert_mappings(OHLCCandle, rows)
+
+        strategy = Strategy(user_id=1, name='straddle', supertrend_period=7, supertrend_multiplier=2.0,
+                            supertrend_timeframe='5m', supertrend_exit_type='breakout',
+                            entry_time=time(9, 20), square_off_time=time(15, 15))
+        db.session.add(strategy)
+        db.session.flush()
+        for number, kind in enumerate(('CE', 'PE'), start=1):
+            db.session.add(StrategyLeg(strategy_id=strategy.id, leg_number=number, instrument='NIFTY',
+                                       product_type='options', expiry='current_week', action='SELL',
+                                       option_type=kind, strike_selection='ATM', lots=1))
+        db.session.commit()
+        yield app, strategy
+        db.session.remove()
+
+
+def test_strikes_rebuilt_per_session(store):
+    app, strategy = store
+    backtest = SupertrendBacktest(strategy, workers=1)
+
+    tasks, skipped = backtest.build_tasks()
+
+    assert skipped == []
+    assert [task['session'] for task in tasks] == SESSIONS
+    # Nearest stored expiry on or after the session, ATM from the index at 09:20
+    assert [leg['symbol'] for leg in tasks[0]['legs']] == ['NIFTY06JAN2625000CE', 'NIFTY06JAN2625000PE']
+    assert [leg['symbol'] for leg in tasks[2]['legs']] == ['NIFTY13JAN2625000CE', 'NIFTY13JAN2625000PE']
+    assert tasks[0]['legs'][0]['lot_size'] == 75
+
+
+def test_spot_from_put_call_parity_without_index_candles(store):
+    app, strategy = store
+    OHLCCandle.query.filter_by(exchange='NSE_INDEX').delete()
+    db.session.commit()
+
+    task = SupertrendBacktest(strategy, workers=1).build_task(SESSIONS[1])
+    strikes = {int(leg['symbol'][12:17]) for leg in task['legs']}
+    assert len(strikes) == 1 and strikes.pop() in STRIKES
+
+
+def test_market_condition_filters_sessions(store):
+    app, strategy = store
+    strategy.market_condition = 'expiry'
+
+    tasks, skipped = SupertrendBacktest(strategy, workers=1).build_tasks()
+
+    assert [task['session'] for task in tasks] == [date(2026, 1, 6)]
+    assert {s['session'] for s in skipped} == {'2026-01-05', '2026-01-07'}
+
+
+def test_process_pool_matches_inline_run(store):
+    app, strategy = store
+    settings = [(p, m, 'breakout') for p in (5, 7, 10) for m in (1.5, 2.0)]
+
+    inline = SupertrendBacktest(strategy, workers=1).run(settings)
+    pooled = SupertrendBacktest(strategy, workers=2).run(settings)
+
+    assert len(inline) == len(SESSIONS) * len(settings)
+    pd.testing.assert_frame_equal(inline, pooled)
+
+    summary = summarize(inline)
+    assert len(summary) == len(settings)
+    assert summary['trades'].sum() == len(inline)
@@ -0,0 +1,119 @@
+"""
+Unit tests for concurrent Supertrend exit evaluation in SupertrendExitService.monitor_strategies
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+import app as app_package
+from app import db
+from app.models import Strategy
+from app.utils.supertrend_exit_service import SupertrendExitService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    app = Flask('supertrend_exit_parallel_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SUPERTREND_EVAL_WORKERS'] = 4
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        for i in range(4):
+            db.session.add(Strategy(user_id=1, name=f's{i}', supertrend_exit_enabled=True,
+                                    supertrend_timeframe='5m', is_active=True))
+        db.session.commit()
+
+    monkeypatch.setattr(app_package, 'create_app', lambda *a, **k: pytest.fail('create_app called per cycle'))
+
+    svc = SupertrendExitService()
+    saved = (svc.app, svc.max_workers, svc._executor)
+    svc.app, svc._executor = None, None
+    svc.evaluation_metrics.clear()
+    svc.app = app
+    svc.max_workers = app.config['SUPERTREND_EVAL_WORKERS']
+    monkeypatch.setattr(svc, 'should_check_strategy', lambda strategy: True)
+    yield svc, app
+
+    if svc._executor:
+        svc._executor.shutdown(wait=True)
+    svc.app, svc.max_workers, svc._executor = saved
+    svc.evaluation_metrics.clear()
+    with app.app_context():
+        db.session.remove()
+
+
+def test_due_strategies_evaluated_concurrently_on_the_reused_app(service, monkeypatch):
+    svc, app = service
+    threads = set()
+
+    def slow_check(strategy, check_app):
+        assert check_app is app
+        threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+
+    monkeypatch.setattr(svc, 'check_supertrend_exit', slow_check)
+
+    started = time.perf_counter()
+    svc.monitor_strategies()
+    elapsed = time.perf_counter() - started
+
+    assert len(threads) == 4
+    assert elapsed < 0.6  # 4 x 0.2s run side by side, not back to back
+
+    metrics = svc.get_metrics()
+    assert set(metrics['strategies']) == {1, 2, 3, 4}
+    for record in metrics['strategies'].values():
+        assert record['duration_ms'] >= 200
+        assert record['lag_ms'] >= record['start_lag_ms'] + record['duration_ms'] - 1
+    assert metrics['last_cycle_lag_ms'] >= 200
+
+
+def test_one_failing_strategy_does_not_stop_the_others(service, monkeypatch):
+    svc, app = service
+    checked = []
+
+    def check(strategy, check_app):
+        if strategy.name == 's1':
+            raise RuntimeError('broker down')
+        checked.append(strategy.name)
+
+    monkeypatch.setattr(svc, 'check_supertrend_exit', check)
+    svc.monitor_strategies()
+
+    assert sorted(checked) == ['s0', 's2', 's3']
+    assert len(svc.evaluation_metrics) == 4
+
+
+def test_exits_are_serialized_per_strategy(service, monkeypatch):
+    svc, app = service
+    active = {}
+    overlaps = []
+
+    def exit_body(strategy, exit_reason, exit_app):
+        active[strategy.id] = active.get(strategy.id, 0) + 1
+        if active[strategy.id] > 1:
+            overlaps.append(strategy.id)
+        time.sleep(0.05)
+        active[strategy.id] -= 1
+
+    monkeypatch.setattr(svc, '_trigger_sequential_exit', exit_body)
+
+    with app.app_context():
+        strategies = Strategy.query.order_by(Strategy.id).all()[:2]
+        workers = [threading.Thread(target=svc.trigger_sequential_exit, args=(strategy, 'test', app))
+                   for strategy in strategies for _ in range(3)]
+
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+    assert overlaps == []
+    # Same strategy waits its turn; different strategies still exit side by side
+    assert 0.15 <= elapsed < 0.3
@@ -0,0 +1,95 @@
+"""
+Regression tests for the numba-compiled Supertrend loop against the
+pure-Python Pine Script reference implementation, and the parameter grid
+"""
+
+import numpy as np
+import pytest
+import talib
+
+from app.utils.supertrend import calculate_supertrend, calculate_supertrend_grid, get_supertrend_signal
+
+HIGH = np.array([101.0, 102.5, 103.0, 102.0, 104.0, 105.5, 105.0, 103.5, 102.0, 100.5,
+                 99.0, 98.5, 100.0, 101.5, 103.0, 104.5, 104.0, 102.5, 101.0, 99.5])
+LOW = HIGH - np.array([1.5, 2.0, 1.0, 1.5, 2.5, 1.0, 2.0, 1.5, 2.5, 2.0,
+                       1.0, 1.5, 2.0, 1.0, 1.5, 2.0, 2.5, 1.0, 1.5, 2.0])
+CLOSE = (HIGH + LOW) / 2 + np.array([0.5, -0.25, 0.25, -0.5, 0.75, 0.25, -0.5, -0.25, -0.75, -0.5,
+                                     0.25, 0.5, 0.5, 0.25, 0.5, 0.5, -0.75, -0.25, -0.5, -0.75])
+
+# Supertrend(3, 1.5) on the bars above. Bar 3: ATR = (2 + 1.75 + 2.25) / 3 = 2,
+# hl2 = 101.25 -> first value is the upper band 101.25 + 1.5 * 2 = 104.25 (downtrend).
+EXPECTED_TREND = [np.nan, np.nan, np.nan, 104.25, 104.25, 101.583333, 101.583333, 101.583333,
+                  104.262346, 102.841564, 101.227709, 100.443473, 100.443473, 98.136234,
+                  99.465823, 100.643882, 100.643882, 100.643882, 103.110146, 101.531764]
+EXPECTED_DIRECTION = [np.nan, np.nan, np.nan, 1, 1, -1, -1, -1, 1, 1, 1, 1, 1, -1, -1, -1, -1, -1, 1, 1]
+
+
+def _random_bars(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return close + rng.random(n) * 2, close - rng.random(n) * 2, close
+
+
+@pytest.mark.parametrize('use_jit', [True, False])
+def test_known_values(use_jit):
+    trend, direction, long_line, short_line = calculate_supertrend(HIGH, LOW, CLOSE, 3, 1.5, use_jit=use_jit)
+
+    np.testing.assert_allclose(trend, EXPECTED_TREND, rtol=0, atol=1e-6)
+    np.testing.assert_array_equal(direction, EXPECTED_DIRECTION)
+    # Long line only while bullish, short line only while bearish
+    assert np.array_equal(np.isnan(long_line), direction != -1)
+    assert np.array_equal(np.isnan(short_line), direction != 1)
+    assert get_supertrend_signal(direction) == 'SELL'
+
+
+@pytest.mark.parametrize('n,period,multiplier', [(10, 7, 3), (5000, 7, 3), (5000, 10, 2.5), (5000, 14, 1)])
+def test_jit_is_bit_identical_to_reference(n, period, multiplier):
+    high, low, close = _random_bars(n, seed=n + period)
+
+    jit = calculate_supertrend(high, low, close, period, multiplier, use_jit=True)
+    reference = calculate_supertrend(high, low, close, period, multiplier, use_jit=False)
+
+    for got, expected in zip(jit, reference):
+        assert got.tobytes() == expected.tobytes()
+
+
+def test_too_few_bars_is_all_nan():
+    trend, direction, _, _ = calculate_supertrend(HIGH[:3], LOW[:3], CLOSE[:3], 7, 3)
+    assert np.isnan(trend).all() and np.isnan(direction).all()
+    assert get_supertrend_signal(direction) == 'NEUTRAL'
+
+
+@pytest.mark.parametrize('use_jit', [True, False])
+def test_grid_rows_match_single_calculation(monkeypatch, use_jit):
+    high, low, close = _random_bars(2000, seed=11)
+    periods, multipliers = [5, 7, 10], [1.5, 2, 3]
+
+    atr_calls = []
+    original_atr = talib.ATR
+    monkeypatch.setattr(talib, 'ATR', lambda *args: atr_calls.append(args[3]) or original_atr(*args))
+    trend, direction, combos = calculate_supertrend_grid(high, low, close, periods, multipliers, use_jit=use_jit)
+
+    assert atr_calls == periods  # ATR shared across multipliers
+    assert trend.shape == direction.shape == (9, 2000) and direction.dtype == np.int8
+    assert combos[4] == (7, 2.0)
+    for row, (period, multiplier) in enumerate(combos):
+        expected_trend, expected_direction, _, _ = calculate_supertrend(high, low, close, period, multiplier)
+        assert trend[row].tobytes() == expected_trend.tobytes()
+        np.testing.assert_array_equal(direction[row], np.nan_to_num(expected_direction))
+
+
+def test_sweep_ranges_are_capped_before_they_are_built(monkeypatch):
+    from app.tradingview import routes
+
+    assert routes._parse_sweep_values('1:4:0.5', None, float) == [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0]
+    assert routes._parse_sweep_values('5:20:1', None, int) == list(range(5, 21))
+
+    def no_arange(*args):
+        raise AssertionError('values built for an oversized range')
+
+    monkeypatch.setattr(routes.np, 'arange', no_arange)
+    for value in ('0:1e12:0.001', '1:1001:1', '1:inf:1'):
+        with pytest.raises(ValueError):
+            routes._parse_sweep_values(value, None, float)
+    with pytest.raises(ValueError):
+        routes._parse_sweep_values(','.join(['1'] * 1001), None, int)
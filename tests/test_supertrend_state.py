@@ -0,0 +1,159 @@
+"""
+Unit tests for the streaming Supertrend state and its use by the Supertrend exit service
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from app import db
+from app.models import Strategy
+from app.utils.supertrend import SupertrendState, calculate_supertrend
+from app.utils.supertrend_exit_service import SupertrendExitService
+
+
+def _random_bars(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return close + rng.random(n) * 2, close - rng.random(n) * 2, close
+
+
+@pytest.mark.parametrize('period,multiplier', [(7, 3), (10, 2.5), (2, 1.5), (1, 3)])
+def test_streaming_matches_batch(period, multiplier):
+    high, low, close = _random_bars(600, seed=period)
+    expected = calculate_supertrend(high, low, close, period, multiplier)
+
+    state = SupertrendState(period, multiplier)
+    streamed = np.array([state.update(high[i], low[i], close[i], i) for i in range(len(close))])
+
+    for column, reference in zip(streamed.T, expected):
+        np.testing.assert_allclose(column, reference, rtol=1e-12, atol=0)
+    np.testing.assert_array_equal(streamed[:, 1], expected[1])
+
+
+def test_same_time_bar_replaces_the_last_one():
+    high, low, close = _random_bars(200, seed=3)
+    state = SupertrendState.seed(high[:-1], low[:-1], close[:-1], 10, 3, times=list(range(199)))
+
+    # Forming candle, revised twice before it closes
+    state.update(high[-1] + 4, low[-1], close[-1] + 3, 199)
+    state.update(high[-1], low[-1] - 4, close[-1] - 3, 199)
+    state.update(high[-1], low[-1], close[-1], 199)
+
+    expected = SupertrendState.seed(high, low, close, 10, 3, times=list(range(200)))
+    np.testing.assert_array_equal(state.values, expected.values)
+    assert state.bars == 200
+
+
+def test_serialized_state_resumes_exactly():
+    high, low, close = _random_bars(300, seed=4)
+    state = SupertrendState.seed(high[:150], low[:150], close[:150], 7, 3, times=list(range(150)))
+    restored = SupertrendState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+    for i in range(150, 300):
+        np.testing.assert_array_equal(restored.update(high[i], low[i], close[i], i),
+                                      state.update(high[i], low[i], close[i], i))
+
+    assert restored.to_dict() == state.to_dict()
+
+
+def test_not_ready_until_first_atr():
+    state = SupertrendState(5, 3)
+    for i in range(5):
+        state.update(101, 99, 100, i)
+    assert not state.ready and np.isnan(state.supertrend)
+    state.update(101, 99, 100, 5)
+    assert state.ready and state.direction == 1.0
+
+
+@pytest.fixture
+def service():
+    app = Flask('supertrend_state_test')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        strategy = Strategy(user_id=1, name='s', supertrend_period=7, supertrend_multiplier=3.0,
+                            supertrend_timeframe='5m')
+        db.session.add(strategy)
+        db.session.commit()
+
+        svc = SupertrendExitService()
+        svc.supertrend_states.clear()
+        yield svc, strategy
+        svc.supertrend_states.clear()
+        db.session.remove()
+
+
+def _spread(high, low, close):
+    index = pd.date_range('2026-01-05 09:15', periods=len(close), freq='5min')
+    return pd.DataFrame({'high': high, 'low': low, 'close': close}, index=index)
+
+
+def test_service_seeds_once_then_streams_new_bars(service, monkeypatch):
+    svc, strategy = service
+    high, low, close = _random_bars(80, seed=5)
+
+    seeds = []
+    original_seed = SupertrendState.seed
+    monkeypatch.setattr(SupertrendState, 'seed',
+                        classmethod(lambda cls, *a, **k: seeds.append(1) or original_seed(*a, **k)))
+
+    svc.update_supertrend_state(strategy, {1, 2}, _spread(high[:60], low[:60], close[:60]))
+    state = svc.update_supertrend_state(strategy, {1, 2}, _spread(high, low, close))
+    assert len(seeds) == 1
+
+    trend, direction, _, _ = calculate_supertrend(high, low, close, 7, 3.0)
+    assert state.direction == direction[-1]
+    assert state.supertrend == pytest.approx(trend[-1], rel=1e-12)
+
+    # A different open leg set reseeds
+    svc.update_supertrend_state(strategy, {1}, _spread(high, low, close))
+    assert len(seeds) == 2
+
+
+def test_service_resumes_from_persisted_state(service, monkeypatch):
+    svc, strategy = service
+    high, low, close = _random_bars(80, seed=6)
+    svc.update_supertrend_state(strategy, {1}, _spread(high[:70], low[:70], close[:70]))
+    assert json.loads(db.session.get(Strategy, strategy.id).supertrend_state)['state']['period'] == 7
+
+    # Restart: nothing in memory, state comes back from the Strategy row
+    svc.supertrend_states.clear()
+    db.session.refresh(strategy)
+    monkeypatch.setattr(SupertrendState, 'seed', classmethod(lambda cls, *a, **k: pytest.fail('reseeded')))
+    state = svc.update_supertrend_state(strategy, {1}, _spread(high, low, close))
+
+    assert state.bars == 80
+
+
+def test_service_reseeds_when_closed_bars_change(service, monkeypatch):
+    svc, strategy = service
+    high, low, close = _random_bars(80, seed=8)
+    svc.update_supertrend_state(strategy, {1}, _spread(high[:70], low[:70], close[:70]))
+
+    # Broker bars replace two live bars behind the state's last bar
+    high, low, close = high.copy(), low.copy(), close.copy()
+    high[66:68] += 5.0
+    close[66:68] += 4.0
+    state = svc.update_supertrend_state(strategy, {1}, _spread(high, low, close))
+
+    trend, direction, _, _ = calculate_supertrend(high, low, close, 7, 3.0)
+    assert state.direction == direction[-1]
+    assert state.supertrend == pytest.approx(trend[-1], rel=1e-12)
+    assert state.bars == 80
+
+    # A bar filled in behind the last bar (lagging leg caught up) also reseeds
+    spread = _spread(high, low, close)
+    gap = spread.drop(spread.index[75])
+    svc.update_supertrend_state(strategy, {1}, gap.iloc[:-2])
+    seeds = []
+    original_seed = SupertrendState.seed
+    monkeypatch.setattr(SupertrendState, 'seed',
+                        classmethod(lambda cls, *a, **k: seeds.append(1) or original_seed(*a, **k)))
+    state = svc.update_supertrend_state(strategy, {1}, spread)
+
+    assert len(seeds) == 1 and state.bars == 80
@@ -0,0 +1,55 @@
+"""
+Unit tests for the precomputed trading calendar
+"""
+
+from datetime import date, datetime, time
+
+import pytest
+
+from app.utils.trading_calendar import TradingCalendar, compile_intervals
+
+WEEKLY = {day: [(time(9, 15), time(15, 30))] for day in range(5)}
+MONDAY = date(2025, 11, 3)
+
+
+@pytest.fixture
+def calendar():
+    cal = TradingCalendar()
+    saved = (cal._weekly_sessions, cal._holidays, cal._special_sessions, cal._index, cal.horizon_days)
+    cal.horizon_days = 14
+    cal._weekly_sessions = WEEKLY
+    cal._holidays = {date(2025, 11, 5): {'holiday_name': 'Guru Nanak Jayanti', 'is_special_session': False}}
+    cal._special_sessions = {date(2025, 11, 8): [(time(18, 0), time(19, 0))]}  # Saturday session
+    cal._build_index(MONDAY)
+    yield cal
+    cal._weekly_sessions, cal._holidays, cal._special_sessions, cal._index, cal.horizon_days = saved
+
+
+def test_compile_skips_holidays_and_adds_special_sessions():
+    intervals = compile_intervals(
+        WEEKLY,
+        {date(2025, 11, 5): {'is_special_session': False}},
+        {date(2025, 11, 8): [(time(18, 0), time(19, 0))]},
+        MONDAY, 7
+    )
+    days = [start.date() for start, _ in intervals]
+    assert date(2025, 11, 5) not in days
+    assert date(2025, 11, 8) in days
+    assert len(intervals) == 5
+
+
+def test_is_open_with_pre_open_buffer(calendar):
+    assert calendar.is_open(datetime(2025, 11, 3, 10, 0))
+    assert calendar.is_open(datetime(2025, 11, 3, 15, 30))
+    assert not calendar.is_open(datetime(2025, 11, 3, 9, 5))
+    assert calendar.is_open(datetime(2025, 11, 3, 9, 5), pre_open_minutes=15)
+    assert not calendar.is_open(datetime(2025, 11, 5, 10, 0))  # holiday
+    assert calendar.is_open(datetime(2025, 11, 8, 18, 30))  # special session
+
+
+def test_next_open_and_close(calendar):
+    # Tuesday after close -> Wednesday is a holiday -> Thursday open
+    assert calendar.next_open(datetime(2025, 11, 4, 16, 0)) == datetime(2025, 11, 6, 9, 15)
+    assert calendar.next_close(datetime(2025, 11, 3, 11, 0)) == datetime(2025, 11, 3, 15, 30)
+    assert calendar.next_close(datetime(2025, 11, 7, 16, 0)) == datetime(2025, 11, 8, 19, 0)
+    assert calendar.is_holiday(date(2025, 11, 5))
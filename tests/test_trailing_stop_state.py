@@ -0,0 +1,133 @@
+"""
+Unit tests for the in-memory trailing stop loss ratchet state
+"""
+
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.utils import risk_manager as risk_manager_module
+from app.utils.risk_manager import RiskManager
+from app.utils.trailing_stop import ACTIVE, TRIGGERED, WAITING, TrailingStopState
+
+
+def test_ratchet_tracks_intra_cycle_peak_and_never_lowers_stop():
+    tsl = TrailingStopState(strategy_id=1)
+    assert tsl.state == WAITING
+
+    assert tsl.update(0.0, -1000.0) == -1000.0
+    assert tsl.state == ACTIVE
+    assert tsl.transitioned
+
+    tsl.mark_persisted()
+    for pnl in (200.0, 650.0, 300.0):  # Peak between two persisted cycles
+        stop = tsl.update(pnl, -1000.0)
+
+    assert tsl.peak_pnl == 650.0
+    assert stop == -350.0
+    assert tsl.dirty and not tsl.transitioned
+
+
+def test_write_behind_due_only_after_interval_or_transition():
+    tsl = TrailingStopState(strategy_id=1, active=True, initial_stop=-500.0, stop=-500.0)
+    tsl.update(100.0, -500.0)
+
+    assert not tsl.due(5.0, now=tsl.last_persisted + 1)
+    assert tsl.due(5.0, now=tsl.last_persisted + 6)
+
+    tsl.mark_persisted()
+    tsl.trigger('TSL: test', datetime(2025, 11, 3, 10, 0))
+    assert tsl.state == TRIGGERED
+    assert tsl.due(5.0, now=tsl.last_persisted)
+    assert tsl.to_row()['trailing_sl_triggered_at'] == datetime(2025, 11, 3, 10, 0)
+
+
+def test_deactivate_clears_tracking_but_keeps_trigger_history():
+    triggered = datetime(2025, 11, 3, 10, 0)
+    tsl = TrailingStopState(strategy_id=1, active=True, peak_pnl=400.0, initial_stop=-500.0,
+                            stop=-100.0, triggered_at=triggered)
+    tsl.deactivate()
+
+    row = tsl.to_row()
+    assert row['trailing_sl_active'] is False
+    assert row['trailing_sl_initial_stop'] is None
+    assert row['trailing_sl_triggered_at'] == triggered
+
+
+def test_outside_observations_share_the_risk_manager_state():
+    rm = RiskManager()
+    strategy = SimpleNamespace(id=4242, name='tsl', trailing_sl_active=False, trailing_sl_peak_pnl=0.0,
+                               trailing_sl_initial_stop=None, trailing_sl_trigger_pnl=None,
+                               trailing_sl_triggered_at=None, trailing_sl_exit_reason=None)
+    try:
+        first = rm.observe_trailing_sl(strategy, 300.0, -1000.0)
+        assert (first['active'], first['peak_pnl'], first['stop']) == (True, 300.0, -700.0)
+
+        # The risk loop works on the same object, so the peak is not lost or lowered
+        tsl = rm._get_tsl_state(strategy)
+        tsl.update(500.0, -1000.0)
+        assert rm.observe_trailing_sl(strategy, 100.0, -1000.0)['stop'] == -500.0
+
+        tsl.trigger('TSL: test', datetime(2025, 11, 3, 10, 0))
+        triggered = rm.observe_trailing_sl(strategy, 900.0, -1000.0)
+        assert triggered['peak_pnl'] == 500.0 and triggered['triggered_at'] is not None
+
+        cleared = rm.observe_trailing_sl(strategy, 0.0, None)
+        assert not cleared['active'] and cleared['stop'] is None and cleared['triggered_at'] is not None
+    finally:
+        rm.reset_trailing_sl(strategy.id)
+
+
+class _GatedSession:
+    """db.session stand-in: records strategy 4343's UPDATE rows in write order, the first write waits on `gate`"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.written = []
+
+    def execute(self, statement, rows):
+        if not self.entered.is_set():
+            self.entered.set()
+            self.gate.wait(5)
+        self.written.extend(dict(row) for row in rows if row['id'] == 4343)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_reset_is_written_after_a_flush_already_in_flight(monkeypatch):
+    session = _GatedSession()
+    monkeypatch.setattr(risk_manager_module, 'db', SimpleNamespace(session=session))
+    rm = RiskManager()
+    previous = TrailingStopState(strategy_id=4343, active=True, initial_stop=-1000.0, stop=-1000.0)
+    previous.update(800.0, -1000.0)
+    previous.trigger('TSL: previous trade', datetime(2025, 11, 3, 10, 0))
+    rm._tsl_states[4343] = previous
+    try:
+        old_flush = threading.Thread(target=rm.persist_trailing_sl_states)
+        old_flush.start()
+        assert session.entered.wait(5)  # Old rows built, UPDATE in flight
+
+        rm.reset_trailing_sl(4343, initial_stop=-300.0)
+        new_flush = threading.Thread(target=rm.persist_trailing_sl_states)
+        new_flush.start()
+
+        # The new trade's state is in memory right away, nothing recovered from the row
+        fresh = rm._tsl_states[4343]
+        assert fresh is not previous and fresh.triggered_at is None and fresh.stop == -300.0
+
+        session.gate.set()
+        old_flush.join(5)
+        new_flush.join(5)
+
+        assert [row['trailing_sl_triggered_at'] for row in session.written] == \
+            [datetime(2025, 11, 3, 10, 0), None]
+        last = session.written[-1]
+        assert (last['trailing_sl_peak_pnl'], last['trailing_sl_trigger_pnl'], last['trailing_sl_active']) == \
+            (0.0, -300.0, True)
+    finally:
+        rm._tsl_states.pop(4343, None)
@@ -23,7 +23,7 @@ import time
 import signal
 import logging
 import threading
-from datetime import datetime, time as dt_time, timedelta, date
+from datetime import datetime, timedelta
 from pathlib import Path
 import pytz
 
@@ -49,9 +49,14 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv(os.path.join(app_dir, '.env'))
 
+from app.utils.trading_calendar import trading_calendar, get_ist_now
+
 # Shared data file path
 SHARED_DATA_PATH = os.path.join(app_dir, 'instance', 'websocket_data.json')
 
+# WebSocket connects this many minutes before each session opens
+PRE_MARKET_MINUTES = 15
+
 
 class StandaloneWebSocketService:
     """
@@ -77,12 +82,9 @@ class StandaloneWebSocketService:
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
 
-        # Trading hours from database (will be loaded dynamically)
+        # Trading hours come from the shared trading calendar
         self.ist = pytz.timezone('Asia/Kolkata')
-        self.cached_sessions = []
-        self.cached_holidays = {}
-        self.cached_special_sessions = {}
-        self.cache_refresh_time = None
+        self.calendar_refreshed_on = None
 
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
@@ -90,130 +92,36 @@ class StandaloneWebSocketService:
         self._shutdown = True
         self.stop()
 
-    def refresh_trading_hours_cache(self):
-        """Load trading hours from database into cache"""
+    def refresh_trading_calendar(self):
+        """
+        Build the shared trading calendar for this process. create_app() compiles it
+        from the database; later calls re-read it (edits in the web app do not reach
+        this process otherwise).
+        """
         try:
-            from app import create_app, db
-            from app.models import TradingSession, MarketHoliday, SpecialTradingSession
-            from sqlalchemy import and_
-
-            app = create_app()
-            with app.app_context():
-                now = datetime.now(self.ist)
-                year_start = date(now.year, 1, 1)
-                year_end = date(now.year, 12, 31)
-
-                # Cache regular trading sessions
-                sessions = TradingSession.query.filter_by(is_active=True).all()
-                self.cached_sessions = []
-                for session in sessions:
-                    self.cached_sessions.append({
-                        'day_of_week': session.day_of_week,
-                        'start_time': session.start_time,
-                        'end_time': session.end_time,
-                        'is_active': session.is_active
-                    })
-
-                # Cache holidays
-                holidays = MarketHoliday.query.filter(
-                    and_(
-                        MarketHoliday.holiday_date >= year_start,
-                        MarketHoliday.holiday_date <= year_end
-                    )
-                ).all()
-
-                self.cached_holidays = {}
-                for holiday in holidays:
-                    self.cached_holidays[holiday.holiday_date] = {
-                        'holiday_name': holiday.holiday_name,
-                        'is_special_session': holiday.is_special_session
-                    }
-
-                # Cache special sessions
-                special_sessions = SpecialTradingSession.query.filter(
-                    and_(
-                        SpecialTradingSession.session_date >= year_start,
-                        SpecialTradingSession.session_date <= year_end,
-                        SpecialTradingSession.is_active == True
-                    )
-                ).all()
-
-                self.cached_special_sessions = {}
-                for session in special_sessions:
-                    if session.session_date not in self.cached_special_sessions:
-                        self.cached_special_sessions[session.session_date] = []
-                    self.cached_special_sessions[session.session_date].append({
-                        'session_name': session.session_name,
-                        'start_time': session.start_time,
-                        'end_time': session.end_time
-                    })
-
-                self.cache_refresh_time = datetime.now(self.ist)
-                logger.info(f"Trading hours cache refreshed: {len(self.cached_sessions)} sessions, "
-                          f"{len(self.cached_holidays)} holidays, "
-                          f"{len(self.cached_special_sessions)} special sessions")
-
+            if trading_calendar.app is None:
+                from app import create_app
+                create_app()
+            else:
+                trading_calendar.refresh()
         except Exception as e:
-            logger.error(f"Failed to refresh trading hours cache: {e}")
-            # Use default NSE hours as fallback
-            self._set_default_cache()
-
-    def _set_default_cache(self):
-        """Set default NSE trading hours if database not available"""
-        logger.warning("Using default NSE trading hours (database unavailable)")
-        self.cached_sessions = [
-            {'day_of_week': i, 'start_time': dt_time(9, 15), 'end_time': dt_time(15, 30), 'is_active': True}
-            for i in range(5)  # Monday to Friday
-        ]
-        self.cached_holidays = {}
-        self.cached_special_sessions = {}
+            # The calendar falls back to default NSE hours
+            logger.error(f"Failed to load trading calendar: {e}")
+        self.calendar_refreshed_on = get_ist_now().date()
 
     def is_trading_hours(self) -> bool:
         """
-        Check if current time is within trading hours based on database settings.
+        Check if current time is within trading hours (shared trading calendar).
         Includes 15-minute pre-market buffer for WebSocket startup.
         """
         try:
-            now = datetime.now(self.ist)
-            current_day = now.weekday()  # 0=Monday, 6=Sunday
-            current_time = now.time()
-            current_date = now.date()
-
-            # Refresh cache if needed (once per day at 5 AM)
-            if (self.cache_refresh_time is None or
-                (now.hour == 5 and now.minute < 5 and
-                 (self.cache_refresh_time.date() != current_date))):
-                self.refresh_trading_hours_cache()
-
-            # If no cached sessions, use defaults
-            if not self.cached_sessions:
-                self._set_default_cache()
-
-            # Check for special trading session first (e.g., Muhurat trading)
-            if current_date in self.cached_special_sessions:
-                for session in self.cached_special_sessions[current_date]:
-                    # Include 15-minute pre-market buffer
-                    pre_market = (datetime.combine(current_date, session['start_time']) - timedelta(minutes=15)).time()
-                    if pre_market <= current_time <= session['end_time']:
-                        logger.debug(f"Special session active: {session['session_name']}")
-                        return True
-
-            # Check if it's a holiday (without special session)
-            if current_date in self.cached_holidays:
-                holiday_info = self.cached_holidays[current_date]
-                if not holiday_info.get('is_special_session', False):
-                    logger.debug(f"Market holiday: {holiday_info.get('holiday_name', 'Unknown')}")
-                    return False
+            now = get_ist_now()
 
-            # Check regular trading sessions for current day
-            for session in self.cached_sessions:
-                if session['day_of_week'] == current_day and session['is_active']:
-                    # Include 15-minute pre-market buffer
-                    pre_market = (datetime.combine(current_date, session['start_time']) - timedelta(minutes=15)).time()
-                    if pre_market <= current_time <= session['end_time']:
-                        return True
+            # Re-read the calendar once per day at 5 AM
+            if self.calendar_refreshed_on is None or (self.calendar_refreshed_on != now.date() and now.hour >= 5):
+                self.refresh_trading_calendar()
 
-            return False
+            return trading_calendar.is_open(now, pre_open_minutes=PRE_MARKET_MINUTES)
 
         except Exception as e:
             logger.error(f"Error checking trading hours: {e}")
@@ -221,64 +129,16 @@ class StandaloneWebSocketService:
 
     def get_time_until_market_open(self) -> int:
         """
-        Calculate seconds until next market open based on database settings.
+        Calculate seconds until next market open (with the pre-market buffer).
         Returns seconds to wait before next trading session.
         """
         try:
-            now = datetime.now(self.ist)
-            current_day = now.weekday()
-            current_time = now.time()
-            current_date = now.date()
-
-            # Ensure cache is loaded
-            if not self.cached_sessions:
-                self.refresh_trading_hours_cache()
-                if not self.cached_sessions:
-                    self._set_default_cache()
-
-            # Find session for current day
-            current_session = None
-            for session in self.cached_sessions:
-                if session['day_of_week'] == current_day and session['is_active']:
-                    current_session = session
-                    break
-
-            # If it's a trading day and before market open (with 15-min buffer)
-            if current_session:
-                pre_market = (datetime.combine(current_date, current_session['start_time']) - timedelta(minutes=15)).time()
-                if current_time < pre_market:
-                    # Check if today is a holiday
-                    if current_date not in self.cached_holidays or \
-                       self.cached_holidays[current_date].get('is_special_session', False):
-                        # Market opens today
-                        market_open_today = now.replace(
-                            hour=pre_market.hour,
-                            minute=pre_market.minute,
-                            second=0,
-                            microsecond=0
-                        )
-                        return int((market_open_today - now).total_seconds())
-
-            # Find next trading day
-            for i in range(1, 8):
-                next_day = (current_day + i) % 7
-                next_date = current_date + timedelta(days=i)
-
-                # Skip holidays
-                if next_date in self.cached_holidays and \
-                   not self.cached_holidays[next_date].get('is_special_session', False):
-                    continue
-
-                # Find session for next day
-                for session in self.cached_sessions:
-                    if session['day_of_week'] == next_day and session['is_active']:
-                        pre_market = (datetime.combine(next_date, session['start_time']) - timedelta(minutes=15)).time()
-                        next_market_open = datetime.combine(next_date, pre_market)
-                        next_market_open = self.ist.localize(next_market_open)
-                        return int((next_market_open - now).total_seconds())
-
-            # Fallback: wait 1 hour and check again
-            return 3600
+            now = get_ist_now()
+            next_open = trading_calendar.next_open(now)
+            if next_open is None:
+                # No session in the calendar window: wait 1 hour and check again
+                return 3600
+            return max(int((next_open - timedelta(minutes=PRE_MARKET_MINUTES) - now).total_seconds()), 0)
 
         except Exception as e:
             logger.error(f"Error calculating time until market open: {e}")
@@ -548,8 +408,8 @@ class StandaloneWebSocketService:
         """Main service loop with trading hours awareness"""
         logger.info("Starting WebSocket Service (OpenAlgo SDK)...")
 
-        # Load trading hours cache first
-        self.refresh_trading_hours_cache()
+        # Load the trading calendar first
+        self.refresh_trading_calendar()
 
         # Load config from database
         if not self.load_config_from_db():